@@ -1,16 +1,268 @@
-from util.data_collector import DataCollector
-from util.plot_market_data import plot_market_data
+import sys
+import argparse
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from util.alerts import evaluate_alerts, parse_sinks
+from util.assets import ASSETS
+from util.data_collector import DataCollector, SOURCES, needs_full_history
+from util.frequency import FREQUENCIES
+from util.metrics import metrics
+from util.pipeline import ArtifactCache, build_analysis_pipeline, write_composite
+from util.snapshot import write_snapshot
+from util.schema import parse_size
+from util.plot_market_data import print_latest_signal
+from util.plotters.market_plotter import LOOKBACK_WINDOWS
 
+# 常駐実行・クエリAPIで使用できない共通オプション（指定した場合はエラー）
+UNSUPPORTED_OPTIONS = {
+    'daemon': ['offline', 'assets', 'workers'],
+    'serve': ['only', 'assets', 'workers', 'no_snapshot', 'windows', 'alerts', 'deadline'],
+}
 
-def main():
+def parse_sources(value):
+    """カンマ区切りのデータソース指定をリストに変換"""
+    sources = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in sources if name not in SOURCES]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"不明なデータソース: {', '.join(unknown)}（指定可能: {', '.join(SOURCES)}）")
+    return sources
+
+
+def parse_assets(value):
+    """カンマ区切りの資産指定をリストに変換（'all' は全資産）"""
+    if value.strip().lower() == 'all':
+        return list(ASSETS)
+    assets = [asset.strip().upper() for asset in value.split(',') if asset.strip()]
+    unknown = [asset for asset in assets if asset not in ASSETS]
+    if unknown or not assets:
+        raise argparse.ArgumentTypeError(
+            f"不明な資産: {', '.join(unknown)}（指定可能: {', '.join(ASSETS)}, all）")
+    return assets
+
+
+def parse_lookback(value):
+    """取得期間の指定を日数に変換（例: 365, 90d, 6m, 10y）"""
+    units = {'d': 'days', 'w': 'weeks', 'm': 'months', 'y': 'years'}
+    unit = value[-1].lower() if value and value[-1].isalpha() else 'd'
+    number = value[:-1] if value and value[-1].isalpha() else value
+    if unit not in units or not number.isdigit() or int(number) <= 0:
+        raise argparse.ArgumentTypeError(f"不正な期間指定: {value}（例: 365, 90d, 6m, 10y）")
+    now = datetime.now()
+    return (now - (now - relativedelta(**{units[unit]: int(number)}))).days
+
+
+def parse_windows(value):
+    """カンマ区切りの期間別グラフの指定を 表示名 -> 日数 に変換（'all' は全期間）"""
+    windows = {}
+    for label in [label.strip() for label in value.split(',') if label.strip()]:
+        windows[label] = None if label.lower() == 'all' else parse_lookback(label)
+    if not windows:
+        raise argparse.ArgumentTypeError(f"不正な期間指定: {value}（例: 30d,90d,1y,all）")
+    return windows
+
+
+def parse_alert_sinks(value):
+    """カンマ区切りの通知先の指定を送信先のリストに変換（例: stdout,file=DIR,webhook=URL）"""
+    try:
+        return parse_sinks(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def parse_memory_budget(value):
+    """メモリ予算の指定をバイト数に変換（例: 512MB, 2GB）"""
+    try:
+        return parse_size(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def parse_args(argv=None):
+    """コマンドライン引数を解析"""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--only', type=parse_sources, default=None,
+                        help='収集するデータソースをカンマ区切りで指定（例: btcusd,funding_rates）')
+    common.add_argument('--offline', action='store_true',
+                        help='データ収集を行わず保存済みデータのみを使用')
+    common.add_argument('--lookback', type=parse_lookback, default=365, metavar='PERIOD',
+                        help='データの取得・分析期間（例: 365, 90d, 6m, 10y、デフォルト: 365日）')
+    common.add_argument('--freq', choices=list(FREQUENCIES), default='1d',
+                        help='BTCUSD価格・指標・シグナルの頻度（デフォルト: 1d）')
+    common.add_argument('--memory-budget', type=parse_memory_budget, default=None, metavar='SIZE',
+                        help='読み込んだデータの合計メモリ使用量の上限（例: 512MB, 2GB）')
+    common.add_argument('--profile', nargs='?', const='profile', default=None, metavar='DIR',
+                        help='ステージごとにプロファイルを取得し、pstatsと折りたたみスタックをDIR（デフォルト: profile）に出力')
+    common.add_argument('--metrics-dir', default=None, metavar='DIR',
+                        help='ステージ別の計測結果（JSONレポートとPrometheus textfile）の出力先')
+    common.add_argument('--trace-memory', action='store_true',
+                        help='--metrics-dir の計測結果にtracemallocによるステージごとのピークメモリを含める（実行が遅くなります）')
+    common.add_argument('--no-cache', action='store_true',
+                        help='ステージの出力キャッシュを使用せず分析・描画を全て再計算')
+    common.add_argument('--assets', type=parse_assets, default=None, metavar='LIST',
+                        help='複数の資産を並列に分析（例: BTC,ETH,SOL、all で全資産）。'
+                             '資産別のグラフと資産横断のサマリーを reports/ に出力')
+    common.add_argument('--workers', type=int, default=None, metavar='N',
+                        help='--assets 指定時に並列に処理する資産数（デフォルト: CPU数）')
+    common.add_argument('--no-snapshot', action='store_true',
+                        help='分析結果のArrow IPCスナップショット（market_data/snapshots/）を保存しない')
+    common.add_argument('--windows', type=parse_windows, nargs='?', const=LOOKBACK_WINDOWS, default=None,
+                        metavar='LIST',
+                        help='期間別のグラフを1回の計算から作成（例: 30d,90d,1y,all、省略時: 30d,90d,1y,all）。'
+                             'crypto_analysis_<期間>.png に保存')
+    common.add_argument('--alerts', type=parse_alert_sinks, nargs='?', const='stdout', default=None,
+                        metavar='SINKS',
+                        help='シグナルの状態の変化を新しい行のみ評価して通知（例: stdout, file=DIR, '
+                             'webhook=URL のカンマ区切り、省略時: stdout）。描画より前に送信')
+    common.add_argument('--deadline', type=float, default=None, metavar='SECONDS',
+                        help='データ収集全体の制限時間（秒）。超過したデータソースは保存済みデータを使用')
+
+    parser = argparse.ArgumentParser(description='ビットコイン市場分析ツール')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('collect', parents=[common], help='データ収集のみ実行')
+    subparsers.add_parser('analyze', parents=[common], help='市場シグナルを計算して表示')
+    subparsers.add_parser('plot', parents=[common], help='グラフを生成')
+    subparsers.add_parser('all', parents=[common], help='収集・分析・グラフ生成を全て実行（デフォルト）')
+    daemon = subparsers.add_parser('daemon', parents=[common],
+                                   help='常駐してデータソースごとの間隔で更新・再描画')
+    daemon.add_argument('--host', default='0.0.0.0', help='ステータスサーバーのホスト（デフォルト: 0.0.0.0）')
+    daemon.add_argument('--port', type=int, default=8080, help='ステータスサーバーのポート（デフォルト: 8080）')
+    serve = subparsers.add_parser('serve', parents=[common],
+                                  help='保存済みの系列・指標・シグナル・相関を返すクエリAPIを起動')
+    serve.add_argument('--host', default='127.0.0.1', help='クエリAPIのホスト（デフォルト: 127.0.0.1）')
+    serve.add_argument('--port', type=int, default=8081, help='クエリAPIのポート（デフォルト: 8081）')
+    serve.add_argument('--cache-entries', type=int, default=64, metavar='N',
+                       help='メモリ上に保持するデータセット・パイプラインの最大数（デフォルト: 64）')
+    # サブコマンド省略時は従来通り全ステージを実行
+    parser.set_defaults(command='all', only=None, offline=False, lookback=365, freq='1d', metrics_dir=None, trace_memory=False, profile=None,
+                        memory_budget=None, no_cache=False, assets=None, workers=None,
+                        deadline=None, no_snapshot=False, windows=None, alerts=None)
+    # オプションのみを指定した場合（例: --offline）もサブコマンド 'all' として解析
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0].startswith('-') and argv[0] not in ('-h', '--help'):
+        argv = ['all'] + argv
+    args = parser.parse_args(argv)
+    for dest in UNSUPPORTED_OPTIONS.get(args.command, []):
+        if getattr(args, dest) != common.get_default(dest):
+            parser.error(f"--{dest.replace('_', '-')} は {args.command} では使用できません")
+    # 期間別のグラフは最も長い期間が収まるよう取得・分析期間を延ばす（'all' は保存済みの全期間）
+    if args.windows:
+        days = [days for days in args.windows.values() if days is not None]
+        if days:
+            args.lookback = max(args.lookback, max(days))
+    return args
+
+
+def load_results(collector, args):
+    """ステージに応じてデータを収集・読み込み"""
+    if args.offline:
+        return collector.load_stored_data(freq=args.freq)
+
+    results = collector.collect_all_data(args.only, freq=args.freq, deadline=args.deadline)
+    if args.command == 'collect' or args.only is None:
+        return results
+
+    # 収集対象外のソースは保存済みデータで補完
+    stored = collector.load_stored_data([name for name in SOURCES if name not in args.only], freq=args.freq) or {}
+    merged = {**stored, **(results or {})}
+    return merged if any(v is not None for v in merged.values()) else None
+
+
+def run_stages(args):
+    """指定されたステージを実行"""
     print("暗号通貨データの収集と分析を開始します...")
-    collector = DataCollector()
-    results = collector.collect_all_data()
-    
-    if results:
-        plot_market_data(results)
-    else:
+    if args.assets:
+        from util.multi_asset import run_assets
+        if args.command == 'collect' and args.offline:
+            print("オフラインモードのためデータ収集をスキップします")
+            return
+        run_assets(args.assets, command=args.command, lookback_days=args.lookback, freq=args.freq,
+                   offline=args.offline, only=args.only, memory_budget=args.memory_budget,
+                   use_cache=not args.no_cache, max_workers=args.workers, deadline=args.deadline,
+                   snapshot=not args.no_snapshot, windows=args.windows, alerts=args.alerts)
+        return
+
+    collector = DataCollector(lookback_days=args.lookback, memory_budget=args.memory_budget,
+                              full_history=needs_full_history(args.windows))
+
+    if args.command == 'collect' and args.offline:
+        print("オフラインモードのためデータ収集をスキップします")
+        return
+
+    try:
+        results = load_results(collector, args)
+    except MemoryError as e:
+        print(f"✗ {str(e)}")
+        return
+    finally:
+        collector.memory_budget.print_report()
+    if not results:
         print("データ収集に失敗したため、分析を実行できません")
+        return
+
+    if args.command == 'collect':
+        return
+
+    # 分析と描画をステージのDAGとして実行（入力が変化したステージのみ再計算）
+    cache = None if args.no_cache else ArtifactCache()
+    with metrics.stage('pipeline'):
+        pipeline = build_analysis_pipeline(results, cache, windows=args.windows)
+        if pipeline is None:
+            print("プロット可能なデータがありません")
+            return
+        # 通知は描画を待たずにシグナルの計算直後に送信
+        evaluate_alerts(pipeline, args.alerts)
+        if args.command in ('analyze', 'all'):
+            print_latest_signal(pipeline.get('signals') if 'signals' in pipeline else None)
+        if args.command in ('plot', 'all'):
+            write_composite(pipeline)
+    if not args.no_snapshot:
+        with metrics.stage('snapshot'):
+            write_snapshot(pipeline, freq=args.freq)
+    pipeline.print_summary()
+    if cache is not None:
+        cache.prune()
+
+
+def write_metrics(metrics_dir):
+    """計測結果を出力"""
+    metrics.print_summary()
+    print(f"計測レポートを保存しました: {metrics.write_json(metrics_dir)}")
+    print(f"Prometheusメトリクスを保存しました: {metrics.write_prometheus(metrics_dir)}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.trace_memory:
+        metrics.enable_memory_tracking()
+    profiler = None
+    if args.profile:
+        from util.profiling import StageProfiler
+        profiler = StageProfiler(args.profile)
+        metrics.add_listener(profiler)
+
+    try:
+        if args.command == 'daemon':
+            from util.daemon import AnalyzerDaemon
+            AnalyzerDaemon(lookback_days=args.lookback, freq=args.freq, sources=args.only,
+                           host=args.host, port=args.port, metrics_dir=args.metrics_dir,
+                           memory_budget=args.memory_budget, alert_sinks=args.alerts,
+                           windows=args.windows, deadline=args.deadline,
+                           snapshot=not args.no_snapshot, use_cache=not args.no_cache).run()
+        elif args.command == 'serve':
+            from util.query_api import QueryService, start_query_server
+            service = QueryService(lookback_days=args.lookback, freq=args.freq, max_entries=args.cache_entries,
+                                   memory_budget=args.memory_budget, use_cache=not args.no_cache)
+            start_query_server(service, host=args.host, port=args.port)
+        else:
+            run_stages(args)
+    finally:
+        # 常駐実行は更新サイクルごとに計測結果を出力済み
+        if args.metrics_dir and args.command != 'daemon':
+            write_metrics(args.metrics_dir)
+        if profiler:
+            profiler.print_hotspots()
+            print(f"プロファイルを保存しました: {profiler.write()}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+from util.metrics import metrics
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """テストごとに一時ディレクトリで実行（market_data/ などはその下に作成）"""
+    monkeypatch.chdir(tmp_path)
+    metrics.reset()
+    yield tmp_path
+    metrics.reset()
+
+
+def synthetic_results(days=400, end='2024-12-31'):
+    """分析用の合成データ（BTCUSD、DXY、S&P500、Fear & Greed）"""
+    rng = np.random.default_rng(0)
+    index = pd.date_range(end=end, periods=days, freq='D', name='timestamp')
+    btc = 30000 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+    dxy = 100 + np.cumsum(rng.normal(0, 0.2, days))
+    business = index[index.dayofweek < 5]
+    return {
+        'btcusd': pd.DataFrame({'BTCUSD Price': btc}, index=index),
+        'dxy': pd.DataFrame({'DXY Price': dxy[index.dayofweek < 5]}, index=business),
+        'sp500': pd.DataFrame({'SP500 Price': 4000 + np.cumsum(rng.normal(0, 20, len(business)))},
+                              index=business),
+        'fear_greed': pd.DataFrame({'Fear & Greed Value': rng.integers(5, 95, days).astype(float)}, index=index),
+    }
+
+
+@pytest.fixture
+def market_results():
+    return synthetic_results()
@@ -0,0 +1,160 @@
+import json
+import pandas as pd
+import pytest
+from util.alerts import (AlertEngine, FileQueueSink, StdoutSink, WebhookSink, component_states, evaluate_alerts,
+                         parse_sinks)
+from util.pipeline import build_analysis_pipeline
+
+
+class ListSink:
+    name = 'list'
+    key = 'list'
+
+    def __init__(self):
+        self.events = []
+
+    def send(self, event):
+        self.events.append(event)
+
+
+class FailingSink:
+    name = 'failing'
+    key = 'failing'
+
+    def __init__(self):
+        self.calls = 0
+        self.events = []
+        self.down = True
+
+    def send(self, event):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError('unreachable')
+        self.events.append(event)
+
+
+def make_components(rsi, timeframes=None, start='2024-01-01'):
+    index = pd.date_range(start, periods=len(rsi), freq='D')
+    components = pd.DataFrame({'rsi': rsi, 'composite': 0.0}, index=index)
+    if timeframes is not None:
+        components['timeframes'] = timeframes
+    return components
+
+
+def test_component_states():
+    states = component_states(make_components([1.0, None, -1.0], timeframes=[0.5, 0.2, -0.7]))
+    assert list(states.columns) == ['rsi', 'timeframes']
+    assert states['rsi'].tolist() == [1, 0, -1]
+    assert states['timeframes'].tolist() == [1, 0, -1]
+
+
+def test_parse_sinks():
+    sinks = parse_sinks('stdout, file=queue,webhook=http://127.0.0.1:9000/alerts')
+    assert [type(sink) for sink in sinks] == [StdoutSink, FileQueueSink, WebhookSink]
+    assert sinks[1].directory == 'queue'
+    assert sinks[2].url == 'http://127.0.0.1:9000/alerts'
+    assert parse_sinks('file')[0].directory == 'market_data/alerts'
+    for value in ['webhook', 'stdout=x', 'email', ' , ']:
+        with pytest.raises(ValueError):
+            parse_sinks(value)
+
+
+def test_first_run_records_baseline_without_sending():
+    sink = ListSink()
+    engine = AlertEngine([sink])
+    components = make_components([0, 1])
+    assert engine.evaluate(components, None) == []
+    state = engine.load_state()
+    assert state['last_timestamp'] == components.index[0].isoformat()
+    assert state['states'] == {'rsi': 0}
+    # 最後の行の変化は送信済みとして記録し、次回に送信しない
+    assert engine.evaluate(components.iloc[1:], state) == []
+    assert sink.events == []
+
+
+def test_transitions_are_sent_once():
+    sink = ListSink()
+    engine = AlertEngine([sink])
+    state = {'last_timestamp': '2023-12-31T00:00:00', 'states': {'rsi': 0}, 'sent': []}
+    components = make_components([1, 1, -1])
+    events = engine.evaluate(components, state)
+    assert [(event['previous_label'], event['current_label']) for event in events] == [('neutral', 'buy'),
+                                                                                        ('buy', 'sell')]
+    assert sink.events == events
+    # 同じ行を再評価しても送信済みの変化は送信しない
+    assert engine.evaluate(components.iloc[-1:], engine.load_state()) == []
+    assert len(sink.events) == 2
+
+
+def test_open_last_row_is_not_saved_as_baseline():
+    engine = AlertEngine([ListSink()])
+    state = {'last_timestamp': '2023-12-31T00:00:00', 'states': {'rsi': 0}, 'sent': []}
+    components = make_components([1, -1])
+    engine.evaluate(components, state)
+    state = engine.load_state()
+    assert state['last_timestamp'] == components.index[0].isoformat()
+    assert state['states'] == {'rsi': 1}
+    # 次回は最後の行から評価し直し、通知した状態から確定した値への変化を通知する
+    assert engine.start_position(components.index, state) == 1
+    events = engine.evaluate(make_components([0], start='2024-01-02'), state)
+    assert [(event['previous'], event['current']) for event in events] == [(-1, 0)]
+
+
+def test_start_position():
+    engine = AlertEngine([])
+    index = pd.date_range('2024-01-01', periods=10, freq='D')
+    assert engine.start_position(index, None) == 8
+    assert engine.start_position(index[:1], None) == 0
+    assert engine.start_position(index, {'last_timestamp': '2024-01-05T00:00:00'}) == 5
+    assert engine.start_position(index, {'last_timestamp': '2024-02-01T00:00:00'}) == 10
+
+
+def test_file_queue_sink_writes_event(workdir):
+    state = {'last_timestamp': '2023-12-31T00:00:00', 'states': {'rsi': 0}, 'sent': []}
+    events = AlertEngine([FileQueueSink('queue')]).evaluate(make_components([1]), state)
+    files = list((workdir / 'queue').iterdir())
+    assert [path.suffix for path in files] == ['.json']
+    assert json.loads(files[0].read_text()) == events[0]
+
+
+def test_failing_sink_is_skipped_for_rest_of_evaluation():
+    failing, sink = FailingSink(), ListSink()
+    engine = AlertEngine([failing, sink])
+    state = {'last_timestamp': '2023-12-31T00:00:00', 'states': {'rsi': 0}, 'sent': []}
+    events = engine.evaluate(make_components([1, -1, 1]), state)
+    assert failing.calls == 1
+    assert sink.events == events and len(events) == 3
+
+
+def test_failed_events_are_retried_on_next_evaluation():
+    failing, sink = FailingSink(), ListSink()
+    engine = AlertEngine([failing, sink])
+    state = {'last_timestamp': '2023-12-31T00:00:00', 'states': {'rsi': 0}, 'sent': []}
+    events = engine.evaluate(make_components([1, -1, 1]), state)
+    failing.down = False
+    # 次の評価で失敗した送信先にのみ検出順に再送する
+    assert engine.evaluate(make_components([1], start='2024-01-03'), engine.load_state()) == []
+    assert failing.events == events
+    assert sink.events == events
+
+
+def test_reversal_of_open_row_transition_is_sent():
+    sink = ListSink()
+    engine = AlertEngine([sink])
+    state = {'last_timestamp': '2023-12-31T00:00:00', 'states': {'rsi': 0}, 'sent': []}
+    engine.evaluate(make_components([0, 1]), state)
+    # 確定していない足で通知した変化が、確定時に元の状態に戻った
+    events = engine.evaluate(make_components([0, 0], start='2024-01-02'), engine.load_state())
+    assert [(event['timestamp'][:10], event['previous'], event['current']) for event in events] == [
+        ('2024-01-02', 1, 0)]
+    assert [(event['previous'], event['current']) for event in sink.events] == [(0, 1), (1, 0)]
+
+
+def test_evaluate_alerts_with_pipeline(market_results):
+    sink = ListSink()
+    assert evaluate_alerts(build_analysis_pipeline(market_results), [sink]) == []
+    state = AlertEngine([sink]).load_state()
+    assert set(state['states']) >= {'rsi', 'macd', 'ma', 'signal'}
+    # 同じデータで再評価しても新しい変化はない
+    assert evaluate_alerts(build_analysis_pipeline(market_results), [sink]) == []
+    assert sink.events == []
@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+from util.collectors.base_collector import BaseCollector
+
+
+@pytest.fixture
+def collector():
+    return BaseCollector(lookback_days=100)
+
+
+def daily_frame(start, end):
+    index = pd.date_range(start, end, freq='D', name='timestamp')
+    return pd.DataFrame({'Value': range(len(index))}, index=index, dtype=float)
+
+
+def test_iter_date_chunks_covers_range_without_overlap(collector):
+    start, end = datetime(2024, 1, 1), datetime(2024, 3, 15)
+    chunks = list(collector.iter_date_chunks(start, end, 30))
+    assert chunks[0][0] == start
+    assert chunks[-1][1] == end
+    for (_, previous_end), (next_start, _) in zip(chunks, chunks[1:]):
+        assert next_start == previous_end + timedelta(days=1)
+    assert all((chunk_end - chunk_start).days <= 29 for chunk_start, chunk_end in chunks)
+
+
+def test_iter_date_chunks_single_day(collector):
+    day = datetime(2024, 1, 1)
+    assert list(collector.iter_date_chunks(day, day, 30)) == [(day, day)]
+
+
+def test_run_backfill_resumes_after_interruption(collector):
+    calls = []
+
+    def failing_fetch(start, end):
+        calls.append(start)
+        if len(calls) == 2:
+            raise RuntimeError('interrupted')
+        return daily_frame(start, end)
+
+    with pytest.raises(RuntimeError):
+        collector.run_backfill('test', 'test.csv', None, failing_fetch, 30)
+    completed = collector.load_checkpoint('test')['completed']
+    assert len(completed) == 1
+    saved = collector.load_existing_data('test.csv')
+    assert saved is not None and len(saved) > 0
+
+    resumed = []
+
+    def fetch(start, end):
+        resumed.append(start)
+        return daily_frame(start, end)
+
+    df = collector.run_backfill('test', 'test.csv', saved, fetch, 30)
+    # 完了済みの最初のチャンクは再取得しない
+    assert calls[0] not in resumed
+    assert resumed[0] == calls[1]
+    assert df.index.min() == pd.Timestamp(collector.start_date)
+    assert df.index.is_monotonic_increasing and not df.index.has_duplicates
+
+
+def test_run_backfill_refetches_only_open_chunk(collector):
+    collector.run_backfill('test', 'test.csv', None, daily_frame, 30)
+    fetched = []
+
+    def fetch(start, end):
+        fetched.append((start, end))
+        return daily_frame(start, end)
+
+    collector.run_backfill('test', 'test.csv', collector.load_existing_data('test.csv'), fetch, 30)
+    # 当日を含むチャンクのみ毎回取得する
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    assert len(fetched) == 1
+    assert fetched[0][1] == today
@@ -0,0 +1,44 @@
+import pytest
+from crypto_analysis import parse_args, parse_lookback, parse_sources
+
+
+def test_options_without_subcommand_run_all():
+    args = parse_args(['--offline'])
+    assert args.command == 'all'
+    assert args.offline
+
+
+def test_no_arguments_run_all():
+    args = parse_args([])
+    assert args.command == 'all'
+    assert args.lookback == 365
+
+
+@pytest.mark.parametrize('value, days', [('30', 30), ('90d', 90), ('2w', 14)])
+def test_parse_lookback_fixed_units(value, days):
+    assert parse_lookback(value) == days
+
+
+def test_parse_lookback_calendar_units():
+    assert 365 <= parse_lookback('1y') <= 366
+    assert 3650 <= parse_lookback('10y') <= 3655
+    assert 28 <= parse_lookback('1m') <= 31
+
+
+@pytest.mark.parametrize('value', ['', '0', '-5', '3x', 'd'])
+def test_parse_lookback_rejects_invalid(value):
+    with pytest.raises(Exception):
+        parse_lookback(value)
+
+
+def test_parse_sources():
+    assert parse_sources('btcusd, funding_rates') == ['btcusd', 'funding_rates']
+    with pytest.raises(Exception):
+        parse_sources('btcusd,unknown')
+
+
+def test_subcommand_options():
+    args = parse_args(['collect', '--only', 'btcusd', '--lookback', '90d'])
+    assert args.command == 'collect'
+    assert args.only == ['btcusd']
+    assert args.lookback == 90
@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+from util.collectors.etf_data import ETFDataCollector
+from util.collectors.market_data import MarketDataCollector
+
+
+@pytest.fixture
+def collector():
+    return MarketDataCollector(lookback_days=10)
+
+
+def test_last_closed_date_crypto_is_previous_utc_day(collector):
+    assert collector.last_closed_date(now=pd.Timestamp('2024-01-10 00:30', tz='UTC')) == datetime(2024, 1, 9)
+    assert collector.last_closed_date(now=pd.Timestamp('2024-01-10 23:59', tz='UTC')) == datetime(2024, 1, 9)
+    # タイムゾーンのない時刻はUTCとして扱う
+    assert collector.last_closed_date(now=pd.Timestamp('2024-01-10 12:00')) == datetime(2024, 1, 9)
+
+
+def test_last_closed_date_nyse_waits_for_market_close(collector):
+    # 2024-01-10（水）の取引終了は21:00 UTC
+    before_close = pd.Timestamp('2024-01-10 20:59', tz='UTC')
+    after_close = pd.Timestamp('2024-01-10 21:00', tz='UTC')
+    assert collector.last_closed_date(True, now=before_close) == datetime(2024, 1, 9)
+    assert collector.last_closed_date(True, now=after_close) == datetime(2024, 1, 10)
+
+
+def test_last_closed_date_nyse_over_weekend(collector):
+    sunday = pd.Timestamp('2024-01-14 12:00', tz='UTC')
+    assert collector.last_closed_date(True, now=sunday) == datetime(2024, 1, 12)
+
+
+def test_missing_ranges_exclude_open_day(collector):
+    last_closed = collector.last_closed_date()
+    ranges = collector.get_missing_date_ranges(None, closed_only=True)
+    assert ranges[-1][1] == last_closed
+    # closed_only を指定しない場合は当日を含める
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    assert collector.get_missing_date_ranges(None)[-1][1] == today
+
+
+def test_missing_ranges_complete_through_last_closed(collector):
+    index = pd.date_range(collector.start_date, collector.last_closed_date(), freq='D', name='timestamp')
+    existing = pd.DataFrame({'DXY Price': 1.0}, index=index)
+    assert collector.get_missing_date_ranges(existing, closed_only=True) == []
+
+
+def test_yf_data_drops_bars_after_chunk_end(collector, monkeypatch):
+    requested = []
+
+    def fake_download(self, ticker, start, end, **kwargs):
+        requested.append((start, end))
+        # 取引中の当日の足まで返す
+        index = pd.date_range(start, datetime.now(), freq='D')
+        return pd.DataFrame({'Close': 1.0}, index=index)
+
+    monkeypatch.setattr(MarketDataCollector, 'yf_download', fake_download)
+    df = collector.get_gold_data()
+    last_closed = collector.last_closed_date(trading_days_only=True)
+    assert df.index.max() == pd.Timestamp(last_closed)
+    assert requested[-1][1] == last_closed + timedelta(days=1)
+
+
+def test_etf_data_stores_only_closed_bars(monkeypatch):
+    def fake_download(self, ticker, start, end, **kwargs):
+        index = pd.date_range(start, datetime.now(), freq='D')
+        return pd.DataFrame({'Close': 10.0, 'Volume': 2.0}, index=index)
+
+    monkeypatch.setattr(ETFDataCollector, 'yf_download', fake_download)
+    collector = ETFDataCollector(lookback_days=10)
+    df = collector.get_etf_data()
+    assert df.index.max() == pd.Timestamp(collector.last_closed_date(trading_days_only=True))
+    assert df['GBTC Flow'].eq(20.0).all()
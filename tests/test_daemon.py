@@ -0,0 +1,114 @@
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta, timezone
+from crypto_analysis import parse_args
+from util.collectors.base_collector import BaseCollector
+from util import daemon as daemon_module
+from util.daemon import AnalyzerDaemon, MARKET_CLOSE_DELAY, SOURCE_SCHEDULES
+
+
+def hourly_frame(start, periods, offset=0):
+    index = pd.date_range(start, periods=periods, freq='h', name='timestamp')
+    return pd.DataFrame({'Close': [float(offset + i) for i in range(periods)]}, index=index)
+
+
+@pytest.fixture
+def resident():
+    collector = BaseCollector(lookback_days=30)
+    collector.keep_frames_in_memory()
+    return collector
+
+
+def test_merge_appends_only_new_rows(resident):
+    existing = resident.merge_and_save(None, hourly_frame('2024-01-01', 5), 'prices.csv')
+    merged = resident.merge_and_save(existing, hourly_frame('2024-01-01 05:00', 2, offset=5), 'prices.csv')
+    stored = pd.read_csv('market_data/prices.csv', index_col='timestamp', parse_dates=True)
+    assert len(stored) == 7
+    pd.testing.assert_frame_equal(stored, merged, check_freq=False)
+    # 2回目以降はCSVを読み込み直さずメモリ上のデータを返す
+    assert resident.load_existing_data('prices.csv') is merged
+
+
+def test_merge_rewrites_changed_tail_rows(resident):
+    existing = resident.merge_and_save(None, hourly_frame('2024-01-01', 5), 'prices.csv')
+    # 最後の行（確定していない足）の値が変わった場合はその行から書き直す
+    update = hourly_frame('2024-01-01 04:00', 3, offset=100)
+    merged = resident.merge_and_save(existing, update, 'prices.csv')
+    stored = pd.read_csv('market_data/prices.csv', index_col='timestamp', parse_dates=True)
+    assert stored['Close'].tolist() == [0.0, 1.0, 2.0, 3.0, 100.0, 101.0, 102.0]
+    pd.testing.assert_frame_equal(stored, merged, check_freq=False)
+
+
+def test_append_rows_rejects_changed_columns(resident):
+    existing = resident.merge_and_save(None, hourly_frame('2024-01-01', 3), 'prices.csv')
+    new = hourly_frame('2024-01-01 03:00', 1).rename(columns={'Close': 'Open'})
+    df = pd.concat([existing, new])
+    assert not resident.append_rows(existing, df, new.index.min(), 'prices.csv')
+
+
+def test_next_refresh_time_interval():
+    daemon = AnalyzerDaemon(sources=['btcusd'])
+    now = datetime(2024, 1, 2, 12, tzinfo=timezone.utc)
+    assert daemon.next_refresh_time('btcusd', now) == now + SOURCE_SCHEDULES['btcusd']
+
+
+def test_next_refresh_time_after_market_close():
+    daemon = AnalyzerDaemon(sources=['sp500'])
+    # 2024-01-05（金）の取引終了後は翌営業日（月曜）の取引終了後に更新
+    now = datetime(2024, 1, 5, 22, tzinfo=timezone.utc)
+    refresh_at = daemon.next_refresh_time('sp500', now)
+    assert refresh_at == datetime(2024, 1, 8, 21, tzinfo=timezone.utc) + MARKET_CLOSE_DELAY
+
+
+def test_update_result_drops_rows_before_period():
+    daemon = AnalyzerDaemon(lookback_days=2, sources=['btcusd'])
+    start = daemon.collector.start_date
+    df = hourly_frame(start - timedelta(days=1), 72)
+    daemon._update_result('btcusd', df)
+    assert daemon.results['btcusd'].index.min() >= pd.Timestamp(start)
+    assert daemon.state['btcusd']['rows'] == len(daemon.results['btcusd'])
+
+
+def test_update_result_hash_changes_with_stale_data():
+    daemon = AnalyzerDaemon(lookback_days=2, sources=['btcusd'])
+    df = hourly_frame(daemon.collector.start_date, 24)
+    daemon._update_result('btcusd', df)
+    fresh = daemon.inputs_hash()
+    stale = df.copy()
+    stale.attrs['stale'] = '2024-01-01'
+    daemon._update_result('btcusd', stale)
+    assert daemon.inputs_hash() != fresh
+
+
+@pytest.mark.parametrize('argv', [
+    ['daemon', '--offline'],
+    ['daemon', '--workers', '2'],
+    ['serve', '--only', 'collect'],
+    ['serve', '--deadline', '10'],
+])
+def test_unsupported_options_rejected(argv):
+    with pytest.raises(SystemExit):
+        parse_args(argv)
+
+
+def test_supported_daemon_options_accepted():
+    args = parse_args(['daemon', '--deadline', '30', '--no-snapshot'])
+    assert args.command == 'daemon'
+    assert args.deadline == 30
+
+
+def test_due_sources_refreshed_before_single_render(monkeypatch):
+    daemon = AnalyzerDaemon(sources=['dxy', 'sp500', 'gold'])
+    calls = []
+
+    def refresh(name, run_deadline=None):
+        calls.append(name)
+        daemon._update_result(name, pd.DataFrame({f'{name} Price': [float(len(calls))]},
+                                                 index=pd.DatetimeIndex([daemon.collector.end_date])))
+
+    monkeypatch.setattr(daemon, 'refresh_source', refresh)
+    monkeypatch.setattr(daemon_module, 'build_analysis_pipeline',
+                        lambda *args, **kwargs: calls.append('pipeline'))
+    daemon.refresh_due_sources(['dxy', 'sp500', 'gold'])
+    # サイクル内の全データソースを更新してからパイプラインを1回だけ構築する
+    assert calls == ['dxy', 'sp500', 'gold', 'pipeline']
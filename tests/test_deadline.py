@@ -0,0 +1,112 @@
+import json
+import os
+import time
+import pandas as pd
+import pytest
+from datetime import datetime
+from util.collectors.base_collector import BaseCollector
+from util.data_collector import DataCollector
+from util.deadline import (CIRCUIT_BASE_COOLDOWN, CIRCUIT_FAILURE_THRESHOLD, DEFAULT_SOURCE_BUDGET,
+                           CircuitBreakers, CircuitOpenError, DeadlineExceeded, RunDeadline, SourceBudget,
+                           circuit_breakers, current_budget, run_with_budget)
+from util.metrics import RUN_STAGE, metrics
+
+
+def test_budget_limited_by_run_deadline():
+    assert RunDeadline().budget_for('dxy').seconds == DEFAULT_SOURCE_BUDGET
+    assert RunDeadline(5).budget_for('dxy').seconds <= 5
+    assert RunDeadline(0).budget_for('dxy').seconds == 0
+
+
+def test_source_budget_timeout_and_cancel():
+    budget = SourceBudget('dxy', 2)
+    connect, read = budget.timeout((10, 30))
+    assert connect <= 2 and read <= 2
+    budget.check()
+    budget.cancelled = True
+    with pytest.raises(DeadlineExceeded):
+        budget.check()
+
+
+def test_run_with_budget_returns_result_in_budget_thread():
+    budget = SourceBudget('dxy', 5)
+    assert run_with_budget(lambda: current_budget(), budget) is budget
+    assert current_budget() is None
+
+
+def test_run_with_budget_abandons_slow_fetch():
+    budget = SourceBudget('dxy', 0.2)
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        run_with_budget(lambda: time.sleep(5), budget)
+    # 応答のない取得を待たずに打ち切る
+    assert time.monotonic() - start < 2
+    assert budget.cancelled
+
+
+def test_run_with_budget_propagates_errors():
+    def fail():
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        run_with_budget(fail, SourceBudget('dxy', 5))
+
+
+def test_circuit_opens_after_threshold_and_persists():
+    breakers = CircuitBreakers()
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD - 1):
+        breakers.record_failure('api.example.com')
+    breakers.check('api.example.com')
+    breakers.record_failure('api.example.com')
+    # 状態はファイルに保存され、別の実行（インスタンス）でも停止中
+    with pytest.raises(CircuitOpenError):
+        CircuitBreakers().check('api.example.com')
+    breakers.check('other.example.com')
+
+
+def test_circuit_cooldown_doubles_and_resets_on_success():
+    breakers = CircuitBreakers()
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD + 1):
+        breakers.record_failure('api.example.com')
+    with open(breakers.path) as f:
+        open_until = datetime.fromisoformat(json.load(f)['api.example.com']['open_until'])
+    cooldown = open_until - datetime.now()
+    assert CIRCUIT_BASE_COOLDOWN * 2 - pd.Timedelta(minutes=1) < cooldown <= CIRCUIT_BASE_COOLDOWN * 2
+    breakers.record_success('api.example.com')
+    breakers.check('api.example.com')
+
+
+def test_open_circuit_skips_request():
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+        circuit_breakers.record_failure('api.example.com')
+    budget = SourceBudget('dxy', 5)
+    collector = BaseCollector(lookback_days=10)
+    with pytest.raises(CircuitOpenError):
+        run_with_budget(lambda: collector.http_get('https://api.example.com/data'), budget)
+    assert metrics.stages[RUN_STAGE]['requests'] == 0
+    assert budget.failures
+
+
+def stored_dxy(collector):
+    os.makedirs('market_data', exist_ok=True)
+    index = pd.date_range(collector.start_date, periods=5, freq='D', name='timestamp')
+    pd.DataFrame({'DXY Price': 100.0}, index=index).to_csv('market_data/dxy.csv')
+    return index
+
+
+def test_timed_out_source_falls_back_to_stored_data(monkeypatch):
+    collector = DataCollector(lookback_days=10)
+    index = stored_dxy(collector)
+    monkeypatch.setattr(DataCollector, '_fetch_source', lambda self, name, freq: time.sleep(5))
+    start = time.monotonic()
+    df = collector.collect_source('dxy', deadline=RunDeadline(0.2))
+    assert time.monotonic() - start < 2
+    assert len(df) == 5
+    assert df.attrs['stale'] == index[-1].strftime('%Y-%m-%d %H:%M')
+    assert metrics.stages['collect.dxy']['stale_sources'] == 1
+
+
+def test_failed_source_without_stored_data(monkeypatch):
+    collector = DataCollector(lookback_days=10)
+    monkeypatch.setattr(DataCollector, '_fetch_source', lambda self, name, freq: None)
+    assert collector.collect_source('dxy') is None
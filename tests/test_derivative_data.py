@@ -0,0 +1,103 @@
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+from util.collectors import derivative_data
+from util.collectors.derivative_data import DerivativeDataCollector, OPEN_INTEREST_HISTORY_DAYS
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class FakeBinance:
+    """openInterestHist と openInterest の応答を返す（日ごとの値は日付の日にち）"""
+
+    def __init__(self):
+        self.requests = []
+        self.latest = '999'
+
+    def __call__(self, url, params=None, **kwargs):
+        self.requests.append((url, dict(params or {})))
+        if url.endswith('/openInterestHist'):
+            start, end = params['startTime'], params['endTime']
+            first = -(-start // DAY_MS) * DAY_MS
+            days = list(range(first, end + 1, DAY_MS))[:params['limit']]
+            return FakeResponse([{'timestamp': day, 'sumOpenInterest': str(pd.Timestamp(day, unit='ms').day)}
+                                 for day in days])
+        return FakeResponse({'openInterest': self.latest})
+
+
+@pytest.fixture
+def binance(monkeypatch):
+    fake = FakeBinance()
+    monkeypatch.setattr(DerivativeDataCollector, 'http_get', lambda self, url, **kwargs: fake(url, **kwargs))
+    monkeypatch.setattr(derivative_data.time, 'sleep', lambda seconds: None)
+    return fake
+
+
+def today():
+    return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def test_open_interest_backfills_history_with_real_values(binance):
+    collector = DerivativeDataCollector(lookback_days=10)
+    df = collector.get_open_interest()
+    history = df[df.index < today()]
+    assert len(history) == 10
+    # 過去の日は履歴の値、当日のみ現在値
+    assert (history['Open Interest'] == history.index.day).all()
+    assert df.loc[today(), 'Open Interest'] == 999.0
+
+
+def test_open_interest_skips_days_outside_history(binance):
+    collector = DerivativeDataCollector(lookback_days=60)
+    df = collector.get_open_interest()
+    history_start = today() - timedelta(days=OPEN_INTEREST_HISTORY_DAYS - 1)
+    assert df.index.min() == history_start
+    history_requests = [params for url, params in binance.requests if url.endswith('/openInterestHist')]
+    assert all(params['startTime'] >= history_start.timestamp() * 1000 for params in history_requests)
+
+
+def test_open_interest_uses_stored_days(binance):
+    DerivativeDataCollector(lookback_days=10).get_open_interest()
+    binance.requests.clear()
+    binance.latest = '1000'
+    df = DerivativeDataCollector(lookback_days=10).get_open_interest()
+    # 最後に保存した前日のみを履歴で確認し、当日の行は現在値で置き換える
+    history_requests = [params for url, params in binance.requests if url.endswith('/openInterestHist')]
+    assert [params['startTime'] for params in history_requests] == [(today() - timedelta(days=1)).timestamp() * 1000]
+    assert len(df) == 11
+    assert df.loc[today(), 'Open Interest'] == 1000.0
+
+
+def test_open_interest_replaces_snapshot_on_next_day(binance):
+    df = DerivativeDataCollector(lookback_days=10).get_open_interest()
+    # 前日の実行で当日の現在値を保存した状態にする
+    yesterday = today() - timedelta(days=1)
+    stored = df[df.index < yesterday]
+    stored.loc[yesterday] = 999.0
+    stored.to_csv('market_data/open_interest.csv')
+    df = DerivativeDataCollector(lookback_days=10).get_open_interest()
+    assert df.loc[yesterday, 'Open Interest'] == yesterday.day
+    assert df.loc[today(), 'Open Interest'] == 999.0
+
+
+def test_open_interest_fetches_only_missing_days(binance):
+    df = DerivativeDataCollector(lookback_days=10).get_open_interest()
+    df.iloc[:-3].to_csv('market_data/open_interest.csv')
+    binance.requests.clear()
+    df = DerivativeDataCollector(lookback_days=10).get_open_interest()
+    history_requests = [params for url, params in binance.requests if url.endswith('/openInterestHist')]
+    assert len(history_requests) == 1
+    # 最後に保存した日（スナップショットの可能性がある日）から取得し直す
+    assert history_requests[0]['startTime'] == (today() - timedelta(days=3)).timestamp() * 1000
+    assert len(df) == 11
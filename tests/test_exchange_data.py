@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+from util.collectors import base_collector, exchange_data
+from util.collectors.exchange_data import COINBASE_CANDLES_LIMIT, ExchangeDataCollector
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class FakeExchanges:
+    """Coinbaseは終値101、Binanceは終値100のローソク足を返す"""
+
+    def __init__(self):
+        self.coinbase_pages = []
+        self.binance_pages = []
+
+    def __call__(self, url, params=None, **kwargs):
+        if 'coinbase' in url:
+            self.coinbase_pages.append(params)
+            step = pd.Timedelta(seconds=params['granularity'])
+            times = pd.date_range(pd.Timestamp(params['start']), pd.Timestamp(params['end']), freq=step)
+            # Coinbaseは新しい順に [時刻, 安値, 高値, 始値, 終値, 出来高] を返す
+            return FakeResponse([[int(t.timestamp()), 100, 102, 101, 101, 1] for t in reversed(times)])
+        self.binance_pages.append(params)
+        step = pd.Timedelta(params['interval'])
+        times = pd.date_range(pd.Timestamp(params['startTime'], unit='ms'),
+                              pd.Timestamp(params['endTime'], unit='ms'), freq=step)[:params['limit']]
+        return FakeResponse([[int(t.timestamp() * 1000), '100', '100', '100', '100', '1'] for t in times])
+
+
+@pytest.fixture
+def exchanges(monkeypatch):
+    fake = FakeExchanges()
+    monkeypatch.setattr(ExchangeDataCollector, 'http_get', lambda self, url, **kwargs: fake(url, **kwargs))
+    monkeypatch.setattr(exchange_data.time, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(base_collector.time, 'sleep', lambda seconds: None)
+    return fake
+
+
+def test_calculate_premium_uses_common_timestamps():
+    index = pd.date_range('2024-01-01', periods=3, freq='D')
+    coinbase = pd.Series([101.0, 102.0, 99.0], index=index)
+    binance = pd.Series([100.0, 100.0], index=index[1:])
+    premium = ExchangeDataCollector(lookback_days=3).calculate_premium(coinbase, binance)
+    assert premium.index.equals(index[1:])
+    assert premium['Coinbase Premium'].round(6).tolist() == [2.0, -1.0]
+
+
+def test_coinbase_candles_paged_and_sorted(exchanges):
+    collector = ExchangeDataCollector(lookback_days=30)
+    start = pd.Timestamp('2024-01-01')
+    end = start + pd.Timedelta(hours=COINBASE_CANDLES_LIMIT + 49)
+    df = collector.fetch_coinbase_candles('BTC-USD', '1h', start, end)
+    assert len(exchanges.coinbase_pages) == 2
+    assert len(df) == COINBASE_CANDLES_LIMIT + 50
+    assert df.index.is_monotonic_increasing
+    assert list(df.columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def test_hourly_premium_from_bulk_candles(exchanges):
+    collector = ExchangeDataCollector(lookback_days=2)
+    df = collector.get_coinbase_premium('1h')
+    assert len(df) >= 48
+    assert (df['Coinbase Premium'].round(6) == 1.0).all()
+    # 1時間足のリクエスト数は取得期間の長さで決まる（足ごとに1リクエストではない）
+    assert len(exchanges.coinbase_pages) == 1
+    assert len(exchanges.binance_pages) == 1
+    stored = pd.read_csv('market_data/coinbase_premium_1h.csv', index_col='timestamp', parse_dates=True)
+    assert len(stored) == len(df)
+
+
+def test_unsupported_interval():
+    with pytest.raises(ValueError):
+        ExchangeDataCollector(lookback_days=2).get_coinbase_premium('5m')
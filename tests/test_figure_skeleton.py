@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from util.plotters.figure_skeleton import (BACKGROUND, GRID_SHAPE, MAIN_SLOT, FigureSkeleton, decode_png,
+                                           encode_png, grid_cells, tile_digest)
+
+
+@pytest.fixture(scope='module')
+def skeleton():
+    # テストでは小さい図で描画する
+    return FigureSkeleton(figsize=(6, 5), dpi=40)
+
+
+def draw_line(values):
+    def draw(figure, spec):
+        ax = figure.add_subplot(spec)
+        ax.plot(values)
+    return draw
+
+
+def test_grid_cells_cover_grid():
+    cells = grid_cells()
+    rows, columns = GRID_SHAPE
+    assert cells[MAIN_SLOT] == (0, 0)
+    assert sorted(cells.values()) == [(row, column) for row in range(rows) for column in range(columns)]
+    assert list(cells)[1:] == list(range(rows * columns - 1))
+
+
+def test_png_round_trip():
+    pixels = np.random.default_rng(0).integers(0, 256, (7, 5, 4), dtype=np.uint8)
+    np.testing.assert_array_equal(decode_png(encode_png(pixels, compress_level=1)), pixels)
+    assert tile_digest(None) is None
+    assert tile_digest(encode_png(pixels)) == tile_digest(encode_png(pixels))
+
+
+def test_slot_regions_partition_figure(skeleton):
+    height, width = skeleton.buffer.shape[:2]
+    covered = np.zeros((height, width), dtype=int)
+    for top, bottom, left, right in skeleton.regions.values():
+        covered[top:bottom, left:right] += 1
+    # スロットの範囲は重ならずに図全体を覆う
+    assert (covered == 1).all()
+
+
+def test_render_tile_returns_slot_image(skeleton):
+    image = skeleton.render_tile(0, draw_line([1, 3, 2]))
+    top, bottom, left, right = skeleton.regions[0]
+    pixels = decode_png(image)
+    assert pixels.shape == (bottom - top, right - left, 4)
+    assert (pixels != BACKGROUND).any()
+    # 描画したAxesは次の描画に残らない
+    assert skeleton.figure.axes == []
+    # 同じ入力の描画は同じ画像になる（キャッシュした画像と置き換えられる）
+    assert skeleton.render_tile(0, draw_line([1, 3, 2])) == image
+
+
+def test_composite_places_tiles_and_clears_missing_slots(skeleton, workdir):
+    tiles = {MAIN_SLOT: skeleton.render_tile(MAIN_SLOT, draw_line([1, 2])),
+             1: skeleton.render_tile(1, draw_line([2, 1]))}
+    skeleton.composite(tiles, 'first.png')
+    with open('first.png', 'rb') as f:
+        frame = decode_png(f.read())
+    top, bottom, left, right = skeleton.regions[1]
+    np.testing.assert_array_equal(frame[top:bottom, left:right], decode_png(tiles[1]))
+
+    # 画像がなくなったスロットは空白に戻す
+    del tiles[1]
+    skeleton.composite(tiles, 'second.png')
+    with open('second.png', 'rb') as f:
+        frame = decode_png(f.read())
+    assert (frame[top:bottom, left:right] == BACKGROUND).all()
+    top, bottom, left, right = skeleton.regions[MAIN_SLOT]
+    np.testing.assert_array_equal(frame[top:bottom, left:right], decode_png(tiles[MAIN_SLOT]))
@@ -0,0 +1,69 @@
+import time
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+from util.collectors.base_collector import BaseCollector
+from util.frequency import base_interval_for, is_intraday, resample_ohlcv
+
+
+@pytest.fixture
+def collector():
+    collector = BaseCollector(lookback_days=1)
+    collector.start_date = datetime(2026, 1, 1)
+    return collector
+
+
+def test_missing_time_ranges_stop_at_last_closed_bar(collector):
+    ranges = collector.get_missing_time_ranges(None, '1h', now=pd.Timestamp('2026-01-01 05:30'))
+    # 05:00の足は進行中のため04:00まで
+    assert ranges == [(datetime(2026, 1, 1, 0), datetime(2026, 1, 1, 4))]
+
+
+def test_missing_time_ranges_use_utc_clock(collector, monkeypatch):
+    # ローカル時刻がUTCと異なっても、UTCで確定した最新の足までを対象にする
+    monkeypatch.setenv('TZ', 'Asia/Tokyo')
+    time.tzset()
+    try:
+        collector.start_date = datetime.utcnow() - timedelta(hours=6)
+        ranges = collector.get_missing_time_ranges(None, '1h')
+    finally:
+        monkeypatch.delenv('TZ')
+        time.tzset()
+    expected = pd.Timestamp.now(tz='UTC').tz_localize(None).floor('1h') - pd.Timedelta(hours=1)
+    assert abs(pd.Timestamp(ranges[-1][1]) - expected) <= pd.Timedelta(hours=1)
+
+
+def test_missing_time_ranges_find_gaps(collector):
+    index = pd.date_range('2026-01-01 00:00', '2026-01-01 09:00', freq='1h')
+    existing = pd.DataFrame({'Close': 1.0}, index=index.delete([3, 4, 7]))
+    ranges = collector.get_missing_time_ranges(existing, '1h', now=pd.Timestamp('2026-01-01 10:15'))
+    assert ranges == [(datetime(2026, 1, 1, 3), datetime(2026, 1, 1, 4)),
+                      (datetime(2026, 1, 1, 7), datetime(2026, 1, 1, 7))]
+
+
+def test_missing_time_ranges_complete(collector):
+    index = pd.date_range('2026-01-01 00:00', '2026-01-01 04:00', freq='1h')
+    existing = pd.DataFrame({'Close': 1.0}, index=index)
+    assert collector.get_missing_time_ranges(existing, '1h', now=pd.Timestamp('2026-01-01 05:59')) == []
+
+
+@pytest.mark.parametrize('freq, base', [('1m', '1m'), ('15m', '1m'), ('30m', '1m'), ('1h', '1h'), ('4h', '1h')])
+def test_base_interval_for(freq, base):
+    assert base_interval_for(freq) == base
+
+
+def test_is_intraday():
+    assert is_intraday('4h')
+    assert not is_intraday('1d')
+    with pytest.raises(ValueError):
+        is_intraday('2d')
+
+
+def test_resample_ohlcv_aggregates_bars():
+    index = pd.date_range('2026-01-01', periods=8, freq='1h')
+    df = pd.DataFrame({'Open': range(8), 'High': range(10, 18), 'Low': range(8),
+                       'Close': range(1, 9), 'Volume': [1.0] * 8}, index=index, dtype=float)
+    bars = resample_ohlcv(df, '4h')
+    assert list(bars.index) == [index[0], index[4]]
+    assert bars.iloc[0].tolist() == [0.0, 13.0, 0.0, 4.0, 4.0]
+    assert bars.iloc[1].tolist() == [4.0, 17.0, 4.0, 8.0, 4.0]
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+from util.plotters.lead_lag_plotter import LeadLagPlotter
+
+
+@pytest.fixture
+def plotter():
+    return LeadLagPlotter()
+
+
+def reference_correlation(target, values, max_lag):
+    """np.correlateによる直接計算（全期間で標準化し、ラグごとの有効な組の数で割る）"""
+    def standardize(values):
+        mask = np.isfinite(values)
+        centered = np.where(mask, values - values[mask].mean(), 0.0)
+        std = np.sqrt((centered ** 2).sum() / mask.sum())
+        return centered / std, mask.astype(float)
+
+    x, x_mask = standardize(target)
+    y, y_mask = standardize(values)
+    n = len(x)
+    sums = np.correlate(x, y, 'full')[n - 1 - max_lag:n + max_lag]
+    counts = np.correlate(x_mask, y_mask, 'full')[n - 1 - max_lag:n + max_lag]
+    return sums / counts
+
+
+def sample_series(days=300, lead=5, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2024-01-01', periods=days, freq='D')
+    driver = rng.normal(size=days + lead)
+    # 系列は資産のリターンに lead 日先行する
+    target = pd.Series(driver[:days] + 0.3 * rng.normal(size=days), index=index)
+    leading = driver[lead:] + 0.3 * rng.normal(size=days)
+    series = pd.DataFrame({'leading': leading, 'noise': rng.normal(size=days)}, index=index)
+    return target, series
+
+
+def test_cross_correlation_matches_np_correlate(plotter):
+    target, series = sample_series()
+    series.iloc[::7, 0] = np.nan
+    target.iloc[::11] = np.nan
+    result = plotter.calculate_cross_correlation(target, series, max_lag=20, min_overlap=1)
+    assert list(result.columns) == list(range(-20, 21))
+    for column in series.columns:
+        expected = reference_correlation(target.to_numpy(), series[column].to_numpy(), 20)
+        np.testing.assert_allclose(result.loc[column].to_numpy(), expected, atol=1e-10)
+
+
+def test_peak_lag_detects_leading_series(plotter):
+    target, series = sample_series(lead=5)
+    peaks = plotter.peak_lags(plotter.calculate_cross_correlation(target, series))
+    assert peaks.at['leading', 'Lag'] == 5
+    assert peaks.at['leading', 'Correlation'] > 0.8
+
+
+def test_lags_below_min_overlap_are_missing(plotter):
+    target, series = sample_series(days=50)
+    result = plotter.calculate_cross_correlation(target, series, max_lag=30, min_overlap=30)
+    # 重なりが30日未満になるラグ（|k| > 20）は欠損
+    assert not np.isnan(result.loc['noise', 20])
+    assert np.isnan(result.loc['noise', 21]) and np.isnan(result.loc['noise', -21])
+
+
+def test_rolling_peak_lags_match_windowed_cross_correlation(plotter):
+    target, series = sample_series(days=400, lead=3)
+    rolling = plotter.calculate_rolling_peak_lags(target, series, window=120, step=30, max_lag=10)
+    assert rolling.index[0] == target.index[119]
+    assert rolling.index[-1] == target.index[119 + 30 * (len(rolling) - 1)]
+    for end in rolling.index:
+        window = slice(target.index.get_loc(end) - 119, target.index.get_loc(end) + 1)
+        expected = plotter.peak_lags(plotter.calculate_cross_correlation(
+            target.iloc[window], series.iloc[window], max_lag=10))
+        assert rolling.at[end, 'leading'] == expected.at['leading', 'Lag'] == 3
+
+
+def test_rolling_peak_lags_need_enough_data(plotter):
+    target, series = sample_series(days=100)
+    assert plotter.calculate_rolling_peak_lags(target, series, window=180) is None
@@ -0,0 +1,115 @@
+import json
+import threading
+import tracemalloc
+from util.metrics import RUN_STAGE, PROMETHEUS_METRICS, RunMetrics
+
+
+def test_increment_outside_stage_counts_in_run():
+    run = RunMetrics()
+    run.increment('requests')
+    assert run.stages[RUN_STAGE]['requests'] == 1
+    assert list(run.stages) == [RUN_STAGE]
+
+
+def test_nested_stages_count_in_outer_stages():
+    run = RunMetrics()
+    with run.stage('collect'):
+        with run.stage('collect.btcusd'):
+            run.increment('requests', 2)
+            run.increment('bytes_transferred', 100)
+        run.increment('requests')
+    assert run.stages['collect.btcusd']['requests'] == 2
+    assert run.stages['collect']['requests'] == 3
+    assert run.stages[RUN_STAGE]['requests'] == 3
+    assert run.stages['collect']['bytes_transferred'] == 100
+    assert run.stages['collect']['calls'] == 1
+    assert run.stages['collect']['wall_seconds'] >= run.stages['collect.btcusd']['wall_seconds']
+
+
+def test_stage_records_time_on_exception():
+    run = RunMetrics()
+    try:
+        with run.stage('plot'):
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert run.stages['plot']['calls'] == 1
+    # 例外で終了しても外側のステージのスタックに残らない
+    run.increment('retries')
+    assert run.stages['plot']['retries'] == 0
+
+
+def test_reset_clears_stages():
+    run = RunMetrics()
+    with run.stage('collect'):
+        run.increment('requests')
+    run.reset()
+    assert list(run.stages) == [RUN_STAGE]
+    assert run.stages[RUN_STAGE]['requests'] == 0
+
+
+def test_report_sets_run_wall_time(workdir):
+    run = RunMetrics()
+    path = run.write_json('metrics')
+    with open(path) as f:
+        report = json.load(f)
+    assert report['stages'][RUN_STAGE]['wall_seconds'] == report['wall_seconds']
+    assert report['stages'][RUN_STAGE]['calls'] == 1
+
+
+def test_prometheus_metrics_are_gauges(workdir):
+    run = RunMetrics()
+    with run.stage('collect'):
+        run.increment('requests', 5)
+    with open(run.write_prometheus('metrics')) as f:
+        text = f.read()
+    assert '_total' not in text
+    assert 'analyzer_stage_requests{stage="collect"} 5' in text
+    assert f'analyzer_stage_requests{{stage="{RUN_STAGE}"}} 5' in text
+    for metric in PROMETHEUS_METRICS:
+        assert f'# TYPE {metric} gauge' in text
+
+
+def test_memory_tracking_records_stage_peak():
+    run = RunMetrics()
+    was_tracing = tracemalloc.is_tracing()
+    run.enable_memory_tracking()
+    try:
+        with run.stage('outer'):
+            with run.stage('inner'):
+                data = bytearray(4 * 1024 * 1024)
+                del data
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    assert run.stages['inner']['peak_memory_bytes'] >= 4 * 1024 * 1024
+    # 内側のステージのピークは外側のステージにも含まれる
+    assert run.stages['outer']['peak_memory_bytes'] >= run.stages['inner']['peak_memory_bytes']
+
+
+def test_stages_are_per_thread_and_bound_to_workers():
+    run = RunMetrics()
+    with run.stage('collect.x'):
+        worker = threading.Thread(target=run.bind(lambda: run.increment('requests')))
+        worker.start()
+        worker.join()
+        other = threading.Thread(target=lambda: run.increment('retries'))
+        other.start()
+        other.join()
+    assert run.stages['collect.x']['requests'] == 1
+    # 別スレッドのカウンターは呼び出し元のステージに含めない
+    assert run.stages['collect.x']['retries'] == 0
+    assert run.stages[RUN_STAGE]['retries'] == 1
+
+
+def test_merge_adds_worker_stages():
+    run, worker = RunMetrics(), RunMetrics()
+    with worker.stage('collect.x'):
+        worker.increment('requests', 3)
+    with run.stage('assets'):
+        run.merge(worker.stages)
+    assert run.stages['collect.x']['calls'] == 1
+    assert run.stages['collect.x']['requests'] == 3
+    # ワーカーの実行全体のカウンターは実行中のステージにも加算する
+    assert run.stages['assets']['requests'] == 3
+    assert run.stages[RUN_STAGE]['requests'] == 3
@@ -0,0 +1,80 @@
+import argparse
+import os
+import pandas as pd
+import pytest
+from crypto_analysis import parse_assets
+from util.assets import ASSETS, SHARED_SOURCES, asset_filename, price_column
+from util.data_collector import SOURCES, DataCollector, available_sources
+from util.metrics import metrics
+from util.multi_asset import load_asset_results, run_asset_worker, run_assets
+
+
+def test_available_sources_per_asset():
+    assert available_sources('BTC') == list(SOURCES)
+    eth = available_sources('ETH')
+    assert 'coinbase_premium' in eth and 'large_holders' not in eth
+    assert all(name in eth for name in SHARED_SOURCES)
+    # Coinbaseで取引されていない資産はコインベースプレミアムを除く
+    assert 'coinbase_premium' not in available_sources('BNB')
+
+
+@pytest.mark.parametrize('filename, asset, expected', [
+    ('btcusd_ohlcv.csv', 'BTC', 'btcusd_ohlcv.csv'),
+    ('btcusd_ohlcv.csv', 'ETH', 'ethusd_ohlcv.csv'),
+    ('funding_rates.csv', 'SOL', 'funding_rates_sol.csv'),
+    ('funding_rates', 'SOL', 'funding_rates_sol'),
+])
+def test_asset_filename(filename, asset, expected):
+    assert asset_filename(filename, asset) == expected
+
+
+def test_price_column():
+    assert price_column('BTC') == 'BTCUSD Price'
+    assert price_column('ETH') == 'ETHUSD Price'
+
+
+def test_parse_assets():
+    assert parse_assets('eth, sol') == ['ETH', 'SOL']
+    assert parse_assets('all') == list(ASSETS)
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_assets('ETH,XXX')
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_assets(',')
+
+
+def test_load_asset_results_reads_asset_files():
+    collector = DataCollector(lookback_days=30, asset='ETH')
+    os.makedirs('market_data', exist_ok=True)
+    index = pd.date_range(collector.start_date, periods=31, freq='D', name='timestamp')
+    pd.DataFrame({'Open': 1.0, 'High': 1.0, 'Low': 1.0, 'Close': range(31), 'Volume': 5.0},
+                 index=index).to_csv('market_data/ethusd_ohlcv.csv')
+    pd.DataFrame({'DXY Price': 100.0}, index=index).to_csv('market_data/dxy.csv')
+
+    results = load_asset_results(collector, offline=True)
+    assert set(results) == set(collector.sources)
+    assert list(results['btcusd'].columns) == ['ETHUSD Price']
+    assert results['btcusd']['ETHUSD Price'].iloc[-1] == 30
+    assert list(results['trading_volume'].columns) == ['Trading Volume']
+    # 共有データソースは資産に関係なく同じファイルを読み込む
+    assert list(results['dxy'].columns) == ['DXY Price']
+    assert results['funding_rates'] is None
+
+
+def test_run_assets_merges_worker_metrics(workdir):
+    collector = DataCollector(lookback_days=30, asset='ETH')
+    os.makedirs('market_data', exist_ok=True)
+    index = pd.date_range(collector.start_date, periods=31, freq='D', name='timestamp')
+    pd.DataFrame({'Open': 1.0, 'High': 1.0, 'Low': 1.0, 'Close': range(31), 'Volume': 5.0},
+                 index=index).to_csv('market_data/ethusd_ohlcv.csv')
+
+    summary = run_assets(['ETH'], command='collect', lookback_days=30, offline=True, max_workers=1)
+    assert summary.loc['ETH', 'Sources'] >= 1
+    # 資産ごとのデータはワーカープロセスでのみ読み込む
+    assert metrics.stages['load.btcusd']['calls'] == 1
+    assert metrics.stages['load.dxy']['calls'] == 2
+
+
+def test_run_asset_worker_returns_error_with_metrics():
+    row, error, stages = run_asset_worker('SOL', 'analyze', 30, '1d', True)
+    assert row is None and 'SOL' in error
+    assert stages['load.btcusd']['calls'] == 1
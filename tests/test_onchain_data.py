@@ -0,0 +1,146 @@
+import json
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+from util.collectors import onchain_data
+from util.collectors.onchain_data import OnchainDataCollector
+
+
+class FakeChartResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {'values': self.data}
+
+
+class FakeBlockchain:
+    """チャートAPIの応答（start から timespan 日分の日次の値、当日まで）"""
+
+    def __init__(self, value=1.0):
+        self.requests = []
+        self.value = value
+
+    def __call__(self, url, params=None, **kwargs):
+        self.requests.append(dict(params))
+        start = datetime.strptime(params['start'], '%Y-%m-%d')
+        days = int(params['timespan'].removesuffix('days'))
+        end = min(start + timedelta(days=days - 1), datetime.now())
+        index = pd.date_range(start, end, freq='D')
+        return FakeChartResponse([{'x': int(t.timestamp()), 'y': self.value} for t in index])
+
+
+@pytest.fixture
+def blockchain(monkeypatch):
+    fake = FakeBlockchain()
+    monkeypatch.setattr(OnchainDataCollector, 'http_get', lambda self, url, **kwargs: fake(url, **kwargs))
+    return fake
+
+
+def test_first_run_fetches_whole_period(blockchain):
+    collector = OnchainDataCollector(lookback_days=30)
+    df = collector.get_hash_rate()
+    assert blockchain.requests[0]['start'] == collector.start_date.strftime('%Y-%m-%d')
+    assert df.index.min() == pd.Timestamp(collector.start_date)
+    assert len(df) == 31
+
+
+def test_next_run_fetches_from_last_stored_point(blockchain):
+    OnchainDataCollector(lookback_days=30).get_hash_rate()
+    # 最終時点の2日前までを保存済みの状態にする
+    stored = pd.read_csv('market_data/hash_rate.csv', index_col='timestamp', parse_dates=True)
+    stored.iloc[:-2].to_csv('market_data/hash_rate.csv')
+    last_stored = stored.index[-3]
+
+    blockchain.requests.clear()
+    blockchain.value = 2.0
+    df = OnchainDataCollector(lookback_days=30).get_hash_rate()
+    assert [params['start'] for params in blockchain.requests] == [last_stored.strftime('%Y-%m-%d')]
+    # 最終時点は値の更新を反映し、それより前の行は保存済みの値のまま
+    assert (df.loc[last_stored:, 'Hash Rate'] == 2.0).all()
+    assert (df.loc[:last_stored - timedelta(days=1), 'Hash Rate'] == 1.0).all()
+    assert len(df) == 31
+
+
+def test_chunk_missing_from_start_fetched_in_full(blockchain):
+    collector = OnchainDataCollector(lookback_days=30)
+    index = pd.date_range(collector.start_date + timedelta(days=10), periods=5, freq='D')
+    existing = pd.DataFrame({'Hash Rate': 1.0}, index=index)
+    end = collector.start_date + timedelta(days=30)
+    collector._fetch_chart_since('hash-rate', 'Hash Rate', existing, collector.start_date, end)
+    assert blockchain.requests[0]['start'] == collector.start_date.strftime('%Y-%m-%d')
+
+
+class FakeStreamResponse:
+    """stream=True のレスポンス（本文を指定したバイト数ごとに返す）"""
+
+    def __init__(self, body, chunk_size=7):
+        self.body = body.encode()
+        self.chunk_size = chunk_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=None):
+        for i in range(0, len(self.body), self.chunk_size):
+            yield self.body[i:i + self.chunk_size]
+
+
+def holders_body(start, days, value=100):
+    dates = pd.date_range(start, periods=days, freq='D')
+    return json.dumps([{'d': f'{date:%Y-%m-%d}', 'unixTs': str(int(date.timestamp())),
+                        'balAddr10Kbtc': str(value + i)} for i, date in enumerate(dates)])
+
+
+def test_iter_json_objects_across_chunk_boundaries():
+    body = '[{"d": "2024-01-01", "v": "é"}, {"d": "2024-01-02", "v": "ü"}]'
+    collector = OnchainDataCollector(lookback_days=30)
+    # 複数バイトの文字がチャンクの境界で分かれても正しく復元する
+    for chunk_size in (1, 3, 1024):
+        records = list(collector.iter_json_objects(FakeStreamResponse(body, chunk_size)))
+        assert [json.loads(record) for record in records] == json.loads(body)
+
+
+def test_large_holders_skip_records_before_watermark(monkeypatch):
+    collector = OnchainDataCollector(lookback_days=30)
+    body = holders_body(collector.start_date - timedelta(days=100), 131)
+    monkeypatch.setattr(OnchainDataCollector, 'http_get', lambda self, url, **kwargs: FakeStreamResponse(body))
+    parsed = []
+    original = json.loads
+    monkeypatch.setattr(onchain_data.json, 'loads', lambda s: parsed.append(s) or original(s))
+
+    df = collector.get_large_holders_data()
+    assert df.index.min() == pd.Timestamp(collector.start_date)
+    assert len(df) == 31
+    # 取得開始日より前の要素は解析しない
+    assert len(parsed) == 31
+
+
+def test_large_holders_resume_from_last_stored_day(monkeypatch):
+    collector = OnchainDataCollector(lookback_days=30)
+    body = holders_body(collector.start_date, 31)
+    monkeypatch.setattr(OnchainDataCollector, 'http_get', lambda self, url, **kwargs: FakeStreamResponse(body))
+    collector.get_large_holders_data()
+
+    stored = pd.read_csv('market_data/large_holders.csv', index_col='timestamp', parse_dates=True)
+    stored.iloc[:-5].to_csv('market_data/large_holders.csv')
+    body = holders_body(collector.start_date, 31, value=200)
+    parsed = []
+    original = json.loads
+    monkeypatch.setattr(onchain_data.json, 'loads', lambda s: parsed.append(s) or original(s))
+
+    df = OnchainDataCollector(lookback_days=30).get_large_holders_data()
+    # 保存済みの最終日とそれ以降のみ解析して更新する
+    assert len(parsed) == 6
+    assert len(df) == 31
+    assert (df['Total Holdings'].iloc[-6:] >= 200).all()
+    assert (df['Total Holdings'].iloc[:-6] < 200).all()
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+from util.metrics import metrics
+from util.panel import FILL_LIMITS, align_sources, build_market_panel
+
+
+def frame(column, index, values=None, tz=None):
+    index = pd.DatetimeIndex(index, tz=tz, name='timestamp')
+    values = values if values is not None else np.arange(1, len(index) + 1, dtype=float)
+    return pd.DataFrame({column: values}, index=index)
+
+
+def test_index_is_union_of_sources():
+    results = {
+        'btcusd': frame('BTCUSD Price', pd.date_range('2024-01-01', periods=7, freq='D')),
+        'sp500': frame('SP500 Price', ['2024-01-02', '2024-01-03', '2024-01-08']),
+    }
+    panel = align_sources(results)
+    assert len(panel.frame) == 8
+    assert panel.sources == {'btcusd': ['BTCUSD Price'], 'sp500': ['SP500 Price']}
+    assert panel.observed['sp500'].sum() == 3
+    # 欠損を含む列はfloat32に変換する
+    assert panel.source_frame('sp500')['SP500 Price'].tolist() == [1.0, 2.0, 3.0]
+    assert panel.frame['SP500 Price'].dtype == np.float32
+
+
+def test_colliding_columns_prefixed_with_source():
+    index = pd.date_range('2024-01-01', periods=3, freq='D')
+    results = {
+        'btcusd': frame('BTCUSD Price', index),
+        'coinbase_premium': frame('BTCUSD Price', index, values=[10.0, 20.0, 30.0]),
+    }
+    panel = align_sources(results)
+    # 同名の列は後のデータソースの列もデータソース名を付けて残す
+    assert panel.sources == {'btcusd': ['BTCUSD Price'], 'coinbase_premium': ['coinbase_premium.BTCUSD Price']}
+    assert panel.frame['BTCUSD Price'].tolist() == [1.0, 2.0, 3.0]
+    assert panel.source_frame('coinbase_premium').iloc[:, 0].tolist() == [10.0, 20.0, 30.0]
+
+
+def test_forward_fill_stops_at_source_limit():
+    results = {
+        'btcusd': frame('BTCUSD Price', pd.date_range('2024-01-01', periods=10, freq='D')),
+        # 株式市場は5日まで、それより古い値は欠損とする
+        'sp500': frame('SP500 Price', ['2024-01-01'], [100.0]),
+    }
+    sp500 = align_sources(results).aligned('SP500 Price')
+    assert FILL_LIMITS['sp500'] == pd.Timedelta(days=5)
+    assert sp500.loc['2024-01-06'] == 100.0
+    assert np.isnan(sp500.loc['2024-01-07'])
+
+
+def test_funding_rates_fill_within_settlement_period():
+    results = {
+        'btcusd': frame('BTCUSD Price', pd.date_range('2024-01-01', periods=24, freq='h')),
+        'funding_rates': frame('Funding Rate', ['2024-01-01 00:00'], [0.01]),
+    }
+    rate = align_sources(results).aligned('Funding Rate')
+    assert rate.loc['2024-01-01 08:00'] == np.float32(0.01)
+    assert np.isnan(rate.loc['2024-01-01 09:00'])
+
+
+def test_aligned_at_source_observations():
+    results = {
+        'btcusd': frame('BTCUSD Price', pd.date_range('2024-01-01', periods=5, freq='D')),
+        'dxy': frame('DXY Price', ['2024-01-02', '2024-01-04'], [1.0, 2.0]),
+    }
+    panel = align_sources(results)
+    assert panel.aligned('BTCUSD Price', at='dxy').tolist() == [2.0, 4.0]
+    assert panel.co_observed(['btcusd', 'dxy'], ['BTCUSD Price', 'DXY Price']).shape == (2, 2)
+
+
+def test_timezones_converted_to_utc():
+    results = {
+        'btcusd': frame('BTCUSD Price', ['2024-01-01 09:00'], tz='Asia/Tokyo'),
+        'dxy': frame('DXY Price', ['2024-01-01 00:00']),
+    }
+    panel = align_sources(results)
+    assert panel.frame.index.tz is None
+    assert len(panel.frame) == 1
+
+
+def test_duplicates_and_order_normalized():
+    df = frame('BTCUSD Price', ['2024-01-02', '2024-01-01', '2024-01-02'], [2.0, 1.0, 3.0])
+    panel = align_sources({'btcusd': df})
+    assert panel.frame['BTCUSD Price'].tolist() == [1.0, 3.0]
+
+
+def test_stale_and_empty_sources():
+    btc = frame('BTCUSD Price', pd.date_range('2024-01-01', periods=3, freq='D'))
+    btc.attrs['stale'] = '2024-01-03'
+    panel = align_sources({'btcusd': btc, 'dxy': None, 'gold': btc.iloc[:0]})
+    assert 'dxy' not in panel and 'gold' not in panel
+    assert panel.stale == {'btcusd': '2024-01-03'}
+    assert align_sources({'dxy': None}) is None
+
+
+def test_daily_panel_from_intraday_prices():
+    results = {
+        'btcusd': frame('BTCUSD Price', pd.date_range('2024-01-01', periods=48, freq='h')),
+        'fear_greed': frame('Fear & Greed Value', ['2024-01-01', '2024-01-02'], [10.0, 20.0]),
+    }
+    panel = align_sources(results)
+    assert panel.is_intraday
+    daily = panel.daily
+    assert not daily.is_intraday
+    assert daily.series('btcusd', 'BTCUSD Price').tolist() == [24.0, 48.0]
+    reference = panel.btc_reference
+    assert reference.min() == 0.0 and reference.max() == 1.0
+
+
+def test_build_market_panel_records_stage():
+    assert build_market_panel(None) is None
+    assert metrics.stages['panel']['calls'] == 1
@@ -0,0 +1,114 @@
+import os
+import pandas as pd
+import pytest
+from util.data_collector import DataCollector
+from util.pipeline import MISSING, ArtifactCache, StagePipeline, content_hash
+
+
+def prices(values):
+    index = pd.date_range('2024-01-01', periods=len(values), freq='D', name='timestamp')
+    return pd.DataFrame({'Close': values}, index=index, dtype=float)
+
+
+def build(cache, btc, dxy, calls):
+    def panel(btc, dxy):
+        calls.append('panel')
+        return {'btc': btc, 'dxy': dxy}
+
+    def indicators(panel):
+        calls.append('indicators')
+        return panel['btc']['Close'].rolling(2).mean()
+
+    pipeline = StagePipeline(cache)
+    pipeline.add_source('btcusd', btc)
+    pipeline.add_source('dxy', dxy)
+    pipeline.add('panel', panel, ['btcusd', 'dxy'], cache=False)
+    # パネルから BTCUSD の列のみを使うため、キーは BTCUSD のソースのみから決める
+    pipeline.add('indicators', indicators, ['panel'], depends=['btcusd'])
+    return pipeline
+
+
+def test_content_hash_depends_on_values_and_attrs():
+    df = prices([1.0, 2.0])
+    assert content_hash(df) == content_hash(df.copy())
+    assert content_hash(df) != content_hash(prices([1.0, 3.0]))
+    assert content_hash(df) != content_hash(df.astype('float32'))
+    stale = df.copy()
+    stale.attrs['stale'] = '2024-01-02'
+    assert content_hash(df) != content_hash(stale)
+    assert content_hash(None) != content_hash(df)
+
+
+def test_unchanged_inputs_reuse_cached_output():
+    cache = ArtifactCache()
+    calls = []
+    first = build(cache, prices([1, 2, 3]), prices([5, 6, 7]), calls).get('indicators')
+    assert calls == ['panel', 'indicators']
+
+    calls.clear()
+    pipeline = build(cache, prices([1, 2, 3]), prices([5, 6, 7]), calls)
+    second = pipeline.get('indicators')
+    # キャッシュから読み込み、上流のステージも評価しない
+    assert calls == []
+    assert pipeline.reused == ['indicators']
+    pd.testing.assert_series_equal(first, second)
+
+
+def test_changed_dependency_invalidates_key():
+    cache = ArtifactCache()
+    calls = []
+    key = build(cache, prices([1, 2, 3]), prices([5, 6, 7]), calls).key('indicators')
+    assert build(cache, prices([1, 2, 4]), prices([5, 6, 7]), calls).key('indicators') != key
+    # depends に含めないソースの変化ではキーは変わらない
+    assert build(cache, prices([1, 2, 3]), prices([5, 6, 8]), calls).key('indicators') == key
+
+
+def test_params_change_key():
+    pipeline = StagePipeline()
+    pipeline.add_source('btcusd', prices([1, 2]))
+    pipeline.add('a', lambda df, window: df, ['btcusd'], params={'window': 2})
+    pipeline.add('b', lambda df, window: df, ['btcusd'], params={'window': 3})
+    assert pipeline.key('a') != pipeline.key('b')
+
+
+def test_unknown_upstream_rejected():
+    pipeline = StagePipeline()
+    with pytest.raises(ValueError):
+        pipeline.add('indicators', lambda panel: panel, ['panel'])
+
+
+def test_artifact_cache_round_trip_and_missing():
+    cache = ArtifactCache()
+    assert cache.load('missing') is MISSING
+    cache.store('key', None)
+    # None も出力として保存できる
+    assert cache.load('key') is None
+
+
+def test_artifact_cache_prune_removes_least_recently_used():
+    cache = ArtifactCache(max_bytes=2500)
+    for i, key in enumerate(['old', 'used', 'new']):
+        cache.store(key, b'x' * 1000)
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+    cache.load('old')
+    cache.prune()
+    assert sorted(os.listdir(cache.base_path)) == ['new.pkl', 'old.pkl']
+
+
+def test_collectors_created_on_first_use():
+    collector = DataCollector(lookback_days=30)
+    assert collector.created_collectors() == []
+    market = collector.market_collector
+    assert collector.created_collectors() == [market]
+    assert collector.market_collector is market
+    with pytest.raises(AttributeError):
+        collector.unknown_collector
+
+
+def test_resident_frames_propagate_to_created_collectors():
+    collector = DataCollector(lookback_days=30)
+    onchain = collector.onchain_collector
+    collector.keep_frames_in_memory()
+    assert onchain.resident_frames == {}
+    # 後から作成したコレクターにも引き継ぐ
+    assert collector.market_collector.resident_frames == {}
@@ -0,0 +1,67 @@
+import os
+import pstats
+from util.deadline import SourceBudget, run_with_budget
+from util.metrics import RunMetrics, metrics
+from util.profiling import StageProfiler
+
+
+def busy_leaf():
+    return sum(i * i for i in range(20000))
+
+
+def busy_outer():
+    return busy_leaf() + sum(range(20000))
+
+
+def profiled_run(profiler):
+    run = RunMetrics()
+    run.add_listener(profiler)
+    with run.stage('analyze'):
+        busy_outer()
+        with run.stage('plot/render'):
+            busy_leaf()
+    return run
+
+
+def test_nested_stage_profiled_separately():
+    profiler = StageProfiler()
+    profiled_run(profiler)
+    outer = {func[2] for func in profiler.stats('analyze').stats}
+    inner = {func[2] for func in profiler.stats('plot/render').stats}
+    assert 'busy_outer' in outer
+    # 外側のステージには子ステージの処理を含めない
+    assert 'busy_outer' not in inner
+    assert 'busy_leaf' in inner
+
+
+def test_write_outputs_pstats_and_collapsed_stacks(workdir):
+    profiler = StageProfiler(output_dir='profile')
+    profiled_run(profiler)
+    collapsed_path = profiler.write()
+    # ステージ名のファイル名に使えない文字は置き換える
+    assert os.path.exists('profile/analyze.pstats')
+    assert os.path.exists('profile/plot_render.pstats')
+    pstats.Stats('profile/analyze.pstats')
+
+    with open(collapsed_path) as f:
+        lines = f.read().splitlines()
+    assert lines
+    for line in lines:
+        stack, microseconds = line.rsplit(' ', 1)
+        assert stack.split(';')[0] in ('analyze', 'plot/render')
+        assert int(microseconds) >= 1
+    assert any('busy_outer' in line and line.startswith('analyze;') for line in lines)
+
+
+def test_format_function():
+    assert StageProfiler.format_function(('~', 0, '<built-in method len>')) == '<built-in method len>'
+    assert StageProfiler.format_function(('/a/b/mod.py', 12, 'run')) == 'mod.py:12(run)'
+
+
+def test_budgeted_fetch_profiled_in_stage(monkeypatch):
+    profiler = StageProfiler()
+    monkeypatch.setattr(metrics, 'listeners', [profiler])
+    with metrics.stage('collect.x'):
+        run_with_budget(busy_leaf, SourceBudget('x', 5))
+    # 取得を実行したスレッドの処理も呼び出し元のステージに含める
+    assert 'busy_leaf' in {func[2] for func in profiler.stats('collect.x').stats}
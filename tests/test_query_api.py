@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from util.query_api import QueryError, QueryService, decode_frame, encode_frame, frame_to_json
+
+
+def sample_frame():
+    index = pd.date_range('2024-01-01', periods=4, freq='h', name='timestamp')
+    return pd.DataFrame({
+        'Close': np.array([1.5, np.nan, 3.5, 4.5], dtype=np.float32),
+        'Fear & Greed Value': np.array([10, 20, 30, 40], dtype=np.uint8),
+        'Signal': np.array([-2, 0, 1, 2], dtype=np.int64),
+    }, index=index)
+
+
+def test_binary_round_trip():
+    df = sample_frame()
+    decoded = decode_frame(encode_frame(df, 'btcusd'))
+    assert decoded.index.equals(df.index)
+    assert list(decoded.columns) == list(df.columns)
+    for column in df.columns:
+        assert decoded[column].dtype == df[column].dtype
+        np.testing.assert_array_equal(decoded[column].to_numpy(), df[column].to_numpy())
+
+
+def test_binary_layout():
+    df = sample_frame()
+    payload = encode_frame(df, 'btcusd')
+    assert payload[:4] == b'BMA1'
+    header_length = int.from_bytes(payload[4:8], 'little')
+    header = json.loads(payload[8:8 + header_length])
+    assert header['rows'] == 4
+    assert header['dtypes'] == ['<f4', '|u1', '<i8']
+    # タイムスタンプ（int64）と各列の値のみが続く
+    assert len(payload) == 8 + header_length + 4 * (8 + 4 + 1 + 8)
+
+
+def test_decode_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        decode_frame(b'XXXX' + encode_frame(sample_frame(), 'btcusd')[4:])
+
+
+def test_frame_to_json_uses_null_for_missing():
+    body = json.loads(frame_to_json(sample_frame(), 'btcusd'))
+    assert body['rows'] == 4
+    assert body['data']['Close'] == [1.5, None, 3.5, 4.5]
+    assert body['index'][0] == '2024-01-01T00:00:00'
+
+
+def test_slice_includes_both_ends_and_converts_timezone():
+    df = sample_frame()
+    assert len(QueryService.slice(df, '2024-01-01T01:00', '2024-01-01T02:00')) == 2
+    assert len(QueryService.slice(df, '2024-01-01T10:00+09:00')) == 3
+    assert len(QueryService.slice(df)) == 4
+    with pytest.raises(QueryError) as error:
+        QueryService.slice(df, 'not a date')
+    assert error.value.status == 400
+
+
+def test_cached_loads_once_for_concurrent_requests():
+    service = QueryService()
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.cached('key', ('sig',), load)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ['value'] * 4
+    assert len(calls) == 1
+
+
+def test_cached_reloads_when_signature_changes():
+    service = QueryService()
+    assert service.cached('key', ('v1',), lambda: 'old') == 'old'
+    assert service.cached('key', ('v1',), lambda: 'unused') == 'old'
+    assert service.cached('key', ('v2',), lambda: 'new') == 'new'
+
+
+def test_cached_evicts_least_recently_used():
+    service = QueryService(max_entries=2)
+    service.cached('a', (), lambda: 'a')
+    service.cached('b', (), lambda: 'b')
+    service.cached('a', (), lambda: 'unused')
+    service.cached('c', (), lambda: 'c')
+    assert list(service.entries) == ['a', 'c']
+
+
+def test_query_series_reloads_updated_file():
+    os.makedirs('market_data', exist_ok=True)
+    service = QueryService(lookback_days=30)
+    index = pd.date_range(service.collector('BTC').start_date, periods=5, freq='D', name='timestamp')
+    pd.DataFrame({'DXY Price': 100.0}, index=index).to_csv('market_data/dxy.csv')
+    name, df = service.query('/v1/series/dxy', {})
+    assert name == 'dxy' and len(df) == 5
+
+    pd.DataFrame({'DXY Price': 101.0}, index=index[:3]).to_csv('market_data/dxy.csv')
+    _, df = service.query('/v1/series/dxy', {'end': str(index[1])})
+    assert df['DXY Price'].tolist() == [101.0, 101.0]
+
+
+@pytest.mark.parametrize('path, params, status', [
+    ('/v2/series/dxy', {}, 404),
+    ('/v1/unknown', {}, 404),
+    ('/v1/series/unknown', {}, 404),
+    ('/v1/series/dxy', {}, 404),
+    ('/v1/series/dxy', {'asset': 'XXX'}, 400),
+])
+def test_query_errors(path, params, status):
+    with pytest.raises(QueryError) as error:
+        QueryService(lookback_days=30).query(path, params)
+    assert error.value.status == status
+
+
+def test_period_moves_forward_after_midnight():
+    os.makedirs('market_data', exist_ok=True)
+    service = QueryService(lookback_days=30)
+    index = pd.date_range(pd.Timestamp.now().normalize() - pd.Timedelta(days=40), periods=41, freq='D',
+                          name='timestamp')
+    pd.DataFrame({'DXY Price': 100.0}, index=index).to_csv('market_data/dxy.csv')
+    # 前日に起動したサーバーのコレクター（取得期間が1日前）
+    started = service.collector('BTC')
+    started.start_date -= pd.Timedelta(days=1)
+    started.end_date -= pd.Timedelta(days=1)
+    service.cached(('series', 'BTC', 'dxy'), service.signature(started, ['dxy']),
+                   lambda: started.load_stored_data(['dxy'])['dxy'])
+
+    _, df = service.query('/v1/series/dxy', {})
+    # 日付が変わったため現在の日付基準の取得期間で読み込み直す
+    assert service.collector('BTC') is not started
+    assert df.index[0] == started.start_date + pd.Timedelta(days=1)
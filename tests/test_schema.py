@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from util.schema import MemoryBudget, compact_frame, memory_footprint, parse_size, to_unsigned
+
+
+def test_compact_frame_assigns_column_kinds():
+    index = pd.date_range('2024-01-01', periods=3, freq='D', name='timestamp')
+    df = pd.DataFrame({
+        'Close': [1.5, 2.5, 3.5],
+        'Active Addresses': [900000.0, 950000.0, 1000000.0],
+        'bitcoin Trend': [10, 50, 100],
+        'Note': ['a', 'b', 'c'],
+    }, index=index)
+    df.attrs['stale'] = '2024-01-02'
+    compact = compact_frame(df)
+    assert compact['Close'].dtype == np.float32
+    assert compact['Active Addresses'].dtype == np.uint32
+    assert compact['bitcoin Trend'].dtype == np.uint8
+    assert compact['Note'].dtype == df['Note'].dtype
+    assert compact.index.name == 'timestamp'
+    assert compact.attrs == df.attrs
+    assert memory_footprint(compact) < memory_footprint(df)
+    # 元のデータは変更しない
+    assert df['Close'].dtype == np.float64
+
+
+def test_compact_frame_parses_string_index():
+    df = pd.DataFrame({'Close': [1.0, 2.0]}, index=pd.Index(['2024-01-01', '2024-01-02'], name='timestamp'))
+    assert isinstance(compact_frame(df).index, pd.DatetimeIndex)
+
+
+@pytest.mark.parametrize('values', [[1.0, np.nan], [-1.0, 2.0], [1.5, 2.0]])
+def test_to_unsigned_falls_back_to_float32(values):
+    assert to_unsigned(pd.Series(values)).dtype == np.float32
+
+
+@pytest.mark.parametrize('value, size', [
+    ('1048576', 1048576),
+    ('512MB', 512 * 1024 ** 2),
+    ('2gb', 2 * 1024 ** 3),
+    ('1.5 KB', 1536),
+    ('64B', 64),
+])
+def test_parse_size(value, size):
+    assert parse_size(value) == size
+
+
+@pytest.mark.parametrize('value', ['', 'MB', '12TB', '-1MB', '1 M B'])
+def test_parse_size_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        parse_size(value)
+
+
+def test_memory_budget_rejects_over_limit():
+    df = pd.DataFrame({'Close': np.zeros(1000)})
+    size = memory_footprint(df)
+    budget = MemoryBudget(limit_bytes=int(size * 1.5))
+    budget.add('btcusd', df)
+    with pytest.raises(MemoryError):
+        budget.add('sp500', df)
+    # 超過したデータは記録しない
+    assert set(budget.footprints) == {'btcusd'}
+    assert budget.total_bytes == size
+
+
+def test_memory_budget_replace_and_remove():
+    df = pd.DataFrame({'Close': np.zeros(100)})
+    budget = MemoryBudget(limit_bytes=memory_footprint(df))
+    budget.add('btcusd', df)
+    # 同じデータセットの置き換えは合計に二重に数えない
+    budget.add('btcusd', df)
+    budget.add('btcusd', None)
+    assert budget.total_bytes == 0
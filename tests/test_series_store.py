@@ -0,0 +1,75 @@
+import os
+import numpy as np
+import pandas as pd
+from util.series_store import SeriesStore
+
+
+def sample_frame(periods=5, tz=None):
+    index = pd.date_range('2024-01-01', periods=periods, freq='h', name='timestamp', tz=tz)
+    return pd.DataFrame({
+        'Close': np.arange(periods, dtype=np.float32),
+        'Fear & Greed Value': np.arange(periods, dtype=np.uint8),
+    }, index=index)
+
+
+def test_write_open_round_trip():
+    store = SeriesStore()
+    df = sample_frame()
+    store.write('btcusd', df)
+    loaded = store.open('btcusd')
+    assert loaded.index.equals(df.index)
+    assert loaded.index.name == 'timestamp'
+    assert list(loaded.columns) == ['Close', 'Fear & Greed Value']
+    for column in df.columns:
+        assert loaded[column].dtype == df[column].dtype
+        np.testing.assert_array_equal(loaded[column].to_numpy(), df[column].to_numpy())
+
+
+def test_open_returns_read_only_memory_map():
+    store = SeriesStore()
+    store.write('btcusd', sample_frame())
+    values = store.open('btcusd')['Close'].to_numpy()
+    assert not values.flags.writeable
+
+
+def test_write_converts_timezone_to_utc():
+    store = SeriesStore()
+    store.write('btcusd', sample_frame(tz='Asia/Tokyo'))
+    loaded = store.open('btcusd')
+    assert loaded.index.tz is None
+    assert loaded.index[0] == pd.Timestamp('2023-12-31 15:00')
+
+
+def test_empty_dataset_round_trip():
+    store = SeriesStore()
+    store.write('btcusd', sample_frame(periods=0))
+    loaded = store.open('btcusd')
+    assert loaded.empty
+    assert list(loaded.columns) == ['Close', 'Fear & Greed Value']
+
+
+def test_rewrite_replaces_dataset():
+    store = SeriesStore()
+    store.write('btcusd', sample_frame(3))
+    store.write('btcusd', sample_frame(6))
+    assert len(store.open('btcusd')) == 6
+    assert not os.path.exists('market_data/store/btcusd.tmp')
+    assert not os.path.exists('market_data/store/btcusd.old')
+
+
+def test_open_missing_dataset():
+    assert SeriesStore().open('missing') is None
+
+
+def test_is_fresh_tracks_source_file():
+    os.makedirs('market_data', exist_ok=True)
+    source_path = 'market_data/btcusd.csv'
+    df = sample_frame()
+    df.to_csv(source_path)
+    store = SeriesStore()
+    assert not store.is_fresh('btcusd', source_path)
+    store.write('btcusd', df, source_path)
+    assert store.is_fresh('btcusd', source_path)
+    # CSVが更新された場合は作り直しが必要
+    sample_frame(8).to_csv(source_path)
+    assert not store.is_fresh('btcusd', source_path)
@@ -0,0 +1,64 @@
+import os
+import numpy as np
+import pyarrow as pa
+import pytest
+from util.pipeline import build_analysis_pipeline
+from util.snapshot import (LATEST_FILENAME, latest_snapshot, load_snapshot, prune_snapshots, read_manifest,
+                           write_snapshot)
+
+
+@pytest.fixture
+def pipeline(market_results):
+    return build_analysis_pipeline(market_results)
+
+
+def test_write_and_load_round_trip(pipeline):
+    snapshot_dir = write_snapshot(pipeline)
+    assert latest_snapshot() == snapshot_dir
+    manifest = read_manifest(snapshot_dir)
+    assert manifest['asset'] == 'BTC' and manifest['freq'] == '1d'
+    assert {'panel', 'indicators', 'signals', 'correlations', 'lead_lag'} <= set(manifest['tables'])
+
+    frames = load_snapshot(snapshot_dir, as_frames=True)
+    indicators = pipeline.get('indicators')
+    np.testing.assert_allclose(frames['indicators']['rsi'].to_numpy(), indicators['rsi'].to_numpy())
+    assert frames['signals'].index.equals(pipeline.get('signal_components').index)
+    assert frames['panel']['observed.dxy'].sum() == pipeline.get('panel').observed['dxy'].sum()
+    for name, table in manifest['tables'].items():
+        assert len(frames[name]) == table['rows']
+
+
+def test_load_selected_tables_as_arrow(pipeline):
+    tables = load_snapshot(write_snapshot(pipeline), tables=['signals'])
+    assert list(tables) == ['signals']
+    assert isinstance(tables['signals'], pa.Table)
+
+
+def test_unchanged_results_reuse_snapshot(pipeline, market_results):
+    first = write_snapshot(pipeline)
+    second = write_snapshot(build_analysis_pipeline(market_results))
+    assert second == first
+    # 頻度が異なる場合は新しいスナップショットを作成
+    assert read_manifest(write_snapshot(pipeline, freq='1h'))['freq'] == '1h'
+
+
+def test_prune_keeps_latest_snapshots(workdir):
+    asset_dir = workdir / 'snapshots' / 'BTC'
+    for version in ['20240101T000000', '20240102T000000', '20240103T000000']:
+        (asset_dir / version).mkdir(parents=True)
+        (asset_dir / version / 'manifest.json').write_text('{}')
+    (asset_dir / LATEST_FILENAME).write_text('20240103T000000\n')
+    prune_snapshots(str(asset_dir), max_snapshots=2)
+    assert sorted(os.listdir(asset_dir)) == ['20240102T000000', '20240103T000000', LATEST_FILENAME]
+
+
+def test_unsupported_schema_version(pipeline):
+    snapshot_dir = write_snapshot(pipeline)
+    with open(os.path.join(snapshot_dir, 'manifest.json'), 'w') as f:
+        f.write('{"schema_version": 999, "tables": {}}')
+    with pytest.raises(ValueError):
+        load_snapshot(snapshot_dir)
+
+
+def test_latest_snapshot_missing():
+    assert latest_snapshot('ETH') is None
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from util.frequency import cascade_resample
+from util.plotters.market_plotter import MarketPlotter, TIMEFRAME_MOMENTUM_WARMUP, TIMEFRAME_TREND_WARMUP
+
+
+@pytest.fixture
+def plotter():
+    return MarketPlotter()
+
+
+def test_cascade_resample_uses_last_observation():
+    index = pd.date_range('2024-01-01', '2024-03-31 23:00', freq='h')
+    price = pd.Series(np.arange(len(index), dtype=float), index=index)
+    pyramid = cascade_resample(price)
+    assert len(pyramid['1d']) == 91
+    assert pyramid['1d'].index[0] == pd.Timestamp('2024-01-01 23:00')
+    # 週足（日曜終わり）・月足は各期間の最後の観測時刻と値
+    assert pyramid['1w'].index[0] == pd.Timestamp('2024-01-07 23:00')
+    assert pyramid['1M'].index.tolist() == [pd.Timestamp('2024-01-31 23:00'), pd.Timestamp('2024-02-29 23:00'),
+                                            pd.Timestamp('2024-03-31 23:00')]
+    assert (pyramid['1M'] == price[pyramid['1M'].index]).all()
+
+
+def test_cascade_resample_matches_direct_resampling():
+    index = pd.date_range('2024-01-03', periods=200, freq='D')
+    price = pd.Series(np.random.default_rng(0).normal(size=200).cumsum(), index=index)
+    pyramid = cascade_resample(price)
+    weekly = price.resample('W-SUN').last()
+    monthly = price.resample('ME').last()
+    assert pyramid['1w'].to_numpy().tolist() == weekly.to_numpy().tolist()
+    assert pyramid['1M'].to_numpy().tolist() == monthly.to_numpy().tolist()
+    # 期間の途中の最後の足（確定していない週・月）も最後の観測時刻で含める
+    assert pyramid['1w'].index[-1] == index[-1]
+
+
+def test_cascade_resample_empty():
+    pyramid = cascade_resample(pd.Series([], dtype=float, index=pd.DatetimeIndex([])))
+    assert all(series.empty for series in pyramid.values())
+
+
+def test_daily_level_reuses_base_indicators(plotter):
+    index = pd.date_range('2023-01-01', periods=400, freq='D')
+    indicators = plotter.calculate_indicators(pd.Series(np.linspace(100, 200, 400), index=index))
+    timeframes = plotter.calculate_timeframe_indicators(indicators)
+    assert timeframes['1d'] is indicators
+    assert len(timeframes['1w']['price']) == len(cascade_resample(indicators['price'])['1w'])
+
+
+def test_agreement_ignores_levels_during_warmup(plotter):
+    index = pd.date_range('2023-01-01', periods=400, freq='D')
+    rising = plotter.calculate_indicators(pd.Series(100 * np.exp(np.arange(400) * 0.01), index=index))
+    falling = plotter.calculate_indicators(
+        cascade_resample(pd.Series(100 * np.exp(-np.arange(400) * 0.01), index=index))['1w'])
+    agreement = plotter.calculate_timeframe_agreement({'1d': rising, '1w': falling}, index)
+
+    weekly = falling['price'].index
+    # 週足のトレンドがウォームアップを過ぎるまでは日足の向き（上昇）のみで判定
+    before = agreement[(index >= index[TIMEFRAME_MOMENTUM_WARMUP]) & (index < weekly[TIMEFRAME_TREND_WARMUP - 1])]
+    assert (before == 1.0).all()
+    # トレンドのみ有効な間は週足のトレンド（下降）が加わる
+    trend_only = agreement[(index >= weekly[TIMEFRAME_TREND_WARMUP - 1])
+                           & (index < weekly[TIMEFRAME_MOMENTUM_WARMUP - 1])]
+    assert (trend_only == 0.0).all()
+    # どの足もウォームアップ中の時点は0
+    assert agreement.iloc[0] == 0.0
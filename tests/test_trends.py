@@ -0,0 +1,94 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+from util.collectors.sentiment_data import (SentimentDataCollector, TRENDS_CHUNK_DAYS, TRENDS_FINAL_DAYS,
+                                            TRENDS_KEYWORDS, TRENDS_OVERLAP_DAYS)
+
+
+@pytest.fixture
+def collector():
+    return SentimentDataCollector(lookback_days=200)
+
+
+def true_trends(start, end):
+    """キーワード間の比率が一定の、日ごとに変化する系列"""
+    index = pd.date_range(start, end, freq='D', name='timestamp')
+    base = 50 + 40 * np.sin(np.arange(len(index)) / 15)
+    return pd.DataFrame({f'{keyword} Trend': base * (i + 1) for i, keyword in enumerate(TRENDS_KEYWORDS)},
+                        index=index)
+
+
+def normalized_chunk(series, start, end):
+    """Googleトレンドと同じく期間内の最大値を100に正規化したチャンク"""
+    chunk = series.loc[start:end]
+    return (chunk * (100 / chunk.to_numpy().max())).round()
+
+
+def test_windows_cover_period_with_overlap(collector):
+    windows = collector.get_trends_windows()
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    assert windows[0][0] <= collector.start_date
+    assert windows[-1][0] <= today <= windows[-1][1]
+    for (start, end), (next_start, _) in zip(windows, windows[1:]):
+        assert (end - start).days == TRENDS_CHUNK_DAYS - 1
+        assert (end - next_start).days + 1 == TRENDS_OVERLAP_DAYS
+
+
+def test_windows_stable_across_days(collector):
+    windows = set(collector.get_trends_windows())
+    collector.start_date += timedelta(days=1)
+    # 開始日が変わっても共通のチャンクは同じ境界になる（キャッシュを再利用できる）
+    assert len(windows & set(collector.get_trends_windows())) >= len(windows) - 1
+
+
+def test_stitch_recovers_relative_levels(collector):
+    series = true_trends('2024-01-01', '2024-07-31')
+    step = TRENDS_CHUNK_DAYS - TRENDS_OVERLAP_DAYS
+    starts = pd.date_range('2024-01-01', '2024-07-31', freq=f'{step}D')
+    chunks = [normalized_chunk(series, start, start + timedelta(days=TRENDS_CHUNK_DAYS - 1)) for start in starts]
+    stitched = collector.stitch_trends_chunks(chunks)
+    expected = series * (100 / series.to_numpy().max())
+    assert stitched.index.equals(series.index)
+    assert stitched.to_numpy().max() == 100
+    # チャンクごとの丸め誤差を除き、元の系列の比率が保たれる
+    assert np.abs(stitched - expected).to_numpy().max() < 3
+
+
+def test_stitch_chunk_without_overlap_is_not_scaled(collector):
+    first = pd.DataFrame({'bitcoin Trend': [50.0, 100.0]}, index=pd.date_range('2024-01-01', periods=2))
+    second = pd.DataFrame({'bitcoin Trend': [25.0]}, index=pd.date_range('2024-03-01', periods=1))
+    stitched = collector.stitch_trends_chunks([first, second])
+    assert stitched['bitcoin Trend'].tolist() == [50.0, 100.0, 25.0]
+
+
+def test_finalized_chunks_reused(collector, monkeypatch):
+    series = true_trends(collector.start_date - timedelta(days=TRENDS_CHUNK_DAYS), datetime.now())
+    fetched = []
+
+    def fake_fetch(self, window_start, window_end):
+        fetched.append(window_start)
+        df = normalized_chunk(series, window_start, min(window_end, datetime.now()))
+        path = self._trends_cache_path(window_start)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_csv(path)
+        # 取得時刻をチャンクの終了日に合わせ、確定済みかどうかを再現する
+        fetched_at = min(window_end + timedelta(days=TRENDS_FINAL_DAYS), datetime.now()).timestamp()
+        os.utime(path, (fetched_at, fetched_at))
+        return df
+
+    monkeypatch.setattr(SentimentDataCollector, 'fetch_trends_chunk', fake_fetch)
+    windows = collector.get_trends_windows()
+    first = collector.get_google_trends_data()
+    assert sorted(fetched) == [start for start, _ in windows]
+    assert first.index.min() >= pd.Timestamp(collector.start_date)
+
+    fetched.clear()
+    second = collector.get_google_trends_data()
+    # 2回目は終了日から一定日数が経過していないチャンクのみ取得し直す
+    today = datetime.now()
+    assert 0 < len(fetched) < len(windows)
+    assert all(end + timedelta(days=TRENDS_FINAL_DAYS) > today
+               for start, end in windows if start in fetched)
+    pd.testing.assert_frame_equal(first, second, check_freq=False)
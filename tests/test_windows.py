@@ -0,0 +1,52 @@
+import argparse
+import pandas as pd
+import pytest
+from crypto_analysis import parse_args, parse_windows
+from util.data_collector import DataCollector, needs_full_history
+from util.pipeline import build_analysis_pipeline
+from util.plotters.market_plotter import window_filename, window_start
+
+
+def test_parse_windows():
+    windows = parse_windows('30d, 2w,all')
+    assert windows == {'30d': 30, '2w': 14, 'all': None}
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_windows(' , ')
+
+
+def test_needs_full_history():
+    assert not needs_full_history(None)
+    assert not needs_full_history({'30d': 30})
+    assert needs_full_history({'30d': 30, 'all': None})
+
+
+def test_lookback_extended_to_longest_window():
+    assert parse_args(['--lookback', '30', '--windows', '30d,400d']).lookback == 400
+    assert parse_args(['--lookback', '500', '--windows', '30d']).lookback == 500
+    # 'all' は保存済みの全期間を使うため取得期間は変えない
+    assert parse_args(['--lookback', '30', '--windows', 'all']).lookback == 30
+
+
+def test_full_history_keeps_rows_before_period():
+    index = pd.date_range(end=pd.Timestamp.now().normalize(), periods=100, freq='D')
+    df = pd.DataFrame({'DXY Price': 1.0}, index=index)
+    assert len(DataCollector(lookback_days=10).since_start(df)) == 11
+    assert DataCollector(lookback_days=10, full_history=True).since_start(df) is df
+
+
+def test_window_helpers():
+    end = pd.Timestamp('2024-12-31')
+    assert window_start(end, 90) == pd.Timestamp('2024-10-02')
+    assert window_start(end, None) is None
+    assert window_filename('reports/crypto_analysis.png', '90d') == 'reports/crypto_analysis_90d.png'
+
+
+def test_pipeline_adds_stages_per_window(market_results):
+    pipeline = build_analysis_pipeline(market_results, windows={'90d': 90, 'all': None})
+    assert pipeline.get('window.90d') == pipeline.get('indicators')['price'].index[-1] - pd.Timedelta(days=90)
+    assert 'window.all' not in pipeline
+    assert pipeline.stages['composite.90d'].params['filename'] == 'crypto_analysis_90d.png'
+    assert pipeline.stages['composite.all'].params['filename'] == 'crypto_analysis_all.png'
+    # 先行・遅行のヒートマップは期間によらず共通のパネル
+    assert 'tile.90d.lead_lag' not in pipeline
+    assert 'composite' not in pipeline
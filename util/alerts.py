@@ -0,0 +1,346 @@
+import os
+import json
+import hashlib
+import pandas as pd
+from datetime import datetime, timezone
+from .assets import DEFAULT_ASSET
+from .plotters.market_plotter import MarketPlotter
+from .deadline import HTTP_TIMEOUT
+from .metrics import metrics
+
+# 評価済みの状態の保存先（資産ごとのファイル、実行をまたいで保持）
+ALERT_STATE_DIR = 'market_data/checkpoints'
+
+# ファイルキューの出力先（イベントごとに1ファイル）
+ALERT_QUEUE_DIR = 'market_data/alerts'
+
+# 送信先ごとに送信済みとして記録するイベントIDの数（再評価や再起動時の重複送信を防ぐ）
+MAX_SENT_EVENT_IDS = 1000
+
+# 送信先ごとに保持する送信に失敗したイベントの数（次回の評価で再送）
+MAX_PENDING_EVENTS = 1000
+
+# 状態を監視する列（signal_componentsの列）と、値 -> 状態名
+ALERT_COMPONENTS = {
+    'rsi': {1: 'buy', 0: 'neutral', -1: 'sell'},
+    'macd': {1: 'buy', 0: 'neutral', -1: 'sell'},
+    'ma': {1: 'buy', 0: 'neutral', -1: 'sell'},
+    'fear_greed': {1: 'buy', 0: 'neutral', -1: 'sell'},
+    'timeframes': {1: 'aligned_up', 0: 'mixed', -1: 'aligned_down'},
+    'signal': {2: 'strong_buy', 1: 'buy', 0: 'neutral', -1: 'sell', -2: 'strong_sell'},
+}
+
+# マルチタイムフレームの一致度（-1 to 1）を上昇・混在・下降の状態に分ける閾値
+TIMEFRAME_ALIGNMENT_THRESHOLD = 0.5
+
+def component_states(components):
+    """signal_componentsを監視する列の状態（整数）に変換"""
+    states = pd.DataFrame(index=components.index)
+    for name in ALERT_COMPONENTS:
+        if name not in components:
+            continue
+        values = components[name]
+        if name == 'timeframes':
+            values = ((values >= TIMEFRAME_ALIGNMENT_THRESHOLD).astype(int)
+                      - (values <= -TIMEFRAME_ALIGNMENT_THRESHOLD).astype(int))
+        states[name] = values.fillna(0).astype(int)
+    return states
+
+class StdoutSink:
+    """イベントを1行のJSONとして標準出力に書き出す"""
+
+    name = 'stdout'
+    key = 'stdout'
+
+    def send(self, event):
+        print(json.dumps(event, ensure_ascii=False), flush=True)
+
+class FileQueueSink:
+    """イベントを1件ずつJSONファイルとしてディレクトリに書き出す（取り出し側が処理後に削除）
+
+    Args:
+        directory (str): 出力先のディレクトリ
+    """
+
+    name = 'file'
+
+    def __init__(self, directory=ALERT_QUEUE_DIR):
+        self.directory = directory
+        # 送信済みのイベントと再送するイベントを記録する送信先の識別子
+        self.key = f'file={directory}'
+
+    def send(self, event):
+        os.makedirs(self.directory, exist_ok=True)
+        # ファイル名の順序が検出順になるよう検出時刻を先頭に付ける
+        filename = f"{event['detected_at'].replace(':', '').replace('-', '')}_{event['id']}.json"
+        path = os.path.join(self.directory, filename)
+        # 書き込み途中のファイルを読まれないよう一時ファイルに書き出してから置き換える
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(event, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+class WebhookSink:
+    """イベントをJSONとしてWebhookにPOSTする
+
+    Args:
+        url (str): 送信先のURL（例: http://127.0.0.1:9000/alerts）
+    """
+
+    name = 'webhook'
+
+    def __init__(self, url):
+        self.url = url
+        self.key = f'webhook={url}'
+
+    def send(self, event):
+        import requests
+        response = requests.post(self.url, json=event, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+
+def parse_sinks(value):
+    """カンマ区切りの送信先の指定を送信先のリストに変換
+
+    Args:
+        value (str): 'stdout', 'file'（'file=DIR'）, 'webhook=URL' のカンマ区切り
+
+    Returns:
+        list: 送信先のリスト
+    """
+    sinks = []
+    for spec in [spec.strip() for spec in value.split(',') if spec.strip()]:
+        kind, _, argument = spec.partition('=')
+        if kind == 'stdout' and not argument:
+            sinks.append(StdoutSink())
+        elif kind == 'file':
+            sinks.append(FileQueueSink(argument or ALERT_QUEUE_DIR))
+        elif kind == 'webhook' and argument:
+            sinks.append(WebhookSink(argument))
+        else:
+            raise ValueError(f"不正な通知先: {spec}（例: stdout, file, file=DIR, webhook=URL）")
+    if not sinks:
+        raise ValueError(f"通知先が指定されていません: {value}")
+    return sinks
+
+class AlertEngine:
+    """シグナルの状態の変化を検出して通知する
+
+    指標ごとのシグナルと総合シグナルの最後に評価した状態を資産ごとに保存し、
+    次回は保存した時刻より新しい行のみを評価します。状態が変化した行ごとに
+    イベントを作成し、送信先ごとに送信済みのイベントIDを記録して同じ変化を重複して
+    送信しません。送信に失敗したイベントは送信先ごとに保存し、次回の評価で再送します。
+    最後の行は足が確定しておらず値が変わり得るため、変化は通知しますが基準の状態には
+    含めず、通知した状態を別に保存して次回はそれと比較して評価し直します（確定時に
+    元の状態に戻った場合はその変化も通知します）。
+    初回は最新の状態を記録するのみで、過去の変化は送信しません。
+
+    Args:
+        sinks (list): 送信先（StdoutSink, FileQueueSink, WebhookSink、key で識別）
+        asset (str): 資産
+        state_dir (str): 状態の保存先
+    """
+
+    def __init__(self, sinks, asset=DEFAULT_ASSET, state_dir=ALERT_STATE_DIR):
+        self.sinks = sinks
+        self.asset = asset
+        self.state_path = os.path.join(state_dir, f'alerts_{asset}.json')
+
+    def load_state(self):
+        """保存済みの状態（ない場合は None）"""
+        if not os.path.exists(self.state_path):
+            return None
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"通知の状態の読み込みに失敗: {str(e)}")
+            return None
+
+    def save_state(self, state):
+        """状態を保存（一時ファイルに書き出してから置き換え）"""
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = f'{self.state_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def start_position(self, index, state):
+        """評価を始める行の位置（初回は基準にする行と最後の行のみ）
+
+        Args:
+            index (pd.DatetimeIndex): シグナルの時点
+            state (dict): load_stateの結果
+
+        Returns:
+            int: 位置
+        """
+        if state is None:
+            return max(len(index) - 2, 0)
+        return int(index.searchsorted(pd.Timestamp(state['last_timestamp']), side='right'))
+
+    def evaluate(self, components, state):
+        """新しい行の状態の変化を検出して送信
+
+        Args:
+            components (pd.DataFrame): start_position以降の行のcalculate_signal_componentsの結果
+            state (dict): load_stateの結果（初回は None）
+
+        Returns:
+            list: 送信したイベント
+        """
+        if components is None or components.empty:
+            return []
+        states = component_states(components)
+        if state is None:
+            # 初回は確定した最後の行の状態を基準とし、最後の行の状態は通知済みとして記録する
+            baseline = states.iloc[0]
+            self.save_state({
+                'last_timestamp': states.index[0].isoformat(),
+                'states': {name: int(value) for name, value in baseline.items()},
+                'open': self.open_state(states),
+                'sent': {},
+                'pending': {},
+            })
+            print(f"✓ 通知の基準となる状態を記録しました（{states.index[0]:%Y-%m-%d %H:%M}）")
+            return []
+
+        current = dict(state['states'])
+        last_timestamp = state['last_timestamp']
+        open_row = state.get('open') or {}
+        sent = self.sent_ids(state)
+        pending = {sink.key: list(state.get('pending', {}).get(sink.key, [])) for sink in self.sinks}
+        failed = set()
+        # 前回送信できなかったイベントを先に送信（検出順を保つ）
+        self.retry_pending(pending, sent, failed)
+
+        events = []
+        for position, (timestamp, row) in enumerate(zip(states.index, states.to_dict('records'))):
+            values = dict(current)
+            # 前回の最後の行は通知した状態と比較する
+            if timestamp.isoformat() == open_row.get('timestamp'):
+                values.update(open_row['states'])
+            for name, value in row.items():
+                previous = values.get(name)
+                values[name] = value
+                if previous is None or previous == value:
+                    continue
+                event = self.create_event(name, timestamp, previous, value, components.at[timestamp, 'composite'])
+                if self.dispatch(event, sent, pending, failed):
+                    events.append(event)
+            # 最後の行（確定していない足）は基準の状態に含めない
+            if position < len(states) - 1:
+                current = values
+                last_timestamp = timestamp.isoformat()
+
+        self.save_state({
+            'last_timestamp': last_timestamp,
+            'states': {name: int(value) for name, value in current.items()},
+            'open': self.open_state(states),
+            'sent': {key: ids[-MAX_SENT_EVENT_IDS:] for key, ids in sent.items()},
+            'pending': {key: queued[-MAX_PENDING_EVENTS:] for key, queued in pending.items() if queued},
+        })
+        if events:
+            print(f"✓ {len(events)}件のシグナルの変化を通知しました")
+        return events
+
+    @staticmethod
+    def open_state(states):
+        """最後の行（確定していない足）の通知した状態"""
+        return {'timestamp': states.index[-1].isoformat(),
+                'states': {name: int(value) for name, value in states.iloc[-1].items()}}
+
+    def sent_ids(self, state):
+        """送信先ごとの送信済みのイベントID（設定中の送信先のみ）"""
+        sent = state.get('sent', {})
+        # 送信先を区別していない以前の形式は全ての送信先で送信済みとみなす
+        if isinstance(sent, list):
+            return {sink.key: list(sent) for sink in self.sinks}
+        return {sink.key: list(sent.get(sink.key, [])) for sink in self.sinks}
+
+    def create_event(self, component, timestamp, previous, current, composite):
+        """状態の変化のイベントを作成（IDは資産・列・時刻・変化後の状態から決まる）"""
+        labels = ALERT_COMPONENTS[component]
+        key = f'{self.asset}|{component}|{timestamp.isoformat()}|{current}'
+        return {
+            'id': hashlib.blake2b(key.encode(), digest_size=8).hexdigest(),
+            'asset': self.asset,
+            'component': component,
+            'timestamp': timestamp.isoformat(),
+            'previous': int(previous),
+            'current': int(current),
+            'previous_label': labels.get(int(previous)),
+            'current_label': labels.get(int(current)),
+            'composite': round(float(composite), 4),
+            'detected_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }
+
+    def dispatch(self, event, sent, pending, failed):
+        """未送信の送信先にイベントを送信
+
+        送信に成功した送信先のみ送信済みとして記録します。失敗した送信先は表示して
+        failed に追加し、同じ評価の残りのイベントは送信せずに再送用に保存します
+        （他の送信先には送信を続けます）。
+
+        Args:
+            event (dict): create_eventのイベント
+            sent (dict): 送信先ごとの送信済みのイベントID
+            pending (dict): 送信先ごとの再送するイベント
+            failed (set): 同じ評価で送信に失敗した送信先
+
+        Returns:
+            bool: 未送信の送信先があったかどうか
+        """
+        new = False
+        for sink in self.sinks:
+            if event['id'] in sent[sink.key] or any(queued['id'] == event['id'] for queued in pending[sink.key]):
+                continue
+            new = True
+            if sink.key in failed or not self.send(sink, event, sent, failed):
+                pending[sink.key].append(event)
+        return new
+
+    def retry_pending(self, pending, sent, failed):
+        """前回送信に失敗したイベントを送信先ごとに再送（失敗した時点で残りは次回に回す）"""
+        for sink in self.sinks:
+            queued = pending[sink.key]
+            while queued and self.send(sink, queued[0], sent, failed):
+                queued.pop(0)
+
+    def send(self, sink, event, sent, failed):
+        """1つの送信先にイベントを送信し、成功した場合は送信済みとして記録"""
+        try:
+            sink.send(event)
+        except Exception as e:
+            print(f"✗ 通知の送信に失敗（{sink.name}）: {str(e)}")
+            failed.add(sink.key)
+            return False
+        metrics.increment('alerts_sent')
+        sent[sink.key].append(event['id'])
+        return True
+
+def evaluate_alerts(pipeline, sinks, asset=DEFAULT_ASSET):
+    """パイプラインのシグナルから状態の変化を通知（描画より前に実行する）
+
+    全期間のsignal_componentsは計算せず、テクニカル指標（計算済みまたはキャッシュ）から
+    前回評価した時刻より後の行のみのシグナルを計算します。
+
+    Args:
+        pipeline (StagePipeline): build_analysis_pipelineで作成したパイプライン
+        sinks (list): 送信先
+        asset (str): 資産
+
+    Returns:
+        list: 送信したイベント
+    """
+    if not sinks or pipeline is None or 'signal_components' not in pipeline:
+        return []
+    with metrics.stage('alerts'):
+        engine = AlertEngine(sinks, asset)
+        state = engine.load_state()
+        indicators = pipeline.get('indicators')
+        start = engine.start_position(indicators['price'].index, state)
+        if start >= len(indicators['price']):
+            return []
+        components = MarketPlotter(asset).calculate_signal_components(
+            pipeline.get('panel'), indicators, pipeline.get('timeframes'), start=start)
+        return engine.evaluate(components, state)
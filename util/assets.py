@@ -0,0 +1,77 @@
+import os
+
+# 分析対象の資産 -> 名称と各データ提供元のシンボル（None は提供なし）
+# yahoo: Yahoo Financeのティッカー、binance: Binanceの現物・USDⓈ-M先物のシンボル、
+# coinbase: Coinbase Exchangeの銘柄（コインベースプレミアムの計算に使用）
+ASSETS = {
+    'BTC': {'name': 'Bitcoin', 'yahoo': 'BTC-USD', 'binance': 'BTCUSDT', 'coinbase': 'BTC-USD'},
+    'ETH': {'name': 'Ethereum', 'yahoo': 'ETH-USD', 'binance': 'ETHUSDT', 'coinbase': 'ETH-USD'},
+    'SOL': {'name': 'Solana', 'yahoo': 'SOL-USD', 'binance': 'SOLUSDT', 'coinbase': 'SOL-USD'},
+    'BNB': {'name': 'BNB', 'yahoo': 'BNB-USD', 'binance': 'BNBUSDT', 'coinbase': None},
+    'XRP': {'name': 'XRP', 'yahoo': 'XRP-USD', 'binance': 'XRPUSDT', 'coinbase': 'XRP-USD'},
+    'ADA': {'name': 'Cardano', 'yahoo': 'ADA-USD', 'binance': 'ADAUSDT', 'coinbase': 'ADA-USD'},
+    'DOGE': {'name': 'Dogecoin', 'yahoo': 'DOGE-USD', 'binance': 'DOGEUSDT', 'coinbase': 'DOGE-USD'},
+    'AVAX': {'name': 'Avalanche', 'yahoo': 'AVAX-USD', 'binance': 'AVAXUSDT', 'coinbase': 'AVAX-USD'},
+    'DOT': {'name': 'Polkadot', 'yahoo': 'DOT-USD', 'binance': 'DOTUSDT', 'coinbase': 'DOT-USD'},
+    'LINK': {'name': 'Chainlink', 'yahoo': 'LINK-USD', 'binance': 'LINKUSDT', 'coinbase': 'LINK-USD'},
+    'LTC': {'name': 'Litecoin', 'yahoo': 'LTC-USD', 'binance': 'LTCUSDT', 'coinbase': 'LTC-USD'},
+    'BCH': {'name': 'Bitcoin Cash', 'yahoo': 'BCH-USD', 'binance': 'BCHUSDT', 'coinbase': 'BCH-USD'},
+    'TRX': {'name': 'TRON', 'yahoo': 'TRX-USD', 'binance': 'TRXUSDT', 'coinbase': None},
+    'ATOM': {'name': 'Cosmos', 'yahoo': 'ATOM-USD', 'binance': 'ATOMUSDT', 'coinbase': 'ATOM-USD'},
+    'XLM': {'name': 'Stellar', 'yahoo': 'XLM-USD', 'binance': 'XLMUSDT', 'coinbase': 'XLM-USD'},
+    'ETC': {'name': 'Ethereum Classic', 'yahoo': 'ETC-USD', 'binance': 'ETCUSDT', 'coinbase': 'ETC-USD'},
+    'FIL': {'name': 'Filecoin', 'yahoo': 'FIL-USD', 'binance': 'FILUSDT', 'coinbase': 'FIL-USD'},
+    'NEAR': {'name': 'NEAR Protocol', 'yahoo': 'NEAR-USD', 'binance': 'NEARUSDT', 'coinbase': 'NEAR-USD'},
+    'AAVE': {'name': 'Aave', 'yahoo': 'AAVE-USD', 'binance': 'AAVEUSDT', 'coinbase': 'AAVE-USD'},
+    'ALGO': {'name': 'Algorand', 'yahoo': 'ALGO-USD', 'binance': 'ALGOUSDT', 'coinbase': 'ALGO-USD'},
+    'HBAR': {'name': 'Hedera', 'yahoo': 'HBAR-USD', 'binance': 'HBARUSDT', 'coinbase': 'HBAR-USD'},
+}
+
+# 資産を指定しない場合の分析対象
+DEFAULT_ASSET = 'BTC'
+
+# 資産ごとに取得するデータソース（データソース名はBTCと共通）
+ASSET_SOURCES = ['btcusd', 'trading_volume', 'funding_rates', 'open_interest', 'coinbase_premium']
+
+# 全資産で共有するデータソース（マクロ指標と市場全体のセンチメント）
+SHARED_SOURCES = ['dxy', 'sp500', 'gold', 'fear_greed']
+
+# 価格の列名の書式（BTCは従来通り 'BTCUSD Price'）
+PRICE_COLUMN_FORMAT = '{asset}USD Price'
+
+def asset_symbol(asset, provider):
+    """資産のデータ提供元でのシンボル（提供がない場合はNone）
+
+    Args:
+        asset (str): 資産（例: 'ETH'）
+        provider (str): データ提供元（'yahoo', 'binance', 'coinbase'）
+    """
+    if asset not in ASSETS:
+        raise ValueError(f"不明な資産: {asset}（指定可能: {', '.join(ASSETS)}）")
+    return ASSETS[asset][provider]
+
+def asset_name(asset):
+    """資産の表示名（例: 'Bitcoin'）"""
+    return ASSETS[asset]['name']
+
+def price_column(asset):
+    """資産の価格の列名（例: 'ETHUSD Price'）"""
+    return PRICE_COLUMN_FORMAT.format(asset=asset)
+
+def asset_filename(filename, asset):
+    """資産ごとの保存ファイル名・チェックポイント名
+
+    BTCは従来のファイル名をそのまま使用します。その他の資産は 'btcusd' で始まる名前を
+    資産名に置き換え（例: ethusd_ohlcv.csv）、それ以外は資産名を末尾に付加します
+    （例: funding_rates_eth.csv）。
+
+    Args:
+        filename (str): BTCのファイル名（拡張子なしのチェックポイント名も可）
+        asset (str): 資産
+    """
+    if asset == DEFAULT_ASSET:
+        return filename
+    if filename.startswith('btcusd'):
+        return f'{asset.lower()}usd' + filename[len('btcusd'):]
+    root, extension = os.path.splitext(filename)
+    return f'{root}_{asset.lower()}{extension}'
@@ -1,60 +1,495 @@
 import os
+import re
+import json
+import time
+import codecs
+import threading
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
 from dateutil.relativedelta import relativedelta
-import pandas_market_calendars as mcal
+from ..assets import DEFAULT_ASSET
+from ..deadline import HTTP_TIMEOUT, CircuitOpenError, current_budget, circuit_breakers
+from ..frequency import FREQUENCIES, to_timedelta
+from ..metrics import metrics
+from ..schema import compact_frame
+
+# BinanceのローソクAPIの1リクエストあたりの最大件数
+BINANCE_KLINES_LIMIT = 1000
+
+# JSONのストリーミング読み込みの単位（バイト）と、入れ子のないオブジェクトのパターン
+JSON_STREAM_CHUNK_SIZE = 64 * 1024
+JSON_FLAT_OBJECT = re.compile(r'\{[^{}]*\}')
+
+# プロセスで共有するNYSEのカレンダー（作成に時間がかかるため初回の使用時のみ作成）
+_nyse_calendar = None
+_nyse_calendar_lock = threading.Lock()
+
+def nyse_calendar():
+    """NYSE（ニューヨーク証券取引所）のカレンダー"""
+    global _nyse_calendar
+    with _nyse_calendar_lock:
+        if _nyse_calendar is None:
+            import pandas_market_calendars as mcal
+            _nyse_calendar = mcal.get_calendar('NYSE')
+        return _nyse_calendar
+
+# HTTPリクエストの最大再試行回数と再試行対象のステータスコード
+HTTP_MAX_RETRIES = 3
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Yahoo Finance（yfinance経由）のサーキットブレーカーのホスト名
+YAHOO_FINANCE_HOST = 'query1.finance.yahoo.com'
+
+def _is_date_only(index):
+    """全ての時刻が00:00かどうか（CSVに日付のみで書き出される）"""
+    return bool((index == index.normalize()).all())
+
+def _tail_offset(f, rows, block_size=64 * 1024):
+    """ファイルの末尾 rows 行の先頭のバイト位置（行数が足りない場合はNone）
+
+    ファイルの末尾から必要な分だけを読み込み、改行を数えて求めます。
+    """
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    if size == 0:
+        return None
+    f.seek(size - 1)
+    # 最終行が改行で終わっていない場合は行の位置を特定できない
+    if f.read(1) != b'\n':
+        return None
+    if rows == 0:
+        return size
+    # 最終行の改行を含めて rows + 1 個目の改行の直後が切り詰め位置
+    remaining = rows + 1
+    position = size
+    while position > 0:
+        read_size = min(block_size, position)
+        position -= read_size
+        f.seek(position)
+        block = f.read(read_size)
+        count = block.count(b'\n')
+        if count >= remaining:
+            index = len(block)
+            for _ in range(remaining):
+                index = block.rindex(b'\n', 0, index)
+            return position + index + 1
+        remaining -= count
+    return None
 
 class BaseCollector:
-    def __init__(self):
+    def __init__(self, lookback_days=365, asset=DEFAULT_ASSET):
         self.base_path = 'market_data'
+        # 分析対象の資産（資産ごとのデータを扱うコレクターで使用）
+        self.asset = asset
         if not os.path.exists(self.base_path):
             os.makedirs(self.base_path)
-        # 1年間のデータ取得用の日付設定
+        # 取得期間（デフォルト: 1年間）の日付設定
+        self.lookback_days = lookback_days
+        self.reset_period()
+        # 常駐実行時にメモリ上に保持するデータ（ファイル名 -> DataFrame、None の場合は保持しない）
+        self.resident_frames = None
+        print(f"データ収集期間: {self.start_date} から {self.end_date}")
+
+    @property
+    def nyse(self):
+        """NYSE（ニューヨーク証券取引所）のカレンダー（全コレクターで共有）"""
+        return nyse_calendar()
+
+    def reset_period(self):
+        """現在時刻を基準に取得期間を再計算（常駐実行時の日付更新用）"""
         self.end_date = datetime.now()
-        self.start_date = self.end_date - relativedelta(years=1)
+        self.start_date = self.end_date - relativedelta(days=self.lookback_days)
         # 日付を00:00:00に設定
         self.end_date = self.end_date.replace(hour=0, minute=0, second=0, microsecond=0)
         self.start_date = self.start_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        # NYSE（ニューヨーク証券取引所）のカレンダーを取得
-        self.nyse = mcal.get_calendar('NYSE')
-        print(f"データ収集期間: {self.start_date} から {self.end_date}")
 
-    def load_existing_data(self, filename):
-        """既存のCSVファイルからデータを読み込む"""
+    def keep_frames_in_memory(self):
+        """読み込み・保存したデータをメモリ上に保持する（常駐実行用）
+
+        以降は同じファイルをCSVから読み込み直さず、保存時は変化した末尾の行のみを
+        CSVに書き込みます（append_rows）。CSVを読み込むのは各ファイルの初回のみです。
+        """
+        if self.resident_frames is None:
+            self.resident_frames = {}
+
+    def load_existing_data(self, filename, compact=False):
+        """既存のCSVファイルからデータを読み込む
+
+        Args:
+            filename (str): ファイル名
+            compact (bool): 列ごとにコンパクトな型（float32や符号なし整数）に変換するかどうか
+        """
+        if self.resident_frames is not None and not compact:
+            if filename not in self.resident_frames:
+                self.resident_frames[filename] = self._read_csv(filename)
+            return self.resident_frames[filename]
+        return self._read_csv(filename, compact)
+
+    def _read_csv(self, filename, compact=False):
+        """CSVファイルを読み込む（ない場合・失敗した場合はNone）"""
         filepath = os.path.join(self.base_path, filename)
         if os.path.exists(filepath):
+            start = time.perf_counter()
             try:
                 df = pd.read_csv(filepath, index_col='timestamp', parse_dates=True)
                 df.sort_index(inplace=True)
-                return df
+                return compact_frame(df) if compact else df
             except Exception as e:
                 print(f"既存データの読み込みに失敗: {str(e)}")
+            finally:
+                metrics.increment('storage_read_seconds', time.perf_counter() - start)
         return None
 
-    def get_missing_date_ranges(self, existing_df):
-        """欠損している日付範囲を取得します。"""
+    def save_data(self, df, filename):
+        """データをCSVファイルに保存"""
+        start = time.perf_counter()
+        filepath = os.path.join(self.base_path, filename)
+        # 打ち切られた取得が書き込み中でも読み込み側が壊れたファイルを読まないよう置き換えで保存
+        tmp_path = f'{filepath}.{os.getpid()}.{threading.get_ident()}.tmp'
+        df.to_csv(tmp_path)
+        os.replace(tmp_path, filepath)
+        metrics.increment('storage_write_seconds', time.perf_counter() - start)
+        if self.resident_frames is not None:
+            self.resident_frames[filename] = df
+
+    def append_rows(self, existing_df, df, start, filename):
+        """マージ後のデータのうち既存データから変化した末尾の行のみをCSVに書き込む
+
+        start 以降の既存行をファイルの末尾から切り詰め、マージ後の同じ範囲の行を
+        追記します（既存データより新しい行のみの場合は追記のみ）。列の構成や日付の
+        書式が既存のファイルと異なる場合は書き込まずに False を返します。
+
+        Args:
+            existing_df (pd.DataFrame): 保存済みのデータ（ファイルの内容と一致するもの）
+            df (pd.DataFrame): マージ後のデータ
+            start (pd.Timestamp): 新規データの最初の時刻（これより前の行は変化しない）
+            filename (str): 保存先のファイル名
+
+        Returns:
+            bool: 書き込んだかどうか（False の場合はファイル全体の保存が必要）
+        """
+        filepath = os.path.join(self.base_path, filename)
+        if (existing_df is None or existing_df.empty or not os.path.exists(filepath)
+                or list(existing_df.columns) != list(df.columns)):
+            return False
+        # start より前の行はマージ後も同じ位置にあり、start 以降も値が変わらない行は書き直さない
+        first = existing_df.index.searchsorted(start)
+        overlap = existing_df.iloc[first:]
+        merged = df.iloc[first:first + len(overlap)]
+        same = (overlap.index == merged.index) & ((overlap.to_numpy() == merged.to_numpy())
+                                                 | (overlap.isna().to_numpy() & merged.isna().to_numpy())).all(axis=1)
+        first += int(same.cumprod().sum())
+        tail = df.iloc[first:]
+        # 先頭から置き換わる場合や、日付のみと時刻付きの書式が混在する場合はファイル全体を保存
+        if first == 0 or _is_date_only(existing_df.index) != _is_date_only(tail.index):
+            return False
+
+        begin = time.perf_counter()
+        with open(filepath, 'rb+') as f:
+            offset = _tail_offset(f, len(existing_df) - first)
+            if offset is None:
+                return False
+            # 切り詰める行がファイルの内容と一致しているか先頭の時刻で確認
+            if first < len(existing_df):
+                f.seek(offset)
+                stamp = f.readline().split(b',', 1)[0].decode()
+                if pd.Timestamp(stamp) != existing_df.index[first]:
+                    return False
+            f.seek(offset)
+            f.truncate()
+            f.write(tail.to_csv(header=False).encode())
+        metrics.increment('storage_write_seconds', time.perf_counter() - begin)
+        return True
+
+    def http_get(self, url, **kwargs):
+        """HTTP GETリクエストを送信（計測と一時的なエラー時の再試行付き）
+        
+        タイムアウトを指定しない場合は HTTP_TIMEOUT を使用し、取得時間の範囲内で
+        実行している場合は残り時間までに制限します。失敗が続いているホストには
+        リクエストを送信せず CircuitOpenError を送出します。
+        
+        Args:
+            url (str): リクエスト先のURL
+            **kwargs: requests.getに渡す引数
+        
+        Returns:
+            requests.Response: レスポンス
+        """
+        import requests
+        host = urlsplit(url).netloc
+        budget = current_budget()
+        timeout = kwargs.pop('timeout', HTTP_TIMEOUT)
+        self.check_circuit(host, budget)
+        for attempt in range(HTTP_MAX_RETRIES + 1):
+            if budget is not None:
+                budget.check()
+                budget.host = host
+            metrics.increment('requests')
+            wait = 2 ** attempt
+            try:
+                response = requests.get(url, timeout=budget.timeout(timeout) if budget else timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == HTTP_MAX_RETRIES:
+                    self.record_failure(host, budget, e)
+                    raise
+            else:
+                # ストリーミング時は本文を読み込まない（転送量は読み込み側で計測）
+                if not kwargs.get('stream'):
+                    metrics.increment('bytes_transferred', len(response.content))
+                if response.status_code not in RETRY_STATUS_CODES:
+                    circuit_breakers.record_success(host)
+                    return response
+                if attempt == HTTP_MAX_RETRIES:
+                    self.record_failure(host, budget, f'HTTP {response.status_code}')
+                    return response
+                # レート制限時はサーバーの指定する待機時間に従う
+                retry_after = response.headers.get('Retry-After', '')
+                if retry_after.isdigit():
+                    wait = int(retry_after)
+                response.close()
+            metrics.increment('retries')
+            if budget is not None:
+                budget.sleep(wait)
+            else:
+                time.sleep(wait)
+
+    def check_circuit(self, host, budget=None):
+        """ホストへのリクエストが停止中でないか確認（停止中は失敗として記録して送出）"""
+        try:
+            circuit_breakers.check(host)
+        except CircuitOpenError as e:
+            if budget is not None:
+                budget.failures.append(str(e))
+            raise
+
+    def record_failure(self, host, budget, error):
+        """再試行しても失敗したリクエストをサーキットブレーカーと取得時間に記録"""
+        circuit_breakers.record_failure(host)
+        if budget is not None:
+            budget.failures.append(f'{host}: {error}')
+
+    def iter_json_objects(self, response, chunk_size=JSON_STREAM_CHUNK_SIZE):
+        """JSON配列のレスポンスを要素ごとに逐次読み込む
+        
+        レスポンス全体をメモリに読み込まず、受信したチャンクから入れ子のない
+        オブジェクト（{...}）を順に切り出して返します。要素の解析は呼び出し側で
+        行うため、不要な要素は解析せずに読み飛ばせます。
+        
+        Args:
+            response (requests.Response): stream=Trueで取得したレスポンス
+            chunk_size (int): 1回に読み込むバイト数
+        
+        Yields:
+            str: 要素のJSON文字列
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        buffer = ''
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            metrics.increment('bytes_transferred', len(chunk))
+            buffer += decoder.decode(chunk)
+            end = 0
+            for match in JSON_FLAT_OBJECT.finditer(buffer):
+                yield match.group()
+                end = match.end()
+            # 途中までしか受信していない要素は次のチャンクと結合する
+            buffer = buffer[end:]
+
+    def yf_download(self, ticker, **kwargs):
+        """Yahoo Financeからデータを取得（リクエスト数を計測）
+        
+        yfinanceは内部で通信を行うため、転送量は計測対象外です。タイムアウトは
+        http_getと同様に取得時間の残りまでに制限します。
+        """
+        import yfinance as yf
+        budget = current_budget()
+        self.check_circuit(YAHOO_FINANCE_HOST, budget)
+        if budget is not None:
+            budget.check()
+            budget.host = YAHOO_FINANCE_HOST
+            kwargs.setdefault('timeout', budget.timeout(HTTP_TIMEOUT[1]))
+        else:
+            kwargs.setdefault('timeout', HTTP_TIMEOUT[1])
+        metrics.increment('requests')
+        try:
+            df = yf.download(ticker, **kwargs)
+        except Exception as e:
+            self.record_failure(YAHOO_FINANCE_HOST, budget, e)
+            raise
+        # yfinanceは通信エラーでも空のデータを返すため、データを取得できた場合のみ成功とする
+        if df is not None and not df.empty:
+            circuit_breakers.record_success(YAHOO_FINANCE_HOST)
+        return df
+
+    def merge_and_save(self, existing_df, new_df, filename):
+        """新規データを既存データとマージしてCSVに保存
+        
+        Args:
+            existing_df (pd.DataFrame): 既存データ（None可）
+            new_df (pd.DataFrame): 新規データ
+            filename (str): 保存先のファイル名
+        
+        Returns:
+            pd.DataFrame: マージ後のデータ
+        """
+        new_df.index.name = 'timestamp'
+        if existing_df is not None and not existing_df.empty:
+            df = pd.concat([existing_df, new_df])
+            df = df[~df.index.duplicated(keep='last')]
+        else:
+            df = new_df
+        df.sort_index(inplace=True)
+        metrics.increment('rows_added', len(df) - (len(existing_df) if existing_df is not None else 0))
+        # 常駐実行時は変化した末尾の行のみを書き込む
+        if self.resident_frames is not None and self.append_rows(existing_df, df, new_df.index.min(), filename):
+            self.resident_frames[filename] = df
+        else:
+            self.save_data(df, filename)
+        return df
+
+    def load_checkpoint(self, name):
+        """バックフィルのチェックポイントを読み込む"""
+        filepath = os.path.join(self.base_path, 'checkpoints', f'{name}.json')
+        if os.path.exists(filepath):
+            try:
+                with open(filepath) as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"チェックポイントの読み込みに失敗: {str(e)}")
+        return {}
+
+    def save_checkpoint(self, name, checkpoint):
+        """バックフィルのチェックポイントを保存"""
+        checkpoint_dir = os.path.join(self.base_path, 'checkpoints')
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        filepath = os.path.join(checkpoint_dir, f'{name}.json')
+        # 書き込み途中で中断されても壊れないよう一時ファイル経由で置き換える
+        tmp_path = f'{filepath}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint, f, indent=2)
+        os.replace(tmp_path, filepath)
+
+    def iter_date_chunks(self, start, end, chunk_days):
+        """日付範囲をchunk_days日ごとの区間に分割（両端を含む）"""
+        current = start
+        while current <= end:
+            chunk_end = min(current + timedelta(days=chunk_days - 1), end)
+            yield current, chunk_end
+            current = chunk_end + timedelta(days=1)
+
+    def run_backfill(self, name, filename, existing_df, fetch_chunk, chunk_days):
+        """取得期間をチャンク単位で取得し、チャンクごとに保存・チェックポイントを記録する
+        
+        チャンク境界はエポック（1970-01-01）基準で固定しているため、取得期間の起点が
+        日々ずれても完了済みのチャンクは再取得されません。中断された場合も次回実行時に
+        未完了のチャンクから再開します。
+        
+        Args:
+            name (str): チェックポイント名
+            filename (str): 保存先のファイル名
+            existing_df (pd.DataFrame): 既存データ（None可）
+            fetch_chunk (callable): (チャンク開始日, チャンク終了日) を受け取りDataFrameを返す関数
+            chunk_days (int): 1チャンクの日数（APIの1リクエストあたりの上限に合わせる）
+        
+        Returns:
+            pd.DataFrame: マージ後のデータ
+        """
         today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        epoch = datetime(1970, 1, 1)
+        checkpoint = self.load_checkpoint(name)
+        completed = checkpoint.get('completed', {})
+        df = existing_df
+        
+        window_start = epoch + timedelta(days=((self.start_date - epoch).days // chunk_days) * chunk_days)
+        while window_start <= today:
+            window_end = window_start + timedelta(days=chunk_days - 1)
+            chunk_start = max(window_start, self.start_date)
+            chunk_end = min(window_end, today)
+            key = window_start.strftime('%Y-%m-%d')
+            
+            # 完了済みのチャンク（同じかより古い起点から取得済み）はスキップ
+            if key in completed and completed[key] <= chunk_start.strftime('%Y-%m-%d'):
+                metrics.increment('cache_hits')
+                window_start = window_end + timedelta(days=1)
+                continue
+            
+            print(f"データ取得期間: {chunk_start.date()} から {chunk_end.date()}")
+            new_df = fetch_chunk(chunk_start, chunk_end)
+            if new_df is not None and not new_df.empty:
+                df = self.merge_and_save(df, new_df, filename)
+            
+            # 終了済みの期間のみ完了扱いにする（当日を含むチャンクは毎回取得）
+            if window_end < today:
+                completed[key] = chunk_start.strftime('%Y-%m-%d')
+                self.save_checkpoint(name, {'completed': completed})
+            window_start = window_end + timedelta(days=1)
+        
+        return df
+
+    def last_closed_date(self, trading_days_only=False, now=None):
+        """足が確定している最後の日付を取得します。
+
+        暗号資産の日足はUTCの0時に確定するため前日、NYSEの取引日は取引終了時刻を
+        過ぎた最後の取引日です。
+
+        Args:
+            trading_days_only (bool): NYSEの取引日を対象にするかどうか
+            now (pd.Timestamp): 現在時刻（UTC、テスト用）
+
+        Returns:
+            datetime: 確定している最後の日付（0時）
+        """
+        now = pd.Timestamp.now(tz='UTC') if now is None else pd.Timestamp(now)
+        if now.tzinfo is None:
+            now = now.tz_localize('UTC')
+        if trading_days_only:
+            schedule = self.nyse.schedule(start_date=(now - timedelta(days=10)).date(), end_date=now.date())
+            closed = schedule.index[schedule['market_close'] <= now]
+            if len(closed):
+                return closed[-1].to_pydatetime()
+        return (now.tz_localize(None).normalize() - timedelta(days=1)).to_pydatetime()
+
+    def get_missing_date_ranges(self, existing_df, trading_days_only=False, closed_only=False):
+        """欠損している日付範囲を取得します。
+        
+        Args:
+            existing_df (pd.DataFrame): 既存データ（None可）
+            trading_days_only (bool): NYSEの取引日のみを対象にするかどうか
+            closed_only (bool): 確定した日足のみを対象にするかどうか（取得途中の当日の足を
+                保存すると、その日付は取得済みとみなされ確定値に更新されないため）
+        """
+        if closed_only:
+            today = self.last_closed_date(trading_days_only)
+        else:
+            today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         start_date = self.start_date.replace(hour=0, minute=0, second=0, microsecond=0)
         
+        if trading_days_only:
+            all_dates = set(self.nyse.valid_days(start_date=start_date, end_date=today).date)
+        else:
+            all_dates = set(pd.date_range(start=start_date, end=today).date)
+        
         if existing_df is None or len(existing_df) == 0:
+            if not all_dates:
+                return []
             print(f"新規データ収集期間: {start_date.date()} から {today.date()}")
             return [(start_date, today)]
         
         # 既存データの日付範囲を確認
         existing_dates = set(existing_df.index.date)
-        all_dates = set(pd.date_range(start=start_date, end=today).date)
         missing_dates = sorted(all_dates - existing_dates)
         
         if not missing_dates:
             return []
         
-        # 連続する日付範囲を特定
+        # 連続する日付範囲を特定（取引日のみの場合は休場日を挟んでも連続とみなす）
+        position = {date: i for i, date in enumerate(sorted(all_dates))}
         ranges = []
         range_start = missing_dates[0]
         prev_date = missing_dates[0]
         
         for date in missing_dates[1:]:
-            if (date - prev_date).days > 1:
+            if position[date] - position[prev_date] > 1:
                 ranges.append((
                     datetime.combine(range_start, datetime.min.time()),
                     datetime.combine(prev_date, datetime.min.time())
@@ -73,6 +508,90 @@ class BaseCollector:
         
         return ranges
 
+    def get_missing_time_ranges(self, existing_df, freq, now=None):
+        """指定頻度で欠損している時間範囲を取得します（日中足向け）。
+        
+        Args:
+            existing_df (pd.DataFrame): 既存データ（None可、インデックスはUTC）
+            freq (str): データの頻度（例: '1m', '1h'）
+            now (pd.Timestamp): 基準時刻（UTC、None の場合は現在時刻）
+        
+        Returns:
+            list: (開始時刻, 終了時刻) のリスト（両端を含む）
+        """
+        step = to_timedelta(freq)
+        # Binanceの足の時刻はUTCのため、ローカル時刻ではなくUTCの現在時刻を基準にする
+        if now is None:
+            now = pd.Timestamp.now(tz='UTC').tz_localize(None)
+        # 確定済みの最新足まで（現在進行中の足は含めない）
+        last_closed = pd.Timestamp(now).floor(FREQUENCIES[freq]) - step
+        expected = pd.date_range(start=self.start_date, end=last_closed, freq=FREQUENCIES[freq])
+        if existing_df is not None and len(existing_df) > 0:
+            expected = expected.difference(existing_df.index)
+        if len(expected) == 0:
+            return []
+        
+        # 連続する時刻をまとめて範囲にする（ベクトル演算）
+        breaks = (expected[1:] - expected[:-1]) > step
+        starts = expected[1:][breaks].insert(0, expected[0])
+        ends = expected[:-1][breaks].append(pd.DatetimeIndex([expected[-1]]))
+        ranges = [(start.to_pydatetime(), end.to_pydatetime()) for start, end in zip(starts, ends)]
+        
+        print(f"データ収集が必要な期間: {len(ranges)}区間（{len(expected)}本）")
+        for start, end in ranges[:5]:
+            print(f"- {start} から {end}")
+        if len(ranges) > 5:
+            print(f"- ...他{len(ranges) - 5}区間")
+        return ranges
+
+    def fetch_binance_klines(self, symbol, interval, start, end,
+                             base_url="https://api.binance.com/api/v3/klines"):
+        """Binanceのローソク足をページングしながら取得
+        
+        Args:
+            symbol (str): シンボル（例: 'BTCUSDT'）
+            interval (str): 足の間隔（例: '1m', '1h', '1d'）
+            start (datetime): 取得開始時刻（UTC）
+            end (datetime): 取得終了時刻（UTC、この時刻に始まる足を含む）
+            base_url (str): APIのURL
+        
+        Returns:
+            pd.DataFrame: Open/High/Low/Close/Volumeのデータ（取得できない場合はNone）
+        """
+        step_ms = int(to_timedelta(interval).total_seconds() * 1000)
+        start_time = int(pd.Timestamp(start).timestamp() * 1000)
+        end_time = int(pd.Timestamp(end).timestamp() * 1000)
+        pages = []
+        
+        while start_time <= end_time:
+            params = {
+                'symbol': symbol,
+                'interval': interval,
+                'startTime': start_time,
+                'endTime': end_time,
+                'limit': BINANCE_KLINES_LIMIT
+            }
+            response = self.http_get(base_url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            if not data:
+                break
+            
+            pages.extend(data)
+            start_time = int(data[-1][0]) + step_ms
+            if len(data) < BINANCE_KLINES_LIMIT:
+                break
+            time.sleep(0.2)  # API制限を考慮
+        
+        if not pages:
+            return None
+        
+        df = pd.DataFrame([row[:6] for row in pages],
+                          columns=['timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        df.set_index('timestamp', inplace=True)
+        return df.astype(float)
+
     def is_market_open(self, date):
         """指定された日付が取引日かどうかを確認"""
         schedule = self.nyse.schedule(start_date=date, end_date=date)
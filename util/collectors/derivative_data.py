@@ -1,134 +1,132 @@
-import requests
 import pandas as pd
 import time
-from datetime import timedelta
+from datetime import datetime, timedelta
 from .base_collector import BaseCollector
+from ..assets import asset_symbol, asset_filename
+
+# ファンディングレートの1チャンクあたりの日数（8時間ごと・1リクエスト最大1000件に収まる範囲）
+FUNDING_CHUNK_DAYS = 90
+
+# オープンインタレスト履歴の提供期間（日数）と1リクエストあたりの最大件数
+OPEN_INTEREST_HISTORY_DAYS = 30
+OPEN_INTEREST_HISTORY_LIMIT = 500
 
 class DerivativeDataCollector(BaseCollector):
     def get_funding_rates(self):
         """Binanceの先物ファンディングレートを取得"""
-        url = "https://fapi.binance.com/fapi/v1/fundingRate"
+        print(f"\nファンディングレートデータ（{self.asset}）の取得を開始...")
+        filename = asset_filename('funding_rates.csv', self.asset)
+        
+        # 既存のデータを読み込む
+        existing_df = self.load_existing_data(filename)
+        if existing_df is not None:
+            print(f"既存データ: {len(existing_df)}行")
         
-        print("\nファンディングレートデータの取得を開始...")
         try:
-            all_data = []
-            start_time = int(self.start_date.timestamp() * 1000)
-            end_time = int(self.end_date.timestamp() * 1000)
-            request_count = 0
-            
-            while start_time < end_time:
-                request_count += 1
-                print(f"\r取得リクエスト数: {request_count}", end='', flush=True)
-                
-                params = {
-                    'symbol': 'BTCUSDT',
-                    'limit': 1000,
-                    'startTime': start_time,
-                    'endTime': end_time
-                }
-                
-                response = requests.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                if not data:
-                    break
-                
-                all_data.extend(data)
-                start_time = int(data[-1]['fundingTime']) + 1
-                time.sleep(1)
-            
-            print("\n✓ データ取得完了")
-            
-            if not all_data:
+            df = self.run_backfill(asset_filename('funding_rates', self.asset), filename, existing_df,
+                                   self._fetch_funding_rates, chunk_days=FUNDING_CHUNK_DAYS)
+            if df is None or df.empty:
                 print("✗ ファンディングレートデータが空です")
                 return None
             
-            df = pd.DataFrame(all_data)
-            df['timestamp'] = pd.to_datetime(df['fundingTime'], unit='ms')
-            df['Funding Rate'] = pd.to_numeric(df['fundingRate'], errors='coerce') * 100
-            df.set_index('timestamp', inplace=True)
-            df = df[['Funding Rate']]
-            df.sort_index(inplace=True)
-            
-            df.to_csv(f'{self.base_path}/funding_rates.csv')
             print("✓ ファンディングレートデータを保存しました")
-            return df
+            return df[df.index >= self.start_date]
         except Exception as e:
             print(f"\n✗ ファンディングレートの取得に失敗: {str(e)}")
+            return existing_df if existing_df is not None else None
+
+    def _fetch_funding_rates(self, start, end):
+        """指定期間のファンディングレートをページングしながら取得"""
+        url = "https://fapi.binance.com/fapi/v1/fundingRate"
+        all_data = []
+        start_time = int(start.timestamp() * 1000)
+        end_time = int((end + timedelta(days=1)).timestamp() * 1000) - 1
+        request_count = 0
+        
+        while start_time < end_time:
+            request_count += 1
+            print(f"\r取得リクエスト数: {request_count}", end='', flush=True)
+            
+            params = {
+                'symbol': asset_symbol(self.asset, 'binance'),
+                'limit': 1000,
+                'startTime': start_time,
+                'endTime': end_time
+            }
+            
+            response = self.http_get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            
+            if not data:
+                break
+            
+            all_data.extend(data)
+            start_time = int(data[-1]['fundingTime']) + 1
+            time.sleep(1)
+        
+        print("\n✓ データ取得完了")
+        
+        if not all_data:
             return None
+        
+        df = pd.DataFrame(all_data)
+        df['timestamp'] = pd.to_datetime(df['fundingTime'], unit='ms')
+        df['Funding Rate'] = pd.to_numeric(df['fundingRate'], errors='coerce') * 100
+        df.set_index('timestamp', inplace=True)
+        return df[['Funding Rate']]
 
     def get_open_interest(self):
-        """Binanceからオープンインタレストデータを取得"""
-        print("\nオープンインタレストデータの取得を開始...")
+        """Binanceからオープンインタレストデータを取得
+        
+        過去の日次データは履歴エンドポイント（openInterestHist）からまとめて取得し、
+        当日分のみ現在値エンドポイント（openInterest）のスナップショットを使用し、実行ごとに
+        置き換えます。翌日以降の実行で、スナップショットを保存した日は履歴の値に置き換えます。
+        Binanceが履歴を提供しているのは直近30日分のみのため、それより古い欠損は埋められません。
+        """
+        print(f"\nオープンインタレストデータ（{self.asset}）の取得を開始...")
+        filename = asset_filename('open_interest.csv', self.asset)
         
         # 既存のデータを読み込む
-        existing_df = self.load_existing_data('open_interest.csv')
+        existing_df = self.load_existing_data(filename)
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        closed_df = None
         if existing_df is not None:
             print(f"既存データ: {len(existing_df)}行")
-            missing_ranges = self.get_missing_date_ranges(existing_df)
-        else:
-            missing_ranges = [(self.start_date, self.end_date)]
-        
-        if not missing_ranges:
-            print("✓ 新規データなし - 既存データを使用")
-            return existing_df
+            # 当日の行は現在値のスナップショットのため、前日までの行のみを取得済みとみなす
+            closed_df = existing_df[existing_df.index < today]
+        missing_ranges = self.get_missing_date_ranges(closed_df)
+        if closed_df is not None and not closed_df.empty:
+            # 最後に保存した日は前回実行時のスナップショットの可能性があるため、前日まで履歴の値で置き換える
+            refresh_start = max(closed_df.index.max().normalize().to_pydatetime(),
+                                self.start_date.replace(hour=0, minute=0, second=0, microsecond=0))
+            missing_ranges = [(start_date, end_date) for start_date, end_date in missing_ranges
+                              if end_date < refresh_start] + [(refresh_start, today)]
         
         try:
-            new_data = []
-            request_count = 0
+            history_start = today - timedelta(days=OPEN_INTEREST_HISTORY_DAYS - 1)
+            frames = []
             
             for start_date, end_date in missing_ranges:
-                current_date = start_date
-                while current_date <= end_date:
-                    request_count += 1
-                    print(f"\r取得リクエスト数: {request_count}", end='', flush=True)
-                    
-                    # 休場日をスキップ
-                    if not self.is_market_open(current_date):
-                        print(f"\n✓ {current_date.date()} は休場日のためスキップします")
-                        current_date += timedelta(days=1)
-                        continue
-                    
-                    params = {
-                        'symbol': 'BTCUSDT'
-                    }
-                    
-                    try:
-                        response = requests.get("https://fapi.binance.com/fapi/v1/openInterest", params=params)
-                        response.raise_for_status()
-                        data = response.json()
-                        
-                        if data:
-                            # 日付を00:00:00に設定
-                            timestamp = current_date.replace(hour=0, minute=0, second=0, microsecond=0)
-                            new_data.append({
-                                'timestamp': timestamp,
-                                'Open Interest': float(data['openInterest'])
-                            })
-                        
-                        time.sleep(1)  # API制限を考慮
-                    
-                    except Exception as e:
-                        print(f"\n✗ {current_date.date()}のデータ取得中にエラー: {str(e)}")
-                    
-                    current_date += timedelta(days=1)
+                if start_date < history_start:
+                    print(f"✓ {start_date.date()} から {min(end_date, history_start - timedelta(days=1)).date()} は"
+                          f"Binanceの履歴提供期間（直近{OPEN_INTEREST_HISTORY_DAYS}日）外のためスキップします")
+                # 前日までは履歴エンドポイントから取得
+                history_end = min(end_date, today - timedelta(days=1))
+                if max(start_date, history_start) <= history_end:
+                    history_df = self._fetch_open_interest_history(max(start_date, history_start), history_end)
+                    if history_df is not None:
+                        frames.append(history_df)
             
-            print("\n✓ データ取得完了")
+            # 当日分は現在値で更新（実行ごとに最新値に置き換える）
+            latest_df = self._fetch_latest_open_interest(today)
+            if latest_df is not None:
+                frames.append(latest_df)
             
-            if new_data:
-                new_df = pd.DataFrame(new_data)
-                new_df.set_index('timestamp', inplace=True)
-                
-                # 既存のデータとマージ
-                if existing_df is not None:
-                    df = pd.concat([existing_df, new_df])
-                    df = df[~df.index.duplicated(keep='last')]
-                else:
-                    df = new_df
-                
-                df.sort_index(inplace=True)
-                df.to_csv(f'{self.base_path}/open_interest.csv')
+            print("✓ データ取得完了")
+            
+            if frames:
+                df = self.merge_and_save(existing_df, pd.concat(frames), filename)
                 print("✓ オープンインタレストデータを保存しました")
                 return df
             elif existing_df is not None:
@@ -140,4 +138,56 @@ class DerivativeDataCollector(BaseCollector):
             
         except Exception as e:
             print(f"\n✗ オープンインタレストデータの取得に失敗: {str(e)}")
-            return existing_df if existing_df is not None else None 
\ No newline at end of file
+            return existing_df if existing_df is not None else None
+
+    def _fetch_open_interest_history(self, start, end):
+        """指定期間の日次オープンインタレストを履歴エンドポイントからページングしながら取得"""
+        url = "https://fapi.binance.com/futures/data/openInterestHist"
+        start_time = int(start.timestamp() * 1000)
+        end_time = int(end.timestamp() * 1000)
+        pages = []
+        
+        while start_time <= end_time:
+            params = {
+                'symbol': asset_symbol(self.asset, 'binance'),
+                'period': '1d',
+                'limit': OPEN_INTEREST_HISTORY_LIMIT,
+                'startTime': start_time,
+                'endTime': end_time
+            }
+            response = self.http_get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            if not data:
+                break
+            
+            pages.extend(data)
+            start_time = int(data[-1]['timestamp']) + 1
+            if len(data) < OPEN_INTEREST_HISTORY_LIMIT:
+                break
+            time.sleep(0.2)  # API制限を考慮
+        
+        if not pages:
+            return None
+        
+        df = pd.DataFrame(pages)
+        df['timestamp'] = pd.to_datetime(df['timestamp'].astype('int64'), unit='ms').dt.normalize()
+        df['Open Interest'] = pd.to_numeric(df['sumOpenInterest'], errors='coerce')
+        df.set_index('timestamp', inplace=True)
+        print(f"✓ 履歴データ: {len(df)}日分")
+        return df[['Open Interest']]
+
+    def _fetch_latest_open_interest(self, today):
+        """現在のオープンインタレストを取得し、当日の値として返す"""
+        try:
+            response = self.http_get("https://fapi.binance.com/fapi/v1/openInterest", params={'symbol': asset_symbol(self.asset, 'binance')})
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            print(f"✗ 現在のオープンインタレストの取得中にエラー: {str(e)}")
+            return None
+        
+        if not data:
+            return None
+        return pd.DataFrame({'Open Interest': [float(data['openInterest'])]},
+                            index=pd.DatetimeIndex([today], name='timestamp'))
@@ -1,86 +1,63 @@
-import yfinance as yf
 import pandas as pd
 from datetime import timedelta
 from .base_collector import BaseCollector
+from ..metrics import metrics
+from .market_data import YF_CHUNK_DAYS
 
 class ETFDataCollector(BaseCollector):
     def get_etf_data(self):
-        """Yahoo FinanceからBitcoin ETFのデータを取得"""
+        """Yahoo FinanceからBitcoin ETFのデータを取得（取引中の当日の足は確定後に取得するため保存しません）"""
         print("\nBitcoin ETFデータの取得を開始...")
-        
+
         # 既存のデータを読み込む
         existing_df = self.load_existing_data('etf.csv')
         if existing_df is not None:
             print(f"既存データ: {len(existing_df)}行")
-            missing_ranges = self.get_missing_date_ranges(existing_df)
-        else:
-            missing_ranges = [(self.start_date, self.end_date)]
-        
+        missing_ranges = self.get_missing_date_ranges(existing_df, trading_days_only=True, closed_only=True)
+
+        if not missing_ranges:
+            print("✓ 新規データなし - 既存データを使用")
+            metrics.increment('cache_hits')
+            return existing_df
+
+        df = existing_df
         try:
-            new_data = []
+            # 複数のBitcoin ETFのデータを取得
+            etf_symbols = ['GBTC', 'BITO']
             for start, end in missing_ranges:
-                # 日付範囲を1日単位で処理
-                current_date = start
-                while current_date <= end:
-                    # 土日または祝日をスキップ
-                    if current_date.weekday() >= 5 or not self.is_market_open(current_date):
-                        print(f"✓ {current_date.strftime('%Y-%m-%d')} は休場日のためスキップします")
-                        current_date += timedelta(days=1)
-                        continue
-                    
-                    next_date = current_date + timedelta(days=1)
-                    print(f"データ取得期間: {current_date.strftime('%Y-%m-%d')}")
-                    
-                    # 複数のBitcoin ETFのデータを取得
-                    etf_symbols = ['GBTC', 'BITO']
-                    daily_data = {}
-                    
+                for chunk_start, chunk_end in self.iter_date_chunks(start, end, YF_CHUNK_DAYS):
+                    print(f"データ取得期間: {chunk_start.strftime('%Y-%m-%d')} から {chunk_end.strftime('%Y-%m-%d')}")
+
+                    symbol_data = []
                     for symbol in etf_symbols:
                         try:
-                            df = yf.download(symbol, start=current_date, end=next_date, progress=False)
-                            if not df.empty:
-                                # .item()を使用して明示的に数値を取得
-                                price = df['Close'].iloc[0].item()
-                                volume = df['Volume'].iloc[0].item()
-                                flow = price * volume
-                                
-                                # 大きな数値を適切に処理
-                                daily_data[f'{symbol} Price'] = price
-                                daily_data[f'{symbol} Volume'] = volume
-                                daily_data[f'{symbol} Flow'] = flow
-                                
-                                print(f"✓ {symbol}: Price=${price:,.2f}, Volume={volume:,.0f}, Flow=${flow:,.2f}")
-                            else:
-                                print(f"✓ {symbol}: {current_date.strftime('%Y-%m-%d')} の期間にデータがないためスキップします")
+                            raw = self.yf_download(symbol, start=chunk_start, end=chunk_end + timedelta(days=1),
+                                              progress=False, multi_level_index=False)
+                            # 期間の終了日より後の足（取引中の当日など）は含めない
+                            raw = raw[raw.index <= pd.Timestamp(chunk_end)]
+                            if raw.empty:
+                                print(f"✓ {symbol}: {chunk_start.strftime('%Y-%m-%d')} から {chunk_end.strftime('%Y-%m-%d')} の期間にデータがないためスキップします")
+                                continue
+
+                            price = raw['Close']
+                            volume = raw['Volume']
+                            symbol_data.append(pd.DataFrame({
+                                f'{symbol} Price': price,
+                                f'{symbol} Volume': volume,
+                                f'{symbol} Flow': price * volume
+                            }))
+                            print(f"✓ {symbol}: {len(raw)}日分, 最新 Price=${price.iloc[-1]:,.2f}, Volume={volume.iloc[-1]:,.0f}")
                         except Exception as e:
-                            if "No price data found" in str(e):
-                                print(f"✓ {symbol}: {current_date.strftime('%Y-%m-%d')} の期間は取引なしのためスキップします")
-                            else:
-                                print(f"✓ {symbol}: {current_date.strftime('%Y-%m-%d')} の期間のデータ取得をスキップ: {str(e)}")
-                    
-                    if daily_data:
-                        daily_df = pd.DataFrame([daily_data], index=[current_date])
-                        new_data.append(daily_df)
-                    
-                    current_date = next_date
-            
-            if new_data:
-                new_df = pd.concat(new_data)
-                new_df.index.name = 'timestamp'
-                
-                # 既存のデータとマージ
-                if existing_df is not None:
-                    df = pd.concat([existing_df, new_df])
-                    df = df[~df.index.duplicated(keep='last')]
-                else:
-                    df = new_df
-                
-                # データ型を明示的に設定し、NaNを処理
-                for col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-                
-                df.sort_index(inplace=True)
-                df.to_csv(f'{self.base_path}/etf.csv')
+                            print(f"✓ {symbol}: {chunk_start.strftime('%Y-%m-%d')} から {chunk_end.strftime('%Y-%m-%d')} の期間のデータ取得をスキップ: {str(e)}")
+
+                    if symbol_data:
+                        new_df = pd.concat(symbol_data, axis=1)
+                        # データ型を明示的に設定し、NaNを処理
+                        for col in new_df.columns:
+                            new_df[col] = pd.to_numeric(new_df[col], errors='coerce')
+                        df = self.merge_and_save(df, new_df, 'etf.csv')
+
+            if df is not existing_df:
                 print("✓ Bitcoin ETFデータを保存しました")
                 return df
             elif existing_df is not None:
@@ -91,4 +68,5 @@ class ETFDataCollector(BaseCollector):
                 return None
         except Exception as e:
             print(f"✗ Bitcoin ETFデータの取得に失敗: {str(e)}")
-            return existing_df if existing_df is not None else None 
\ No newline at end of file
+            # 取得済みのチャンクは保存されているため、その時点のデータを返す
+            return df
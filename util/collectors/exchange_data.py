@@ -1,124 +1,128 @@
-import requests
 import pandas as pd
-import yfinance as yf
 import time
 from datetime import timedelta
 from .base_collector import BaseCollector
+from ..assets import asset_symbol, asset_filename
+from ..frequency import to_timedelta
+from ..metrics import metrics
 
-class ExchangeDataCollector(BaseCollector):
-    def get_trading_volume(self):
-        """Yahoo FinanceからBTCUSD取引量を取得"""
-        print("\n取引量データの取得を開始...")
-        try:
-            df = yf.download("BTC-USD", start=self.start_date, end=self.end_date)
-            if df.empty:
-                return None
-                
-            volume_df = df[['Volume']].copy()
-            volume_df.columns = ['Trading Volume']
-            volume_df.to_csv(f'{self.base_path}/trading_volume.csv')
-            print("✓ 取引量データを保存しました")
-            return volume_df
-            
-        except Exception as e:
-            print(f"✗ 取引量データの取得に失敗: {str(e)}")
-            return None
+# Coinbase ExchangeのローソクAPIの1リクエストあたりの最大件数
+COINBASE_CANDLES_LIMIT = 300
 
-    def get_coinbase_premium(self):
+# コインベースプレミアムの足の間隔 -> 保存単位の日数（この日数分を取得するごとにCSVへ保存）
+PREMIUM_CHUNK_DAYS = {
+    '1d': 365,
+    '1h': 90
+}
+
+class ExchangeDataCollector(BaseCollector):
+    def get_coinbase_premium(self, interval='1d'):
         """コインベースプレミアムデータを取得します。
-        コインベースとBinanceの価格差からプレミアムを計算します。
+        
+        欠損期間のCoinbaseとBinanceのローソク足をまとめて取得し、終値の差から
+        プレミアムを計算します（(Coinbase - Binance) / Binance * 100）。
+        
+        Args:
+            interval (str): 足の間隔（'1d' または '1h'）
+        
+        Returns:
+            pd.DataFrame: 'Coinbase Premium'（%）のデータ
         """
-        print("\nコインベースプレミアムデータの取得を開始...")
+        if interval not in PREMIUM_CHUNK_DAYS:
+            raise ValueError(f"未対応の足の間隔: {interval}（指定可能: {', '.join(PREMIUM_CHUNK_DAYS)}）")
+        
+        product = asset_symbol(self.asset, 'coinbase')
+        if product is None:
+            print(f"✗ {self.asset}はCoinbaseで取引されていないため、コインベースプレミアムを計算できません")
+            return None
+        
+        filename = 'coinbase_premium.csv' if interval == '1d' else f'coinbase_premium_{interval}.csv'
+        filename = asset_filename(filename, self.asset)
+        print(f"\nコインベースプレミアムデータ（{self.asset}, {interval}）の取得を開始...")
         
         # 既存のデータを読み込む
-        existing_df = self.load_existing_data('coinbase_premium.csv')
+        existing_df = self.load_existing_data(filename)
         if existing_df is not None:
             print(f"既存データ: {len(existing_df)}行")
-            missing_ranges = self.get_missing_date_ranges(existing_df)
-        else:
-            missing_ranges = [(self.start_date, self.end_date)]
+        missing_ranges = self.get_missing_time_ranges(existing_df, interval)
         
         if not missing_ranges:
             print("✓ 新規データなし - 既存データを使用")
-            return existing_df
+            metrics.increment('cache_hits')
+            return existing_df[existing_df.index >= self.start_date]
 
+        df = existing_df
         try:
-            new_data = []
-            for start_date, end_date in missing_ranges:
-                current_date = start_date
-                while current_date <= end_date:
-                    # 休場日をスキップ
-                    if not self.is_market_open(current_date):
-                        print(f"✓ {current_date.date()} は休場日のためスキップします")
-                        current_date += timedelta(days=1)
-                        continue
-
-                    try:
-                        # Coinbaseのデータ取得
-                        cb_url = "https://api.coinbase.com/v2/prices/BTC-USD/spot"
-                        response = requests.get(cb_url)
-                        if response.status_code == 200:
-                            cb_data = response.json()
-                            cb_price = float(cb_data['data']['amount'])
-                        else:
-                            print(f"✗ {current_date.date()}のCoinbaseデータの取得に失敗: {response.status_code}")
-                            current_date += timedelta(days=1)
-                            continue
+            for start, end in missing_ranges:
+                # 長い期間は分割して取得し、チャンクごとに保存
+                chunk_start = start
+                while chunk_start <= end:
+                    chunk_end = min(chunk_start + timedelta(days=PREMIUM_CHUNK_DAYS[interval]), end)
+                    print(f"データ取得期間: {chunk_start} から {chunk_end}")
+                    coinbase = self.fetch_coinbase_candles(product, interval, chunk_start, chunk_end)
+                    binance = self.fetch_binance_klines(asset_symbol(self.asset, 'binance'), interval, chunk_start, chunk_end)
+                    if coinbase is None or binance is None:
+                        print(f"✗ {chunk_start} から {chunk_end} のローソク足が取得できませんでした")
+                    else:
+                        new_df = self.calculate_premium(coinbase['Close'], binance['Close'])
+                        if not new_df.empty:
+                            df = self.merge_and_save(df, new_df, filename)
+                            print(f"✓ {len(new_df)}本, 最新プレミアム: {new_df['Coinbase Premium'].iloc[-1]:.3f}%")
+                    chunk_start = chunk_end + to_timedelta(interval)
 
-                        # Binanceのデータ取得
-                        binance_url = "https://api.binance.com/api/v3/ticker/price"
-                        params = {'symbol': 'BTCUSDT'}
-                        response = requests.get(binance_url, params=params)
-                        if response.status_code == 200:
-                            binance_data = response.json()
-                            binance_price = float(binance_data['price'])
-                        else:
-                            print(f"✗ {current_date.date()}のBinanceデータの取得に失敗: {response.status_code}")
-                            current_date += timedelta(days=1)
-                            continue
-
-                        # プレミアムの計算（パーセンテージ）
-                        premium = ((cb_price - binance_price) / binance_price) * 100
-
-                        # 日付を00:00:00に設定
-                        timestamp = current_date.replace(hour=0, minute=0, second=0, microsecond=0)
-                        new_data.append({
-                            'timestamp': timestamp,
-                            'Coinbase Premium': premium
-                        })
-
-                        print(f"✓ {current_date.date()}のコインベースプレミアム: {premium:.2f}%")
-                        time.sleep(1)  # API制限を考慮
-
-                    except Exception as e:
-                        print(f"✗ {current_date.date()}のデータ取得中にエラーが発生: {e}")
-
-                    current_date += timedelta(days=1)
-
-            if new_data:
-                new_df = pd.DataFrame(new_data)
-                new_df.set_index('timestamp', inplace=True)
-                
-                # 既存のデータとマージ
-                if existing_df is not None:
-                    df = pd.concat([existing_df, new_df])
-                    df = df[~df.index.duplicated(keep='last')]
-                else:
-                    df = new_df
-                
-                df.sort_index(inplace=True)
-                
-                # CSVに保存
-                df.to_csv(f'{self.base_path}/coinbase_premium.csv')
-                print("✓ コインベースプレミアムデータを保存しました")
-                return df
-            elif existing_df is not None:
-                print("✓ 新規データなし - 既存データを使用")
-                return existing_df
-            else:
+            if df is None:
                 print("✗ データが取得できませんでした")
                 return None
+            print("✓ コインベースプレミアムデータを保存しました")
+            return df[df.index >= self.start_date]
             
         except Exception as e:
             print(f"✗ コインベースプレミアムデータの取得に失敗: {str(e)}")
-            return existing_df if existing_df is not None else None 
\ No newline at end of file
+            return df[df.index >= self.start_date] if df is not None else None
+
+    def calculate_premium(self, coinbase_close, binance_close):
+        """両取引所の終値からプレミアム（%）を計算（同じ時刻の足のみ）"""
+        prices = pd.concat({'coinbase': coinbase_close, 'binance': binance_close}, axis=1, join='inner')
+        premium = (prices['coinbase'] - prices['binance']) / prices['binance'] * 100
+        return premium.dropna().to_frame('Coinbase Premium')
+
+    def fetch_coinbase_candles(self, product, interval, start, end):
+        """Coinbase Exchangeのローソク足をページングしながら取得
+        
+        Args:
+            product (str): 銘柄（例: 'BTC-USD'）
+            interval (str): 足の間隔（'1d' または '1h'）
+            start (datetime): 取得開始時刻（UTC）
+            end (datetime): 取得終了時刻（UTC、この時刻に始まる足を含む）
+        
+        Returns:
+            pd.DataFrame: Open/High/Low/Close/Volumeのデータ（取得できない場合はNone）
+        """
+        url = f"https://api.exchange.coinbase.com/products/{product}/candles"
+        step = to_timedelta(interval)
+        page_start = pd.Timestamp(start)
+        end = pd.Timestamp(end)
+        pages = []
+        
+        while page_start <= end:
+            page_end = min(page_start + step * (COINBASE_CANDLES_LIMIT - 1), end)
+            params = {
+                'granularity': int(step.total_seconds()),
+                'start': page_start.isoformat(),
+                'end': page_end.isoformat()
+            }
+            response = self.http_get(url, params=params)
+            response.raise_for_status()
+            pages.extend(response.json())
+            page_start = page_end + step
+            time.sleep(0.2)  # API制限を考慮
+        
+        if not pages:
+            return None
+        
+        # 各行は [時刻, 安値, 高値, 始値, 終値, 出来高]（新しい順）
+        df = pd.DataFrame(pages, columns=['timestamp', 'Low', 'High', 'Open', 'Close', 'Volume'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
+        df = df.set_index('timestamp').sort_index()
+        df = df[~df.index.duplicated(keep='last')]
+        return df[['Open', 'High', 'Low', 'Close', 'Volume']].astype(float)
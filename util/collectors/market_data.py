@@ -1,250 +1,167 @@
-import yfinance as yf
 import pandas as pd
 from datetime import timedelta
 from .base_collector import BaseCollector
+from ..assets import asset_symbol, asset_filename, price_column
+from ..metrics import metrics
+
+# Yahoo Financeへの1リクエストあたりの取得日数
+YF_CHUNK_DAYS = 365
+
+# BTC-USDの日足OHLCV（価格と取引量で共有するデータセット、他の資産はasset_filenameで置き換え）
+BTCUSD_OHLCV_FILENAME = 'btcusd_ohlcv.csv'
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# 日中足の保存単位（この日数分を取得するごとにCSVへ保存）
+INTRADAY_CHUNK_DAYS = {
+    '1m': 30,
+    '1h': 365
+}
 
 class MarketDataCollector(BaseCollector):
     def get_btcusd_data(self):
-        """Yahoo FinanceからBTCUSDデータを取得"""
-        print("\nBTCUSDデータの取得を開始...")
-        
+        """資産（デフォルト: BTC）の終値データを取得（共有のOHLCVデータセットから作成）"""
+        df = self.get_btcusd_ohlcv()
+        if df is None:
+            return None
+        return df[['Close']].rename(columns={'Close': price_column(self.asset)})
+
+    def get_trading_volume(self):
+        """資産（デフォルト: BTC）の取引量データを取得（共有のOHLCVデータセットから作成）"""
+        df = self.get_btcusd_ohlcv()
+        if df is None:
+            return None
+        return df[['Volume']].rename(columns={'Volume': 'Trading Volume'})
+
+    def get_btcusd_ohlcv(self):
+        """Yahoo Financeから資産（デフォルト: BTC-USD）の日足OHLCVを差分取得
+
+        価格と取引量は同じデータセットから作成するため、1回の実行で同じティッカーを
+        重複して取得せず、両者の日付も常に一致します。
+        """
+        return self._get_yf_data(asset_symbol(self.asset, 'yahoo'), {column: column for column in OHLCV_COLUMNS},
+                                 asset_filename(BTCUSD_OHLCV_FILENAME, self.asset), f'{self.asset}USD OHLCV')
+
+    def get_btcusd_bars(self, interval='1h'):
+        """Binanceから資産（デフォルト: BTC）の日中足（OHLCV）を取得
+
+        Args:
+            interval (str): 足の間隔（'1m' または '1h'）
+
+        Returns:
+            pd.DataFrame: Open/High/Low/Close/Volumeのデータ
+        """
+        if interval not in INTRADAY_CHUNK_DAYS:
+            raise ValueError(f"未対応の足の間隔: {interval}（指定可能: {', '.join(INTRADAY_CHUNK_DAYS)}）")
+
+        filename = asset_filename(f'btcusd_{interval}.csv', self.asset)
+        print(f"\n{self.asset}USD {interval}足データの取得を開始...")
+
         # 既存のデータを読み込む
-        existing_df = self.load_existing_data('btcusd.csv')
+        existing_df = self.load_existing_data(filename)
         if existing_df is not None:
             print(f"既存データ: {len(existing_df)}行")
-            missing_ranges = self.get_missing_date_ranges(existing_df)
-        else:
-            missing_ranges = [(self.start_date, self.end_date)]
-        
+        missing_ranges = self.get_missing_time_ranges(existing_df, interval)
+
+        if not missing_ranges:
+            print("✓ 新規データなし - 既存データを使用")
+            metrics.increment('cache_hits')
+            return existing_df[existing_df.index >= self.start_date]
+
+        df = existing_df
         try:
-            new_data = []
             for start, end in missing_ranges:
-                print(f"データ取得期間: {start} から {end}")
-                ticker = "BTC-USD"
-                # end_dateに1日を加算して終了日を含める
-                df = yf.download(ticker, start=start, end=end + timedelta(days=1))
-                if not df.empty:
-                    new_data.append(df[['Close']].copy())
-            
-            if new_data:
-                new_df = pd.concat(new_data)
-                new_df.columns = ['BTCUSD Price']
-                new_df.index.name = 'timestamp'
-                
-                # 既存のデータとマージ
-                if existing_df is not None:
-                    df = pd.concat([existing_df, new_df])
-                    df = df[~df.index.duplicated(keep='last')]
-                else:
-                    df = new_df
-                
-                df.sort_index(inplace=True)
-                df.to_csv(f'{self.base_path}/btcusd.csv')
-                print("✓ BTCUSDデータを保存しました")
-                return df
-            elif existing_df is not None:
-                print("✓ 新規データなし - 既存データを使用")
-                return existing_df
-            else:
+                # 長い期間は分割して取得し、チャンクごとに保存（中断時は次回に続きから取得）
+                chunk_start = start
+                while chunk_start <= end:
+                    chunk_end = min(chunk_start + timedelta(days=INTRADAY_CHUNK_DAYS[interval]), end)
+                    print(f"データ取得期間: {chunk_start} から {chunk_end}")
+                    new_df = self.fetch_binance_klines(asset_symbol(self.asset, 'binance'), interval, chunk_start, chunk_end)
+                    if new_df is not None and not new_df.empty:
+                        df = self.merge_and_save(df, new_df, filename)
+                    chunk_start = chunk_end + timedelta(minutes=1)
+
+            if df is None:
                 print("✗ データが取得できませんでした")
                 return None
+            print(f"✓ {self.asset}USD {interval}足データを保存しました")
+            return df[df.index >= self.start_date]
         except Exception as e:
-            print(f"✗ BTCUSDデータの取得に失敗: {str(e)}")
-            return existing_df if existing_df is not None else None
+            print(f"✗ {self.asset}USD {interval}足データの取得に失敗: {str(e)}")
+            return df[df.index >= self.start_date] if df is not None else None
 
     def get_dxy_data(self):
         """Yahoo FinanceからDXY（米ドル指数）データを取得"""
-        print("\nDXYデータの取得を開始...")
-        
-        # 既存のデータを読み込む
-        existing_df = self.load_existing_data('dxy.csv')
-        if existing_df is not None:
-            print(f"既存データ: {len(existing_df)}行")
-            missing_ranges = self.get_missing_date_ranges(existing_df)
-        else:
-            missing_ranges = [(self.start_date, self.end_date)]
-        
-        try:
-            new_data = []
-            for start, end in missing_ranges:
-                # 日付範囲を1日単位で処理
-                current_date = start
-                while current_date <= end:
-                    # 土日または祝日をスキップ
-                    if current_date.weekday() >= 5 or not self.is_market_open(current_date):
-                        print(f"✓ {current_date.strftime('%Y-%m-%d')} は休場日のためスキップします")
-                        current_date += timedelta(days=1)
-                        continue
-                    
-                    next_date = current_date + timedelta(days=1)
-                    print(f"データ取得期間: {current_date.strftime('%Y-%m-%d')}")
-                    
-                    try:
-                        df = yf.download("DX-Y.NYB", start=current_date, end=next_date, progress=False)
-                        if not df.empty:
-                            df_close = df[['Close']].copy()
-                            df_close.columns = ['DXY Price']
-                            new_data.append(df_close)
-                        else:
-                            print(f"✓ {current_date.strftime('%Y-%m-%d')} の期間にデータがないためスキップします")
-                    except Exception as e:
-                        if "No price data found" in str(e):
-                            print(f"✓ {current_date.strftime('%Y-%m-%d')} の期間は取引なしのためスキップします")
-                        else:
-                            print(f"✓ {current_date.strftime('%Y-%m-%d')} の期間のデータ取得をスキップ: {str(e)}")
-                    
-                    current_date = next_date
-            
-            if new_data:
-                new_df = pd.concat(new_data)
-                new_df.index.name = 'timestamp'
-                
-                # 既存のデータとマージ
-                if existing_df is not None:
-                    df = pd.concat([existing_df, new_df])
-                    df = df[~df.index.duplicated(keep='last')]
-                else:
-                    df = new_df
-                
-                df.sort_index(inplace=True)
-                df.to_csv(f'{self.base_path}/dxy.csv')
-                print("✓ DXYデータを保存しました")
-                return df
-            elif existing_df is not None:
-                print("✓ 新規データなし - 既存データを使用")
-                return existing_df
-            else:
-                print("✗ データが取得できませんでした")
-                return None
-        except Exception as e:
-            print(f"✗ DXYデータの取得に失敗: {str(e)}")
-            return existing_df if existing_df is not None else None
+        return self._get_close_data("DX-Y.NYB", 'DXY Price', 'dxy.csv', 'DXY', trading_days_only=True)
 
     def get_sp500_data(self):
         """Yahoo FinanceからS&P500データを取得"""
-        print("\nS&P500データの取得を開始...")
-        
-        # 既存のデータを読み込む
-        existing_df = self.load_existing_data('sp500.csv')
-        if existing_df is not None:
-            print(f"既存データ: {len(existing_df)}行")
-            missing_ranges = self.get_missing_date_ranges(existing_df)
-        else:
-            missing_ranges = [(self.start_date, self.end_date)]
-        
-        try:
-            new_data = []
-            for start, end in missing_ranges:
-                # 日付範囲を1日単位で処理
-                current_date = start
-                while current_date <= end:
-                    # 土日または祝日をスキップ
-                    if current_date.weekday() >= 5 or not self.is_market_open(current_date):
-                        print(f"✓ {current_date.strftime('%Y-%m-%d')} は休場日のためスキップします")
-                        current_date += timedelta(days=1)
-                        continue
-                    
-                    next_date = current_date + timedelta(days=1)
-                    print(f"データ取得期間: {current_date.strftime('%Y-%m-%d')}")
-                    
-                    try:
-                        df = yf.download("^GSPC", start=current_date, end=next_date, progress=False)
-                        if not df.empty:
-                            df_close = df[['Close']].copy()
-                            df_close.columns = ['SP500 Price']
-                            new_data.append(df_close)
-                        else:
-                            print(f"✓ {current_date.strftime('%Y-%m-%d')} の期間にデータがないためスキップします")
-                    except Exception as e:
-                        if "No price data found" in str(e):
-                            print(f"✓ {current_date.strftime('%Y-%m-%d')} の期間は取引なしのためスキップします")
-                        else:
-                            print(f"✓ {current_date.strftime('%Y-%m-%d')} の期間のデータ取得をスキップ: {str(e)}")
-                    
-                    current_date = next_date
-            
-            if new_data:
-                new_df = pd.concat(new_data)
-                new_df.index.name = 'timestamp'
-                
-                # 既存のデータとマージ
-                if existing_df is not None:
-                    df = pd.concat([existing_df, new_df])
-                    df = df[~df.index.duplicated(keep='last')]
-                else:
-                    df = new_df
-                
-                df.sort_index(inplace=True)
-                df.to_csv(f'{self.base_path}/sp500.csv')
-                print("✓ S&P500データを保存しました")
-                return df
-            elif existing_df is not None:
-                print("✓ 新規データなし - 既存データを使用")
-                return existing_df
-            else:
-                print("✗ データが取得できませんでした")
-                return None
-        except Exception as e:
-            print(f"✗ S&P500データの取得に失敗: {str(e)}")
-            return existing_df if existing_df is not None else None
+        return self._get_close_data("^GSPC", 'SP500 Price', 'sp500.csv', 'S&P500', trading_days_only=True)
 
     def get_gold_data(self):
         """Yahoo Financeから金価格データを取得"""
-        print("\n金価格データの取得を開始...")
-        
+        return self._get_close_data("GLD", 'Gold Price', 'gold.csv', '金価格', trading_days_only=True)
+
+    def _get_close_data(self, ticker, column, filename, label, trading_days_only=False):
+        """Yahoo Financeから終値データを取得し、既存データとマージして保存
+
+        Args:
+            ticker (str): Yahoo Financeのティッカー
+            column (str): 保存するカラム名
+            filename (str): 保存先のファイル名
+            label (str): 表示用の名前
+            trading_days_only (bool): NYSEの取引日のみを取得対象にするかどうか
+        """
+        return self._get_yf_data(ticker, {'Close': column}, filename, label, trading_days_only)
+
+    def _get_yf_data(self, ticker, columns, filename, label, trading_days_only=False):
+        """Yahoo Financeからデータを取得し、既存データとマージして保存
+
+        欠損期間をYF_CHUNK_DAYS日ごとに分割して取得し、チャンクごとに保存するため、
+        中断された場合も次回実行時に残りの期間から再開します。取引中の当日の足は
+        確定後に取得するため保存しません。
+
+        Args:
+            ticker (str): Yahoo Financeのティッカー
+            columns (dict): Yahoo Financeの列名 -> 保存するカラム名
+            filename (str): 保存先のファイル名
+            label (str): 表示用の名前
+            trading_days_only (bool): NYSEの取引日のみを取得対象にするかどうか
+        """
+        print(f"\n{label}データの取得を開始...")
+
         # 既存のデータを読み込む
-        existing_df = self.load_existing_data('gold.csv')
+        existing_df = self.load_existing_data(filename)
         if existing_df is not None:
             print(f"既存データ: {len(existing_df)}行")
-            missing_ranges = self.get_missing_date_ranges(existing_df)
-        else:
-            missing_ranges = [(self.start_date, self.end_date)]
-        
+        missing_ranges = self.get_missing_date_ranges(existing_df, trading_days_only=trading_days_only,
+                                                      closed_only=True)
+
+        if not missing_ranges:
+            print("✓ 新規データなし - 既存データを使用")
+            metrics.increment('cache_hits')
+            return existing_df
+
+        df = existing_df
         try:
-            new_data = []
             for start, end in missing_ranges:
-                # 日付範囲を1日単位で処理
-                current_date = start
-                while current_date <= end:
-                    # 土日または祝日をスキップ
-                    if current_date.weekday() >= 5 or not self.is_market_open(current_date):
-                        print(f"✓ {current_date.strftime('%Y-%m-%d')} は休場日のためスキップします")
-                        current_date += timedelta(days=1)
+                for chunk_start, chunk_end in self.iter_date_chunks(start, end, YF_CHUNK_DAYS):
+                    print(f"データ取得期間: {chunk_start.strftime('%Y-%m-%d')} から {chunk_end.strftime('%Y-%m-%d')}")
+                    # end_dateに1日を加算して終了日を含める
+                    raw = self.yf_download(ticker, start=chunk_start, end=chunk_end + timedelta(days=1),
+                                           progress=False, multi_level_index=False)
+                    if raw.empty:
+                        print(f"✓ {chunk_start.strftime('%Y-%m-%d')} から {chunk_end.strftime('%Y-%m-%d')} の期間にデータがないためスキップします")
                         continue
-                    
-                    next_date = current_date + timedelta(days=1)
-                    print(f"データ取得期間: {current_date.strftime('%Y-%m-%d')}")
-                    
-                    try:
-                        df = yf.download("GLD", start=current_date, end=next_date)
-                        if not df.empty:
-                            df_close = df[['Close']].copy()
-                            df_close.columns = ['Gold Price']
-                            new_data.append(df_close)
-                        else:
-                            print(f"✓ {current_date.strftime('%Y-%m-%d')} の期間にデータがないためスキップします")
-                    except Exception as e:
-                        if "No price data found" in str(e):
-                            print(f"✓ {current_date.strftime('%Y-%m-%d')} の期間は取引なしのためスキップします")
-                        else:
-                            print(f"✓ {current_date.strftime('%Y-%m-%d')} の期間のデータ取得をスキップ: {str(e)}")
-                    
-                    current_date = next_date
-            
-            if new_data:
-                new_df = pd.concat(new_data)
-                new_df.index.name = 'timestamp'
-                
-                # 既存のデータとマージ
-                if existing_df is not None:
-                    df = pd.concat([existing_df, new_df])
-                    df = df[~df.index.duplicated(keep='last')]
-                else:
-                    df = new_df
-                
-                df.sort_index(inplace=True)
-                df.to_csv(f'{self.base_path}/gold.csv')
-                print("✓ 金価格データを保存しました")
+
+                    # 期間の終了日より後の足（取引中の当日など）は含めない
+                    new_df = raw[list(columns)].rename(columns=columns)
+                    new_df = new_df[new_df.index <= pd.Timestamp(chunk_end)]
+                    if new_df.empty:
+                        continue
+                    df = self.merge_and_save(df, new_df, filename)
+
+            if df is not existing_df:
+                print(f"✓ {label}データを保存しました")
                 return df
             elif existing_df is not None:
                 print("✓ 新規データなし - 既存データを使用")
@@ -253,5 +170,6 @@ class MarketDataCollector(BaseCollector):
                 print("✗ データが取得できませんでした")
                 return None
         except Exception as e:
-            print(f"✗ 金価格データの取得に失敗: {str(e)}")
-            return existing_df if existing_df is not None else None 
\ No newline at end of file
+            print(f"✗ {label}データの取得に失敗: {str(e)}")
+            # 取得済みのチャンクは保存されているため、その時点のデータを返す
+            return df
@@ -1,11 +1,22 @@
-import requests
+import re
+import json
 import pandas as pd
-from datetime import datetime
+from datetime import timedelta
 from .base_collector import BaseCollector
 
+# Blockchain.comのチャートAPIへの1リクエストあたりの取得日数
+BLOCKCHAIN_CHUNK_DAYS = 365
+
+# 大口保有者データの要素から日付を取り出すパターン（解析せずに読み飛ばすため）
+LARGE_HOLDERS_DATE = re.compile(r'"d"\s*:\s*"(\d{4}-\d{2}-\d{2})"')
+
 class OnchainDataCollector(BaseCollector):
     def get_large_holders_data(self):
-        """bitcoin-dataからビットコインの大口保有者データを取得"""
+        """bitcoin-dataからビットコインの大口保有者データを取得
+        
+        APIは全期間の履歴を返すため、レスポンスを逐次読み込み、保存済みの最終日
+        （保存済みデータがない場合は取得開始日）より古い要素は解析せずに読み飛ばします。
+        """
         print("\n大口保有者データの取得を開始...")
         
         # 既存のデータを読み込む
@@ -13,36 +24,46 @@ class OnchainDataCollector(BaseCollector):
         if existing_df is not None:
             print(f"既存データ: {len(existing_df)}行")
         
+        # 保存済みの最終日（値の更新に備えて含める）以降のみを対象にする
+        watermark = self.start_date
+        if existing_df is not None and not existing_df.empty and existing_df.index[0] <= self.start_date:
+            watermark = max(watermark, existing_df.index[-1].to_pydatetime())
+        watermark = watermark.strftime('%Y-%m-%d')
+        
         url = 'https://bitcoin-data.com/v1/balance-addr-10K-BTC'
         headers = {'accept': 'application/hal+json'}
         
         try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
+            dates = []
+            balances = []
+            skipped = 0
+            with self.http_get(url, headers=headers, stream=True) as response:
+                response.raise_for_status()
+                for record in self.iter_json_objects(response):
+                    # ISO形式の日付は文字列のまま比較できるため、古い要素は解析しない
+                    match = LARGE_HOLDERS_DATE.search(record)
+                    if match and match.group(1) < watermark:
+                        skipped += 1
+                        continue
+                    item = json.loads(record)
+                    dates.append(item['d'])
+                    balances.append(item['balAddr10Kbtc'])
+            print(f"✓ 新規対象: {len(dates)}件（{watermark} より前の {skipped}件は読み飛ばし）")
             
-            # データをDataFrameに変換
-            dates = [datetime.strptime(item["d"], "%Y-%m-%d") for item in data]
-            balances = [int(item["balAddr10Kbtc"]) for item in data]
+            if not dates:
+                print("✓ 新規データなし - 既存データを使用")
+                return existing_df
             
+            # 日付と値はまとめて変換
             df = pd.DataFrame({
-                'Total Holdings': balances
-            }, index=dates)
-            df.index.name = 'timestamp'
-            
-            # 1年分のデータにフィルタリング
-            df = df[df.index >= self.start_date]
-            df.sort_index(inplace=True)
+                'Total Holdings': pd.to_numeric(pd.Series(balances), errors='coerce').to_numpy()
+            }, index=pd.to_datetime(pd.Index(dates), format='%Y-%m-%d'))
+            df = df[~df.index.duplicated(keep='last')]
             
             # 既存のデータとマージ
-            if existing_df is not None:
-                df = pd.concat([existing_df, df])
-                df = df[~df.index.duplicated(keep='last')]
-                df.sort_index(inplace=True)
-            
-            df.to_csv(f'{self.base_path}/large_holders.csv')
+            df = self.merge_and_save(existing_df, df, 'large_holders.csv')
             print("✓ 大口保有者データを保存しました")
-            return df
+            return df[df.index >= self.start_date]
         except Exception as e:
             print(f"✗ 大口保有者データの取得に失敗: {str(e)}")
             return existing_df if existing_df is not None else None
@@ -50,63 +71,78 @@ class OnchainDataCollector(BaseCollector):
     def get_active_addresses(self):
         """Blockchain.comからアクティブアドレス数を取得"""
         print("\nアクティブアドレス数の取得を開始...")
-        url = "https://api.blockchain.info/charts/n-unique-addresses"
-        params = {
-            'timespan': '365days',
-            'format': 'json'
-        }
+        return self._get_chart_data('n-unique-addresses', 'Active Addresses', 'active_addresses.csv', 'アクティブアドレス数')
+
+    def get_hash_rate(self):
+        """Blockchain.comからハッシュレートを取得"""
+        print("\nハッシュレートデータの取得を開始...")
+        return self._get_chart_data('hash-rate', 'Hash Rate', 'hash_rate.csv', 'ハッシュレート')
+
+    def _get_chart_data(self, chart, column, filename, label):
+        """Blockchain.comのチャートデータを取得期間全体についてチャンク単位で取得
+        
+        保存済みのデータがあるチャンクは最終時点以降のみを取得するため、日次の実行では
+        数行分の転送で済み、取得期間より古い履歴も保持されます。
+        
+        Args:
+            chart (str): チャート名
+            column (str): 保存するカラム名
+            filename (str): 保存先のファイル名
+            label (str): 表示用の名前
+        """
+        existing_df = self.load_existing_data(filename)
+        if existing_df is not None:
+            print(f"既存データ: {len(existing_df)}行")
         
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()['values']
+            df = self.run_backfill(
+                chart, filename, existing_df,
+                lambda start, end: self._fetch_chart_since(chart, column, existing_df, start, end),
+                chunk_days=BLOCKCHAIN_CHUNK_DAYS)
+            if df is None or df.empty:
+                print(f"✗ {label}データが取得できませんでした")
+                return None
             
-            df = pd.DataFrame(data)
-            df['timestamp'] = pd.to_datetime(df['x'], unit='s')
-            df['Active Addresses'] = df['y']
-            df.set_index('timestamp', inplace=True)
-            df = df[['Active Addresses']]
-            
-            # 1年分のデータにフィルタリング
-            df = df[df.index >= self.start_date]
-            df.sort_index(inplace=True)
-            
-            df.to_csv(f'{self.base_path}/active_addresses.csv')
-            print("✓ アクティブアドレス数データを保存しました")
-            return df
+            print(f"✓ {label}データを保存しました")
+            return df[df.index >= self.start_date]
             
         except Exception as e:
-            print(f"✗ アクティブアドレス数の取得に失敗: {str(e)}")
-            return None
+            print(f"✗ {label}の取得に失敗: {str(e)}")
+            return existing_df if existing_df is not None else None
 
-    def get_hash_rate(self):
-        """Blockchain.comからハッシュレートを取得"""
-        print("\nハッシュレートデータの取得を開始...")
-        url = "https://api.blockchain.info/charts/hash-rate"
+    def _fetch_chart_since(self, chart, column, existing_df, start, end):
+        """保存済みの最終時点以降のみをチャートAPIから取得（差分同期）
+        
+        チャンクの先頭から保存済みの場合のみ取得開始を最終時点に進めます
+        （途中から欠損しているチャンクは全期間を取得）。
+        """
+        if existing_df is not None and not existing_df.empty:
+            stored = existing_df.index[(existing_df.index >= start) & (existing_df.index < end + timedelta(days=1))]
+            if len(stored) > 0 and stored[0] < start + timedelta(days=1):
+                # 最終時点は値が更新されている可能性があるため含めて取得
+                start = stored[-1].to_pydatetime().replace(hour=0, minute=0, second=0, microsecond=0)
+                print(f"差分取得: {start.date()} から")
+        return self._fetch_chart(chart, column, start, end)
+
+    def _fetch_chart(self, chart, column, start, end):
+        """Blockchain.comのチャートAPIから指定期間のデータを取得"""
+        url = f"https://api.blockchain.info/charts/{chart}"
         params = {
-            'timespan': '365days',
+            'start': start.strftime('%Y-%m-%d'),
+            'timespan': f'{(end - start).days + 1}days',
+            'sampled': 'false',
             'format': 'json'
         }
         
-        try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()['values']
-            
-            df = pd.DataFrame(data)
-            df['timestamp'] = pd.to_datetime(df['x'], unit='s')
-            df['Hash Rate'] = df['y']
-            df.set_index('timestamp', inplace=True)
-            df = df[['Hash Rate']]
-            
-            # 1年分のデータにフィルタリング
-            df = df[df.index >= self.start_date]
-            df.sort_index(inplace=True)
-            
-            df.to_csv(f'{self.base_path}/hash_rate.csv')
-            print("✓ ハッシュレートデータを保存しました")
-            return df
-            
-        except Exception as e:
-            print(f"✗ ハッシュレートの取得に失敗: {str(e)}")
-            return None 
\ No newline at end of file
+        response = self.http_get(url, params=params)
+        response.raise_for_status()
+        data = response.json()['values']
+        if not data:
+            return None
+        
+        df = pd.DataFrame(data)
+        df['timestamp'] = pd.to_datetime(df['x'], unit='s')
+        df[column] = df['y']
+        df.set_index('timestamp', inplace=True)
+        df = df[[column]]
+        return df[df.index < end + timedelta(days=1)]
@@ -1,26 +1,67 @@
 import os
-import requests
+import time
+import threading
 import pandas as pd
-from pytrends.request import TrendReq
-from .base_collector import BaseCollector
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from .base_collector import BaseCollector, HTTP_MAX_RETRIES
+from ..deadline import HTTP_TIMEOUT, current_budget, with_budget, circuit_breakers
+from ..metrics import metrics
+
+# Googleトレンドの検索キーワード
+TRENDS_KEYWORDS = ['bitcoin', 'BTC', 'crypto']
+
+# 1チャンクの日数（90日未満の期間は日次の値が返される）と隣接チャンクとの重なりの日数
+TRENDS_CHUNK_DAYS = 89
+TRENDS_OVERLAP_DAYS = 29
+
+# 同時に実行するリクエスト数と、リクエスト開始の最小間隔（秒、レート制限対策）
+TRENDS_MAX_WORKERS = 3
+TRENDS_MIN_INTERVAL = 2.0
+
+# 直近の値は後から更新されるため、終了日からこの日数が経過したチャンクのみキャッシュを再利用
+TRENDS_FINAL_DAYS = 3
+
+# Googleトレンドのサーキットブレーカーのホスト名
+TRENDS_HOST = 'trends.google.com'
 
 class SentimentDataCollector(BaseCollector):
-    def __init__(self):
-        super().__init__()
-        # PyTrendsの初期化
-        self.pytrends = TrendReq(hl='en-US', tz=360)
+    def __init__(self, lookback_days=365):
+        super().__init__(lookback_days)
+        # PyTrendsは初期化時に通信するため、初回利用時に生成する
+        # （リクエストの状態を保持するため、並列取得時はスレッドごとに生成）
+        self._local = threading.local()
+        self._throttle_lock = threading.Lock()
+        self._last_request = 0.0
+
+    @property
+    def pytrends(self):
+        """PyTrendsクライアントを取得（スレッドごとに遅延初期化）"""
+        if getattr(self._local, 'pytrends', None) is None:
+            # pytrendsはGoogleトレンドの取得時のみ読み込む
+            from pytrends.request import TrendReq
+            # タイムアウトを指定しないと応答がないまま数分間待つことがある
+            self._local.pytrends = TrendReq(hl='en-US', tz=360, timeout=HTTP_TIMEOUT)
+        return self._local.pytrends
 
     def get_fear_greed_index(self):
         """Fear & Greed Indexを取得"""
         url = "https://api.alternative.me/fng/"
+        print("\nFear & Greed Indexの取得を開始...")
+        
+        # 既存のデータを読み込む
+        existing_df = self.load_existing_data('fear_greed.csv')
+        if existing_df is not None:
+            print(f"既存データ: {len(existing_df)}行")
+        
+        # APIはページングに対応していないため、取得期間の日数分を1リクエストで取得
         params = {
-            'limit': 365,
+            'limit': (datetime.now() - self.start_date).days + 1,
             'format': 'json'
         }
         
-        print("\nFear & Greed Indexの取得を開始...")
         try:
-            response = requests.get(url, params=params)
+            response = self.http_get(url, params=params)
             response.raise_for_status()
             data = response.json()['data']
             
@@ -29,77 +70,198 @@ class SentimentDataCollector(BaseCollector):
             df['Fear & Greed Value'] = pd.to_numeric(df['value'], errors='coerce')
             df.set_index('timestamp', inplace=True)
             df = df[['Fear & Greed Value']]
-            df.sort_index(inplace=True)
             
-            # 1年分のデータに制限
-            df = df[df.index >= self.start_date]
-            
-            df.to_csv(f'{self.base_path}/fear_greed.csv')
+            # 既存のデータとマージ
+            df = self.merge_and_save(existing_df, df, 'fear_greed.csv')
             print("✓ Fear & Greed Indexデータを保存しました")
-            return df
+            
+            # 取得期間のデータに制限
+            return df[df.index >= self.start_date]
         except Exception as e:
             print(f"✗ Fear & Greed Indexの取得に失敗: {str(e)}")
-            return None
+            return existing_df if existing_df is not None else None
 
     def get_google_trends_data(self):
-        """Googleトレンドからビットコイン関連の検索トレンドを取得"""
+        """Googleトレンドからビットコイン関連の検索トレンドを日次で取得
+        
+        Googleトレンドは90日未満の期間でのみ日次の値を返すため、期間を重なりのある
+        チャンクに分割して並列に取得し、重なり部分の比率で1つの系列に繋ぎ合わせます。
+        各チャンクはディスクにキャッシュし、値が確定したチャンクは再取得しません。
+        """
         print("\nGoogleトレンドデータの取得を開始...")
         
-        # 既存のデータを読み込む
-        try:
-            filepath = os.path.join(self.base_path, 'google_trends.csv')
-            if os.path.exists(filepath):
-                existing_df = pd.read_csv(filepath)
-                existing_df['timestamp'] = pd.to_datetime(existing_df['date'])
-                existing_df.set_index('timestamp', inplace=True)
-                existing_df.drop('date', axis=1, errors='ignore', inplace=True)
-                print(f"既存データ: {len(existing_df)}行")
-                if existing_df.index[-1].date() >= self.end_date.date():
-                    print("✓ 新規データなし - 既存データを使用")
-                    return existing_df
+        windows = self.get_trends_windows()
+        chunks = {}
+        pending = []
+        for window_start, window_end in windows:
+            cached = self.load_trends_chunk(window_start, window_end)
+            if cached is not None:
+                chunks[window_start] = cached
             else:
-                existing_df = None
-        except Exception as e:
-            print(f"既存データの読み込みをスキップ: {str(e)}")
-            existing_df = None
+                pending.append((window_start, window_end))
+        # 取得期間外の過去のチャンクも繋ぎ合わせに使用（履歴を蓄積するため）
+        chunks.update(self.load_cached_trends_chunks(skip=chunks))
         
-        try:
-            # 検索キーワードの設定
-            keywords = ['bitcoin', 'BTC', 'crypto']
-            self.pytrends.build_payload(
-                kw_list=keywords,
-                timeframe=f'{self.start_date.strftime("%Y-%m-%d")} {self.end_date.strftime("%Y-%m-%d")}'
-            )
-            
-            # データの取得
-            df = self.pytrends.interest_over_time()
-            if df.empty:
-                print("✗ トレンドデータが取得できませんでした")
-                return existing_df if existing_df is not None else None
-            
-            # 不要な列を削除
-            df = df.drop('isPartial', axis=1)
-            
-            # カラム名を変更
-            df.columns = [f'{col} Trend' for col in df.columns]
-            
-            # インデックス名を変更
-            df.index.name = 'timestamp'
-            
-            # 既存のデータとマージ
-            if existing_df is not None:
-                df = pd.concat([existing_df, df])
-                df = df[~df.index.duplicated(keep='last')]
-            
-            df.sort_index(inplace=True)
-            
-            # CSVに保存（dateカラムを追加）
-            df_to_save = df.copy()
-            df_to_save['date'] = df_to_save.index
-            df_to_save.to_csv(f'{self.base_path}/google_trends.csv', index=True)
-            print("✓ Googleトレンドデータを保存しました")
-            return df
-            
-        except Exception as e:
-            print(f"✗ Googleトレンドデータの取得に失敗: {str(e)}")
-            return existing_df if existing_df is not None else None 
\ No newline at end of file
+        print(f"チャンク: {len(windows)}件（キャッシュ済み: {len(windows) - len(pending)}件）")
+        if not pending:
+            metrics.increment('cache_hits')
+        
+        failed = 0
+        # 並列取得のスレッドでも呼び出し元と同じ取得時間とステージの計測を使用
+        fetch = with_budget(current_budget(), metrics.bind(self.fetch_trends_chunk))
+        with ThreadPoolExecutor(max_workers=TRENDS_MAX_WORKERS) as executor:
+            futures = {executor.submit(fetch, start, end): start for start, end in pending}
+            for future in as_completed(futures):
+                try:
+                    df = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"✗ {futures[future].date()} からのチャンクの取得に失敗: {str(e)}")
+                    continue
+                if df is not None:
+                    chunks[futures[future]] = df
+        
+        if not chunks:
+            print("✗ トレンドデータが取得できませんでした")
+            return None
+        
+        df = self.stitch_trends_chunks([chunks[start] for start in sorted(chunks)])
+        self.save_data(df, 'google_trends.csv')
+        print(f"✓ Googleトレンドデータを保存しました（{len(df)}日分" + (f", 取得失敗: {failed}チャンク）" if failed else "）"))
+        return df[df.index >= self.start_date]
+
+    def get_trends_windows(self):
+        """取得期間を覆うチャンク（開始日, 終了日）の一覧
+        
+        チャンク境界はエポック基準で固定しているため、実行日が変わっても
+        同じチャンクのキャッシュを再利用できます。
+        """
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        epoch = datetime(1970, 1, 1)
+        step = TRENDS_CHUNK_DAYS - TRENDS_OVERLAP_DAYS
+        first = max(((self.start_date - epoch).days - TRENDS_CHUNK_DAYS) // step + 1, 0)
+        windows = []
+        window_start = epoch + timedelta(days=first * step)
+        while window_start <= today:
+            windows.append((window_start, window_start + timedelta(days=TRENDS_CHUNK_DAYS - 1)))
+            window_start += timedelta(days=step)
+        return windows
+
+    def _trends_cache_path(self, window_start):
+        return os.path.join(self.base_path, 'cache', 'google_trends', f"{window_start.strftime('%Y-%m-%d')}.csv")
+
+    def load_trends_chunk(self, window_start, window_end):
+        """値が確定したチャンクのキャッシュを読み込む（未確定・未取得の場合はNone）"""
+        filepath = self._trends_cache_path(window_start)
+        if not os.path.exists(filepath):
+            return None
+        # 直近の値は後から更新されるため、終了日から一定日数が経過した後に取得したもののみ使用
+        fetched_at = datetime.fromtimestamp(os.path.getmtime(filepath))
+        if fetched_at < window_end + timedelta(days=TRENDS_FINAL_DAYS):
+            return None
+        return pd.read_csv(filepath, index_col='timestamp', parse_dates=True)
+
+    def load_cached_trends_chunks(self, skip=()):
+        """キャッシュ済みの全チャンクを読み込む（チャンク開始日 -> データ、skipの開始日は除く）"""
+        directory = os.path.dirname(self._trends_cache_path(datetime(1970, 1, 1)))
+        if not os.path.isdir(directory):
+            return {}
+        chunks = {}
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith('.csv'):
+                window_start = datetime.strptime(filename[:-4], '%Y-%m-%d')
+                if window_start in skip:
+                    continue
+                chunks[window_start] = pd.read_csv(os.path.join(directory, filename),
+                                                   index_col='timestamp', parse_dates=True)
+        return chunks
+
+    def _throttle(self):
+        """リクエスト開始の間隔を一定以上空ける（全スレッド共通）"""
+        with self._throttle_lock:
+            wait = self._last_request + TRENDS_MIN_INTERVAL - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_request = time.monotonic()
+
+    def fetch_trends_chunk(self, window_start, window_end):
+        """1チャンクのトレンドを取得してキャッシュに保存（レート制限時は再試行）
+        
+        Args:
+            window_start (datetime): チャンク開始日
+            window_end (datetime): チャンク終了日（当日より先の場合は当日まで取得）
+        
+        Returns:
+            pd.DataFrame: '<キーワード> Trend' 列の日次データ（データがない場合はNone）
+        """
+        end = min(window_end, datetime.now())
+        timeframe = f"{window_start.strftime('%Y-%m-%d')} {end.strftime('%Y-%m-%d')}"
+        from pytrends.exceptions import ResponseError
+        from requests.exceptions import RequestException
+        budget = current_budget()
+        self.check_circuit(TRENDS_HOST, budget)
+        for attempt in range(HTTP_MAX_RETRIES + 1):
+            self._throttle()
+            if budget is not None:
+                budget.check()
+                budget.host = TRENDS_HOST
+            metrics.increment('requests')
+            try:
+                self.pytrends.build_payload(kw_list=TRENDS_KEYWORDS, timeframe=timeframe)
+                df = self.pytrends.interest_over_time()
+                break
+            except (ResponseError, RequestException) as e:
+                if attempt == HTTP_MAX_RETRIES:
+                    self.record_failure(TRENDS_HOST, budget, e)
+                    raise
+                metrics.increment('retries')
+                wait = TRENDS_MIN_INTERVAL * 2 ** (attempt + 1)
+                if budget is not None:
+                    budget.sleep(wait)
+                else:
+                    time.sleep(wait)
+        circuit_breakers.record_success(TRENDS_HOST)
+        
+        if df.empty:
+            return None
+        df = df.drop(columns='isPartial', errors='ignore')
+        df.columns = [f'{col} Trend' for col in df.columns]
+        df.index.name = 'timestamp'
+        
+        filepath = self._trends_cache_path(window_start)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        df.to_csv(filepath)
+        print(f"✓ {timeframe}: {len(df)}日分")
+        return df
+
+    def stitch_trends_chunks(self, chunks):
+        """チャンクごとに正規化されたトレンドを1つの系列に繋ぎ合わせる
+        
+        Googleトレンドの値はリクエストごとに期間内の最大値を100として正規化されるため、
+        各チャンクを直前までに繋いだ系列との重なり部分の合計比で拡大縮小します。
+        キーワード間の比率を保つため、比率は全キーワード共通です。最後に全体の最大値が
+        100になるよう正規化します。
+        
+        Args:
+            chunks (list): 開始日順のチャンクのリスト
+        
+        Returns:
+            pd.DataFrame: 日次のトレンド
+        """
+        stitched = chunks[0].astype(float)
+        for chunk in chunks[1:]:
+            chunk = chunk.astype(float)
+            overlap = stitched.index.intersection(chunk.index)
+            reference = stitched.loc[overlap].to_numpy().sum()
+            current = chunk.loc[overlap].to_numpy().sum()
+            if len(overlap) == 0:
+                print(f"✗ {chunk.index[0].date()} からのチャンクは重なりがないため比率を調整できません")
+            # 重なりがない・値が0の場合は比率を調整しない
+            scale = reference / current if len(overlap) > 0 and current > 0 and reference > 0 else 1.0
+            new_rows = chunk.loc[chunk.index.difference(stitched.index)] * scale
+            stitched = pd.concat([stitched, new_rows]).sort_index()
+        
+        maximum = stitched.to_numpy().max()
+        if maximum > 0:
+            stitched = stitched * (100 / maximum)
+        return stitched.round(2)
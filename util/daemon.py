@@ -0,0 +1,292 @@
+import json
+import signal
+import threading
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .alerts import evaluate_alerts
+from .data_collector import DataCollector, SOURCES, needs_full_history
+from .deadline import RunDeadline
+from .plot_market_data import print_latest_signal
+from .metrics import metrics
+from .pipeline import ArtifactCache, build_analysis_pipeline, write_composite
+from .snapshot import write_snapshot
+
+# データソースごとの更新間隔（'market_close' はNYSEの取引終了後に更新）
+SOURCE_SCHEDULES = {
+    'btcusd': timedelta(hours=1),
+    'dxy': 'market_close',
+    'sp500': 'market_close',
+    'gold': 'market_close',
+    'large_holders': timedelta(days=1),
+    'active_addresses': timedelta(days=1),
+    'hash_rate': timedelta(days=1),
+    'funding_rates': timedelta(hours=8),
+    'open_interest': timedelta(hours=1),
+    'fear_greed': timedelta(days=1),
+    'google_trends': timedelta(days=1),
+    'trading_volume': timedelta(hours=1),
+    'coinbase_premium': timedelta(hours=1),
+    'etf': 'market_close',
+}
+
+# 取引終了から更新までの待機時間（データ提供元の反映待ち）
+MARKET_CLOSE_DELAY = timedelta(minutes=30)
+
+# 失敗時の再試行間隔
+RETRY_INTERVAL = timedelta(minutes=15)
+
+# メインループの最大待機秒数
+MAX_SLEEP_SECONDS = 60
+
+class AnalyzerDaemon:
+    """常駐してデータソースごとの間隔でデータを更新し、入力が変化した時のみ再描画する
+
+    Args:
+        lookback_days (int): データの取得・分析期間（日数）
+        freq (str): BTCUSD価格・指標・シグナルの頻度
+        sources (list): 更新するデータソース（None の場合は全て）
+        host (str): ステータスサーバーのホスト
+        port (int): ステータスサーバーのポート
+        metrics_dir (str): 更新サイクルごとの計測結果の出力先
+        memory_budget (int): 読み込んだデータの合計メモリ使用量の上限（バイト）
+        alert_sinks (list): シグナルの変化の通知先
+        windows (dict): 期間別のグラフ（表示名 -> 日数）
+        deadline (float): 更新サイクルごとのデータ収集の制限時間（秒）
+        snapshot (bool): 再描画ごとに分析結果のスナップショットを保存するか
+        use_cache (bool): ステージの出力キャッシュを使用するか
+    """
+
+    def __init__(self, lookback_days=365, freq='1d', sources=None, host='0.0.0.0', port=8080,
+                 metrics_dir=None, memory_budget=None, alert_sinks=None, windows=None,
+                 deadline=None, snapshot=True, use_cache=True):
+        self.collector = DataCollector(lookback_days=lookback_days, memory_budget=memory_budget,
+                                       full_history=needs_full_history(windows))
+        # 更新ごとにCSV全体を読み込み直さず、取得した行のみをメモリ上のデータとCSVに反映する
+        self.collector.keep_frames_in_memory()
+        self.freq = freq
+        self.metrics_dir = metrics_dir
+        self.windows = windows
+        self.deadline = deadline
+        self.snapshot = snapshot
+        self.sources = [name for name in SOURCES if sources is None or name in sources]
+        self.host = host
+        self.port = port
+        self.started_at = datetime.now(timezone.utc)
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+
+        # メモリ上に保持するデータと状態
+        self.results = {}
+        self.data_hashes = {}
+        self.state = {name: {'last_refresh': None, 'next_refresh': None, 'rows': 0, 'error': None}
+                      for name in self.sources}
+        # パネルごとの画像をキャッシュし、入力が変化したパネルのみ再描画する
+        self.cache = ArtifactCache() if use_cache else None
+        self.rendered_hash = None
+        self.last_render = None
+        self.latest_signal = None
+        # シグナルの変化の通知先
+        self.alert_sinks = alert_sinks
+
+    def load_initial_data(self):
+        """起動時に保存済みデータをメモリに読み込む"""
+        stored = self.collector.load_stored_data(self.sources, freq=self.freq) or {}
+        for name, df in stored.items():
+            self._update_result(name, df)
+
+    def next_refresh_time(self, name, now):
+        """データソースの次回更新時刻を計算"""
+        schedule = SOURCE_SCHEDULES[name]
+        if schedule != 'market_close':
+            return now + schedule
+
+        # 次のNYSE取引終了時刻（UTC）の一定時間後
+        nyse_schedule = self.collector.nyse.schedule(
+            start_date=now.date(), end_date=(now + timedelta(days=10)).date())
+        for market_close in nyse_schedule['market_close']:
+            refresh_at = market_close.to_pydatetime() + MARKET_CLOSE_DELAY
+            if refresh_at > now:
+                return refresh_at
+        return now + timedelta(days=1)
+
+    def refresh_source(self, name, run_deadline=None):
+        """データソースを更新してメモリ上のデータを差し替える
+
+        Args:
+            name (str): データソース
+            run_deadline (RunDeadline): 更新サイクル全体の期限（超過時は保存済みデータを使用）
+        """
+        now = datetime.now(timezone.utc)
+        self.collector.reset_period()
+        try:
+            df = self.collector.collect_source(name, self.freq, run_deadline)
+            if df is None:
+                error = 'データが取得できませんでした'
+            elif 'stale' in df.attrs:
+                # 取得できず保存済みデータを使用した場合も再試行の間隔で更新する
+                error = f"取得に失敗したため保存済みデータ（最終: {df.attrs['stale']}）を使用しています"
+            else:
+                error = None
+        except Exception as e:
+            df = None
+            error = str(e)
+
+        with self.lock:
+            if df is not None:
+                self._update_result(name, df)
+            self.state[name]['last_refresh'] = now
+            self.state[name]['error'] = error
+            self.state[name]['next_refresh'] = (now + RETRY_INTERVAL if error
+                                                else self.next_refresh_time(name, now))
+
+    def _update_result(self, name, df):
+        """データとハッシュを更新（取得期間外の古いデータはメモリに保持しない）"""
+        if df is None or df.empty:
+            return
+        df = self.collector.since_start(df)
+        self.results[name] = df
+        # 保存済みデータへの切り替えもグラフの表示が変わるため変化として扱う
+        self.data_hashes[name] = (int(pd.util.hash_pandas_object(df).sum()), df.attrs.get('stale'))
+        self.state[name]['rows'] = len(df)
+
+    def inputs_hash(self):
+        """全入力データのハッシュ"""
+        return hash(tuple(sorted(self.data_hashes.items())))
+
+    def render_if_changed(self):
+        """入力データが変化している場合のみ分析・通知・描画を実行"""
+        with self.lock:
+            current_hash = self.inputs_hash()
+            if current_hash == self.rendered_hash or not self.results:
+                return False
+            results = dict(self.results)
+
+        print("\n入力データの変化を検出 - 分析とグラフを更新します")
+        # 描画先の図はプロセス内で保持され、変化したパネルのみ合成済みの画像に書き込まれる
+        pipeline = build_analysis_pipeline(results, self.cache, windows=self.windows)
+        signals = None
+        if pipeline is not None:
+            # 通知は描画より前に送信
+            evaluate_alerts(pipeline, self.alert_sinks)
+            signals = print_latest_signal(pipeline.get('signals') if 'signals' in pipeline else None)
+            with metrics.stage('plot'):
+                write_composite(pipeline)
+            if self.snapshot:
+                with metrics.stage('snapshot'):
+                    write_snapshot(pipeline, freq=self.freq)
+            pipeline.print_summary()
+            if self.cache is not None:
+                self.cache.prune()
+        with self.lock:
+            self.rendered_hash = current_hash
+            self.last_render = datetime.now(timezone.utc)
+            self.latest_signal = None if signals is None else int(signals.iloc[-1])
+        return True
+
+    def refresh_due_sources(self, due):
+        """更新が必要なデータソースを全て更新してから、分析・通知・描画を1回だけ実行
+
+        同じサイクルで複数のデータソースを更新する場合も、パイプラインの構築と通知の
+        評価はサイクルごとに1回のみ行います。
+
+        Args:
+            due (list): 更新が必要なデータソース
+        """
+        # 制限時間は更新サイクルごとに数える
+        run_deadline = RunDeadline(self.deadline)
+        for name in due:
+            if self.stop_event.is_set():
+                break
+            self.refresh_source(name, run_deadline)
+        self.render_if_changed()
+        # 更新サイクルごとに計測結果を出力
+        if self.metrics_dir:
+            metrics.write_json(self.metrics_dir)
+            metrics.write_prometheus(self.metrics_dir)
+            metrics.reset()
+
+    def status(self):
+        """ヘルスチェック用の状態を返す"""
+        def isoformat(value):
+            return value.isoformat() if value is not None else None
+
+        with self.lock:
+            sources = {
+                name: {
+                    'last_refresh': isoformat(state['last_refresh']),
+                    'next_refresh': isoformat(state['next_refresh']),
+                    'rows': state['rows'],
+                    'memory_bytes': self.collector.memory_budget.footprints.get(name, 0),
+                    'error': state['error'],
+                }
+                for name, state in self.state.items()
+            }
+            return {
+                'status': 'ok',
+                'started_at': isoformat(self.started_at),
+                'uptime_seconds': int((datetime.now(timezone.utc) - self.started_at).total_seconds()),
+                'freq': self.freq,
+                'last_render': isoformat(self.last_render),
+                'latest_signal': self.latest_signal,
+                'sources': sources,
+            }
+
+    def start_status_server(self):
+        """ヘルスチェック用のHTTPサーバーを別スレッドで起動"""
+        daemon = self
+
+        class StatusHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/health':
+                    body = {'status': 'ok'}
+                elif self.path == '/status':
+                    body = daemon.status()
+                else:
+                    self.send_error(404)
+                    return
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                # アクセスログは出力しない
+                pass
+
+        server = ThreadingHTTPServer((self.host, self.port), StatusHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        print(f"ステータスサーバーを起動しました: http://{self.host}:{self.port}/status")
+        return server
+
+    def stop(self, *args):
+        """常駐処理を停止"""
+        print("\n停止要求を受信しました")
+        self.stop_event.set()
+
+    def run(self):
+        """常駐処理のメインループ"""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        server = self.start_status_server()
+        self.load_initial_data()
+        self.render_if_changed()
+
+        try:
+            while not self.stop_event.is_set():
+                now = datetime.now(timezone.utc)
+                due = [name for name in self.sources
+                       if self.state[name]['next_refresh'] is None or self.state[name]['next_refresh'] <= now]
+                if due:
+                    self.refresh_due_sources(due)
+
+                # 次に更新が必要になる時刻まで待機
+                next_times = [state['next_refresh'] for state in self.state.values() if state['next_refresh']]
+                wait = min(next_times) - datetime.now(timezone.utc) if next_times else timedelta(0)
+                self.stop_event.wait(min(max(wait.total_seconds(), 1), MAX_SLEEP_SECONDS))
+        finally:
+            server.shutdown()
+            print("常駐処理を終了しました")
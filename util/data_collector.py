@@ -1,59 +1,348 @@
+import os
+from importlib import import_module
 from .collectors.base_collector import BaseCollector
-from .collectors.market_data import MarketDataCollector
-from .collectors.onchain_data import OnchainDataCollector
-from .collectors.derivative_data import DerivativeDataCollector
-from .collectors.sentiment_data import SentimentDataCollector
-from .collectors.exchange_data import ExchangeDataCollector
-from .collectors.etf_data import ETFDataCollector
+from .assets import (DEFAULT_ASSET, ASSET_SOURCES, SHARED_SOURCES, PRICE_COLUMN_FORMAT,
+                     asset_symbol, asset_filename, price_column)
+from .deadline import RunDeadline, DeadlineExceeded, CircuitOpenError, run_with_budget, circuit_breakers
+from .frequency import is_intraday, base_interval_for, resample_ohlcv
+from .metrics import metrics
+from .schema import MemoryBudget, compact_frame
+from .series_store import SeriesStore
+
+# データソース名 -> (コレクター属性名, 取得メソッド名, 保存ファイル名)
+SOURCES = {
+    # 市場データ
+    'btcusd': ('market_collector', 'get_btcusd_data', 'btcusd_ohlcv.csv'),
+    'dxy': ('market_collector', 'get_dxy_data', 'dxy.csv'),
+    'sp500': ('market_collector', 'get_sp500_data', 'sp500.csv'),
+    'gold': ('market_collector', 'get_gold_data', 'gold.csv'),
+    # オンチェーンデータ
+    'large_holders': ('onchain_collector', 'get_large_holders_data', 'large_holders.csv'),
+    'active_addresses': ('onchain_collector', 'get_active_addresses', 'active_addresses.csv'),
+    'hash_rate': ('onchain_collector', 'get_hash_rate', 'hash_rate.csv'),
+    # デリバティブデータ
+    'funding_rates': ('derivative_collector', 'get_funding_rates', 'funding_rates.csv'),
+    'open_interest': ('derivative_collector', 'get_open_interest', 'open_interest.csv'),
+    # センチメントデータ
+    'fear_greed': ('sentiment_collector', 'get_fear_greed_index', 'fear_greed.csv'),
+    'google_trends': ('sentiment_collector', 'get_google_trends_data', 'google_trends.csv'),
+    # 取引所データ
+    'trading_volume': ('market_collector', 'get_trading_volume', 'btcusd_ohlcv.csv'),
+    'coinbase_premium': ('exchange_collector', 'get_coinbase_premium', 'coinbase_premium.csv'),
+    # ETFデータ
+    'etf': ('etf_collector', 'get_etf_data', 'etf.csv'),
+}
+
+# コレクター属性名 -> (モジュール, クラス名, 資産ごとのデータを扱うかどうか)
+# 初回の使用時に作成するため、保存済みデータのみを使う実行ではデータ取得用の
+# ライブラリ（yfinance、pytrendsなど）を読み込まず、コレクターも作成しない
+COLLECTORS = {
+    'market_collector': ('.collectors.market_data', 'MarketDataCollector', True),
+    'onchain_collector': ('.collectors.onchain_data', 'OnchainDataCollector', False),
+    'derivative_collector': ('.collectors.derivative_data', 'DerivativeDataCollector', True),
+    'sentiment_collector': ('.collectors.sentiment_data', 'SentimentDataCollector', False),
+    'exchange_collector': ('.collectors.exchange_data', 'ExchangeDataCollector', True),
+    'etf_collector': ('.collectors.etf_data', 'ETFDataCollector', False),
+}
+
+# 共有データセットから列を切り出すデータソース -> {元の列名: 列名（{asset}は資産名に置き換え）}
+SOURCE_COLUMNS = {
+    'btcusd': {'Close': PRICE_COLUMN_FORMAT},
+    'trading_volume': {'Volume': 'Trading Volume'},
+}
+
+# 日中足の指定時に時間足で取得するデータソース -> (コレクター属性名, 取得メソッド名, 足の間隔, 保存ファイル名)
+HOURLY_SOURCES = {
+    'coinbase_premium': ('exchange_collector', 'get_coinbase_premium', '1h', 'coinbase_premium_1h.csv'),
+}
+
+def available_sources(asset=DEFAULT_ASSET):
+    """資産で利用できるデータソース名
+
+    BTCは全てのデータソース、その他の資産は資産ごとのデータソース（価格・取引量・
+    デリバティブ・コインベースプレミアム）と全資産で共有するデータソースを使用します。
+    """
+    if asset == DEFAULT_ASSET:
+        return list(SOURCES)
+    names = [name for name in SOURCES if name in ASSET_SOURCES or name in SHARED_SOURCES]
+    if asset_symbol(asset, 'coinbase') is None:
+        names.remove('coinbase_premium')
+    return names
+
+def needs_full_history(windows):
+    """期間別のグラフに全期間（'all'）が含まれるかどうか"""
+    return bool(windows) and any(days is None for days in windows.values())
 
 class DataCollector(BaseCollector):
-    def __init__(self):
-        super().__init__()
-        self.market_collector = MarketDataCollector()
-        self.onchain_collector = OnchainDataCollector()
-        self.derivative_collector = DerivativeDataCollector()
-        self.sentiment_collector = SentimentDataCollector()
-        self.exchange_collector = ExchangeDataCollector()
-        self.etf_collector = ETFDataCollector()
-
-    def collect_all_data(self):
-        """全てのデータを収集します。"""
+    def __init__(self, lookback_days=365, memory_budget=None, asset=DEFAULT_ASSET, full_history=False):
+        super().__init__(lookback_days, asset)
+        # 保存済みデータを取得期間で切り出さずに全期間を使用するか（期間別のグラフの 'all' 用）
+        self.full_history = full_history
+        # 読み込んだデータのメモリ使用量（memory_budgetはバイト数、Noneの場合は無制限）
+        self.memory_budget = MemoryBudget(memory_budget)
+        self.store = SeriesStore(os.path.join(self.base_path, 'store'))
+        self.sources = available_sources(asset)
+
+    def __getattr__(self, name):
+        """コレクター（market_collector など）を初回の参照時に作成"""
+        if name not in COLLECTORS:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        module, class_name, per_asset = COLLECTORS[name]
+        collector_class = getattr(import_module(module, __package__), class_name)
+        if per_asset:
+            collector = collector_class(self.lookback_days, self.asset)
+        else:
+            collector = collector_class(self.lookback_days)
+        if self.resident_frames is not None:
+            collector.keep_frames_in_memory()
+        setattr(self, name, collector)
+        return collector
+
+    def created_collectors(self):
+        """作成済みのコレクター"""
+        return [self.__dict__[name] for name in COLLECTORS if name in self.__dict__]
+
+    def _select_sources(self, sources):
+        """対象のデータソース名を検証して返す（資産で利用できないデータソースは除外）"""
+        if sources is None:
+            return list(self.sources)
+        unknown = [name for name in sources if name not in SOURCES]
+        if unknown:
+            raise ValueError(f"不明なデータソース: {', '.join(unknown)}（指定可能: {', '.join(SOURCES)}）")
+        return [name for name in self.sources if name in sources]
+
+    def source_filename(self, name, freq='1d'):
+        """データソースの保存ファイル名（資産と頻度に応じたもの）"""
+        if name == 'btcusd' and is_intraday(freq):
+            # 日中足は取得元の足（1分足または1時間足）のファイル
+            filename = f'btcusd_{base_interval_for(freq)}.csv'
+        elif name in HOURLY_SOURCES and is_intraday(freq):
+            filename = HOURLY_SOURCES[name][3]
+        else:
+            filename = SOURCES[name][2]
+        return asset_filename(filename, self.asset) if name in ASSET_SOURCES else filename
+
+    def source_columns(self, name):
+        """共有データセットから切り出す列 {元の列名: 列名}（対象外のデータソースはNone）"""
+        if name not in SOURCE_COLUMNS:
+            return None
+        return {source: column.format(asset=self.asset) for source, column in SOURCE_COLUMNS[name].items()}
+
+    def collect_all_data(self, sources=None, freq='1d', deadline=None):
+        """全てのデータを収集します。
+
+        Args:
+            sources (list): 収集するデータソース名のリスト（None の場合は全て）
+            freq (str): BTCUSD価格データの頻度（'1d' 以外は日中足、HOURLY_SOURCESは時間足を取得）
+            deadline (float): 収集全体の秒数（None の場合はデータソースごとの上限のみ）。
+                期限を過ぎた後のデータソースは取得せず保存済みデータを使用します
+        """
+        names = self._select_sources(sources)
+        run_deadline = RunDeadline(deadline)
         results = {}
         print("="*50)
         print("データ収集を開始...")
         print(f"期間: {self.start_date.strftime('%Y-%m-%d')} から {self.end_date.strftime('%Y-%m-%d')}")
+        if deadline is not None:
+            print(f"収集の期限: {deadline:.0f}秒")
         print("="*50)
-        
-        # 市場データ
-        results['btcusd'] = self.market_collector.get_btcusd_data()
-        results['dxy'] = self.market_collector.get_dxy_data()
-        results['sp500'] = self.market_collector.get_sp500_data()
-        results['gold'] = self.market_collector.get_gold_data()
-        
-        # オンチェーンデータ
-        results['large_holders'] = self.onchain_collector.get_large_holders_data()
-        results['active_addresses'] = self.onchain_collector.get_active_addresses()
-        results['hash_rate'] = self.onchain_collector.get_hash_rate()
-        
-        # デリバティブデータ
-        results['funding_rates'] = self.derivative_collector.get_funding_rates()
-        results['open_interest'] = self.derivative_collector.get_open_interest()
-        
-        # センチメントデータ
-        results['fear_greed'] = self.sentiment_collector.get_fear_greed_index()
-        results['google_trends'] = self.sentiment_collector.get_google_trends_data()
-        
-        # 取引所データ
-        results['trading_volume'] = self.exchange_collector.get_trading_volume()
-        results['coinbase_premium'] = self.exchange_collector.get_coinbase_premium()
-        
-        # ETFデータ
-        results['etf'] = self.etf_collector.get_etf_data()
-        
+
+        for name in names:
+            results[name] = self.collect_source(name, freq, run_deadline)
+
         success_count = sum(1 for v in results.values() if v is not None)
+        stale_count = sum(1 for v in results.values() if v is not None and 'stale' in v.attrs)
         total_count = len(results)
-        
+
         print("\n" + "="*50)
-        print(f"データ収集完了: {success_count}/{total_count} 成功")
+        print(f"データ収集完了: {success_count}/{total_count} 成功"
+              + (f"（うち{stale_count}件は保存済みデータ）" if stale_count else ""))
         print("="*50)
-        return results if success_count > 0 else None
\ No newline at end of file
+        return results if success_count > 0 else None
+
+    def collect_source(self, name, freq='1d', deadline=None):
+        """指定したデータソースを1つ収集します。
+
+        取得はデータソースごとの取得時間（SOURCE_BUDGETS と実行全体の期限の残り）の範囲で
+        行い、時間切れ・失敗・サーキットブレーカーによる停止の場合は保存済みデータに
+        切り替えます。保存済みデータには attrs['stale'] に最終時刻を記録し、グラフの
+        パネルに表示します。
+
+        Args:
+            name (str): データソース名
+            freq (str): BTCUSD価格データの頻度（'1d' 以外は日中足、HOURLY_SOURCESは時間足を取得）
+            deadline (RunDeadline): 実行全体の期限（None の場合はデータソースごとの上限のみ）
+
+        Returns:
+            pd.DataFrame: コンパクトな型に変換したデータ（取得失敗時かつ保存済みデータがない場合はNone）
+
+        Raises:
+            MemoryError: 読み込んだデータの合計がメモリ予算を超えた場合
+        """
+        with metrics.stage(f'collect.{name}'):
+            budget = (deadline or RunDeadline()).budget_for(name)
+            df = None
+            try:
+                df = run_with_budget(lambda: self._fetch_source(name, freq), budget)
+                failure = budget.failures[-1] if budget.failures else None
+                if df is None and failure is None:
+                    failure = 'データが取得できませんでした'
+            except DeadlineExceeded as e:
+                # 応答待ちのまま打ち切ったホストも失敗として記録
+                if budget.host and budget.cancelled:
+                    circuit_breakers.record_failure(budget.host)
+                failure = str(e)
+            except CircuitOpenError as e:
+                failure = str(e)
+
+            if failure is not None:
+                df = self.load_stale_data(name, freq, failure)
+            df = compact_frame(df)
+            self.memory_budget.add(name, df)
+            return df
+
+    def _fetch_source(self, name, freq):
+        """データソースを取得元から取得（取得時間の範囲で実行）"""
+        if name == 'btcusd' and is_intraday(freq):
+            return self.get_btcusd_intraday_data(freq)
+        if name in HOURLY_SOURCES and is_intraday(freq):
+            collector_attr, method_name, interval, _ = HOURLY_SOURCES[name]
+            return getattr(getattr(self, collector_attr), method_name)(interval)
+        collector_attr, method_name, _ = SOURCES[name]
+        return getattr(getattr(self, collector_attr), method_name)()
+
+    def load_stale_data(self, name, freq, reason):
+        """取得できなかったデータソースの保存済みデータを読み込み、最終時刻を記録
+
+        Args:
+            name (str): データソース名
+            freq (str): 頻度
+            reason (str): 保存済みデータを使用する理由（表示用）
+
+        Returns:
+            pd.DataFrame: attrs['stale'] に最終時刻を記録したデータ（保存済みデータがない場合はNone）
+        """
+        df = self.load_source(name, freq)
+        if df is None or df.empty:
+            print(f"✗ {name}: {reason}（保存済みデータもありません）")
+            return None
+        last = df.index[-1].strftime('%Y-%m-%d %H:%M')
+        print(f"✗ {name}: {reason} - 保存済みデータ（最終: {last}）を使用します")
+        metrics.increment('stale_sources')
+        df = df.copy(deep=False)
+        df.attrs['stale'] = last
+        return df
+
+    def reset_period(self):
+        """全コレクターの取得期間を現在時刻基準で再計算"""
+        super().reset_period()
+        for collector in self.created_collectors():
+            collector.reset_period()
+
+    def keep_frames_in_memory(self):
+        """全コレクターで読み込み・保存したデータをメモリ上に保持する（常駐実行用）"""
+        super().keep_frames_in_memory()
+        for collector in self.created_collectors():
+            collector.keep_frames_in_memory()
+
+    def load_stored_data(self, sources=None, freq='1d'):
+        """保存済みのCSVからデータを読み込みます（ネットワークアクセスなし）。
+
+        Args:
+            sources (list): 読み込むデータソース名のリスト（None の場合は全て）
+            freq (str): BTCUSD価格データの頻度（'1d' 以外は日中足、HOURLY_SOURCESは時間足を読み込む）
+
+        Raises:
+            MemoryError: 読み込んだデータの合計がメモリ予算を超えた場合
+        """
+        results = {}
+        for name in self._select_sources(sources):
+            with metrics.stage(f'load.{name}'):
+                df = self.load_source(name, freq)
+                self.memory_budget.add(name, df)
+                results[name] = df
+
+        loaded_count = sum(1 for v in results.values() if v is not None)
+        print(f"保存済みデータの読み込み: {loaded_count}/{len(results)} 件")
+        return results if loaded_count > 0 else None
+
+    def load_source(self, name, freq='1d'):
+        """保存済みのデータソースを1つ読み込む（取得期間の開始日以降、ネットワークアクセスなし）"""
+        if name == 'btcusd' and is_intraday(freq):
+            return self.get_btcusd_intraday_data(freq, offline=True)
+        filename = self.source_filename(name, freq)
+        # 未作成のコレクターはメモリ上のデータを持たないため、読み込みのために作成しない
+        collector = self.__dict__.get(SOURCES[name][0])
+        frames = collector.resident_frames if collector is not None else None
+        if frames is not None and frames.get(filename) is not None:
+            # 常駐実行時はメモリ上のデータを使用（CSVを読み込み直さない）
+            df = self.since_start(compact_frame(frames[filename]))
+        else:
+            df = self.since_start(self.load_dataset(filename))
+        columns = self.source_columns(name)
+        if df is not None and columns:
+            df = df[list(columns)].rename(columns=columns)
+        return df
+
+    def load_dataset(self, filename):
+        """保存済みデータをメモリマップのストア経由で読み込みます。
+
+        ストアがCSVより古い場合（または存在しない場合）はCSVを読み込んで
+        ストアを作り直します。返すデータはファイルを参照する読み取り専用のビューです。
+
+        Args:
+            filename (str): CSVファイル名（拡張子を除いた名前をストアのデータセット名に使用）
+
+        Returns:
+            pd.DataFrame: コンパクトな型のデータ（保存済みデータがない場合はNone）
+        """
+        name = os.path.splitext(filename)[0]
+        source_path = os.path.join(self.base_path, filename)
+        if self.store.is_fresh(name, source_path):
+            df = self.store.open(name)
+            if df is not None:
+                return df
+
+        df = self.load_existing_data(filename, compact=True)
+        if df is None:
+            return None
+        # Googleトレンドは保存時に付加した'date'列を除外
+        df = df.drop(columns='date', errors='ignore')
+        try:
+            self.store.write(name, df, source_path)
+        except Exception as e:
+            print(f"ストアへの保存に失敗: {str(e)}")
+            return df
+        return self.store.open(name)
+
+    def since_start(self, df):
+        """取得期間の開始日以降のデータを返す（コピーせずにビューとして切り出す）"""
+        if df is None or self.full_history:
+            return df
+        return df.iloc[df.index.searchsorted(self.start_date):]
+
+    def get_btcusd_intraday_data(self, freq, offline=False):
+        """資産（デフォルト: BTC）の日中足を指定頻度で取得します。
+
+        取得元の足（1分足または1時間足）を収集し、より粗い頻度が指定された場合は
+        リサンプリングして作成します。
+
+        Args:
+            freq (str): 頻度（例: '1m', '15m', '1h', '4h'）
+            offline (bool): 保存済みデータのみを使用するかどうか
+
+        Returns:
+            pd.DataFrame: OHLCVと価格の列（'BTCUSD Price' など、終値）を含むデータ
+        """
+        interval = base_interval_for(freq)
+        if offline:
+            bars = self.since_start(self.load_dataset(self.source_filename('btcusd', freq)))
+        else:
+            bars = self.market_collector.get_btcusd_bars(interval)
+
+        if bars is None or bars.empty:
+            return None
+        if freq != interval:
+            bars = resample_ohlcv(bars, freq)
+
+        return bars.assign(**{price_column(self.asset): bars['Close']})
@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime, timedelta
+from .metrics import metrics
+
+# 1リクエストのタイムアウト（秒）: (接続, 応答の読み込み)
+HTTP_TIMEOUT = (10, 30)
+
+# データソースごとの取得時間の上限（秒、実行全体の期限の残り時間が短い場合はそちらを優先）
+SOURCE_BUDGETS = {
+    # 日中足やバックフィルはページ数が多いため長めに設定
+    'btcusd': 300,
+    'large_holders': 300,
+    # Googleトレンドはレート制限のため1チャンクごとに待機が入る
+    'google_trends': 300,
+}
+
+# SOURCE_BUDGETSにないデータソースの取得時間の上限（秒）
+DEFAULT_SOURCE_BUDGET = 120
+
+# サーキットブレーカーの状態の保存先（実行をまたいで保持）
+CIRCUIT_BREAKER_PATH = 'market_data/checkpoints/circuit_breakers.json'
+
+# 連続してこの回数失敗したホストへのリクエストを停止する
+CIRCUIT_FAILURE_THRESHOLD = 3
+
+# 停止する期間（停止後も失敗が続く場合は倍に延長し、上限で打ち切る）
+CIRCUIT_BASE_COOLDOWN = timedelta(minutes=15)
+CIRCUIT_MAX_COOLDOWN = timedelta(hours=6)
+
+class DeadlineExceeded(Exception):
+    """取得時間の上限を超えた"""
+
+class CircuitOpenError(Exception):
+    """失敗が続いているホストへのリクエストを停止中"""
+
+class SourceBudget:
+    """1つのデータソースの取得に使える時間
+
+    取得を実行するスレッドに紐付け（current_budget で参照）、リクエストのタイムアウトと
+    再試行の待機を残り時間に収めます。打ち切られた取得は次のリクエストの前に停止します。
+
+    Args:
+        name (str): データソース名
+        seconds (float): 取得に使える秒数
+    """
+
+    def __init__(self, name, seconds):
+        self.name = name
+        self.seconds = max(seconds, 0)
+        self.expires_at = time.monotonic() + self.seconds
+        self.cancelled = False
+        # 最後にリクエストを送信したホスト（打ち切り時にサーキットブレーカーに記録）
+        self.host = None
+        # 取得中に発生した失敗（呼び出し側で保存済みデータへの切り替えに使用）
+        self.failures = []
+
+    def remaining(self):
+        """残り秒数"""
+        return max(self.expires_at - time.monotonic(), 0)
+
+    def check(self):
+        """時間切れまたは打ち切り済みの場合に DeadlineExceeded を送出"""
+        if self.cancelled or self.remaining() <= 0:
+            raise DeadlineExceeded(f"取得時間の上限（{self.seconds:.0f}秒）を超えました")
+
+    def timeout(self, timeout=HTTP_TIMEOUT):
+        """リクエストのタイムアウトを残り時間までに制限"""
+        remaining = self.remaining()
+        if isinstance(timeout, tuple):
+            return tuple(min(value, remaining) for value in timeout)
+        return min(timeout, remaining) if timeout is not None else remaining
+
+    def sleep(self, seconds):
+        """残り時間の範囲で待機（待機後に時間切れなら DeadlineExceeded）"""
+        time.sleep(min(seconds, self.remaining()))
+        self.check()
+
+_local = threading.local()
+
+def current_budget():
+    """現在のスレッドの取得時間（取得の外では None）"""
+    return getattr(_local, 'budget', None)
+
+def with_budget(budget, func):
+    """別スレッドでも同じ取得時間を使うよう func をラップ（スレッドプール用）"""
+    def wrapper(*args, **kwargs):
+        previous = current_budget()
+        _local.budget = budget
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.budget = previous
+    return wrapper
+
+def run_with_budget(func, budget):
+    """取得時間の範囲で func を実行
+
+    func は専用のスレッドで実行し、時間内に終わらない場合は待たずに DeadlineExceeded を
+    送出します。HTTPのタイムアウトが効かない処理（DNSの解決や外部ライブラリ内部の待機）で
+    止まっても、呼び出し側は時間どおりに次の処理へ進めます。残されたスレッドは
+    打ち切りを検知して次のリクエストの前に終了します。計測（カウンターとプロファイル）は
+    呼び出し元で実行中のステージに含めます。
+
+    Args:
+        func (callable): 引数なしの関数
+        budget (SourceBudget): 取得時間
+
+    Returns:
+        func の戻り値
+    """
+    budget.check()
+    outcome = {}
+    bound = metrics.bind(func)
+
+    def target():
+        try:
+            outcome['result'] = with_budget(budget, bound)()
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, name=f'collect-{budget.name}', daemon=True)
+    thread.start()
+    thread.join(budget.remaining())
+    if thread.is_alive():
+        budget.cancelled = True
+        raise DeadlineExceeded(f"取得時間の上限（{budget.seconds:.0f}秒）を超えたため打ち切りました")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome.get('result')
+
+class RunDeadline:
+    """実行全体の期限と、データソースごとの取得時間の割り当て
+
+    Args:
+        seconds (float): 実行全体の秒数（None の場合はデータソースごとの上限のみ）
+    """
+
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+
+    def remaining(self):
+        """残り秒数（期限なしの場合は None）"""
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0)
+
+    def budget_for(self, name):
+        """データソースの取得時間（上限と期限の残り時間の短い方）"""
+        seconds = SOURCE_BUDGETS.get(name, DEFAULT_SOURCE_BUDGET)
+        remaining = self.remaining()
+        if remaining is not None:
+            seconds = min(seconds, remaining)
+        return SourceBudget(name, seconds)
+
+class CircuitBreakers:
+    """ホストごとのサーキットブレーカー（状態は実行をまたいでファイルに保持）
+
+    連続して失敗したホストへのリクエストを一定期間停止し、停止中は通信せずに
+    CircuitOpenError を送出します。停止期間の経過後は1回だけ試行し、成功すれば
+    通常の状態に戻り、失敗すれば停止期間を倍にして再び停止します。
+
+    Args:
+        path (str): 状態の保存先
+    """
+
+    def __init__(self, path=CIRCUIT_BREAKER_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"サーキットブレーカーの状態の読み込みに失敗: {str(e)}")
+            return {}
+
+    def _save(self, states):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # 複数プロセスが同時に保存しても壊れないようプロセスごとの一時ファイルを使用
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(states, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def check(self, host):
+        """ホストへのリクエストが停止中の場合に CircuitOpenError を送出"""
+        with self.lock:
+            state = self._load().get(host)
+        if state and state.get('open_until'):
+            open_until = datetime.fromisoformat(state['open_until'])
+            if datetime.now() < open_until:
+                raise CircuitOpenError(
+                    f"{host} は{state['failures']}回連続で失敗したため {open_until:%Y-%m-%d %H:%M} まで停止中です")
+
+    def record_success(self, host):
+        """成功を記録（失敗の履歴を消去）"""
+        with self.lock:
+            states = self._load()
+            if states.pop(host, None) is not None:
+                self._save(states)
+                print(f"✓ {host} への接続が回復しました")
+
+    def record_failure(self, host):
+        """失敗を記録（連続失敗が閾値に達した場合は停止）"""
+        with self.lock:
+            states = self._load()
+            state = states.setdefault(host, {'failures': 0, 'open_until': None})
+            state['failures'] += 1
+            excess = state['failures'] - CIRCUIT_FAILURE_THRESHOLD
+            if excess >= 0:
+                cooldown = min(CIRCUIT_BASE_COOLDOWN * 2 ** excess, CIRCUIT_MAX_COOLDOWN)
+                open_until = datetime.now() + cooldown
+                state['open_until'] = open_until.isoformat(timespec='seconds')
+                print(f"✗ {host} への接続が{state['failures']}回連続で失敗したため "
+                      f"{open_until:%Y-%m-%d %H:%M} まで停止します")
+            self._save(states)
+
+# 全コレクターで共有するサーキットブレーカー
+circuit_breakers = CircuitBreakers()
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+# 指定可能な頻度 -> pandasの頻度文字列
+FREQUENCIES = {
+    '1m': '1min',
+    '5m': '5min',
+    '15m': '15min',
+    '30m': '30min',
+    '1h': '1h',
+    '4h': '4h',
+    '1d': '1D'
+}
+
+# 取得元となる足（これより粗い頻度はリサンプリングで作成）
+BASE_INTERVALS = ['1m', '1h']
+
+# マルチタイムフレームの階層: 足 -> (期間（pandasのPeriodの頻度）, 作成元の足（None は基準の系列）)
+# 週は月をまたぐため、月足は週足ではなく日足から作成する
+TIMEFRAME_LEVELS = {
+    '1d': ('D', None),
+    '1w': ('W-SUN', '1d'),
+    '1M': ('M', '1d'),
+}
+
+# OHLCVのリサンプリング方法
+OHLCV_AGGREGATION = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Volume': 'sum'
+}
+
+def to_timedelta(freq):
+    """頻度指定をTimedeltaに変換"""
+    if freq not in FREQUENCIES:
+        raise ValueError(f"不明な頻度: {freq}（指定可能: {', '.join(FREQUENCIES)}）")
+    return pd.Timedelta(FREQUENCIES[freq])
+
+def is_intraday(freq):
+    """日足より細かい頻度かどうか"""
+    return to_timedelta(freq) < pd.Timedelta(days=1)
+
+def base_interval_for(freq):
+    """指定頻度を作成するために取得する元の足を返す"""
+    delta = to_timedelta(freq)
+    for interval in reversed(BASE_INTERVALS):
+        base = to_timedelta(interval)
+        if delta >= base and delta % base == pd.Timedelta(0):
+            return interval
+    return BASE_INTERVALS[0]
+
+def resample_ohlcv(df, freq):
+    """OHLCVデータを粗い頻度にリサンプリング
+
+    Args:
+        df (pd.DataFrame): Open/High/Low/Close/Volumeを含むデータ
+        freq (str): リサンプリング先の頻度（例: '4h', '1d'）
+
+    Returns:
+        pd.DataFrame: リサンプリング後のデータ（取引のない足は除外）
+    """
+    aggregation = {col: how for col, how in OHLCV_AGGREGATION.items() if col in df.columns}
+    resampled = df.resample(FREQUENCIES[freq], label='left', closed='left').agg(aggregation)
+    return resampled.dropna(subset=['Close'] if 'Close' in resampled.columns else None)
+
+def resample_last(data, freq):
+    """価格などの時系列を各足の最終値でリサンプリング"""
+    return data.resample(FREQUENCIES[freq], label='left', closed='left').last().dropna(how='all')
+
+def cascade_resample(data, levels=TIMEFRAME_LEVELS):
+    """基準の系列から上位の足を順に作成（日足 -> 週足・月足）
+
+    各足は作成元の足の最終値で、インデックスはその足で最後に観測された時刻です。
+    上位の足は基準の系列ではなく作成済みの下位の足から作るため、行数の多い
+    日中足を走査するのは日足を作る1回のみです。足の終了時刻ではなく最後の観測時刻を
+    使うため、as-of結合すると各時点ではその時点までに確定した値のみを参照します。
+
+    Args:
+        data (pd.Series): 価格などの時系列（インデックスは昇順）
+        levels (dict): 足 -> (期間, 作成元の足)（作成元の足を先に定義する）
+
+    Returns:
+        dict: 足 -> その足の系列
+    """
+    pyramid = {}
+    for level, (period, parent) in levels.items():
+        source = data if parent is None else pyramid[parent]
+        periods = source.index.to_period(period)
+        # 期間が切り替わる直前の行（各期間の最後の観測）を選ぶ
+        last = np.append(periods[1:] != periods[:-1], True) if len(source) else np.array([], dtype=bool)
+        pyramid[level] = source[last]
+    return pyramid
+
+def infer_is_intraday(index):
+    """インデックスの間隔から日中足データかどうかを判定"""
+    if len(index) < 2:
+        return False
+    return pd.Series(index).diff().median() < pd.Timedelta(days=1)
@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import resource
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# ステージごとに集計するカウンター
+COUNTERS = [
+    'requests',
+    'bytes_transferred',
+    'retries',
+    'cache_hits',
+    'rows_added',
+    'storage_read_seconds',
+    'storage_write_seconds',
+    'stale_sources',
+    'alerts_sent'
+]
+
+# 実行全体の集計（ステージの外で加算したカウンターも含む）を記録するステージ名
+RUN_STAGE = 'run'
+
+# Prometheusのメトリクス名 -> (ステージ記録のキー, 説明)
+# 値は実行（常駐実行では更新サイクル）ごとに初期化されるため、単調増加のcounterではなく
+# gaugeとして出力し、counterを表す _total の接尾辞は付けない
+PROMETHEUS_METRICS = {
+    'analyzer_stage_calls': ('calls', 'Number of times the stage ran in the last run'),
+    'analyzer_stage_duration_seconds': ('wall_seconds', 'Wall time spent in the stage'),
+    'analyzer_stage_peak_memory_bytes': ('peak_memory_bytes', 'Peak traced memory above the stage start'),
+    'analyzer_stage_requests': ('requests', 'HTTP/API requests issued in the last run'),
+    'analyzer_stage_bytes_transferred': ('bytes_transferred', 'Response bytes received in the last run'),
+    'analyzer_stage_retries': ('retries', 'Retried requests in the last run'),
+    'analyzer_stage_cache_hits': ('cache_hits', 'Requests avoided by stored data or checkpoints in the last run'),
+    'analyzer_stage_rows_added': ('rows_added', 'Rows added to stored datasets in the last run'),
+    'analyzer_stage_storage_read_seconds': ('storage_read_seconds', 'Time spent reading stored datasets'),
+    'analyzer_stage_storage_write_seconds': ('storage_write_seconds', 'Time spent writing stored datasets'),
+    'analyzer_stage_stale_sources': ('stale_sources', 'Sources that fell back to stored data in the last run'),
+    'analyzer_stage_alerts_sent': ('alerts_sent', 'Signal transition events delivered to alert sinks in the last run'),
+}
+
+def new_record():
+    """ステージの計測値の初期値"""
+    return {
+        'calls': 0,
+        'wall_seconds': 0.0,
+        'peak_memory_bytes': 0,
+        **{counter: 0 for counter in COUNTERS}
+    }
+
+class RunMetrics:
+    """実行ステージごとの計測値（時間・リクエスト数・転送量・メモリなど）を集計する"""
+
+    def __init__(self):
+        self.listeners = []
+        self.track_memory = False
+        # 実行中のステージはスレッドごとに保持（取得は別スレッドで実行されるため）
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        """計測値を初期化"""
+        self.started_at = datetime.now(timezone.utc)
+        # 実行全体の集計を先頭に置き、ステージの外で加算したカウンターも失わないようにする
+        self.stages = {RUN_STAGE: {**new_record(), 'calls': 1}}
+        self._local.stack = []
+
+    @property
+    def _stack(self):
+        """現在のスレッドで実行中のステージ"""
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def enable_memory_tracking(self):
+        """tracemallocによるステージごとのピークメモリ計測を有効化（--trace-memory 指定時のみ）
+
+        全てのメモリ割り当てを追跡するため実行が遅くなります。
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.track_memory = True
+
+    def add_listener(self, listener):
+        """ステージの開始・終了を通知するリスナーを追加
+
+        リスナーは on_stage_start(name) と on_stage_end(name) を実装します。
+        """
+        self.listeners.append(listener)
+
+    @contextmanager
+    def stage(self, name):
+        """ステージの計測を行うコンテキストマネージャ
+
+        ステージは入れ子にでき、時間やカウンターは外側のステージにも含まれます。
+
+        Args:
+            name (str): ステージ名（例: 'collect.btcusd', 'plot.savefig'）
+        """
+        record = self.stages.setdefault(name, new_record())
+        frame = {'name': name, 'base': 0, 'peak': 0}
+        if self.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # 外側のステージのピークを退避してから計測をリセット
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            frame['base'] = frame['peak'] = current
+        self._stack.append(frame)
+        for listener in self.listeners:
+            listener.on_stage_start(name)
+
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['wall_seconds'] += time.perf_counter() - start
+            record['calls'] += 1
+            for listener in reversed(self.listeners):
+                listener.on_stage_end(name)
+            self._stack.remove(frame)
+            if self.track_memory:
+                peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                record['peak_memory_bytes'] = max(record['peak_memory_bytes'], peak - frame['base'])
+                if self._stack:
+                    self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+
+    def bind(self, func):
+        """呼び出し元で実行中のステージの中で func を実行するようラップ（別スレッド用）
+
+        別スレッドでもカウンターを同じステージに加算し、リスナーにはそのスレッドで
+        最も内側のステージの開始・終了を通知します（プロファイラーがスレッドを計測するため）。
+        """
+        frames = list(self._stack)
+
+        def wrapper(*args, **kwargs):
+            previous = self._local.__dict__.get('stack')
+            self._local.stack = list(frames)
+            name = frames[-1]['name'] if frames else None
+            if name is not None:
+                for listener in self.listeners:
+                    listener.on_stage_start(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                if name is not None:
+                    for listener in reversed(self.listeners):
+                        listener.on_stage_end(name)
+                self._local.stack = previous if previous is not None else []
+        return wrapper
+
+    def increment(self, counter, value=1):
+        """実行全体と実行中の全ステージのカウンターを加算"""
+        self.stages[RUN_STAGE][counter] += value
+        for frame in self._stack:
+            self.stages[frame['name']][counter] += value
+
+    def merge(self, stages):
+        """別プロセス（資産ごとのワーカー）で計測したステージの記録を加算
+
+        実行全体のカウンターは実行中のステージにも加算し、時間は各プロセスの実行時間を
+        含めないよう実行全体以外のステージのみ加算します。
+
+        Args:
+            stages (dict): ワーカーの RunMetrics.stages
+        """
+        for name, record in stages.items():
+            if name == RUN_STAGE:
+                for counter in COUNTERS:
+                    if record[counter]:
+                        self.increment(counter, record[counter])
+                continue
+            target = self.stages.setdefault(name, new_record())
+            target['calls'] += record['calls']
+            target['wall_seconds'] += record['wall_seconds']
+            target['peak_memory_bytes'] = max(target['peak_memory_bytes'], record['peak_memory_bytes'])
+            for counter in COUNTERS:
+                target[counter] += record[counter]
+
+    def report(self):
+        """実行レポートを辞書で返す"""
+        wall_seconds = (datetime.now(timezone.utc) - self.started_at).total_seconds()
+        self.stages[RUN_STAGE]['wall_seconds'] = wall_seconds
+        return {
+            'started_at': self.started_at.isoformat(),
+            'finished_at': datetime.now(timezone.utc).isoformat(),
+            'wall_seconds': wall_seconds,
+            # ru_maxrssはLinuxではKB単位
+            'max_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            'stages': self.stages
+        }
+
+    def write_json(self, directory):
+        """実行レポートをJSONで保存（実行ごとに別ファイル）"""
+        os.makedirs(directory, exist_ok=True)
+        filepath = os.path.join(directory, f"run_{self.started_at.strftime('%Y%m%dT%H%M%SZ')}.json")
+        with open(filepath, 'w') as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+        return filepath
+
+    def write_prometheus(self, directory, filename='analyzer.prom'):
+        """node_exporterのtextfileコレクター形式で保存（同じファイルを上書き）"""
+        os.makedirs(directory, exist_ok=True)
+        report = self.report()
+        lines = []
+        for metric, (key, description) in PROMETHEUS_METRICS.items():
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} gauge')
+            for stage_name, record in self.stages.items():
+                lines.append(f'{metric}{{stage="{stage_name}"}} {record[key]}')
+        lines.append('# HELP analyzer_run_duration_seconds Wall time of the whole run')
+        lines.append('# TYPE analyzer_run_duration_seconds gauge')
+        lines.append(f"analyzer_run_duration_seconds {report['wall_seconds']}")
+        lines.append('# HELP analyzer_run_max_rss_bytes Peak resident set size of the process')
+        lines.append('# TYPE analyzer_run_max_rss_bytes gauge')
+        lines.append(f"analyzer_run_max_rss_bytes {report['max_rss_bytes']}")
+        lines.append('# HELP analyzer_run_timestamp_seconds Unix time the run finished')
+        lines.append('# TYPE analyzer_run_timestamp_seconds gauge')
+        lines.append(f'analyzer_run_timestamp_seconds {time.time()}')
+
+        # 収集途中のファイルを読まれないよう一時ファイル経由で置き換える
+        filepath = os.path.join(directory, filename)
+        tmp_path = f'{filepath}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, filepath)
+        return filepath
+
+    def print_summary(self):
+        """ステージごとの計測結果を表示"""
+        print("\n" + "="*50)
+        print("ステージ別の計測結果")
+        print("="*50)
+        for name, record in self.report()['stages'].items():
+            print(f"{name:<32} {record['wall_seconds']:8.2f}s "
+                  f"req={record['requests']} bytes={record['bytes_transferred']:,} "
+                  f"retry={record['retries']} cache={record['cache_hits']} rows+={record['rows_added']} "
+                  f"peak={record['peak_memory_bytes'] / 1024 / 1024:.1f}MB")
+
+# 実行全体で共有する計測インスタンス
+metrics = RunMetrics()
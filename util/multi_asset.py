@@ -0,0 +1,209 @@
+import os
+import time
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .alerts import evaluate_alerts
+from .assets import SHARED_SOURCES
+from .data_collector import DataCollector, needs_full_history
+from .metrics import metrics
+from .pipeline import ArtifactCache, build_analysis_pipeline, write_composite
+from .plot_market_data import SIGNAL_LABELS
+from .snapshot import write_snapshot
+
+# 資産別のレポートと資産横断のサマリーの出力先
+REPORT_DIR = 'reports'
+
+# 資産横断のサマリーのファイル名
+SUMMARY_FILENAME = 'signal_summary.csv'
+
+# サマリーの価格変化率の期間（日数）
+SUMMARY_CHANGE_DAYS = 30
+
+def collect_shared_sources(lookback_days, freq='1d', offline=False, only=None, deadline=None):
+    """全資産で共有するデータソースを1回だけ収集し、ストアを最新の状態にする
+
+    各資産のワーカーは共有データソースをストアからメモリマップで読み込むため、
+    同じデータをネットワークから重複して取得せず、メモリもプロセス間で共有されます。
+
+    Args:
+        lookback_days (int): 取得期間（日数）
+        freq (str): BTCUSD価格データの頻度
+        offline (bool): 保存済みデータのみを使用するかどうか
+        only (list): 収集するデータソース名（None の場合は全て）
+        deadline (float): 収集の制限時間（秒）
+    """
+    collector = DataCollector(lookback_days=lookback_days)
+    names = [name for name in SHARED_SOURCES if only is None or name in only]
+    if names and not offline:
+        collector.collect_all_data(names, freq=freq, deadline=deadline)
+    # ワーカーが同時にストアを作成しないよう、ここでストアを作成しておく
+    collector.load_stored_data(SHARED_SOURCES, freq=freq)
+
+def load_asset_results(collector, freq='1d', offline=False, only=None, deadline=None):
+    """資産のデータを収集し、共有データソースと合わせて返す
+
+    Args:
+        collector (DataCollector): 資産のコレクター
+        freq (str): 価格データの頻度
+        offline (bool): 保存済みデータのみを使用するかどうか
+        only (list): 収集するデータソース名（対象外は保存済みデータを使用）
+        deadline (float): 収集の制限時間（秒）
+    """
+    asset_names = [name for name in collector.sources if name not in SHARED_SOURCES]
+    targets = asset_names if only is None else [name for name in asset_names if name in only]
+    results = {}
+    if targets and not offline:
+        results.update(collector.collect_all_data(targets, freq=freq, deadline=deadline) or {})
+    stored = [name for name in collector.sources if name not in results or results[name] is None]
+    results.update(collector.load_stored_data(stored, freq=freq) or {})
+    return results
+
+def run_asset(asset, command='all', lookback_days=365, freq='1d', offline=False, only=None,
+              memory_budget=None, use_cache=True, report_dir=REPORT_DIR, expires_at=None, snapshot=True,
+              windows=None, alerts=None):
+    """1資産分の収集・分析・描画を実行（ワーカープロセスで実行）
+
+    Args:
+        expires_at (float): 収集の期限（time.time() の値、None の場合は期限なし）
+        snapshot (bool): 分析結果のスナップショットを保存するかどうか
+        windows (dict): 期間別のグラフの表示名 -> 日数（None の場合は全期間のグラフのみ）
+        alerts (list): シグナルの変化の通知先（None の場合は通知しない）
+
+    Returns:
+        dict: 資産横断のサマリーの1行
+    """
+    collector = DataCollector(lookback_days=lookback_days, memory_budget=memory_budget, asset=asset,
+                              full_history=needs_full_history(windows))
+    deadline = max(expires_at - time.time(), 0) if expires_at is not None else None
+    results = load_asset_results(collector, freq, offline, only, deadline)
+    if command == 'collect':
+        return {'Asset': asset, 'Sources': sum(1 for df in results.values() if df is not None)}
+
+    asset_dir = os.path.join(report_dir, asset)
+    filename = os.path.join(asset_dir, 'crypto_analysis.png')
+    pipeline = build_analysis_pipeline(results, ArtifactCache() if use_cache else None, filename, asset, windows)
+    if pipeline is None or 'signals' not in pipeline:
+        raise ValueError(f"{asset}の価格データがありません")
+    os.makedirs(asset_dir, exist_ok=True)
+
+    # 通知は資産ごとの状態で評価し、描画より前に送信
+    evaluate_alerts(pipeline, alerts, asset)
+    if command in ('plot', 'all'):
+        write_composite(pipeline)
+    if snapshot:
+        write_snapshot(pipeline, asset, freq)
+    return summarize_asset(asset, pipeline)
+
+def run_asset_worker(asset, *args):
+    """ワーカープロセスで run_asset を実行し、結果とそのプロセスで計測した値を返す
+
+    ワーカーの計測値はプロセスごとに保持され破棄されるため、呼び出し元で
+    RunMetrics.merge により実行レポートに加算します。
+
+    Returns:
+        tuple: (サマリーの1行, エラーメッセージ（成功時は None）, RunMetrics.stages)
+    """
+    # プロセスの再利用やforkで引き継いだ計測値を含めない
+    metrics.reset()
+    try:
+        return run_asset(asset, *args), None, metrics.stages
+    except Exception as e:
+        return None, str(e), metrics.stages
+
+def summarize_asset(asset, pipeline):
+    """資産の最新のシグナルと指標をサマリーの1行にまとめる"""
+    signals = pipeline.get('signals')
+    indicators = pipeline.get('indicators')
+    price = indicators['price']
+    past = price[price.index <= price.index[-1] - pd.Timedelta(days=SUMMARY_CHANGE_DAYS)]
+
+    row = {
+        'Asset': asset,
+        'Date': signals.index[-1].strftime('%Y-%m-%d %H:%M'),
+        'Price': float(price.iloc[-1]),
+        f'Change {SUMMARY_CHANGE_DAYS}d (%)': (float(price.iloc[-1] / past.iloc[-1] - 1) * 100
+                                                if not past.empty else None),
+        'RSI': float(indicators['rsi'].iloc[-1]),
+        'Signal': int(signals.iloc[-1]),
+        'Label': SIGNAL_LABELS[int(signals.iloc[-1])],
+    }
+    for name in ('dxy', 'sp500'):
+        stage = f'correlation.{name}'
+        correlation = pipeline.get(stage).dropna() if stage in pipeline else None
+        row[f'Corr {name.upper()}'] = (float(correlation.iloc[-1])
+                                        if correlation is not None and not correlation.empty else None)
+    return row
+
+def run_assets(assets, command='all', lookback_days=365, freq='1d', offline=False, only=None,
+               memory_budget=None, use_cache=True, max_workers=None, report_dir=REPORT_DIR, deadline=None,
+               snapshot=True, windows=None, alerts=None):
+    """複数の資産の収集・分析・描画を並列に実行し、資産横断のサマリーを作成
+
+    共有データソース（DXY、S&P500、金、Fear & Greed）は最初に1回だけ収集し、各資産は
+    別プロセスで資産ごとのデータの収集とパイプラインを実行します（matplotlibの描画は
+    スレッドセーフではないため、スレッドではなくプロセスで並列化します）。
+    資産ごとのグラフは report_dir/<資産>/crypto_analysis.png（期間別の場合は
+    crypto_analysis_<期間>.png）に保存されます。
+
+    Args:
+        assets (list): 資産のリスト（例: ['BTC', 'ETH', 'SOL']）
+        command (str): 実行するステージ（'collect', 'analyze', 'plot', 'all'）
+        lookback_days (int): 取得・分析期間（日数）
+        freq (str): 価格・指標・シグナルの頻度
+        offline (bool): 保存済みデータのみを使用するかどうか
+        only (list): 収集するデータソース名（None の場合は全て）
+        memory_budget (int): 資産ごとのメモリ予算（バイト数）
+        use_cache (bool): ステージの出力キャッシュを使用するかどうか
+        max_workers (int): 並列に実行する資産数（None の場合はCPU数）
+        report_dir (str): レポートの出力先
+        deadline (float): 共有データソースと全資産の収集を合わせた制限時間（秒）
+        snapshot (bool): 資産ごとに分析結果のスナップショットを保存するかどうか
+        windows (dict): 期間別のグラフの表示名 -> 日数（None の場合は全期間のグラフのみ）
+        alerts (list): シグナルの変化の通知先（資産ごとに状態を保存して評価）
+
+    Returns:
+        pd.DataFrame: 資産横断のサマリー（資産ごとに1行）
+    """
+    # 順番待ちの資産も同じ期限に収まるよう、期限は時刻で各ワーカーに渡す
+    expires_at = time.time() + deadline if deadline is not None else None
+    collect_shared_sources(lookback_days, freq, offline, only, deadline)
+
+    max_workers = max_workers or min(len(assets), os.cpu_count() or 1)
+    print(f"\n{len(assets)}資産の処理を{max_workers}並列で開始します: {', '.join(assets)}")
+    rows = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(run_asset_worker, asset, command, lookback_days, freq, offline, only,
+                            memory_budget, use_cache, report_dir, expires_at, snapshot, windows, alerts): asset
+            for asset in assets
+        }
+        for future in as_completed(futures):
+            asset = futures[future]
+            try:
+                row, error, stages = future.result()
+            except Exception as e:
+                # ワーカープロセスの異常終了など（計測値は失われる）
+                row, error, stages = None, str(e), None
+            if stages is not None:
+                metrics.merge(stages)
+            if error is None:
+                rows[asset] = row
+                print(f"✓ {asset}の処理が完了しました")
+            else:
+                print(f"✗ {asset}の処理に失敗: {error}")
+                rows[asset] = {'Asset': asset, 'Error': error}
+
+    summary = pd.DataFrame([rows[asset] for asset in assets]).set_index('Asset')
+    if 'Signal' in summary:
+        # 失敗した資産があっても整数で表示
+        summary['Signal'] = summary['Signal'].astype('Int64')
+    os.makedirs(report_dir, exist_ok=True)
+    summary_path = os.path.join(report_dir, SUMMARY_FILENAME)
+    summary.to_csv(summary_path)
+
+    print("\n" + "="*50)
+    print("資産横断のシグナルサマリー")
+    print("="*50)
+    print(summary.to_string(float_format=lambda value: f'{value:,.2f}'))
+    print(f"\nサマリーを保存しました: {summary_path}")
+    return summary
@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from .frequency import infer_is_intraday, resample_last
+from .metrics import metrics
+
+# データソース -> 前方補完で値を引き継ぐ最大期間（これより古い値は欠損とする）
+FILL_LIMITS = {
+    # 株式市場（週末・祝日をまたいで引き継ぐ）
+    'dxy': timedelta(days=5),
+    'sp500': timedelta(days=5),
+    'gold': timedelta(days=5),
+    'etf': timedelta(days=5),
+    # 暗号資産・オンチェーン（日次で更新）
+    'btcusd': timedelta(days=7),
+    'large_holders': timedelta(days=7),
+    'active_addresses': timedelta(days=7),
+    'hash_rate': timedelta(days=7),
+    'open_interest': timedelta(days=7),
+    'fear_greed': timedelta(days=7),
+    'google_trends': timedelta(days=7),
+    'trading_volume': timedelta(days=7),
+    'coinbase_premium': timedelta(days=7),
+    # 資金調達率（8時間ごとに精算）
+    'funding_rates': timedelta(hours=8),
+}
+
+# FILL_LIMITSにないデータソースの前方補完の最大期間
+DEFAULT_FILL_LIMIT = timedelta(days=7)
+
+# BTCUSDの参照線に使用する列（資産を指定しない場合）
+BTC_PRICE_COLUMN = 'BTCUSD Price'
+
+class MarketPanel:
+    """全データソースを共通のUTCインデックスに揃えた横長のデータ
+
+    インデックスは全データソースのタイムスタンプの和集合で、各列はデータソースごとの
+    期間（FILL_LIMITS）を上限に直前の値で補完されています。各時点で実際に値が
+    観測されたかどうかは observed にデータソース単位で保持します。
+
+    分析対象の資産の価格は 'btcusd' データソースの price_column 列です
+    （BTC以外の資産もデータソース名は共通で、列名のみ異なります）。
+    取得できずに保存済みデータを使用したデータソースは stale に最終時刻を保持します。
+    """
+
+    def __init__(self, frame, observed, sources, price_column=BTC_PRICE_COLUMN, stale=None):
+        self.frame = frame
+        self.observed = observed
+        self.sources = sources
+        self.price_column = price_column
+        self.stale = stale or {}
+        self._daily = None
+        self._btc_reference = None
+
+    def __contains__(self, name):
+        return name in self.sources
+
+    @property
+    def is_intraday(self):
+        """BTCUSDが日中足かどうか"""
+        return 'btcusd' in self and infer_is_intraday(self.frame.index[self.observed['btcusd'].to_numpy()])
+
+    def source_frame(self, name):
+        """データソースの観測時点のみのデータ（元のデータと同じ行）"""
+        return self.frame.loc[self.observed[name].to_numpy(), self.sources[name]]
+
+    def series(self, name, column):
+        """データソースの列を観測時点のみで返す"""
+        return self.frame.loc[self.observed[name].to_numpy(), column]
+
+    def aligned(self, column, at=None):
+        """前方補完済みの列を返す
+
+        Args:
+            column (str): 列名
+            at (str): 揃える時点のデータソース名（指定時はその観測時点のみ）
+        """
+        if at is None:
+            return self.frame[column]
+        return self.frame.loc[self.observed[at].to_numpy(), column]
+
+    def co_observed(self, names, columns):
+        """指定した全データソースが観測された時点のみの列を返す（相関の計算用）"""
+        mask = self.observed[names].all(axis=1).to_numpy()
+        return self.frame.loc[mask, columns]
+
+    @property
+    def daily(self):
+        """日足のBTCUSDを基準にしたパネル（日次の他指標との比較用）
+
+        BTCUSDが日中足の場合は各日の最終値に変換したパネルを作成し、
+        日足の場合は自身を返します。
+        """
+        if self._daily is None:
+            if not self.is_intraday:
+                self._daily = self
+            else:
+                results = {name: self.source_frame(name) for name in self.sources}
+                results['btcusd'] = resample_last(results['btcusd'], '1d')
+                self._daily = align_sources(results, self.price_column)
+                self._daily.stale = self.stale
+        return self._daily
+
+    @property
+    def btc_reference(self):
+        """日足のBTCUSDを0-1に正規化した系列（各パネルの参照線用、1回のみ計算）"""
+        if self._btc_reference is None and 'btcusd' in self:
+            btc_price = self.daily.series('btcusd', self.price_column)
+            low, high = btc_price.min(), btc_price.max()
+            if high > low:
+                self._btc_reference = (btc_price - low) / (high - low)
+            else:
+                self._btc_reference = pd.Series(0.5, index=btc_price.index)
+        return self._btc_reference
+
+def _utc_index(index):
+    """インデックスをタイムゾーンなしのUTC（ナノ秒）に揃える"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    return index.as_unit('ns')
+
+def align_sources(results, price_column=BTC_PRICE_COLUMN):
+    """データソースを共通インデックスに揃えたパネルを作成
+
+    Args:
+        results (dict): データソース名 -> データ（None や空のデータは除外、
+            attrs['stale'] がある場合はパネルの stale に引き継ぐ）
+        price_column (str): 分析対象の資産の価格の列名
+
+    Returns:
+        MarketPanel: 揃えたパネル（有効なデータがない場合はNone）
+    """
+    frames = {}
+    stale = {}
+    for name, df in results.items():
+        if df is None or df.empty:
+            continue
+        if 'stale' in df.attrs:
+            stale[name] = df.attrs['stale']
+        df = df.set_axis(_utc_index(df.index))
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+        if not df.index.is_unique:
+            df = df[~df.index.duplicated(keep='last')]
+        frames[name] = df
+    if not frames:
+        return None
+
+    index = frames[next(iter(frames))].index
+    for df in list(frames.values())[1:]:
+        index = index.union(df.index)
+
+    columns = {}
+    observed = {}
+    sources = {}
+    for name, df in frames.items():
+        limit = pd.Timedelta(FILL_LIMITS.get(name, DEFAULT_FILL_LIMIT))
+        observed[name] = index.isin(df.index)
+        sources[name] = []
+        for column in df.columns:
+            key = column
+            if key in columns:
+                # 他のデータソースと同名の列はデータソース名を付けて区別する（上書きや欠落を防ぐ）
+                key = f'{name}.{column}'
+                owner = next(source for source, names in sources.items() if column in names)
+                print(f"✓ {name}の列 '{column}' は{owner}と重複するため '{key}' として扱います")
+            # 直前の観測値を上限期間内で割り当てる（as-of結合）
+            values = df[column].reindex(index, method='ffill', tolerance=limit)
+            if pd.api.types.is_numeric_dtype(values) and values.dtype != np.float32 and values.hasnans:
+                values = values.astype(np.float32)
+            columns[key] = values
+            sources[name].append(key)
+
+    frame = pd.DataFrame(columns, index=index)
+    return MarketPanel(frame, pd.DataFrame(observed, index=index), sources, price_column, stale)
+
+def build_market_panel(results, price_column=BTC_PRICE_COLUMN):
+    """収集したデータから分析・描画で共有するパネルを作成（実行ごとに1回）
+
+    Args:
+        results (dict): 各種市場データを含む辞書
+        price_column (str): 分析対象の資産の価格の列名
+
+    Returns:
+        MarketPanel: 揃えたパネル（有効なデータがない場合はNone）
+    """
+    with metrics.stage('panel'):
+        return align_sources(results or {}, price_column)
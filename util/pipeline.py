@@ -0,0 +1,433 @@
+import os
+import json
+import pickle
+import hashlib
+import numpy as np
+import pandas as pd
+from .metrics import metrics
+from .assets import DEFAULT_ASSET, price_column
+from .panel import build_market_panel
+from .plotters.market_plotter import (MarketPlotter, CORRELATION_CONFIGS, PANEL_CONFIGS, LEAD_LAG_CONFIGS,
+                                      window_filename, window_start)
+from .plotters.figure_skeleton import figure_skeleton
+
+# ステージの出力を保存するディレクトリ
+STAGE_CACHE_PATH = 'market_data/cache/stages'
+
+# ステージキャッシュの合計サイズの上限（超えた場合は古いものから削除）
+MAX_STAGE_CACHE_BYTES = 512 * 1024 ** 2
+
+# ステージのキーに含めるソースファイル（util/からの相対パス）
+# 計算や描画の処理を変更した場合にキャッシュを無効化するため
+CODE_FILES = [
+    'pipeline.py',
+    'panel.py',
+    'frequency.py',
+    'plotters/base_plotter.py',
+    'plotters/market_plotter.py',
+    'plotters/technical_indicators.py',
+    'plotters/correlation_plotter.py',
+    'plotters/lead_lag_plotter.py',
+    'plotters/figure_skeleton.py',
+]
+
+# キャッシュに値がないことを表す値（Noneもステージの出力になり得るため）
+MISSING = object()
+
+def content_hash(value):
+    """データの内容から決まるハッシュ（同じ行・列・型なら同じ値）
+
+    DataFrameは列ごとのバッファを直接ハッシュするため、メモリマップされた
+    データでもコピーせずに計算できます。
+
+    Args:
+        value: ハッシュするデータ（pd.DataFrame、pd.Series、None）
+
+    Returns:
+        str: 16進数のハッシュ値
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if value is None:
+        digest.update(b'none')
+        return digest.hexdigest()
+    if isinstance(value, pd.Series):
+        value = value.to_frame()
+
+    header = [list(map(str, value.columns)), list(map(str, value.dtypes)), value.index.name,
+              str(value.index.dtype), len(value)]
+    digest.update(json.dumps([header, value.attrs], default=str, sort_keys=True).encode())
+
+    arrays = [value.index.asi8 if isinstance(value.index, pd.DatetimeIndex) else value.index.to_numpy()]
+    arrays.extend(value[column].to_numpy() for column in value.columns)
+    for array in arrays:
+        if array.dtype == object:
+            # 文字列などはpandasのハッシュ値に変換
+            array = pd.util.hash_array(array)
+        digest.update(np.ascontiguousarray(array).view(np.uint8))
+    return digest.hexdigest()
+
+def code_fingerprint():
+    """ステージの処理を実装するソースファイルのハッシュ"""
+    digest = hashlib.blake2b(digest_size=16)
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    for filename in CODE_FILES:
+        with open(os.path.join(base_path, filename), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+class ArtifactCache:
+    """ステージの出力をキー（入力と設定のハッシュ）ごとにファイルに保存するキャッシュ
+
+    キーが内容から決まるため、同じ入力に対する出力は実行をまたいで再利用でき、
+    古いエントリを上書きすることはありません。合計サイズが上限を超えた場合は
+    最後に使用した時刻が古いものから削除します。
+    """
+
+    def __init__(self, base_path=STAGE_CACHE_PATH, max_bytes=MAX_STAGE_CACHE_BYTES):
+        self.base_path = base_path
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self.base_path, f'{key}.pkl')
+
+    def load(self, key):
+        """キーに対応する出力を読み込む（ない場合はMISSING）"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return MISSING
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except Exception as e:
+            print(f"ステージキャッシュの読み込みに失敗: {str(e)}")
+            return MISSING
+        # 削除の順序に使用する最終使用時刻を更新
+        os.utime(path)
+        return value
+
+    def store(self, key, value):
+        """出力を保存（一時ファイルに書き出してから置き換え）"""
+        os.makedirs(self.base_path, exist_ok=True)
+        path = self._path(key)
+        # 複数プロセスが同じキーを同時に保存しても壊れないようプロセスごとの一時ファイルを使用
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"ステージキャッシュの保存に失敗: {str(e)}")
+
+    def prune(self):
+        """合計サイズが上限を超えている場合に古いエントリを削除"""
+        if not os.path.isdir(self.base_path):
+            return
+        entries = []
+        for filename in os.listdir(self.base_path):
+            if filename.endswith('.pkl'):
+                stat = os.stat(os.path.join(self.base_path, filename))
+                entries.append((stat.st_mtime, stat.st_size, filename))
+        total = sum(size for _, size, _ in entries)
+        for _, size, filename in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.base_path, filename))
+            total -= size
+
+class Stage:
+    """パイプラインの1ステージ
+
+    Args:
+        name (str): ステージ名
+        func (callable): inputsの出力を引数に取る関数（ソースの場合はNone）
+        inputs (list): 関数に渡す上流ステージ名
+        depends (list): キーの計算に使用する上流ステージ名（None の場合はinputs）
+        params (dict): 関数に渡すキーワード引数（キーに含める）
+        cache (bool): 出力をキャッシュするかどうか
+    """
+
+    def __init__(self, name, func=None, inputs=(), depends=None, params=None, cache=True):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.depends = list(inputs if depends is None else depends)
+        self.params = params or {}
+        self.cache = cache
+
+class StagePipeline:
+    """ステージのDAGを、出力のキャッシュを使って必要な部分のみ評価する
+
+    各ステージのキーは、ステージ名・パラメータ・処理のソースコードと、上流ステージの
+    キーから決まります。ソース（入力データ）のキーはデータの内容のハッシュです。
+    キーに対応する出力がキャッシュにあればそれを使用し、上流のステージは評価しません。
+    そのため、入力が変化していなければ最終ステージのキャッシュを読むだけで終わり、
+    一部のソースが変化した場合はその下流のステージのみを再計算します。
+
+    depends には inputs の出力のうち実際に使用する部分を決めるステージを指定します。
+    例えば全ソースを揃えたパネルを受け取り、そのうちBTCUSDの列のみを使うステージは
+    depends をBTCUSDのソースのみにすることで、他のソースの変化で再計算されません。
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.stages = {}
+        self.values = {}
+        self.keys = {}
+        self.fingerprint = code_fingerprint()
+        self.computed = []
+        self.reused = []
+
+    def __contains__(self, name):
+        return name in self.stages
+
+    def add_source(self, name, value):
+        """入力データをソースとして追加（キーは内容のハッシュ）"""
+        self.stages[name] = Stage(name, cache=False)
+        self.values[name] = value
+        self.keys[name] = content_hash(value)
+
+    def add(self, name, func, inputs=(), depends=None, params=None, cache=True):
+        """ステージを追加（上流のステージは先に追加しておく）"""
+        stage = Stage(name, func, inputs, depends, params, cache)
+        unknown = [upstream for upstream in stage.inputs + stage.depends if upstream not in self.stages]
+        if unknown:
+            raise ValueError(f"未定義の上流ステージ: {', '.join(unknown)}（{name}）")
+        self.stages[name] = stage
+
+    def key(self, name):
+        """ステージのキー（上流のキーから再帰的に計算）"""
+        if name not in self.keys:
+            stage = self.stages[name]
+            payload = json.dumps([name, stage.params, self.fingerprint,
+                                  [self.key(upstream) for upstream in stage.depends]],
+                                 default=str, sort_keys=True)
+            self.keys[name] = hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+        return self.keys[name]
+
+    def get(self, name):
+        """ステージの出力を返す（キャッシュになければ上流から計算）"""
+        if name in self.values:
+            return self.values[name]
+        stage = self.stages[name]
+        use_cache = stage.cache and self.cache is not None
+
+        if use_cache:
+            value = self.cache.load(self.key(name))
+            if value is not MISSING:
+                metrics.increment('cache_hits')
+                self.reused.append(name)
+                self.values[name] = value
+                return value
+
+        arguments = [self.get(upstream) for upstream in stage.inputs]
+        with metrics.stage(f'pipeline.{name}'):
+            value = stage.func(*arguments, **stage.params)
+        if use_cache:
+            self.cache.store(self.key(name), value)
+        self.computed.append(name)
+        self.values[name] = value
+        return value
+
+    def print_summary(self):
+        """再計算・再利用したステージを表示"""
+        if self.computed:
+            print(f"再計算したステージ: {', '.join(self.computed)}")
+        print(f"✓ パイプライン: {len(self.computed)}ステージを計算、{len(self.reused)}ステージをキャッシュから再利用")
+
+def _build_panel(*frames, names, asset):
+    return build_market_panel(dict(zip(names, frames)), price_column(asset))
+
+def _indicators(panel, asset):
+    plotter = MarketPlotter(asset)
+    return plotter.calculate_indicators(panel.series('btcusd', plotter.price_column))
+
+def _timeframes(indicators, asset):
+    return MarketPlotter(asset).calculate_timeframe_indicators(indicators)
+
+def _signal_components(panel, indicators, timeframes, asset):
+    return MarketPlotter(asset).calculate_signal_components(panel, indicators, timeframes)
+
+def _signals(components):
+    return components['signal'].rename(None)
+
+def _btc_reference(panel):
+    return panel.daily.btc_reference
+
+def _correlation(panel, name, asset):
+    return MarketPlotter(asset).calculate_correlation(panel.daily, name)
+
+def _correlation_matrix(panel, asset):
+    return MarketPlotter(asset).calculate_correlation_matrix(panel.daily)
+
+def _lead_lag(panel, asset):
+    return MarketPlotter(asset).calculate_lead_lag(panel.daily)
+
+def _panel_series(panel, name):
+    return MarketPlotter().panel_series(panel.daily, name)
+
+def _render_inputs(values, stale):
+    """ステージ名 -> 出力 をMarketPlotter.renderの描画データに変換"""
+    def prefixed(prefix):
+        return {name[len(prefix):]: value for name, value in values.items() if name.startswith(prefix)}
+
+    return {
+        'indicators': values.get('indicators'),
+        'signals': values.get('signals'),
+        'btc_reference': values.get('btc_reference'),
+        'correlations': prefixed('correlation.'),
+        'series': prefixed('series.'),
+        'lead_lag': values.get('lead_lag'),
+        'stale': stale,
+    }
+
+def _panel_inputs(panel):
+    """パネルの描画に使用するステージと、最終時刻を表示するデータソース"""
+    if panel == 'btcusd':
+        return ['indicators', 'signals'], ['btcusd']
+    if panel.startswith('correlation.'):
+        return [panel, 'btc_reference'], ['btcusd', panel[len('correlation.'):]]
+    if panel.startswith('series.'):
+        return [panel, 'btc_reference'], [panel[len('series.'):]]
+    return [panel], ['btcusd'] + [name for name, _, _, _ in LEAD_LAG_CONFIGS]
+
+def _window_start(indicators, days):
+    return window_start(indicators['price'].index[-1], days)
+
+def _tile(*values, stage_names, panel, slot, asset, stale, windowed=False):
+    """1つのパネルを描画し、スロットの画像を返す（windowed の場合は最後の値が期間の開始時点）"""
+    start = None
+    if windowed:
+        *values, start = values
+    plotter = MarketPlotter(asset)
+    inputs = plotter.slice_inputs(_render_inputs(dict(zip(stage_names, values)), stale), start)
+    return plotter.render_panel(panel, slot, inputs)
+
+def _composite(*tiles, slots, filename):
+    """パネルの画像を合成して保存し、画像ファイルの内容を返す"""
+    with metrics.stage('plot.composite'):
+        return figure_skeleton().composite(dict(zip(slots, tiles)), filename)
+
+def build_analysis_pipeline(results, cache=None, filename='crypto_analysis.png', asset=DEFAULT_ASSET, windows=None):
+    """分析と描画のステージのDAGを作成
+
+    ステージ構成:
+        source.<データソース>: 収集・読み込みしたデータ
+        panel: 全ソースを揃えたパネル（キャッシュしない）
+        indicators: BTCUSDのテクニカル指標
+        timeframes: 日足・週足・月足のテクニカル指標
+        signal_components: 市場シグナルの指標ごとのシグナルと総合値
+        signals: 市場シグナル
+        btc_reference: 各パネルの参照線
+        correlation.<データソース>: BTCUSDとの相関係数
+        correlation_matrix: 全列の変化率の相関行列（スナップショット用、描画では使用しない）
+        lead_lag: 各系列の先行・遅行（相互相関とローリングのピークのラグ）
+        series.<データソース>: 個別パネルの系列
+        tile.<パネル>: パネルごとの画像（入力と描画設定が同じパネルはキャッシュを使用）
+        composite: パネルの画像を合成した画像
+        window.<期間>, tile.<期間>.<パネル>, composite.<期間>: 期間別のグラフ（windows 指定時）
+
+    Args:
+        results (dict): データソース名 -> データ
+        cache (ArtifactCache): ステージのキャッシュ（None の場合はキャッシュしない）
+        filename (str): 画像の保存先
+        asset (str): 分析対象の資産（価格は 'btcusd' データソースの資産の列）
+        windows (dict): 期間別のグラフの表示名 -> 日数（None は全期間）。指定した場合は
+            全期間のグラフの代わりに期間ごとのグラフ（ファイル名に表示名を付加）を作成
+
+    Returns:
+        StagePipeline: 作成したパイプライン（データがない場合はNone）
+    """
+    names = [name for name, df in (results or {}).items() if df is not None and not df.empty]
+    if not names:
+        return None
+
+    pipeline = StagePipeline(cache)
+    for name in names:
+        pipeline.add_source(f'source.{name}', results[name])
+    pipeline.add('panel', _build_panel, [f'source.{name}' for name in names],
+                 params={'names': names, 'asset': asset}, cache=False)
+
+    panels = []
+    if 'btcusd' in names:
+        pipeline.add('indicators', _indicators, ['panel'], depends=['source.btcusd'], params={'asset': asset})
+        signal_sources = [f'source.{name}' for name in ('btcusd', 'fear_greed') if name in names]
+        pipeline.add('timeframes', _timeframes, ['indicators'], params={'asset': asset})
+        pipeline.add('signal_components', _signal_components, ['panel', 'indicators', 'timeframes'],
+                     depends=signal_sources + ['indicators', 'timeframes'], params={'asset': asset})
+        pipeline.add('signals', _signals, ['signal_components'])
+        pipeline.add('correlation_matrix', _correlation_matrix, ['panel'],
+                     depends=[f'source.{name}' for name in names], params={'asset': asset})
+        pipeline.add('btc_reference', _btc_reference, ['panel'], depends=['source.btcusd'])
+        panels.extend(['indicators', 'signals', 'btc_reference'])
+
+        # 相関はBTCUSDの参照線がある場合のみ描画
+        for name, _, _, _ in CORRELATION_CONFIGS:
+            if name in names:
+                pipeline.add(f'correlation.{name}', _correlation, ['panel'],
+                             depends=['source.btcusd', f'source.{name}'], params={'name': name, 'asset': asset})
+                panels.append(f'correlation.{name}')
+
+    for name, _, _, _ in PANEL_CONFIGS:
+        if name in names:
+            pipeline.add(f'series.{name}', _panel_series, ['panel'],
+                         depends=[f'source.{name}'], params={'name': name})
+            panels.append(f'series.{name}')
+
+    lead_lag_sources = [f'source.{name}' for name, _, _, _ in LEAD_LAG_CONFIGS if name in names]
+    if 'btcusd' in names and lead_lag_sources:
+        pipeline.add('lead_lag', _lead_lag, ['panel'], depends=['source.btcusd'] + lead_lag_sources,
+                     params={'asset': asset})
+        panels.append('lead_lag')
+
+    # パネルごとの画像（保存済みデータを使用したデータソースはパネルに最終時刻を表示）
+    stale = {name: results[name].attrs['stale'] for name in names if 'stale' in results[name].attrs}
+    # スロットの割り当てはパネルの有無のみで決まるため、出力の代わりにステージの有無を渡す
+    available = _render_inputs({name: name for name in panels}, stale)
+    layout = MarketPlotter(asset).panel_slots(available)
+
+    # 期間別のグラフは全期間の指標・シグナルを切り出して描画する（期間ごとの再計算はない）
+    for label, days in (windows or {None: None}).items():
+        window = None
+        if days is not None and 'indicators' in pipeline:
+            window = f'window.{label}'
+            pipeline.add(window, _window_start, ['indicators'], params={'days': days})
+        tiles, slots = [], []
+        for panel, slot in layout:
+            stage_names, panel_sources = _panel_inputs(panel)
+            stage_names = [name for name in stage_names if name in pipeline]
+            # 先行・遅行のヒートマップは横軸がラグのため期間によらず共通
+            windowed = window is not None and panel != 'lead_lag'
+            name = f'tile.{label}.{panel}' if label is not None and panel != 'lead_lag' else f'tile.{panel}'
+            if name not in pipeline:
+                pipeline.add(name, _tile, stage_names + ([window] if windowed else []),
+                             params={'stage_names': stage_names, 'panel': panel, 'slot': slot, 'asset': asset,
+                                     'stale': {source: stale[source] for source in panel_sources if source in stale},
+                                     'windowed': windowed})
+            tiles.append(name)
+            slots.append(slot)
+        composite = 'composite' if label is None else f'composite.{label}'
+        output = filename if label is None else window_filename(filename, label)
+        pipeline.add(composite, _composite, tiles, params={'slots': slots, 'filename': output})
+    return pipeline
+
+def composite_stages(pipeline):
+    """画像を合成するステージ名（全期間の 'composite' と期間別の 'composite.<期間>'）"""
+    return [name for name in pipeline.stages if name == 'composite' or name.startswith('composite.')]
+
+def write_composite(pipeline):
+    """画像を保存（キャッシュから再利用した場合は内容が異なる時のみ書き込む）"""
+    for name in composite_stages(pipeline):
+        filename = pipeline.stages[name].params['filename']
+        image = pipeline.get(name)
+        if name in pipeline.computed:
+            continue
+        if os.path.exists(filename):
+            with open(filename, 'rb') as f:
+                if f.read() == image:
+                    print(f"入力データに変化がないため'{filename}'を再利用しました")
+                    continue
+        tmp_path = f'{filename}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(image)
+        os.replace(tmp_path, filename)
+        print(f"グラフを'{filename}'として保存しました（キャッシュから復元）")
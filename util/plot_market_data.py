@@ -1,10 +1,56 @@
 from .plotters.market_plotter import MarketPlotter
+from .metrics import metrics
 
-def plot_market_data(results):
+# シグナル値と表示ラベルの対応
+SIGNAL_LABELS = {
+    2: '強い買い',
+    1: '買い',
+    0: '中立',
+    -1: '売り',
+    -2: '強い売り'
+}
+
+def plot_market_data(panel, windows=None):
     """市場データをプロット
     
     Args:
-        results (dict): 各種市場データを含む辞書
+        panel (MarketPanel): build_market_panelで作成したパネル
+        windows (dict): 期間別のグラフの表示名 -> 日数（None の場合は全期間のグラフのみ）
+    """
+    plotter = MarketPlotter()
+    with metrics.stage('plot'):
+        plotter.plot_market_data(panel, windows)
+
+def analyze_market_data(panel):
+    """市場シグナルを計算して最新の状態を表示
+    
+    Args:
+        panel (MarketPanel): build_market_panelで作成したパネル
+    
+    Returns:
+        pd.Series: 市場シグナル（データ不足の場合は None）
     """
     plotter = MarketPlotter()
-    plotter.plot_market_data(results)
\ No newline at end of file
+    with metrics.stage('analyze'):
+        signals = plotter.calculate_market_signal(panel)
+    return print_latest_signal(signals)
+
+def print_latest_signal(signals):
+    """最新の市場シグナルを表示
+    
+    Args:
+        signals (pd.Series): 市場シグナル（None可）
+    
+    Returns:
+        pd.Series: 市場シグナル（データ不足の場合は None）
+    """
+    if signals is None or signals.empty:
+        print("✗ シグナルの計算に必要なBTCUSDデータがありません")
+        return None
+
+    latest_date = signals.index[-1]
+    latest_signal = int(signals.iloc[-1])
+    print("\n" + "="*50)
+    print(f"市場シグナル（{latest_date.strftime('%Y-%m-%d')}）: {SIGNAL_LABELS[latest_signal]}")
+    print("="*50)
+    return signals
@@ -2,10 +2,12 @@ from .base_plotter import BasePlotter
 from .technical_indicators import TechnicalIndicators
 from .correlation_plotter import CorrelationPlotter
 from .market_plotter import MarketPlotter
+from .figure_skeleton import FigureSkeleton
 
 __all__ = [
     'BasePlotter',
     'TechnicalIndicators',
     'CorrelationPlotter',
-    'MarketPlotter'
+    'MarketPlotter',
+    'FigureSkeleton'
 ] 
\ No newline at end of file
@@ -1,9 +1,5 @@
-import matplotlib.pyplot as plt
-import seaborn as sns
 import pandas as pd
 import numpy as np
-import matplotlib.gridspec as gridspec
-from matplotlib.patches import Rectangle
 
 class BasePlotter:
     def __init__(self):
@@ -50,6 +46,8 @@ class BasePlotter:
 
     def setup_plot_style(self):
         """プロットのスタイルを設定"""
+        # matplotlibは描画時のみ読み込む（キャッシュから画像を再利用する実行では不要）
+        import matplotlib.pyplot as plt
         plt.style.use('seaborn-v0_8-darkgrid')
         plt.rcParams.update({
             'figure.figsize': (24, 20),
@@ -58,27 +56,6 @@ class BasePlotter:
             'axes.labelsize': 10
         })
 
-    def create_grid(self):
-        """グリッドを作成"""
-        fig = plt.figure(figsize=(24, 20))
-        gs = gridspec.GridSpec(5, 3, height_ratios=[1.5, 1, 1, 1, 1])
-        gs_btc = gridspec.GridSpecFromSubplotSpec(3, 1, subplot_spec=gs[0, 0], height_ratios=[3, 1, 1], hspace=0.1)
-        
-        # 他のグラフ用のaxesリストを作成
-        other_axes = []
-        for i in range(1, 3):  # 上段の残り2つ
-            other_axes.append(plt.subplot(gs[0, i]))
-        for i in range(3):     # 2段目3つ
-            other_axes.append(plt.subplot(gs[1, i]))
-        for i in range(3):     # 3段目3つ
-            other_axes.append(plt.subplot(gs[2, i]))
-        for i in range(3):     # 4段目3つ
-            other_axes.append(plt.subplot(gs[3, i]))
-        for i in range(3):     # 5段目3つ
-            other_axes.append(plt.subplot(gs[4, i]))
-        
-        return fig, gs, gs_btc, other_axes
-
     def format_axis(self, ax, title, ylabel=None, show_borders=False, borders=None):
         """軸のフォーマットを設定
         
@@ -120,23 +97,19 @@ class BasePlotter:
             -2: self.signal_colors['strong_sell']
         }
 
-        # 各日付でのシグナルに応じて背景色を設定
-        for i in range(len(signal_data) - 1):
-            signal = signal_data.iloc[i]
-            start = signal_data.index[i]
-            end = signal_data.index[i + 1]
-            
-            # シグナル値が有効な場合のみ背景色を追加
-            if signal in signal_map:
-                rect = Rectangle((start, ax.get_ylim()[0]),
-                               end - start,
-                               ax.get_ylim()[1] - ax.get_ylim()[0],
-                               facecolor=signal_map[signal],
-                               zorder=0)
-                ax.add_patch(rect)
-
-    def save_plot(self, fig, filename='crypto_analysis.png'):
-        """プロットを保存"""
-        plt.tight_layout()
-        fig.savefig(filename, dpi=300, bbox_inches='tight', facecolor='white')
-        print(f"グラフを'{filename}'として保存しました") 
\ No newline at end of file
+        # 同じシグナルが続く区間をまとめ、シグナル値ごとに1つのコレクションとして描画
+        # （日中足で区間数が多くても描画オブジェクト数を抑える）
+        import matplotlib.dates as mdates
+        values = signal_data.to_numpy()
+        x = mdates.date2num(signal_data.index.to_pydatetime())
+        starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+        ends = np.append(starts[1:], len(values) - 1)
+        y_min, y_max = ax.get_ylim()
+        for signal, color in signal_map.items():
+            # シグナル値が有効な区間のみ背景色を追加
+            mask = (values[starts] == signal) & (ends > starts)
+            if not mask.any():
+                continue
+            xranges = np.column_stack([x[starts[mask]], x[ends[mask]] - x[starts[mask]]])
+            ax.broken_barh(xranges, (y_min, y_max - y_min), facecolors=color, zorder=0)
+        ax.set_ylim(y_min, y_max)
@@ -1,4 +1,3 @@
-import pandas as pd
 from .base_plotter import BasePlotter
 
 class CorrelationPlotter(BasePlotter):
@@ -7,25 +6,32 @@ class CorrelationPlotter(BasePlotter):
         
         Args:
             price1 (pd.Series): 1つ目の価格データ
-            price2 (pd.Series): 2つ目の価格データ
+            price2 (pd.Series): 2つ目の価格データ（price1と同じインデックスに揃えたもの）
             window (int): 相関を計算する期間（デフォルト: 30日）
         
         Returns:
             pd.Series: 相関係数の時系列
         """
-        # 両方のデータを結合してリサンプリング
-        df = pd.DataFrame({'price1': price1, 'price2': price2})
-        df = df.dropna()
-        
         # 日次変化率を計算
-        returns1 = df['price1'].pct_change()
-        returns2 = df['price2'].pct_change()
+        returns1 = price1.pct_change()
+        returns2 = price2.pct_change()
         
         # 相関係数を計算
         correlation = returns1.rolling(window=window).corr(returns2)
         
         return correlation
 
+    def calculate_correlation_matrix(self, prices):
+        """複数の系列の変化率の相関行列を計算する
+        
+        Args:
+            prices (pd.DataFrame): 同じインデックスに揃えた系列（列ごと）
+        
+        Returns:
+            pd.DataFrame: 列×列の相関係数
+        """
+        return prices.astype(float).pct_change(fill_method=None).corr()
+
     def plot_correlation(self, ax, correlation, title, asset1_name, asset2_name):
         """相関係数をプロット
         
@@ -0,0 +1,202 @@
+import io
+import hashlib
+import os
+import threading
+import numpy as np
+from PIL import Image
+from .base_plotter import BasePlotter
+
+# 図のサイズ（インチ）と解像度
+FIGURE_SIZE = (24, 20)
+FIGURE_DPI = 300
+
+# グリッドの行数・列数と行の高さの比率（上段の左はBTCUSDセクション）
+GRID_SHAPE = (5, 3)
+GRID_HEIGHT_RATIOS = [1.5, 1, 1, 1, 1]
+
+# グリッドの余白と間隔（パネルごとに描画して合成するため、内容によらず固定）
+GRID_SUBPLOT_PARAMS = {
+    'left': 0.075,
+    'right': 0.985,
+    'bottom': 0.035,
+    'top': 0.98,
+    'wspace': 0.22,
+    'hspace': 0.4,
+}
+
+# マスの間の余白を隣り合うスロットに分ける割合（左・上のスロットの割合）
+# 縦軸のラベルは右のマス、回転した横軸のラベルは上のマスの余白に描画されるため
+COLUMN_GAP_SPLIT = 0.35
+ROW_GAP_SPLIT = 0.75
+
+# BTCUSDセクションのスロット名（その他のパネルのスロットは 0 から順の番号）
+MAIN_SLOT = 'main'
+
+# パネル画像のPNGの圧縮レベル（キャッシュ用のため速度を優先）
+TILE_COMPRESS_LEVEL = 1
+
+# 合成した画像の背景色（RGBA）
+BACKGROUND = 255
+
+def grid_cells():
+    """スロット -> グリッドのマス（行, 列）（上段の残り2つ、2〜5段目の順）
+
+    スロットの割り当てはグリッドの形のみで決まるため、図を作成せずに求められます。
+    """
+    rows, columns = GRID_SHAPE
+    cells = [(0, column) for column in range(1, columns)]
+    cells += [(row, column) for row in range(1, rows) for column in range(columns)]
+    return {MAIN_SLOT: (0, 0), **dict(enumerate(cells))}
+
+class FigureSkeleton:
+    """グリッドのレイアウトと描画先を保持し、パネルごとの画像の描画と合成を行う
+
+    図・GridSpec・描画バッファはプロセスで1回だけ作成し（figure_skeleton）、実行をまたいで
+    再利用します。パネルはスロット（グリッドの1マスと周囲の余白）ごとに描画して画像として
+    切り出すため、入力が変化していないパネルはキャッシュした画像を使用できます。
+    合成先のフレームも保持し、前回と異なるスロットの画像のみを書き込みます（ブリッティング）。
+    """
+
+    def __init__(self, figsize=FIGURE_SIZE, dpi=FIGURE_DPI):
+        # matplotlibは描画が必要になった時のみ読み込む
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        # スタイルは図の作成前に1回だけ設定
+        BasePlotter().setup_plot_style()
+        self.figure = Figure(figsize=figsize, dpi=dpi, facecolor='white')
+        FigureCanvasAgg(self.figure)
+        self.dpi = dpi
+        grid = self.figure.add_gridspec(*GRID_SHAPE, height_ratios=GRID_HEIGHT_RATIOS, **GRID_SUBPLOT_PARAMS)
+
+        # スロット -> SubplotSpec
+        self.specs = {slot: grid[cell] for slot, cell in grid_cells().items()}
+
+        self.renderer = self.figure.canvas.get_renderer()
+        self.buffer = np.asarray(self.renderer.buffer_rgba())
+        self.regions = self._slot_regions(grid)
+
+        # 合成先のフレームと、各スロットに書き込んだ画像のハッシュ
+        self.frame = None
+        self.frame_tiles = {}
+        self.lock = threading.Lock()
+
+    def _slot_regions(self, grid):
+        """スロット -> 描画バッファ上の範囲（上端, 下端, 左端, 右端）
+
+        隣り合うマスの間の余白は COLUMN_GAP_SPLIT・ROW_GAP_SPLIT の割合で分け、
+        外周の余白は端のマスに含めます。
+        """
+        height, width = self.buffer.shape[:2]
+        bottoms, tops, lefts, rights = grid.get_grid_positions(self.figure)
+        row_edges = np.concatenate([[1.0], bottoms[:-1] - (bottoms[:-1] - tops[1:]) * ROW_GAP_SPLIT, [0.0]])
+        column_edges = np.concatenate([[0.0], rights[:-1] + (lefts[1:] - rights[:-1]) * COLUMN_GAP_SPLIT, [1.0]])
+        row_pixels = np.rint((1 - row_edges) * height).astype(int)
+        column_pixels = np.rint(column_edges * width).astype(int)
+
+        regions = {}
+        for slot, spec in self.specs.items():
+            row, column = spec.rowspan.start, spec.colspan.start
+            regions[slot] = (row_pixels[row], row_pixels[row + 1], column_pixels[column], column_pixels[column + 1])
+        return regions
+
+    def _frame(self):
+        """合成先のフレーム（初回のみ作成）"""
+        if self.frame is None:
+            self.frame = np.full(self.buffer.shape, BACKGROUND, dtype=np.uint8)
+        return self.frame
+
+    def slots(self):
+        """全スロット（BTCUSDセクション、その他のパネルの順）"""
+        return list(self.specs)
+
+    def render_tile(self, slot, draw):
+        """1つのスロットを描画してPNG画像として返す
+
+        Args:
+            slot: スロット（MAIN_SLOT または 0 からの番号）
+            draw (callable): (figure, subplot_spec) を受け取り、Axesを作成して描画する関数
+
+        Returns:
+            bytes: スロットの範囲のPNG画像
+        """
+        with self.lock:
+            before = set(self.figure.axes)
+            try:
+                draw(self.figure, self.specs[slot])
+                axes = [ax for ax in self.figure.axes if ax not in before]
+                top, bottom, left, right = self.regions[slot]
+                self.buffer[top:bottom, left:right] = BACKGROUND
+                # 図全体ではなく、このスロットのAxes（カラーバーを含む）のみを描画
+                for ax in axes:
+                    ax.draw(self.renderer)
+                tile = self.buffer[top:bottom, left:right].copy()
+            finally:
+                # 次の描画に残らないようAxesを削除（図とバッファは再利用）
+                for ax in [ax for ax in self.figure.axes if ax not in before]:
+                    ax.remove()
+
+            image = encode_png(tile, TILE_COMPRESS_LEVEL)
+            # 描画した画像はそのままフレームに書き込み、合成時の読み込みを省く
+            self._frame()[top:bottom, left:right] = tile
+            self.frame_tiles[slot] = tile_digest(image)
+            return image
+
+    def composite(self, tiles, filename):
+        """スロットごとの画像を合成して保存
+
+        前回の合成から画像が変化したスロットのみフレームに書き込みます。
+
+        Args:
+            tiles (dict): スロット -> render_tileの画像（ないスロットは空白）
+            filename (str): 保存先のファイル名
+
+        Returns:
+            bytes: 保存した画像ファイルの内容
+        """
+        with self.lock:
+            frame = self._frame()
+            for slot in self.slots():
+                image = tiles.get(slot)
+                digest = tile_digest(image)
+                if self.frame_tiles.get(slot) == digest:
+                    continue
+                top, bottom, left, right = self.regions[slot]
+                frame[top:bottom, left:right] = BACKGROUND if image is None else decode_png(image)
+                self.frame_tiles[slot] = digest
+            content = encode_png(frame, dpi=self.dpi)
+
+        # 書き込み途中のファイルを読まれないよう一時ファイルに保存してから置き換える
+        tmp_path = f'{filename}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, filename)
+        print(f"グラフを'{filename}'として保存しました")
+        return content
+
+def encode_png(pixels, compress_level=6, dpi=None):
+    """RGBAの配列をPNGに変換"""
+    output = io.BytesIO()
+    options = {'compress_level': compress_level}
+    if dpi:
+        options['dpi'] = (dpi, dpi)
+    Image.fromarray(pixels).save(output, 'png', **options)
+    return output.getvalue()
+
+def decode_png(image):
+    """PNGをRGBAの配列に変換"""
+    return np.asarray(Image.open(io.BytesIO(image)).convert('RGBA'))
+
+def tile_digest(image):
+    """スロットの画像のハッシュ（空白は None）"""
+    return None if image is None else hashlib.blake2b(image, digest_size=16).hexdigest()
+
+_skeleton = None
+_skeleton_lock = threading.Lock()
+
+def figure_skeleton():
+    """プロセスで共有する FigureSkeleton（初回のみ作成）"""
+    global _skeleton
+    with _skeleton_lock:
+        if _skeleton is None:
+            _skeleton = FigureSkeleton()
+        return _skeleton
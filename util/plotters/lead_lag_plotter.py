@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from .base_plotter import BasePlotter
+
+# 相互相関を計算するラグの範囲（日数、±MAX_LAG_DAYS）
+MAX_LAG_DAYS = 60
+
+# ピークのラグの推移を計算するローリングウィンドウの日数と、ウィンドウをずらす日数
+ROLLING_WINDOW_DAYS = 180
+ROLLING_STEP_DAYS = 7
+
+# 相関の計算に必要な重なりの最小日数（これ未満のラグは欠損とする）
+MIN_OVERLAP_DAYS = 30
+
+def _next_fft_size(n):
+    """n以上の2の累乗（FFTの長さ）"""
+    return 1 << (int(n) - 1).bit_length()
+
+def _standardize(values):
+    """欠損を除いて平均0・分散1に標準化し、欠損を0にした値と有効値のマスクを返す（最後の軸ごと）"""
+    mask = np.isfinite(values)
+    count = mask.sum(axis=-1, keepdims=True)
+    filled = np.where(mask, values, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = filled.sum(axis=-1, keepdims=True) / count
+        centered = np.where(mask, values - mean, 0.0)
+        std = np.sqrt((centered ** 2).sum(axis=-1, keepdims=True) / count)
+        standardized = np.where(std > 0, centered / std, 0.0)
+    return standardized, mask.astype(float)
+
+def _cross_sums(x, y, max_lag):
+    """FFTで sum_t x[t + k] * y[t] を k = -max_lag..max_lag について計算（最後の軸ごと）"""
+    n = x.shape[-1]
+    size = _next_fft_size(2 * n - 1)
+    spectrum = np.fft.rfft(x, size) * np.conj(np.fft.rfft(y, size))
+    circular = np.fft.irfft(spectrum, size)
+    # 負のラグは末尾に折り返されている
+    return np.concatenate([circular[..., size - max_lag:], circular[..., :max_lag + 1]], axis=-1)
+
+class LeadLagPlotter(BasePlotter):
+    """資産のリターンと各系列の相互相関（先行・遅行の関係）を計算・描画する
+
+    ラグ k の相関は「系列の t 日の変化」と「資産の t + k 日のリターン」の相関で、
+    k > 0 のピークは系列が資産に k 日先行していることを表します。
+    相互相関は全ラグをFFTによる畳み込みで一度に計算するため、系列数やウィンドウ数が
+    増えても計算量は O(n log n) に収まります。欠損は標準化後に0とし、ラグごとの
+    有効な組の数（マスクの相互相関）で割って正規化します。
+    """
+
+    def calculate_cross_correlation(self, target, series, max_lag=MAX_LAG_DAYS, min_overlap=MIN_OVERLAP_DAYS):
+        """全ラグの相互相関を計算
+
+        Args:
+            target (pd.Series): 資産のリターン（日次）
+            series (pd.DataFrame): 各系列の変化（targetと同じインデックス、列ごと）
+            max_lag (int): ラグの範囲（±日数）
+            min_overlap (int): 相関の計算に必要な重なりの最小日数
+
+        Returns:
+            pd.DataFrame: 系列 × ラグ（-max_lag..max_lag）の相関係数
+        """
+        lags = np.arange(-max_lag, max_lag + 1)
+        x, x_mask = _standardize(target.to_numpy(dtype=float))
+        y, y_mask = _standardize(series.to_numpy(dtype=float).T)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            counts = np.rint(_cross_sums(x_mask, y_mask, max_lag))
+            correlation = _cross_sums(x, y, max_lag) / counts
+        correlation[counts < min_overlap] = np.nan
+        return pd.DataFrame(correlation, index=series.columns, columns=lags)
+
+    def calculate_rolling_peak_lags(self, target, series, window=ROLLING_WINDOW_DAYS, step=ROLLING_STEP_DAYS,
+                                    max_lag=MAX_LAG_DAYS, min_overlap=MIN_OVERLAP_DAYS):
+        """ローリングウィンドウごとに相関の絶対値が最大となるラグを計算
+
+        全ウィンドウを1つの配列にまとめてFFTを実行します（ウィンドウ数に比例した
+        Pythonのループはありません）。
+
+        Args:
+            target (pd.Series): 資産のリターン（日次）
+            series (pd.DataFrame): 各系列の変化（targetと同じインデックス、列ごと）
+            window (int): ウィンドウの日数
+            step (int): ウィンドウをずらす日数
+            max_lag (int): ラグの範囲（±日数）
+            min_overlap (int): 相関の計算に必要な重なりの最小日数
+
+        Returns:
+            pd.DataFrame: ウィンドウの最終日 × 系列のピークのラグ（データ不足の場合はNone）
+        """
+        if len(target) < window or window <= max_lag:
+            return None
+        ends = np.arange(window - 1, len(target), step)
+        x_windows = sliding_window_view(target.to_numpy(dtype=float), window)[ends - window + 1]
+        y_windows = sliding_window_view(series.to_numpy(dtype=float).T, window, axis=-1)[:, ends - window + 1]
+
+        x, x_mask = _standardize(x_windows)
+        y, y_mask = _standardize(y_windows)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            counts = np.rint(_cross_sums(x_mask, y_mask, max_lag))
+            correlation = _cross_sums(x, y, max_lag) / counts
+        correlation[counts < min_overlap] = np.nan
+
+        # 系列 × ウィンドウ × ラグ から相関の絶対値が最大のラグを選ぶ（全て欠損の場合は欠損）
+        magnitude = np.abs(correlation)
+        valid = np.isfinite(magnitude).any(axis=-1)
+        peaks = np.where(valid, np.argmax(np.nan_to_num(magnitude, nan=-1.0), axis=-1) - max_lag, np.nan)
+        return pd.DataFrame(peaks.T, index=target.index[ends], columns=series.columns)
+
+    def peak_lags(self, cross_correlation):
+        """系列ごとに相関の絶対値が最大となるラグと相関係数
+
+        Args:
+            cross_correlation (pd.DataFrame): calculate_cross_correlationの結果
+
+        Returns:
+            pd.DataFrame: 'Lag'（日数）と 'Correlation' の列（系列ごと）
+        """
+        magnitude = cross_correlation.abs()
+        valid = magnitude.notna().any(axis=1)
+        lags = magnitude[valid].idxmax(axis=1)
+        return pd.DataFrame({
+            'Lag': lags,
+            'Correlation': [cross_correlation.at[name, lag] for name, lag in lags.items()],
+        })
+
+    def plot_lead_lag(self, ax, cross_correlation, title, labels=None):
+        """相互相関のヒートマップ（系列 × ラグ）と系列ごとのピークを描画
+
+        Args:
+            ax (matplotlib.axes.Axes): プロット対象のAxes
+            cross_correlation (pd.DataFrame): calculate_cross_correlationの結果
+            title (str): グラフのタイトル
+            labels (dict): 系列名 -> 表示名
+        """
+        lags = cross_correlation.columns.to_numpy()
+        values = cross_correlation.to_numpy(dtype=float)
+        limit = np.nanmax(np.abs(values)) if np.isfinite(values).any() else 1.0
+        image = ax.imshow(np.ma.masked_invalid(values), aspect='auto', cmap='RdBu_r',
+                          vmin=-limit, vmax=limit, interpolation='nearest',
+                          extent=[lags[0] - 0.5, lags[-1] + 0.5, len(values) - 0.5, -0.5])
+        ax.figure.colorbar(image, ax=ax, fraction=0.04, pad=0.02)
+
+        # 系列ごとのピーク（相関の絶対値が最大のラグ）
+        peaks = self.peak_lags(cross_correlation)
+        rows = [cross_correlation.index.get_loc(name) for name in peaks.index]
+        ax.scatter(peaks['Lag'], rows, marker='x', color='black', zorder=3)
+        ax.axvline(x=0, color='gray', linestyle='--', alpha=0.7)
+
+        labels = labels or {}
+        ticks = []
+        for name in cross_correlation.index:
+            label = labels.get(name, name)
+            if name in peaks.index:
+                label = f"{label} ({int(peaks.at[name, 'Lag']):+d}d)"
+            ticks.append(label)
+        ax.set_yticks(range(len(ticks)))
+        ax.set_yticklabels(ticks)
+        ax.set_xlabel('Lag (days, +: series leads)')
+        ax.set_title(title)
+        ax.grid(False)
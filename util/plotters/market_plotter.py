@@ -1,72 +1,244 @@
+import os
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from .base_plotter import BasePlotter
 from .technical_indicators import TechnicalIndicators
 from .correlation_plotter import CorrelationPlotter
+from .lead_lag_plotter import LeadLagPlotter
+from .figure_skeleton import MAIN_SLOT, figure_skeleton, grid_cells
+from ..frequency import cascade_resample
+from ..metrics import metrics
+from ..assets import DEFAULT_ASSET, asset_name, price_column
+
+# MACDヒストグラムを棒グラフで描画する最大本数（超える場合は塗りつぶしで描画）
+MAX_HISTOGRAM_BARS = 2000
+
+# 相関パネルの設定: (データソース名, 列名, タイトル（{asset}は資産名）, 表示名)
+CORRELATION_CONFIGS = [
+    ('dxy', 'DXY Price', '{asset}-DXY Correlation', 'DXY'),
+    ('sp500', 'SP500 Price', '{asset}-S&P500 Correlation', 'S&P500'),
+]
+
+# 先行・遅行分析の系列: (データソース名, 列名, 表示名, 変化の計算方法（'pct': 変化率, 'diff': 差分）)
+LEAD_LAG_CONFIGS = [
+    ('dxy', 'DXY Price', 'DXY', 'pct'),
+    ('sp500', 'SP500 Price', 'S&P500', 'pct'),
+    ('gold', 'Gold Price', 'Gold', 'pct'),
+    ('funding_rates', 'Funding Rate', 'Funding', 'diff'),
+    ('fear_greed', 'Fear & Greed Value', 'Fear & Greed', 'diff'),
+    ('google_trends', 'bitcoin Trend', 'Google Trends', 'diff'),
+]
+
+# 総合シグナルの各指標の重み
+SIGNAL_WEIGHTS = {
+    'rsi': 1.0,
+    'macd': 1.5,
+    'ma': 2.0,
+    'fear_greed': 0.5,
+    'timeframes': 1.0
+}
+
+# マルチタイムフレームの一致度で各足のトレンドの判定に使用する移動平均
+TIMEFRAME_TREND_MA = 'EMA_21'
+
+# 一致度の判定に使用するまでに必要な足の数（指数移動平均のウォームアップ期間）
+# 足の数が足りない間は初期値の影響が大きいため、その足は一致度に含めない
+TIMEFRAME_TREND_WARMUP = 21
+TIMEFRAME_MOMENTUM_WARMUP = 26 + 9 - 1
+
+# 期間別のグラフの期間: 表示名 -> 日数（None は全期間）
+LOOKBACK_WINDOWS = {
+    '30d': 30,
+    '90d': 90,
+    '1y': 365,
+    'all': None,
+}
+
+# 保存済みデータを使用したパネルのタイトルの色
+STALE_COLOR = '#d62728'
+
+# 個別パネルの設定: (データソース名, 列名, タイトル（{asset}は資産名）, ボーダーライン)
+PANEL_CONFIGS = [
+    ('large_holders', 'Total Holdings', 'Large Holders', None),
+    ('funding_rates', 'Funding Rate', 'Funding Rates (%)', [-0.05, 0.05]),
+    ('fear_greed', 'Fear & Greed Value', 'Fear & Greed Index', [25, 75]),
+    ('open_interest', 'Open Interest', 'Open Interest ({asset})', None),
+    ('trading_volume', 'Trading Volume', 'Volume (USD)', None),
+    ('active_addresses', 'Active Addresses', 'Number of Addresses', None),
+    ('hash_rate', 'Hash Rate', 'Hash Rate (TH/s)', None),
+    ('coinbase_premium', 'Coinbase Premium', 'Premium (%)', [-0.05, 0.05]),
+    ('etf', 'GBTC Price', 'GBTC Price (USD)', None)
+]
 
 class MarketPlotter(BasePlotter):
-    def __init__(self):
+    def __init__(self, asset=DEFAULT_ASSET):
         super().__init__()
+        # 分析対象の資産と価格の列名
+        self.asset = asset
+        self.price_column = price_column(asset)
         self.tech_indicators = TechnicalIndicators()
         self.corr_plotter = CorrelationPlotter()
+        self.lead_lag_plotter = LeadLagPlotter()
 
-    def calculate_market_signal(self, data):
+    def calculate_indicators(self, btc_price):
+        """シグナルとBTCUSDセクションで使用するテクニカル指標を計算
+        
+        Args:
+            btc_price (pd.Series): 資産の価格データ
+        
+        Returns:
+            dict: 価格（price）、RSI（rsi）、MACD（macd_line, signal_line, histogram）、移動平均（mas）
+        """
+        with metrics.stage('indicators'):
+            macd_line, signal_line, histogram = self.tech_indicators.calculate_macd(btc_price)
+            return {
+                'price': btc_price,
+                'rsi': self.tech_indicators.calculate_rsi(btc_price),
+                'macd_line': macd_line,
+                'signal_line': signal_line,
+                'histogram': histogram,
+                'mas': self.tech_indicators.calculate_moving_averages(btc_price),
+            }
+
+    def calculate_market_signal(self, panel, indicators=None, timeframes=None):
         """市場シグナルを計算
         
         Args:
-            data (dict): 各種市場データを含む辞書
+            panel (MarketPanel): 各種市場データを揃えたパネル
+            indicators (dict): calculate_indicatorsの結果（None の場合は計算）
+            timeframes (dict): calculate_timeframe_indicatorsの結果（None の場合は計算）
         
         Returns:
             pd.Series: 市場シグナル（-2: 強い売り、-1: 売り、0: 中立、1: 買い、2: 強い買い）
         """
-        if 'btcusd' not in data:
+        components = self.calculate_signal_components(panel, indicators, timeframes)
+        if components is None:
             return None
+        return components['signal'].rename(None)
 
-        btc_price = data['btcusd']['BTCUSD Price']
-        signals = pd.Series(index=btc_price.index, dtype=float)
+    def calculate_signal_components(self, panel, indicators=None, timeframes=None, start=None):
+        """市場シグナルの各指標のシグナル、重み付けした総合値と5段階のシグナルを計算
+        
+        Args:
+            panel (MarketPanel): 各種市場データを揃えたパネル
+            indicators (dict): calculate_indicatorsの結果（None の場合は計算）
+            timeframes (dict): calculate_timeframe_indicatorsの結果（None の場合は計算）
+            start (int): 計算を始める行の位置（None の場合は全ての行）。指標は全期間で
+                計算済みのものを切り出し、シグナルの分類と一致度は対象の行のみで計算します
+        
+        Returns:
+            pd.DataFrame: 指標ごとのシグナル（rsi, macd, ma, fear_greed、-1 to 1）、
+                日足・週足・月足の一致度（timeframes、-1 to 1）、総合値（composite）、
+                市場シグナル（signal、-2 to 2）（データがない場合はNone）
+        """
+        if panel is None or 'btcusd' not in panel:
+            return None
+
+        # テクニカル指標の計算
+        if indicators is None:
+            indicators = self.calculate_indicators(panel.series('btcusd', self.price_column))
+        if timeframes is None:
+            timeframes = self.calculate_timeframe_indicators(indicators)
+
+        with metrics.stage('signal'):
+            rows = slice(start, None)
+            price = indicators['price'].iloc[rows]
+            agreement = self.calculate_timeframe_agreement(timeframes, price.index)
+            return self._classify_market_signal(
+                panel, price, indicators['rsi'].iloc[rows], indicators['histogram'].iloc[rows],
+                indicators['mas'].iloc[rows], agreement)
+
+    def calculate_timeframe_indicators(self, indicators):
+        """日足・週足・月足のテクニカル指標を計算（マルチタイムフレームのピラミッド）
+        
+        基準の価格から日足・週足・月足を順にリサンプリングし（cascade_resample）、
+        各足で同じ指標を計算します。基準の価格が日足の場合、日足の指標は
+        計算済みの指標をそのまま使用します。
+        
+        Args:
+            indicators (dict): 基準の価格のcalculate_indicatorsの結果
+        
+        Returns:
+            dict: 足（'1d', '1w', '1M'）-> calculate_indicatorsの結果
+        """
+        price = indicators['price']
+        timeframes = {}
+        with metrics.stage('timeframes'):
+            for level, bars in cascade_resample(price).items():
+                if len(bars) == len(price):
+                    # 基準の価格と同じ足（日足）は再計算しない
+                    timeframes[level] = indicators
+                else:
+                    timeframes[level] = self.calculate_indicators(bars)
+        return timeframes
+
+    def calculate_timeframe_agreement(self, timeframes, index):
+        """日足・週足・月足のトレンドの一致度を計算
+        
+        各足でMACDヒストグラムの符号（モメンタム）と価格とTIMEFRAME_TREND_MAの
+        上下（トレンド）の平均を向きとし、各時点で確定済みの足の値を全ての足で
+        平均します（全ての足で上昇なら1、下降なら-1）。ウォームアップ期間
+        （TIMEFRAME_TREND_WARMUP・TIMEFRAME_MOMENTUM_WARMUP）の足は判定に使用せず、
+        取得期間に対して足の数が少ない上位の足（1年間の月足など）は平均から除きます。
+        
+        Args:
+            timeframes (dict): calculate_timeframe_indicatorsの結果
+            index (pd.DatetimeIndex): 一致度を求める時点（基準の価格のインデックス）
+        
+        Returns:
+            pd.Series: 一致度（-1 to 1）
+        """
+        votes = []
+        for level_indicators in timeframes.values():
+            trend = np.sign(level_indicators['price'] - level_indicators['mas'][TIMEFRAME_TREND_MA])
+            momentum = np.sign(level_indicators['histogram'])
+            position = np.arange(len(trend))
+            trend = trend.where(position >= TIMEFRAME_TREND_WARMUP - 1)
+            momentum = momentum.where(position >= TIMEFRAME_MOMENTUM_WARMUP - 1)
+            vote = pd.concat([trend, momentum], axis=1).mean(axis=1)
+            # 各足のインデックスは最後の観測時刻のため、as-of結合で確定済みの値のみを参照
+            votes.append(vote.reindex(index, method='ffill'))
+        if not votes:
+            return pd.Series(0.0, index=index)
+        return pd.concat(votes, axis=1).mean(axis=1).fillna(0.0)
 
+    def _classify_market_signal(self, panel, btc_price, rsi, histogram, mas, agreement):
+        """各指標のシグナルを重み付けして5段階に分類"""
         # RSIによるシグナル（-1 to 1）
-        rsi = self.tech_indicators.calculate_rsi(btc_price)
         rsi_signal = pd.Series(0, index=rsi.index)
         rsi_signal[rsi > 70] = -1  # 売られすぎ
         rsi_signal[rsi < 30] = 1   # 買われすぎ
 
         # MACDによるシグナル（-1 to 1）
-        macd_line, signal_line, histogram = self.tech_indicators.calculate_macd(btc_price)
-        macd_signal = pd.Series(0, index=macd_line.index)
+        macd_signal = pd.Series(0, index=histogram.index)
         macd_signal[histogram > 0] = 1    # ゴールデンクロス
         macd_signal[histogram < 0] = -1   # デッドクロス
 
         # 移動平均によるシグナル（-1 to 1）
-        mas = self.tech_indicators.calculate_moving_averages(btc_price)
         ma_signal = pd.Series(0, index=mas.index)
         ma_signal[btc_price > mas['SMA_200']] = 1     # 長期MAの上
         ma_signal[btc_price < mas['SMA_200']] = -1    # 長期MAの下
 
         # Fear & Greedインデックスによるシグナル（-1 to 1）
-        if 'fear_greed' in data:
-            fg = data['fear_greed']['Fear & Greed Value']
+        if 'fear_greed' in panel:
+            # 価格データの各足時点で補完済みのFear & Greedを使用
+            fg = panel.aligned('Fear & Greed Value', at='btcusd')
+            # 価格の一部の行のみを計算する場合は同じ末尾の行を使用
+            fg = fg.iloc[len(fg) - len(btc_price):]
             fg_signal = pd.Series(0, index=fg.index)
             fg_signal[fg > 75] = -1   # 強気すぎ
             fg_signal[fg < 25] = 1    # 弱気すぎ
         else:
             fg_signal = pd.Series(0, index=btc_price.index)
 
-        # 各シグナルの重み付け
-        weights = {
-            'rsi': 1.0,
-            'macd': 1.5,
-            'ma': 2.0,
-            'fear_greed': 0.5
-        }
-
         # 総合シグナルの計算
+        weights = SIGNAL_WEIGHTS
         total_signal = (
             weights['rsi'] * rsi_signal +
             weights['macd'] * macd_signal +
             weights['ma'] * ma_signal +
-            weights['fear_greed'] * fg_signal
+            weights['fear_greed'] * fg_signal +
+            weights['timeframes'] * agreement
         ) / sum(weights.values())
 
         # シグナルを5段階に分類（-2 to 2）
@@ -77,60 +249,326 @@ class MarketPlotter(BasePlotter):
         signals[(total_signal >= 0.3) & (total_signal < 0.8)] = 1     # 買い
         signals[total_signal >= 0.8] = 2      # 強い買い
 
-        return signals
+        return pd.DataFrame({
+            'rsi': rsi_signal,
+            'macd': macd_signal,
+            'ma': ma_signal,
+            'fear_greed': fg_signal,
+            'timeframes': agreement,
+            'composite': total_signal,
+            'signal': signals,
+        })
+
+    def calculate_correlation(self, panel, name):
+        """資産の価格とデータソースの相関係数を計算
+        
+        Args:
+            panel (MarketPanel): 日足のBTCUSDを基準にしたパネル
+            name (str): CORRELATION_CONFIGSのデータソース名
+        
+        Returns:
+            pd.Series: 相関係数の時系列（データがない場合はNone）
+        """
+        column = next(config[1] for config in CORRELATION_CONFIGS if config[0] == name)
+        if 'btcusd' not in panel or name not in panel:
+            return None
+        pair = panel.co_observed(['btcusd', name], [self.price_column, column])
+        return self.corr_plotter.calculate_correlation(pair[self.price_column], pair[column])
+
+    def calculate_correlation_matrix(self, panel):
+        """資産の価格と全データソースの列の相関行列を計算（日足の価格の時点で揃えた変化率）
+        
+        Args:
+            panel (MarketPanel): 日足のBTCUSDを基準にしたパネル
+        
+        Returns:
+            pd.DataFrame: 列×列の相関係数（価格データがない場合はNone）
+        """
+        if 'btcusd' not in panel:
+            return None
+        columns = [column for column in panel.frame.columns
+                   if pd.api.types.is_numeric_dtype(panel.frame[column])]
+        prices = panel.frame.loc[panel.observed['btcusd'].to_numpy(), columns]
+        return self.corr_plotter.calculate_correlation_matrix(prices)
+
+    def calculate_lead_lag(self, panel):
+        """資産の日次リターンに対する各系列の先行・遅行（相互相関）を計算
+        
+        各系列は観測日ごとの値（日中の更新は日の最終値）の変化を観測日に割り当て、
+        休場日などの観測のない日は欠損として扱います。
+        
+        Args:
+            panel (MarketPanel): 日足のBTCUSDを基準にしたパネル
+        
+        Returns:
+            dict: 相互相関（cross、系列 × ラグ）とローリングウィンドウごとのピークのラグ
+                （rolling、None可）（対象の系列がない場合はNone）
+        """
+        if 'btcusd' not in panel:
+            return None
+        price = panel.series('btcusd', self.price_column).astype(float)
+        price = price.groupby(price.index.normalize()).last()
+        returns = np.log(price).diff()
+
+        changes = {}
+        for name, column, _, method in LEAD_LAG_CONFIGS:
+            if name not in panel or column not in panel.sources[name]:
+                continue
+            values = panel.series(name, column).astype(float)
+            values = values.groupby(values.index.normalize()).last()
+            change = values.pct_change(fill_method=None) if method == 'pct' else values.diff()
+            changes[name] = change.replace([np.inf, -np.inf], np.nan).reindex(returns.index)
+        if not changes:
+            return None
+
+        changes = pd.DataFrame(changes)
+        return {
+            'cross': self.lead_lag_plotter.calculate_cross_correlation(returns, changes),
+            'rolling': self.lead_lag_plotter.calculate_rolling_peak_lags(returns, changes),
+        }
+
+    def panel_series(self, panel, name):
+        """個別パネルに描画する系列（観測時点の値のみ）
+        
+        Args:
+            panel (MarketPanel): 日足のBTCUSDを基準にしたパネル
+            name (str): PANEL_CONFIGSのデータソース名
+        
+        Returns:
+            pd.Series: 描画する系列（列がない場合はNone）
+        """
+        column = next(config[1] for config in PANEL_CONFIGS if config[0] == name)
+        if name not in panel or column not in panel.sources[name]:
+            return None
+        return panel.series(name, column)
+
+    def calculate_plot_inputs(self, panel):
+        """描画に必要な系列をパネルから計算
+        
+        Args:
+            panel (MarketPanel): 各種市場データを揃えたパネル
+        
+        Returns:
+            dict: renderに渡す描画データ
+        """
+        indicators = None
+        if 'btcusd' in panel:
+            indicators = self.calculate_indicators(panel.series('btcusd', self.price_column))
 
-    def plot_market_data(self, results):
+        # 日次の他指標と比較するため日足のパネルを使用
+        daily = panel.daily
+        return {
+            'indicators': indicators,
+            'signals': self.calculate_market_signal(panel, indicators),
+            'btc_reference': daily.btc_reference,
+            'correlations': {name: self.calculate_correlation(daily, name)
+                             for name, _, _, _ in CORRELATION_CONFIGS if name in daily},
+            'series': {name: self.panel_series(daily, name)
+                       for name, _, _, _ in PANEL_CONFIGS if name in daily},
+            'lead_lag': self.calculate_lead_lag(daily),
+            'stale': dict(panel.stale),
+        }
+
+    def plot_market_data(self, panel, windows=None):
         """市場データをプロット
         
         Args:
-            results (dict): 各種市場データを含む辞書
+            panel (MarketPanel): 各種市場データを揃えたパネル
+            windows (dict): 期間別のグラフの表示名 -> 日数（None の場合は全期間のグラフのみ）
         """
-        if not results:
+        if panel is None:
             print("プロット可能なデータがありません")
             return
 
-        valid_results = {k: v for k, v in results.items() if v is not None and not v.empty}
-        if not valid_results:
-            print("プロット可能なデータがありません")
-            return
+        inputs = self.calculate_plot_inputs(panel)
+        if windows:
+            self.render_windows(inputs, windows)
+        else:
+            self.render(inputs)
 
-        # シグナルの計算
-        market_signals = self.calculate_market_signal(valid_results)
+    def render(self, inputs, filename='crypto_analysis.png'):
+        """計算済みの描画データからグラフを作成して保存
+        
+        Args:
+            inputs (dict): 描画データ
+                indicators (dict): calculate_indicatorsの結果（None可）
+                signals (pd.Series): 市場シグナル（None可）
+                btc_reference (pd.Series): 0-1に正規化したBTCUSD（None可）
+                correlations (dict): データソース名 -> 相関係数の時系列
+                series (dict): データソース名 -> 個別パネルの系列（None可）
+                lead_lag (dict): calculate_lead_lagの結果（省略可）
+                stale (dict): 保存済みデータを使用したデータソース名 -> 最終時刻（省略可）
+            filename (str): 保存先のファイル名
+        """
+        tiles = {slot: self.render_panel(panel, slot, inputs) for panel, slot in self.panel_slots(inputs)}
+        with metrics.stage('plot.composite'):
+            figure_skeleton().composite(tiles, filename)
 
-        # プロットスタイルの設定
-        self.setup_plot_style()
+    def render_windows(self, inputs, windows=LOOKBACK_WINDOWS, filename='crypto_analysis.png'):
+        """計算済みの描画データから期間別のグラフを作成して保存
         
-        # グリッドの作成
-        fig, gs, gs_btc, other_axes = self.create_grid()
+        指標・シグナルは全期間で1回だけ計算し、各期間のグラフは同じ系列を
+        期間の開始時点から切り出して描画します（期間ごとの再計算はありません）。
         
-        # BTCUSDのプロット（メイン、RSI、MACD）
-        self.plot_btcusd_section(gs_btc, valid_results.get('btcusd'), market_signals)
+        Args:
+            inputs (dict): renderの描画データ（全期間）
+            windows (dict): 表示名 -> 日数（None は全期間）
+            filename (str): 保存先のファイル名（期間ごとに表示名を付加）
+        """
+        end = self.latest_timestamp(inputs)
+        for label, days in windows.items():
+            start = window_start(end, days)
+            self.render(self.slice_inputs(inputs, start), window_filename(filename, label))
+
+    def latest_timestamp(self, inputs):
+        """描画データの最新時刻（価格がある場合は価格の最新時刻）"""
+        indicators = inputs.get('indicators')
+        if indicators is not None:
+            return indicators['price'].index[-1]
+        ends = [series.index[-1] for series in inputs.get('series', {}).values()
+                if series is not None and not series.empty]
+        return max(ends) if ends else None
+
+    def slice_inputs(self, inputs, start):
+        """描画データを start 以降に切り出す
         
-        # その他のデータのプロット
-        self.plot_other_data(other_axes, valid_results)
+        位置による切り出しのため、各系列は元の配列を参照したまま（コピーせずに）
+        切り出されます。BTCUSDの参照線は期間内で0-1に正規化し直します。
+        
+        Args:
+            inputs (dict): renderの描画データ
+            start (pd.Timestamp): 期間の開始時点（None の場合は全期間）
         
-        # プロットの保存
-        self.save_plot(fig)
+        Returns:
+            dict: 切り出した描画データ
+        """
+        if start is None:
+            return inputs
+
+        def since(data):
+            if data is None:
+                return None
+            return data.iloc[data.index.searchsorted(start):]
+
+        indicators = inputs.get('indicators')
+        if indicators is not None:
+            indicators = {key: since(value) for key, value in indicators.items()}
+
+        btc_reference = since(inputs.get('btc_reference'))
+        if btc_reference is not None and not btc_reference.empty:
+            low, high = btc_reference.min(), btc_reference.max()
+            if high > low:
+                btc_reference = (btc_reference - low) / (high - low)
+
+        # 先行・遅行のヒートマップは横軸がラグのため全期間のまま
+        return {
+            **inputs,
+            'indicators': indicators,
+            'signals': since(inputs.get('signals')),
+            'btc_reference': btc_reference,
+            'correlations': {name: since(value) for name, value in inputs.get('correlations', {}).items()},
+            'series': {name: since(value) for name, value in inputs.get('series', {}).items()},
+        }
+
+    def panel_slots(self, inputs):
+        """描画するパネルとグリッドのスロットの対応
+        
+        BTCUSDセクションは上段の左、その他は相関、個別パネル（PANEL_CONFIGSの順）、
+        先行・遅行のヒートマップの順に空いているスロットに配置します。
+        
+        Args:
+            inputs (dict): renderの描画データ（パネルの有無の判定にのみ使用）
+        
+        Returns:
+            list: (パネル名, スロット) のリスト（パネル名は 'btcusd', 'correlation.<データソース>',
+                'series.<データソース>', 'lead_lag'）
+        """
+        slots = []
+        if inputs.get('indicators') is not None:
+            slots.append(('btcusd', MAIN_SLOT))
 
-    def plot_btcusd_section(self, gs_btc, btcusd_data, market_signals):
+        panels = []
+        if inputs.get('btc_reference') is not None:
+            panels.extend(f'correlation.{name}' for name, _, _, _ in CORRELATION_CONFIGS
+                          if name in inputs.get('correlations', {}))
+        panels.extend(f'series.{name}' for name, _, _, _ in PANEL_CONFIGS if name in inputs.get('series', {}))
+        if inputs.get('lead_lag') is not None:
+            panels.append('lead_lag')
+        # スロットが足りない場合は後ろのパネルを省略
+        other_slots = [slot for slot in grid_cells() if slot != MAIN_SLOT]
+        slots.extend(zip(panels, other_slots))
+        return slots
+
+    def render_panel(self, panel, slot, inputs):
+        """1つのパネルをスロットに描画して画像を返す
+        
+        Args:
+            panel (str): panel_slotsのパネル名
+            slot: グリッドのスロット
+            inputs (dict): renderの描画データ（パネルが使用する項目のみでよい）
+        
+        Returns:
+            bytes: パネルのPNG画像（描画するデータがない場合はNone）
+        """
+        if panel.startswith('series.') and inputs['series'][panel[len('series.'):]] is None:
+            return None
+        if panel == 'lead_lag' and inputs.get('lead_lag') is None:
+            return None
+
+        def draw(fig, spec):
+            self.plot_panel(fig, spec, panel, inputs)
+
+        with metrics.stage('plot.btcusd_section' if panel == 'btcusd' else f'plot.panel.{panel}'):
+            return figure_skeleton().render_tile(slot, draw)
+
+    def plot_panel(self, fig, spec, panel, inputs):
+        """パネル名に応じてAxesを作成して描画
+        
+        Args:
+            fig (matplotlib.figure.Figure): 描画先の図
+            spec (matplotlib.gridspec.SubplotSpec): パネルのグリッドのマス
+            panel (str): panel_slotsのパネル名
+            inputs (dict): renderの描画データ
+        """
+        stale = inputs.get('stale')
+        if panel == 'btcusd':
+            self.plot_btcusd_section(fig, spec, inputs['indicators'], inputs.get('signals'), stale)
+        elif panel.startswith('correlation.'):
+            name = panel[len('correlation.'):]
+            self.plot_correlation_panel(fig.add_subplot(spec), name, inputs['correlations'][name],
+                                        inputs['btc_reference'], stale)
+        elif panel.startswith('series.'):
+            name = panel[len('series.'):]
+            self.plot_series_panel(fig.add_subplot(spec), name, inputs['series'][name],
+                                   inputs.get('btc_reference'), stale)
+        elif panel == 'lead_lag':
+            self.plot_lead_lag_panel(fig.add_subplot(spec), inputs['lead_lag'], stale)
+
+    def plot_btcusd_section(self, fig, spec, indicators, market_signals, stale=None):
         """BTCUSDセクションのプロット
         
         Args:
-            gs_btc: BTCUSDセクション用のGridSpec
-            btcusd_data (pd.DataFrame): BTCUSDの価格データ
+            fig (matplotlib.figure.Figure): 描画先の図
+            spec (matplotlib.gridspec.SubplotSpec): BTCUSDセクションのグリッドのマス
+            indicators (dict): calculate_indicatorsの結果
             market_signals (pd.Series): 市場シグナル
+            stale (dict): 保存済みデータを使用したデータソース名 -> 最終時刻
         """
-        if btcusd_data is None:
+        if indicators is None:
             return
 
+        # メイン、RSI、MACDの3段
+        gs_btc = spec.subgridspec(3, 1, height_ratios=[3, 1, 1], hspace=0.1)
+        btc_price = indicators['price']
+
         # メインチャート
-        ax_main = plt.subplot(gs_btc[0])
+        ax_main = fig.add_subplot(gs_btc[0])
         
         # プロットの順序を調整
         # 1. データの範囲を設定
-        ax_main.set_xlim(btcusd_data.index[0], btcusd_data.index[-1])
-        min_price = btcusd_data['BTCUSD Price'].min()
-        max_price = btcusd_data['BTCUSD Price'].max()
+        ax_main.set_xlim(btc_price.index[0], btc_price.index[-1])
+        min_price = btc_price.min()
+        max_price = btc_price.max()
         price_margin = (max_price - min_price) * 0.1
         ax_main.set_ylim(min_price - price_margin, max_price + price_margin)
         
@@ -142,128 +580,143 @@ class MarketPlotter(BasePlotter):
         ax_main.grid(True, alpha=0.3, zorder=1)
         
         # 4. 価格データをプロット
-        ax_main.plot(btcusd_data.index, btcusd_data['BTCUSD Price'],
-                    color=self.colors['btcusd'], label='BTCUSD', zorder=2)
+        ax_main.plot(btc_price.index, btc_price,
+                    color=self.colors['btcusd'], label=f'{self.asset}USD', zorder=2)
         
         # 5. 移動平均線の追加
-        mas = self.tech_indicators.calculate_moving_averages(btcusd_data['BTCUSD Price'])
+        mas = indicators['mas']
         for period in [21, 50, 200]:
             ax_main.plot(mas.index, mas[f'SMA_{period}'],
                         color=self.colors[f'sma_{period}'],
                         label=f'SMA {period}', alpha=0.7, zorder=2)
         
-        self.format_axis(ax_main, 'Bitcoin Price (USD)', ylabel='Price')
+        self.format_axis(ax_main, f'{asset_name(self.asset)} Price (USD)', ylabel='Price')
+        self.mark_stale(ax_main, stale, ['btcusd'])
         ax_main.legend(loc='upper left')
         
         # RSIのプロット
-        ax_rsi = plt.subplot(gs_btc[1])
-        rsi = self.tech_indicators.calculate_rsi(btcusd_data['BTCUSD Price'])
+        ax_rsi = fig.add_subplot(gs_btc[1])
+        rsi = indicators['rsi']
         ax_rsi.plot(rsi.index, rsi, color=self.colors['btcusd'])
         self.format_axis(ax_rsi, 'RSI (14)', ylabel='RSI', show_borders=True, borders=[30, 70])
         ax_rsi.set_ylim(0, 100)
         
         # MACDのプロット
-        ax_macd = plt.subplot(gs_btc[2])
-        macd_line, signal_line, histogram = self.tech_indicators.calculate_macd(btcusd_data['BTCUSD Price'])
+        ax_macd = fig.add_subplot(gs_btc[2])
+        macd_line, signal_line, histogram = indicators['macd_line'], indicators['signal_line'], indicators['histogram']
         ax_macd.plot(macd_line.index, macd_line, color=self.colors['macd'], label='MACD')
         ax_macd.plot(signal_line.index, signal_line, color=self.colors['signal'], label='Signal')
-        ax_macd.bar(histogram.index, histogram, color=self.colors['btcusd'], alpha=0.3)
+        if len(histogram) <= MAX_HISTOGRAM_BARS:
+            ax_macd.bar(histogram.index, histogram, color=self.colors['btcusd'], alpha=0.3)
+        else:
+            ax_macd.fill_between(histogram.index, 0, histogram, color=self.colors['btcusd'], alpha=0.3)
         
         # MACDのボーダーライン（0を基準）
         self.format_axis(ax_macd, 'MACD', ylabel='MACD', show_borders=True, borders=[-0, 0])
         ax_macd.legend(loc='upper left')
 
-    def add_btc_reference_line(self, ax, btc_price):
+    def mark_stale(self, ax, stale, names):
+        """保存済みデータを使用したパネルのタイトルに最終時刻を表示
+        
+        Args:
+            ax: プロット対象のAxes
+            stale (dict): 保存済みデータを使用したデータソース名 -> 最終時刻（None可）
+            names (list): パネルが使用するデータソース名
+        """
+        marks = [stale[name] for name in names if stale and name in stale]
+        if marks:
+            ax.set_title(f'{ax.get_title()} [stale: {min(marks)}]', color=STALE_COLOR)
+
+    def add_btc_reference_line(self, ax, btc_normalized):
         """BTCUSDの参照線を追加
         
         Args:
             ax: プロット対象のAxes
-            btc_price (pd.Series): BTCUSDの価格データ
+            btc_normalized (pd.Series): 0-1の範囲に正規化したBTCUSDの価格データ
         """
         # 現在のY軸の範囲を取得
         y_min, y_max = ax.get_ylim()
         y_range = y_max - y_min
         
-        # BTCUSDデータを0-1の範囲に正規化
-        btc_normalized = (btc_price - btc_price.min()) / (btc_price.max() - btc_price.min())
-        
         # 正規化したデータを現在のY軸の中央40%の範囲にスケーリング
         y_center = (y_max + y_min) / 2
         y_scale = y_range * 0.4
         btc_scaled = y_center + (btc_normalized - 0.5) * y_scale
         
         # 点線でプロット
-        ax.plot(btc_price.index, btc_scaled, color=self.colors['btcusd'], 
+        ax.plot(btc_normalized.index, btc_scaled, color=self.colors['btcusd'], 
                 linestyle='--', alpha=0.3, zorder=1)
 
-    def plot_other_data(self, axes, data):
-        """その他のデータをプロット
+    def plot_correlation_panel(self, ax, name, correlation, btc_reference, stale=None):
+        """BTCUSDとの相関係数のパネルを描画
+        
+        Args:
+            ax: プロット対象のAxes
+            name (str): CORRELATION_CONFIGSのデータソース名
+            correlation (pd.Series): 相関係数の時系列
+            btc_reference (pd.Series): 0-1に正規化したBTCUSD
+            stale (dict): 保存済みデータを使用したデータソース名 -> 最終時刻
+        """
+        _, _, title, label = next(config for config in CORRELATION_CONFIGS if config[0] == name)
+        title = title.format(asset=self.asset)
+        self.corr_plotter.plot_correlation(ax, correlation, title, self.asset, label)
+        self.add_btc_reference_line(ax, btc_reference)
+        self.format_axis(ax, title, ylabel='Correlation', show_borders=True, borders=[-0.5, 0.5])
+        self.mark_stale(ax, stale, ['btcusd', name])
+
+    def plot_series_panel(self, ax, name, series, btc_reference=None, stale=None):
+        """個別パネルを描画
+        
+        Args:
+            ax: プロット対象のAxes
+            name (str): PANEL_CONFIGSのデータソース名
+            series (pd.Series): panel_seriesの系列
+            btc_reference (pd.Series): 0-1に正規化したBTCUSD（None可）
+            stale (dict): 保存済みデータを使用したデータソース名 -> 最終時刻
+        """
+        _, _, title, borders = next(config for config in PANEL_CONFIGS if config[0] == name)
+
+        # メインデータのプロット（観測時点の値のみ）
+        ax.plot(series.index, series,
+                color=self.colors.get(name, '#333333'),
+                zorder=2)  # メインデータを前面に表示
+        
+        # BTCUSDの参照線を追加（RSIとMACD以外）
+        if btc_reference is not None:
+            self.add_btc_reference_line(ax, btc_reference)
+        
+        # ボーダーラインの追加
+        self.format_axis(ax, title.format(asset=self.asset),
+                         show_borders=bool(borders), borders=borders)
+        self.mark_stale(ax, stale, [name])
+        
+        # 特別な設定
+        if name == 'fear_greed':
+            ax.set_ylim(0, 100)
+        elif name == 'open_interest':
+            from matplotlib.ticker import FuncFormatter
+            ax.yaxis.set_major_formatter(
+                FuncFormatter(lambda x, p: format(int(x), ',')))
+
+    def plot_lead_lag_panel(self, ax, lead_lag, stale=None):
+        """先行・遅行のヒートマップを描画
         
         Args:
-            axes (list): プロット用のAxesリスト
-            data (dict): プロットするデータの辞書
+            ax: プロット対象のAxes
+            lead_lag (dict): calculate_lead_lagの結果
+            stale (dict): 保存済みデータを使用したデータソース名 -> 最終時刻
         """
-        ax_index = 0
-        btc_price = None if 'btcusd' not in data else data['btcusd']['BTCUSD Price']
-        
-        # 相関プロット
-        if btc_price is not None:
-            # DXYとの相関
-            if 'dxy' in data and ax_index < len(axes):
-                correlation = self.corr_plotter.calculate_correlation(
-                    btc_price, data['dxy']['DXY Price'])
-                self.corr_plotter.plot_correlation(
-                    axes[ax_index], correlation, 'BTC-DXY Correlation', 'BTC', 'DXY')
-                self.add_btc_reference_line(axes[ax_index], btc_price)
-                self.format_axis(axes[ax_index], 'BTC-DXY Correlation', ylabel='Correlation',
-                               show_borders=True, borders=[-0.5, 0.5])
-                ax_index += 1
-            
-            # S&P500との相関
-            if 'sp500' in data and ax_index < len(axes):
-                correlation = self.corr_plotter.calculate_correlation(
-                    btc_price, data['sp500']['SP500 Price'])
-                self.corr_plotter.plot_correlation(
-                    axes[ax_index], correlation, 'BTC-S&P500 Correlation', 'BTC', 'S&P500')
-                self.add_btc_reference_line(axes[ax_index], btc_price)
-                self.format_axis(axes[ax_index], 'BTC-S&P500 Correlation', ylabel='Correlation',
-                               show_borders=True, borders=[-0.5, 0.5])
-                ax_index += 1
-        
-        # その他のデータプロット
-        plot_configs = [
-            ('large_holders', 'Total Holdings', 'Large Holders', None),
-            ('funding_rates', 'Funding Rate', 'Funding Rates (%)', [-0.05, 0.05]),
-            ('fear_greed', 'Fear & Greed Value', 'Fear & Greed Index', [25, 75]),
-            ('open_interest', 'Open Interest', 'Open Interest (BTC)', None),
-            ('trading_volume', 'Trading Volume', 'Volume (USD)', None),
-            ('active_addresses', 'Active Addresses', 'Number of Addresses', None),
-            ('hash_rate', 'Hash Rate', 'Hash Rate (TH/s)', None),
-            ('coinbase_premium', 'Coinbase Premium', 'Premium (%)', [-0.05, 0.05]),
-            ('etf', 'GBTC Price', 'GBTC Price (USD)', None)
-        ]
-
-        for name, column, title, borders in plot_configs:
-            if name in data and ax_index < len(axes):
-                df = data[name]
-                if column in df.columns:
-                    # メインデータのプロット
-                    axes[ax_index].plot(df.index, df[column],
-                                      color=self.colors.get(name, '#333333'),
-                                      zorder=2)  # メインデータを前面に表示
-                    
-                    # BTCUSDの参照線を追加（RSIとMACD以外）
-                    if btc_price is not None:
-                        self.add_btc_reference_line(axes[ax_index], btc_price)
-                    
-                    # ボーダーラインの追加
-                    self.format_axis(axes[ax_index], title, show_borders=bool(borders), borders=borders)
-                    
-                    # 特別な設定
-                    if name == 'fear_greed':
-                        axes[ax_index].set_ylim(0, 100)
-                    elif name == 'open_interest':
-                        axes[ax_index].yaxis.set_major_formatter(
-                            plt.FuncFormatter(lambda x, p: format(int(x), ',')))
-  
-                ax_index += 1 
\ No newline at end of file
+        labels = {name: label for name, _, label, _ in LEAD_LAG_CONFIGS}
+        self.lead_lag_plotter.plot_lead_lag(ax, lead_lag['cross'], f'Lead-Lag vs {self.asset} Returns', labels)
+        self.mark_stale(ax, stale, ['btcusd'] + list(lead_lag['cross'].index))
+
+def window_start(end, days):
+    """期間の開始時点（日数が None または最新時刻がない場合は None）"""
+    if days is None or end is None:
+        return None
+    return end - pd.Timedelta(days=days)
+
+def window_filename(filename, label):
+    """期間別のグラフのファイル名（例: crypto_analysis_90d.png）"""
+    root, extension = os.path.splitext(filename)
+    return f'{root}_{label}{extension}'
@@ -0,0 +1,153 @@
+import os
+import re
+import io
+import cProfile
+import pstats
+import threading
+
+# 折りたたみスタックの最大深さと出力する最小時間（マイクロ秒）
+MAX_STACK_DEPTH = 64
+MIN_STACK_MICROSECONDS = 1
+
+# 折りたたみスタックで辿る枝の最小割合（ステージ合計時間に対する比率）
+# 呼び出しグラフの経路数は指数的に増えるため、小さな枝は打ち切る
+MIN_BRANCH_FRACTION = 0.001
+
+class StageProfiler:
+    """ステージごとにcProfileで計測し、pstatsと折りたたみスタックを出力する
+
+    ステージが入れ子の場合は内側のステージのみを計測するため、各ステージの
+    プロファイルには子ステージの処理時間は含まれません。cProfileはスレッドごとに
+    計測するため、別スレッドで実行したステージ（RunMetrics.bind）はスレッドごとに
+    計測し、出力時にまとめます。
+    """
+
+    def __init__(self, output_dir='profile'):
+        self.output_dir = output_dir
+        # ステージ名 -> スレッドごとの計測
+        self.profiles = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def _stack(self):
+        """現在のスレッドで計測中のプロファイル"""
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+            self._local.profiles = {}
+        return self._local.stack
+
+    def on_stage_start(self, name):
+        """ステージ開始時に外側の計測を止めて新しい計測を開始"""
+        stack = self._stack
+        if stack:
+            stack[-1].disable()
+        profile = self._local.profiles.get(name)
+        if profile is None:
+            profile = self._local.profiles[name] = cProfile.Profile()
+            with self._lock:
+                self.profiles.setdefault(name, []).append(profile)
+        stack.append(profile)
+        profile.enable()
+
+    def on_stage_end(self, name):
+        """ステージ終了時に計測を止めて外側の計測を再開"""
+        stack = self._stack
+        profile = stack.pop()
+        profile.disable()
+        if stack:
+            stack[-1].enable()
+
+    def stats(self, name):
+        """ステージの計測結果（全スレッド分をまとめたpstats.Stats）"""
+        return pstats.Stats(*self.profiles[name])
+
+    def _filename(self, name, extension):
+        """ステージ名からファイル名を作成"""
+        return os.path.join(self.output_dir, re.sub(r'[^0-9A-Za-z_.-]', '_', name) + extension)
+
+    def write(self):
+        """pstatsファイルと折りたたみスタック（flamegraph用）を保存"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        collapsed_lines = []
+        for name in self.profiles:
+            stats = self.stats(name)
+            stats.dump_stats(self._filename(name, '.pstats'))
+            collapsed_lines.extend(self.collapse_stacks(name, stats))
+
+        collapsed_path = os.path.join(self.output_dir, 'profile.collapsed')
+        with open(collapsed_path, 'w') as f:
+            f.write('\n'.join(collapsed_lines) + '\n')
+        return collapsed_path
+
+    def collapse_stacks(self, stage_name, stats):
+        """pstatsの呼び出しグラフから折りたたみスタック形式の行を作成
+
+        cProfileは呼び出し元と呼び出し先の組でしか時間を記録しないため、各関数の
+        時間を呼び出し元ごとの比率で按分してスタックを再構成します（近似値）。
+
+        Args:
+            stage_name (str): スタックの根に置くステージ名
+            stats (pstats.Stats): 計測結果
+
+        Returns:
+            list: "stage;関数;関数... マイクロ秒" 形式の行
+        """
+        callees = {}
+        roots = []
+        for func, (_, _, _, _, callers) in stats.stats.items():
+            if not callers:
+                roots.append(func)
+            for caller, edge in callers.items():
+                callees.setdefault(caller, []).append((func, edge[3]))
+
+        weights = {}
+        min_branch = stats.total_tt * MIN_BRANCH_FRACTION
+
+        def walk(func, inclusive, path):
+            _, _, self_time, cumulative, _ = stats.stats[func]
+            path = path + [self.format_function(func)]
+            if cumulative > 0:
+                own = inclusive * self_time / cumulative
+                if own > 0:
+                    key = ';'.join(path)
+                    weights[key] = weights.get(key, 0) + own
+            if len(path) >= MAX_STACK_DEPTH or cumulative <= 0:
+                return
+            for callee, edge_time in callees.get(func, []):
+                # 再帰呼び出しは按分が循環するため打ち切る
+                if self.format_function(callee) in path or edge_time <= 0:
+                    continue
+                branch = inclusive * edge_time / cumulative
+                if branch >= min_branch:
+                    walk(callee, branch, path)
+
+        for root in roots:
+            walk(root, stats.stats[root][3], [stage_name])
+
+        return [f'{stack} {int(seconds * 1_000_000)}'
+                for stack, seconds in weights.items()
+                if seconds * 1_000_000 >= MIN_STACK_MICROSECONDS]
+
+    @staticmethod
+    def format_function(func):
+        """pstatsの関数キーを表示用の文字列に変換"""
+        filename, line, function = func
+        if filename == '~':
+            return function
+        return f'{os.path.basename(filename)}:{line}({function})'
+
+    def print_hotspots(self, limit=5):
+        """ステージごとに自己時間の長い関数を表示"""
+        print("\n" + "="*50)
+        print("ステージ別のホットスポット（自己時間順）")
+        print("="*50)
+        for name, profiles in self.profiles.items():
+            stream = io.StringIO()
+            stats = pstats.Stats(*profiles, stream=stream)
+            if not stats.stats:
+                continue
+            print(f"\n[{name}] 合計 {stats.total_tt:.2f}s")
+            top = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+            for func, (_, calls, self_time, cumulative, _) in top:
+                print(f"  {self_time:8.3f}s (累積 {cumulative:8.3f}s, {calls}回) {self.format_function(func)}")
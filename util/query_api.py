@@ -0,0 +1,359 @@
+import os
+import json
+import struct
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .assets import DEFAULT_ASSET, ASSETS
+from .data_collector import DataCollector, SOURCES
+from .pipeline import ArtifactCache, build_analysis_pipeline
+from .plot_market_data import SIGNAL_LABELS
+
+# メモリ上に保持するデータセット・パイプラインの最大数（超えた場合は最も古く使用したものから破棄）
+QUERY_CACHE_ENTRIES = 64
+
+# バイナリ形式の先頭の識別子
+BINARY_MAGIC = b'BMA1'
+
+# バイナリ形式のContent-Type
+BINARY_CONTENT_TYPE = 'application/x-market-frame'
+
+def encode_frame(df, name):
+    """データをバイナリ形式に変換
+
+    形式（リトルエンディアン）:
+        識別子 'BMA1'（4バイト）、ヘッダー長（uint32）、ヘッダー（UTF-8のJSON:
+        name, rows, columns, dtypes）、タイムスタンプ（UTCのナノ秒、int64 × rows）、
+        各列の値（ヘッダーのdtype × rows、列の順に連結）
+
+    Args:
+        df (pd.DataFrame): 数値列のみのデータ（DatetimeIndex）
+        name (str): データセット名
+
+    Returns:
+        bytes: エンコードしたデータ
+    """
+    arrays = [np.ascontiguousarray(df[column].to_numpy()).astype(df[column].dtype.newbyteorder('<'), copy=False)
+              for column in df.columns]
+    header = json.dumps({
+        'name': name,
+        'rows': len(df),
+        'columns': list(df.columns),
+        'dtypes': [array.dtype.str for array in arrays],
+    }).encode('utf-8')
+    timestamps = np.ascontiguousarray(pd.DatetimeIndex(df.index).as_unit('ns').asi8, dtype='<i8')
+    parts = [BINARY_MAGIC, struct.pack('<I', len(header)), header, timestamps.tobytes()]
+    parts.extend(array.tobytes() for array in arrays)
+    return b''.join(parts)
+
+def decode_frame(payload):
+    """バイナリ形式のデータをDataFrameに戻す（クライアント用）
+
+    Args:
+        payload (bytes): encode_frameで作成したデータ
+
+    Returns:
+        pd.DataFrame: 元のデータ（インデックスはUTCのDatetimeIndex）
+    """
+    if payload[:4] != BINARY_MAGIC:
+        raise ValueError("不正なバイナリ形式です")
+    header_length = struct.unpack('<I', payload[4:8])[0]
+    header = json.loads(payload[8:8 + header_length].decode('utf-8'))
+    offset = 8 + header_length
+    rows = header['rows']
+    timestamps = np.frombuffer(payload, dtype='<i8', count=rows, offset=offset)
+    offset += timestamps.nbytes
+    columns = {}
+    for column, dtype in zip(header['columns'], header['dtypes']):
+        values = np.frombuffer(payload, dtype=dtype, count=rows, offset=offset)
+        offset += values.nbytes
+        columns[column] = values
+    return pd.DataFrame(columns, index=pd.DatetimeIndex(timestamps.view('datetime64[ns]'), name='timestamp'))
+
+def frame_to_json(df, name):
+    """データをJSONに変換（欠損値はnull、時刻はISO 8601）"""
+    data = {}
+    for column in df.columns:
+        values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        data[column] = [None if np.isnan(value) else value for value in values.tolist()]
+    body = {
+        'name': name,
+        'rows': len(df),
+        'index': [timestamp.isoformat() for timestamp in pd.DatetimeIndex(df.index)],
+        'data': data,
+    }
+    return json.dumps(body, ensure_ascii=False).encode('utf-8')
+
+def indicators_frame(indicators):
+    """テクニカル指標の辞書を1つのDataFrameにまとめる"""
+    return pd.concat({
+        'RSI': indicators['rsi'],
+        'MACD': indicators['macd_line'],
+        'MACD Signal': indicators['signal_line'],
+        'MACD Histogram': indicators['histogram'],
+        **{column: indicators['mas'][column] for column in indicators['mas'].columns},
+    }, axis=1)
+
+class QueryError(Exception):
+    """クエリの指定が不正な場合のエラー（HTTPステータスコードを保持）"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class QueryService:
+    """保存済みの系列・指標・シグナル・相関を時間範囲で返すサービス
+
+    読み込んだデータセットとパイプライン（指標・シグナル・相関のステージ）はLRUで
+    メモリ上に保持します。各エントリには元のCSVの更新時刻とサイズを記録し、
+    リクエストごとに比較して、コレクターが新しいデータを書き込んでいれば読み込み直します。
+    日付が変わった場合は取得期間を現在の日付基準で作り直し、エントリも読み込み直します。
+    パイプラインの計算結果はステージキャッシュも使用するため、再読み込み時も
+    変化したデータソースの下流のみを再計算します。
+
+    Args:
+        lookback_days (int): データの分析期間（日数）
+        freq (str): BTCUSD価格・指標・シグナルの頻度
+        max_entries (int): メモリ上に保持するデータセット・パイプラインの最大数
+        memory_budget (int): 資産ごとの読み込んだデータの合計メモリ使用量の上限（バイト）
+        use_cache (bool): ステージの出力キャッシュを使用するか
+    """
+
+    def __init__(self, lookback_days=365, freq='1d', max_entries=QUERY_CACHE_ENTRIES,
+                 memory_budget=None, use_cache=True):
+        self.lookback_days = lookback_days
+        self.freq = freq
+        self.max_entries = max_entries
+        self.memory_budget = memory_budget
+        self.collectors = {}
+        self.entries = OrderedDict()
+        # エントリ・コレクター・キーごとのロックの辞書を操作する間のみ保持するロック
+        self.lock = threading.Lock()
+        # キー -> 読み込みとパイプラインの評価を1スレッドずつ行うためのロック
+        self.key_locks = {}
+        self.stage_cache = ArtifactCache() if use_cache else None
+
+    def collector(self, asset):
+        """資産のコレクター（資産ごとに1つ作成し、日付が変わるまで再利用）
+
+        取得期間は作成時の日付で決まるため、日付が変わった場合は新しいコレクターを作成します
+        （読み込み中の他のスレッドは作成済みのコレクターの期間のまま処理を終えます）。
+        """
+        if asset not in ASSETS:
+            raise QueryError(400, f"不明な資産: {asset}（指定可能: {', '.join(ASSETS)}）")
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        with self.lock:
+            collector = self.collectors.get(asset)
+            if collector is None or collector.end_date != today:
+                collector = self.collectors[asset] = DataCollector(
+                    lookback_days=self.lookback_days, asset=asset, memory_budget=self.memory_budget)
+            return collector
+
+    def signature(self, collector, names):
+        """取得期間とデータソースの保存ファイルの更新時刻とサイズ（変更検出用）"""
+        signature = [('period', collector.start_date, collector.end_date)]
+        for name in names:
+            path = os.path.join(collector.base_path, collector.source_filename(name, self.freq))
+            try:
+                stat = os.stat(path)
+                signature.append((name, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append((name, None, None))
+        return tuple(signature)
+
+    def key_lock(self, key):
+        """キーごとのロック（初回のみ作成）"""
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    def _lookup(self, key, signature):
+        """元データが変化していないエントリの値（ない場合は None）"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != signature:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def cached(self, key, signature, load):
+        """LRUキャッシュからエントリを返す（ない場合や元データが変化した場合は読み込む）
+
+        読み込みは全体のロックの外でキーごとのロックを取得して行うため、他のキーの
+        リクエストを待たせません。同じキーの読み込みが同時に必要になった場合は
+        最初のスレッドのみが読み込み、他のスレッドはその結果を使用します。
+        """
+        value = self._lookup(key, signature)
+        if value is not None:
+            return value
+
+        with self.key_lock(key):
+            # 待っている間に他のスレッドが読み込んだ場合はその結果を使用
+            value = self._lookup(key, signature)
+            if value is not None:
+                return value
+            value = load()
+            with self.lock:
+                self.entries[key] = (signature, value)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+            return value
+
+    def stage(self, asset, name):
+        """資産のパイプラインのステージの出力（同じパイプラインの評価は1スレッドずつ）"""
+        pipeline = self.pipeline(asset)
+        with self.key_lock(('pipeline', asset)):
+            return pipeline.get(name)
+
+    def series(self, asset, name):
+        """保存済みの系列（取得期間内）"""
+        collector = self.collector(asset)
+        if name not in collector.sources:
+            raise QueryError(404, f"不明なデータソース: {name}（指定可能: {', '.join(collector.sources)}）")
+
+        def load():
+            df = collector.load_stored_data([name], freq=self.freq)
+            if df is None or df.get(name) is None:
+                raise QueryError(404, f"保存済みデータがありません: {name}")
+            return df[name]
+
+        return self.cached(('series', asset, name), self.signature(collector, [name]), load)
+
+    def pipeline(self, asset):
+        """資産の分析パイプライン（指標・シグナル・相関のステージ）"""
+        collector = self.collector(asset)
+
+        def load():
+            results = collector.load_stored_data(freq=self.freq)
+            pipeline = build_analysis_pipeline(results, self.stage_cache, asset=asset)
+            if pipeline is None or 'signals' not in pipeline:
+                raise QueryError(404, f"{asset}の価格データがありません")
+            return pipeline
+
+        return self.cached(('pipeline', asset), self.signature(collector, collector.sources), load)
+
+    def query(self, path, params):
+        """パスとクエリパラメータからデータを返す
+
+        Args:
+            path (str): リクエストパス（例: '/v1/series/btcusd'）
+            params (dict): クエリパラメータ（start, end, asset）
+
+        Returns:
+            tuple: (データセット名, pd.DataFrame)
+        """
+        asset = params.get('asset', DEFAULT_ASSET).upper()
+        parts = [part for part in path.split('/') if part]
+        if len(parts) < 2 or parts[0] != 'v1':
+            raise QueryError(404, f"不明なパス: {path}")
+
+        resource = parts[1]
+        if resource == 'series' and len(parts) == 3:
+            name, df = parts[2], self.series(asset, parts[2])
+        elif resource == 'indicators' and len(parts) == 2:
+            name, df = 'indicators', indicators_frame(self.stage(asset, 'indicators'))
+        elif resource == 'signal' and len(parts) == 2:
+            name, df = 'signal', self.stage(asset, 'signals').to_frame('Signal')
+        elif resource == 'correlations' and len(parts) == 3:
+            stage = f'correlation.{parts[2]}'
+            if stage not in self.pipeline(asset):
+                raise QueryError(404, f"相関を計算できないデータソース: {parts[2]}")
+            name, df = stage, self.stage(asset, stage).to_frame('Correlation')
+        else:
+            raise QueryError(404, f"不明なパス: {path}")
+
+        return name, self.slice(df, params.get('start'), params.get('end'))
+
+    def latest(self, asset=DEFAULT_ASSET):
+        """最新の市場シグナル"""
+        signals = self.stage(asset, 'signals')
+        latest_signal = int(signals.iloc[-1])
+        return {'asset': asset, 'timestamp': signals.index[-1].isoformat(),
+                'signal': latest_signal, 'label': SIGNAL_LABELS[latest_signal]}
+
+    @staticmethod
+    def slice(df, start=None, end=None):
+        """時間範囲で切り出す（両端を含む、コピーせずにビューとして返す）"""
+        def to_utc(value):
+            if not value:
+                return None
+            try:
+                timestamp = pd.Timestamp(value)
+            except ValueError as e:
+                raise QueryError(400, f"不正な時刻指定: {value}（{str(e)}）")
+            # タイムゾーン付きの指定はタイムゾーンなしのUTCに揃える
+            return timestamp.tz_convert('UTC').tz_localize(None) if timestamp.tz is not None else timestamp
+
+        start, end = to_utc(start), to_utc(end)
+        index = df.index
+        begin = index.searchsorted(start) if start is not None else 0
+        stop = index.searchsorted(end, side='right') if end is not None else len(index)
+        return df.iloc[begin:stop]
+
+def start_query_server(service, host='127.0.0.1', port=8081):
+    """クエリAPIのHTTPサーバーを起動（呼び出したスレッドで処理を続ける）
+
+    エンドポイント:
+        GET /v1/sources: データソースの一覧
+        GET /v1/latest: 最新の市場シグナル
+        GET /v1/series/<データソース>: 保存済みの系列
+        GET /v1/indicators: テクニカル指標（RSI、MACD、移動平均）
+        GET /v1/signal: 市場シグナル（-2〜2）
+        GET /v1/correlations/<dxy|sp500>: 価格との相関係数
+
+    クエリパラメータ: start, end（ISO 8601、両端を含む）、asset（デフォルト: BTC）、
+    format（json または bin、デフォルト: json）
+    """
+
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                if url.path == '/v1/sources':
+                    payload, content_type = self._json({'sources': list(SOURCES), 'assets': list(ASSETS)})
+                elif url.path == '/v1/latest':
+                    payload, content_type = self._json(service.latest(params.get('asset', DEFAULT_ASSET).upper()))
+                else:
+                    name, df = service.query(url.path, params)
+                    if params.get('format', 'json') == 'bin':
+                        payload, content_type = encode_frame(df, name), BINARY_CONTENT_TYPE
+                    else:
+                        payload, content_type = frame_to_json(df, name), 'application/json; charset=utf-8'
+            except QueryError as e:
+                self._send(e.status, *self._json({'error': str(e)}))
+                return
+            except Exception as e:
+                self._send(500, *self._json({'error': str(e)}))
+                return
+            self._send(200, payload, content_type)
+
+        def _send(self, status, payload, content_type):
+            # エラーもJSONで返す（send_errorは日本語のメッセージを送信できないため）
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        @staticmethod
+        def _json(body):
+            return json.dumps(body, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8'
+
+        def log_message(self, format, *args):
+            # アクセスログは出力しない
+            pass
+
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    print(f"クエリAPIを起動しました: http://{host}:{port}/v1/latest")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n停止要求を受信しました")
+    finally:
+        server.server_close()
+        print("クエリAPIを終了しました")
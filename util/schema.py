@@ -0,0 +1,160 @@
+import re
+import numpy as np
+import pandas as pd
+
+# 列名 -> メモリ上で使用する型の種類
+# 'price': float32（価格・比率など小数を含む値）
+# 'count': 符号なし整数（出来高・アドレス数など、欠損や小数を含む場合はfloat32）
+COLUMN_KINDS = {
+    'Open': 'price',
+    'High': 'price',
+    'Low': 'price',
+    'Close': 'price',
+    'Volume': 'price',            # BTC建ての出来高は小数を含む
+    'BTCUSD Price': 'price',
+    'DXY Price': 'price',
+    'SP500 Price': 'price',
+    'Gold Price': 'price',
+    'Total Holdings': 'count',
+    'Active Addresses': 'count',
+    'Hash Rate': 'price',
+    'Funding Rate': 'price',
+    'Open Interest': 'price',
+    'Fear & Greed Value': 'count',
+    'Trading Volume': 'price',    # USD建ての出来高
+    'Coinbase Premium': 'price',
+}
+
+# 列名のパターン -> 型の種類（COLUMN_KINDSにない列に適用）
+COLUMN_PATTERNS = [
+    (re.compile(r' Trend$'), 'count'),
+    (re.compile(r' Volume$'), 'count'),
+    (re.compile(r' (Price|Flow)$'), 'price'),
+]
+
+# 符号なし整数の候補（値の範囲に収まる最小の型を使用）
+UNSIGNED_DTYPES = [np.uint8, np.uint16, np.uint32, np.uint64]
+
+# メモリ予算の単位
+SIZE_UNITS = {'': 1, 'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+def column_kind(column):
+    """列名から型の種類を返す（不明な列はNone）"""
+    if column in COLUMN_KINDS:
+        return COLUMN_KINDS[column]
+    for pattern, kind in COLUMN_PATTERNS:
+        if pattern.search(column):
+            return kind
+    return None
+
+def to_unsigned(series):
+    """符号なし整数に変換（欠損・負値・小数を含む場合はfloat32）"""
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    if len(values) == 0 or np.isnan(values).any() or (values < 0).any() or (values != np.floor(values)).any():
+        return series.astype(np.float32)
+    maximum = values.max()
+    for dtype in UNSIGNED_DTYPES:
+        if maximum <= np.iinfo(dtype).max:
+            return series.astype(dtype)
+    return series.astype(np.float32)
+
+def compact_frame(df):
+    """列ごとにコンパクトな型を割り当てたデータを返す
+
+    価格や比率はfloat32、出来高やアドレス数などの件数は符号なし整数に変換し、
+    インデックスはdatetime64に揃えます。数値に変換できない列はそのまま残します。
+
+    Args:
+        df (pd.DataFrame): 変換するデータ
+
+    Returns:
+        pd.DataFrame: 変換後のデータ（元のデータは変更しない）
+    """
+    if df is None:
+        return None
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        kind = column_kind(column)
+        if kind is None and not pd.api.types.is_numeric_dtype(series):
+            columns[column] = series
+            continue
+        series = pd.to_numeric(series, errors='coerce')
+        if kind == 'count':
+            columns[column] = to_unsigned(series)
+        elif kind == 'price' or pd.api.types.is_float_dtype(series):
+            columns[column] = series.astype(np.float32)
+        else:
+            columns[column] = pd.to_numeric(series, downcast='integer')
+
+    compact = pd.DataFrame(columns, index=df.index)
+    if not isinstance(compact.index, pd.DatetimeIndex):
+        compact.index = pd.to_datetime(compact.index)
+    compact.index.name = df.index.name
+    compact.attrs = dict(df.attrs)
+    return compact
+
+def memory_footprint(df):
+    """データが使用するメモリ量（バイト、インデックスを含む）"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+def parse_size(value):
+    """サイズ指定をバイト数に変換（例: 512MB, 2GB, 1048576）"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*', value.upper())
+    if not match or match.group(2) not in SIZE_UNITS:
+        raise ValueError(f"不正なサイズ指定: {value}（例: 512MB, 2GB）")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+def format_size(size):
+    """バイト数を読みやすい文字列に変換"""
+    for unit in ('GB', 'MB', 'KB'):
+        if size >= SIZE_UNITS[unit]:
+            return f'{size / SIZE_UNITS[unit]:.1f}{unit}'
+    return f'{size}B'
+
+class MemoryBudget:
+    """読み込んだデータのメモリ使用量を集計し、予算を超えた場合にエラーとする"""
+
+    def __init__(self, limit_bytes=None):
+        self.limit_bytes = limit_bytes
+        self.footprints = {}
+
+    @property
+    def total_bytes(self):
+        return sum(self.footprints.values())
+
+    def add(self, name, df):
+        """データのメモリ使用量を記録
+
+        Args:
+            name (str): データセット名
+            df (pd.DataFrame): 記録するデータ（None可）
+
+        Raises:
+            MemoryError: 合計が予算を超えた場合
+        """
+        if df is None:
+            self.footprints.pop(name, None)
+            return
+        previous = self.footprints.get(name)
+        self.footprints[name] = memory_footprint(df)
+        if self.limit_bytes is not None and self.total_bytes > self.limit_bytes:
+            total, size = self.total_bytes, self.footprints[name]
+            # 予算超過時は記録を元に戻す（データは採用されない）
+            if previous is None:
+                del self.footprints[name]
+            else:
+                self.footprints[name] = previous
+            raise MemoryError(
+                f"メモリ予算を超えました: {format_size(total)} > {format_size(self.limit_bytes)}"
+                f"（{name}: {format_size(size)}）")
+
+    def print_report(self):
+        """データセットごとのメモリ使用量を表示"""
+        print("\n" + "="*50)
+        print("データセット別のメモリ使用量")
+        print("="*50)
+        for name, size in sorted(self.footprints.items(), key=lambda item: item[1], reverse=True):
+            print(f"{name:<20} {format_size(size):>10}")
+        limit = f" / 予算 {format_size(self.limit_bytes)}" if self.limit_bytes is not None else ""
+        print(f"{'合計':<18} {format_size(self.total_bytes):>10}{limit}")
@@ -0,0 +1,133 @@
+import os
+import re
+import json
+import shutil
+import numpy as np
+import pandas as pd
+
+# ストアの形式バージョン（形式を変更した場合は古いストアを再作成）
+STORE_VERSION = 1
+
+# タイムスタンプ列のファイル名（UTCのナノ秒を固定長のint64で保存）
+TIMESTAMP_FILE = 'timestamp.npy'
+
+class SeriesStore:
+    """データセットを列ごとのバイナリファイルに保存し、メモリマップで読み込むストア
+
+    各データセットは market_data/store/<データセット名>/ に、タイムスタンプ列と
+    値の列を1列1ファイル（.npy）で保存します。読み込み時はnp.load(mmap_mode='r')で
+    ファイルをマップし、コピーせずにpandasのビューとして返すため、複数のプロセスで
+    OSのページキャッシュ上の同じデータを共有できます。返すデータは読み取り専用です。
+
+    CSVが正本で、ストアはCSVから作成するキャッシュです。元のCSVの更新時刻と
+    サイズを記録し、CSVが更新された場合は作り直します。
+    """
+
+    def __init__(self, base_path='market_data/store'):
+        self.base_path = base_path
+
+    def _dataset_path(self, name):
+        return os.path.join(self.base_path, name)
+
+    @staticmethod
+    def _column_filename(position, column):
+        """列名からファイル名を作成（列名の記号は置き換え、順序を先頭に付加）"""
+        return f"{position:03d}_{re.sub(r'[^0-9A-Za-z_-]', '_', column)}.npy"
+
+    @staticmethod
+    def source_signature(source_path):
+        """元ファイルの更新時刻とサイズ（変更検出用）"""
+        stat = os.stat(source_path)
+        return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+    def read_meta(self, name):
+        """データセットのメタ情報を読み込む（存在しない場合はNone）"""
+        meta_path = os.path.join(self._dataset_path(name), 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except Exception as e:
+            print(f"ストアのメタ情報の読み込みに失敗: {str(e)}")
+            return None
+        return meta if meta.get('version') == STORE_VERSION else None
+
+    def is_fresh(self, name, source_path):
+        """ストアが元ファイルの最新の内容から作成されているかどうか"""
+        meta = self.read_meta(name)
+        if meta is None or not os.path.exists(source_path):
+            return False
+        return meta.get('source') == self.source_signature(source_path)
+
+    def write(self, name, df, source_path=None):
+        """データセットをストアに保存
+
+        一時ディレクトリに書き出してから置き換えるため、読み込み中のプロセスは
+        置き換え前のファイルを引き続き参照できます。
+
+        Args:
+            name (str): データセット名
+            df (pd.DataFrame): 数値列のみのデータ（DatetimeIndex）
+            source_path (str): 元のCSVファイル（変更検出用、None可）
+        """
+        dataset_path = self._dataset_path(name)
+        tmp_path = f'{dataset_path}.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        np.save(os.path.join(tmp_path, TIMESTAMP_FILE), index.as_unit('ns').asi8)
+
+        columns = []
+        for position, column in enumerate(df.columns):
+            filename = self._column_filename(position, column)
+            np.save(os.path.join(tmp_path, filename), df[column].to_numpy())
+            columns.append({'name': column, 'file': filename})
+
+        meta = {
+            'version': STORE_VERSION,
+            'rows': len(df),
+            'index_name': df.index.name,
+            'columns': columns,
+            'source': self.source_signature(source_path) if source_path else None,
+        }
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False)
+
+        # 旧ディレクトリを退避してから置き換える
+        old_path = f'{dataset_path}.old'
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(dataset_path):
+            os.replace(dataset_path, old_path)
+        os.replace(tmp_path, dataset_path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    def open(self, name):
+        """データセットをメモリマップで開く
+
+        Args:
+            name (str): データセット名
+
+        Returns:
+            pd.DataFrame: ファイルを参照する読み取り専用のデータ（存在しない場合はNone）
+        """
+        meta = self.read_meta(name)
+        if meta is None:
+            return None
+        dataset_path = self._dataset_path(name)
+        try:
+            # 空のファイルはマップできないため通常の読み込みを行う
+            mmap_mode = 'r' if meta['rows'] > 0 else None
+            timestamps = np.load(os.path.join(dataset_path, TIMESTAMP_FILE), mmap_mode=mmap_mode)
+            index = pd.DatetimeIndex(timestamps.view('datetime64[ns]'), copy=False, name=meta['index_name'])
+            columns = {
+                column['name']: np.load(os.path.join(dataset_path, column['file']), mmap_mode=mmap_mode)
+                for column in meta['columns']
+            }
+        except Exception as e:
+            print(f"ストアの読み込みに失敗: {str(e)}")
+            return None
+        return pd.DataFrame(columns, index=index, copy=False)
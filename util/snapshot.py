@@ -0,0 +1,214 @@
+import os
+import json
+import shutil
+import hashlib
+import pandas as pd
+import pyarrow as pa
+from datetime import datetime
+from .assets import DEFAULT_ASSET
+
+# スナップショットの保存先（資産ごとのディレクトリにバージョンごとのディレクトリを作成）
+SNAPSHOT_PATH = 'market_data/snapshots'
+
+# スナップショットの形式のバージョン（テーブルの構成や列を変更した場合に更新）
+SNAPSHOT_SCHEMA_VERSION = 1
+
+# 資産ごとに保持するスナップショットの数（超えた場合は古いものから削除）
+MAX_SNAPSHOTS = 30
+
+# 最新のスナップショットのバージョンを記録するファイル
+LATEST_FILENAME = 'LATEST'
+
+# スナップショットに含めるステージの一覧のファイル
+MANIFEST_FILENAME = 'manifest.json'
+
+# テーブル名 -> スナップショットに含めるステージ（'correlation.' は全ての相関係数）
+SNAPSHOT_STAGES = {
+    'panel': ['panel'],
+    'indicators': ['indicators'],
+    'indicators_1w': ['timeframes'],
+    'indicators_1M': ['timeframes'],
+    'signals': ['signal_components'],
+    'correlations': ['correlation.'],
+    'correlation_matrix': ['correlation_matrix'],
+    'lead_lag': ['lead_lag'],
+    'lead_lag_rolling': ['lead_lag'],
+}
+
+def _stage_names(pipeline, prefixes):
+    return [name for name in pipeline.stages
+            if any(name == prefix or (prefix.endswith('.') and name.startswith(prefix)) for prefix in prefixes)]
+
+def _timestamped(df):
+    """インデックスを 'timestamp' 列として書き出せるよう名前を揃える"""
+    return df.rename_axis('timestamp')
+
+def _indicator_table(indicators):
+    """calculate_indicatorsの結果を1つの表にまとめる"""
+    return _timestamped(pd.concat(
+        [indicators['price'].rename('price'), indicators['rsi'].rename('rsi'),
+         indicators['macd_line'].rename('macd_line'), indicators['signal_line'].rename('signal_line'),
+         indicators['histogram'].rename('histogram'), indicators['mas']], axis=1))
+
+def snapshot_tables(pipeline):
+    """パイプラインの出力をスナップショットのテーブルに変換
+
+    Args:
+        pipeline (StagePipeline): build_analysis_pipelineで作成したパイプライン
+
+    Returns:
+        dict: テーブル名 -> pd.DataFrame（出力がないテーブルは含まない）
+    """
+    tables = {}
+    panel = pipeline.get('panel')
+    # 補完済みの値と、各データソースが実際に観測された時点
+    tables['panel'] = _timestamped(pd.concat(
+        [panel.frame, panel.observed.add_prefix('observed.')], axis=1))
+
+    if 'indicators' in pipeline:
+        tables['indicators'] = _indicator_table(pipeline.get('indicators'))
+    if 'timeframes' in pipeline:
+        # 週足・月足の指標（日足は indicators と同じ）
+        timeframes = pipeline.get('timeframes')
+        for level in ('1w', '1M'):
+            if level in timeframes:
+                tables[f'indicators_{level}'] = _indicator_table(timeframes[level])
+    if 'signal_components' in pipeline:
+        tables['signals'] = _timestamped(pipeline.get('signal_components'))
+
+    correlations = {name[len('correlation.'):]: pipeline.get(name)
+                    for name in _stage_names(pipeline, ['correlation.'])}
+    correlations = {name: series.rename(name) for name, series in correlations.items() if series is not None}
+    if correlations:
+        tables['correlations'] = _timestamped(pd.concat(correlations.values(), axis=1))
+    if 'correlation_matrix' in pipeline:
+        matrix = pipeline.get('correlation_matrix')
+        if matrix is not None:
+            tables['correlation_matrix'] = matrix.rename_axis('column')
+    lead_lag = pipeline.get('lead_lag') if 'lead_lag' in pipeline else None
+    if lead_lag is not None:
+        # ラグ（日数）を列名にした系列 × ラグの相互相関
+        tables['lead_lag'] = lead_lag['cross'].rename(columns=str).rename_axis('series')
+        if lead_lag['rolling'] is not None:
+            tables['lead_lag_rolling'] = _timestamped(lead_lag['rolling'])
+    return tables
+
+def snapshot_key(pipeline):
+    """スナップショットの内容を決めるキー（含めるステージのキーから計算）"""
+    names = sorted(name for prefixes in SNAPSHOT_STAGES.values() for name in _stage_names(pipeline, prefixes))
+    payload = json.dumps([SNAPSHOT_SCHEMA_VERSION] + [pipeline.key(name) for name in names])
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+def write_table(df, path):
+    """DataFrameを非圧縮のArrow IPCファイルとして保存（メモリマップで読み込めるように）"""
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return table
+
+def write_snapshot(pipeline, asset=DEFAULT_ASSET, freq='1d', base_path=SNAPSHOT_PATH, max_snapshots=MAX_SNAPSHOTS):
+    """分析結果をバージョン付きのArrow IPCスナップショットとして保存
+
+    <base_path>/<資産>/<バージョン>/ にテーブルごとの .arrow ファイルと manifest.json を
+    作成し、<base_path>/<資産>/LATEST に最新のバージョンを記録します。内容（含める
+    ステージのキー）が最新のスナップショットと同じ場合は新しいバージョンを作成しません。
+
+    Args:
+        pipeline (StagePipeline): build_analysis_pipelineで作成したパイプライン
+        asset (str): 分析対象の資産
+        freq (str): 価格・指標・シグナルの頻度
+        base_path (str): スナップショットの保存先
+        max_snapshots (int): 保持するスナップショットの数
+
+    Returns:
+        str: スナップショットのディレクトリ
+    """
+    asset_dir = os.path.join(base_path, asset)
+    key = snapshot_key(pipeline)
+    latest = latest_snapshot(asset, base_path)
+    if latest is not None:
+        manifest = read_manifest(latest)
+        if manifest.get('key') == key and manifest.get('freq') == freq:
+            print(f"分析結果に変化がないためスナップショット'{latest}'を再利用しました")
+            return latest
+
+    created_at = datetime.now()
+    version = created_at.strftime('%Y%m%dT%H%M%S')
+    snapshot_dir = os.path.join(asset_dir, version)
+    # 書き込み途中のスナップショットを読まれないよう一時ディレクトリに作成してから置き換える
+    tmp_dir = f'{snapshot_dir}.{os.getpid()}.tmp'
+    os.makedirs(tmp_dir, exist_ok=True)
+    tables = {}
+    for name, df in snapshot_tables(pipeline).items():
+        table = write_table(df, os.path.join(tmp_dir, f'{name}.arrow'))
+        tables[name] = {'rows': table.num_rows, 'columns': table.column_names}
+
+    manifest = {
+        'schema_version': SNAPSHOT_SCHEMA_VERSION,
+        'version': version,
+        'created_at': created_at.isoformat(timespec='seconds'),
+        'asset': asset,
+        'freq': freq,
+        'key': key,
+        'tables': tables,
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILENAME), 'w') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    if os.path.exists(snapshot_dir):
+        shutil.rmtree(snapshot_dir)
+    os.replace(tmp_dir, snapshot_dir)
+
+    tmp_path = os.path.join(asset_dir, f'{LATEST_FILENAME}.{os.getpid()}.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp_path, os.path.join(asset_dir, LATEST_FILENAME))
+
+    prune_snapshots(asset_dir, max_snapshots)
+    print(f"スナップショットを保存しました: {snapshot_dir}（{len(tables)}テーブル）")
+    return snapshot_dir
+
+def prune_snapshots(asset_dir, max_snapshots=MAX_SNAPSHOTS):
+    """古いスナップショットを削除（バージョン名は時刻順に並ぶ）"""
+    versions = sorted(name for name in os.listdir(asset_dir)
+                      if os.path.isfile(os.path.join(asset_dir, name, MANIFEST_FILENAME)))
+    for version in versions[:-max_snapshots] if max_snapshots else []:
+        shutil.rmtree(os.path.join(asset_dir, version), ignore_errors=True)
+
+def latest_snapshot(asset=DEFAULT_ASSET, base_path=SNAPSHOT_PATH):
+    """最新のスナップショットのディレクトリ（ない場合はNone）"""
+    asset_dir = os.path.join(base_path, asset)
+    try:
+        with open(os.path.join(asset_dir, LATEST_FILENAME)) as f:
+            snapshot_dir = os.path.join(asset_dir, f.read().strip())
+    except FileNotFoundError:
+        return None
+    return snapshot_dir if os.path.isfile(os.path.join(snapshot_dir, MANIFEST_FILENAME)) else None
+
+def read_manifest(snapshot_dir):
+    """スナップショットの manifest.json を読み込む"""
+    with open(os.path.join(snapshot_dir, MANIFEST_FILENAME)) as f:
+        return json.load(f)
+
+def load_snapshot(snapshot_dir, tables=None, as_frames=False):
+    """スナップショットをメモリマップで読み込む
+
+    返すArrowテーブルはファイルを参照するため、コピーせずに列を読み出せます。
+
+    Args:
+        snapshot_dir (str): スナップショットのディレクトリ（latest_snapshotの戻り値など）
+        tables (list): 読み込むテーブル名（None の場合は全て）
+        as_frames (bool): pd.DataFrame（インデックスを復元したもの）に変換するかどうか
+
+    Returns:
+        dict: テーブル名 -> pa.Table（as_frames の場合は pd.DataFrame）
+    """
+    manifest = read_manifest(snapshot_dir)
+    if manifest.get('schema_version') != SNAPSHOT_SCHEMA_VERSION:
+        raise ValueError(f"未対応のスナップショット形式: {manifest.get('schema_version')}")
+    results = {}
+    for name in tables or manifest['tables']:
+        source = pa.memory_map(os.path.join(snapshot_dir, f'{name}.arrow'), 'r')
+        table = pa.ipc.open_file(source).read_all()
+        results[name] = table.to_pandas() if as_frames else table
+    return results